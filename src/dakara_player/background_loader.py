@@ -1,9 +1,11 @@
 import logging
 from os.path import exists
 
+import filetype
 from dakara_base.exceptions import DakaraError
 from path import Path
 
+from dakara_player.io_executor import IOTimeoutError
 
 logger = logging.getLogger(__name__)
 
@@ -55,6 +57,9 @@ class BackgroundLoader:
             file name.
         directory (path.Path): custom lookup directory.
         background_filenames (dict): dictionary of custom background filenames.
+        io_executor (dakara_player.io_executor.IOExecutor): executor to check
+            the existence of files within a deadline. If not given, files are
+            checked directly.
 
     Attributes:
         backgrounds (dict): dictionary of background file paths. The key is
@@ -64,6 +69,8 @@ class BackgroundLoader:
             filenames.
         directory (path.Path): custom lookup directory.
         background_filenames (dict): dictionary of custom background filenames.
+        io_executor (dakara_player.io_executor.IOExecutor): executor to check
+            the existence of files within a deadline.
     """
 
     def __init__(
@@ -72,6 +79,7 @@ class BackgroundLoader:
         default_background_filenames,
         directory=None,
         background_filenames=None,
+        io_executor=None,
     ):
         self.default_directory = default_directory
         self.default_background_filenames = default_background_filenames
@@ -80,6 +88,7 @@ class BackgroundLoader:
         self.background_filenames = dict(
             (k, v) for k, v in background_filenames.items() if v
         )
+        self.io_executor = io_executor
         self.backgrounds = {}
 
     def load(self):
@@ -96,7 +105,7 @@ class BackgroundLoader:
         if name in self.background_filenames and self.directory:
             filename = self.background_filenames[name]
             path = self.directory / filename
-            if exists(path):
+            if self.exists(path):
                 logger.debug("Loading custom %s background file '%s'", name, path)
                 return path
 
@@ -104,13 +113,13 @@ class BackgroundLoader:
         default_filename = self.default_background_filenames[name]
         if self.directory:
             path = self.directory / default_filename
-            if exists(path):
+            if self.exists(path):
                 logger.debug("Loading default %s background file '%s'", name, path)
                 return path
 
         # trying to load from default name and default directory
         path = self.default_directory / default_filename
-        if exists(path):
+        if self.exists(path):
             logger.debug("Loading default %s background file '%s'", name, path)
             return path
 
@@ -118,6 +127,45 @@ class BackgroundLoader:
             "Unable to find a background file for {}".format(name)
         )
 
+    def is_video(self, name):
+        """Tell if a loaded background is a video
+
+        Args:
+            name (str): name of the background.
+
+        Returns:
+            bool: True if the background file is detected as a video.
+        """
+        kind = filetype.guess(str(self.backgrounds[name]))
+        if not kind:
+            return False
+
+        maintype, _ = kind.mime.split("/")
+
+        return maintype == "video"
+
+    def exists(self, path):
+        """Check if a background file exists
+
+        A file that cannot be accessed within the deadline of the executor is
+        considered missing.
+
+        Args:
+            path (path.Path): path of the file.
+
+        Returns:
+            bool: True if the file exists.
+        """
+        if self.io_executor is None:
+            return exists(path)
+
+        try:
+            return self.io_executor.call(exists, path)
+
+        except IOTimeoutError as error:
+            logger.warning("Unable to check background file: %s", error)
+            return False
+
 
 class BackgroundNotFoundError(DakaraError, FileNotFoundError):
     """Error raised when a background cannot be found
@@ -0,0 +1,154 @@
+import json
+import logging
+import os
+from threading import Lock
+from time import monotonic, time
+
+from path import Path
+
+from dakara_player.playlist_entry import PlaylistEntry
+
+CHECKPOINT_INTERVAL = 2
+CHECKPOINT_MAX_AGE = 60
+
+logger = logging.getLogger(__name__)
+
+
+class Checkpoint:
+    """Crash-safe record of the song being played
+
+    The playlist entry and the position of the song are written to a small
+    file, so that a restarted player can resume it. The file is written to a
+    temporary file first and then renamed, so that it is never partially
+    written. Writes are throttled, and skipped if nothing has changed. The
+    file is not synced to disk, as it only has to survive a crash of the
+    program, not of the system.
+
+    >>> checkpoint = Checkpoint(Path("checkpoint.json"))
+    >>> checkpoint.save(playlist_entry, 12.5)
+    >>> checkpoint.load(Path("kara"))
+    (<PlaylistEntry 42 'Song title'>, 12.5)
+
+    Args:
+        path (path.Path): Path of the checkpoint file.
+        interval (float): Minimal interval between two writes for the same
+            playlist entry, in seconds.
+        max_age (float): Maximal age of a checkpoint to be resumed, in
+            seconds.
+
+    Attributes:
+        path (path.Path): Path of the checkpoint file.
+        interval (float): Minimal interval between two writes for the same
+            playlist entry, in seconds.
+        max_age (float): Maximal age of a checkpoint to be resumed, in
+            seconds.
+        saved (tuple): ID of the playlist entry and position of the last
+            write, None if there is no checkpoint file.
+        saved_time (float): Monotonic time of the last write.
+        lock (threading.Lock): Lock for writes.
+    """
+
+    def __init__(
+        self, path, interval=CHECKPOINT_INTERVAL, max_age=CHECKPOINT_MAX_AGE,
+    ):
+        self.path = Path(path)
+        self.interval = interval
+        self.max_age = max_age
+        self.saved = None
+        self.saved_time = 0
+        self.lock = Lock()
+
+    def save(self, playlist_entry, position):
+        """Save the playlist entry being played and its position
+
+        The file is not written if the same playlist entry has been saved
+        less than `interval` seconds ago. It is written even if the position
+        has not changed, e.g. when the song is paused, so that the time of the
+        checkpoint stays recent.
+
+        Args:
+            playlist_entry (dakara_player.playlist_entry.PlaylistEntry):
+                Playlist entry being played.
+            position (float): Position in the song in seconds.
+        """
+        with self.lock:
+            now = monotonic()
+            saved = (playlist_entry.id, position)
+
+            if (
+                self.saved is not None
+                and self.saved[0] == playlist_entry.id
+                and now - self.saved_time < self.interval
+            ):
+                return
+
+            content = json.dumps(
+                {
+                    "playlist_entry": playlist_entry.to_dict(),
+                    "position": position,
+                    "time": time(),
+                }
+            )
+
+            path_temporary = self.path + ".tmp"
+            try:
+                path_temporary.write_text(content)
+                os.replace(path_temporary, self.path)
+
+            except OSError as error:
+                logger.warning("Unable to write checkpoint: %s", error)
+                return
+
+            self.saved = saved
+            self.saved_time = now
+
+    def clear(self):
+        """Remove the checkpoint
+
+        The file is only removed if it has been written by this instance.
+        """
+        with self.lock:
+            if self.saved is None:
+                return
+
+            try:
+                self.path.remove_p()
+
+            except OSError as error:
+                logger.warning("Unable to remove checkpoint: %s", error)
+
+            self.saved = None
+
+    def load(self, kara_folder_path):
+        """Load the checkpoint if it is recent enough
+
+        The saved playlist entry is validated like one sent by the server, an
+        invalid checkpoint is ignored.
+
+        Args:
+            kara_folder_path (path.Path): Path of the karaoke folder.
+
+        Returns:
+            tuple: Playlist entry and position in seconds of the saved song,
+            None if there is no recent valid checkpoint.
+        """
+        if not self.path.exists():
+            return None
+
+        try:
+            content = json.loads(self.path.text())
+            age = time() - content["time"]
+            playlist_entry = PlaylistEntry.from_dict(
+                content["playlist_entry"], kara_folder_path
+            )
+            position = float(content["position"])
+
+        except (OSError, ValueError, TypeError, KeyError) as error:
+            logger.warning("Unable to read checkpoint: %s", error)
+            return None
+
+        if not 0 <= age <= self.max_age:
+            logger.debug("Checkpoint is too old to be resumed")
+            return None
+
+        return playlist_entry, position
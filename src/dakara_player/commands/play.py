@@ -6,12 +6,29 @@ from dakara_base.config import (
     ConfigNotFoundError,
     create_config_file,
     create_logger,
+    get_config_directory,
     get_config_file,
     load_config,
     set_loglevel,
 )
+from path import Path
 
 from dakara_player import DakaraPlayer
+from dakara_player.decoder_probe import (
+    DecoderProbeError,
+    get_sample_path,
+    probe_decoders,
+    select_result,
+    write_setting,
+)
+from dakara_player.library_check import (
+    LIBRARY_REPORT_NAME,
+    check_library,
+    get_reject_list,
+    write_json,
+)
+from dakara_player.profiles import get_effective_settings
+from dakara_player.reject_list import get_reject_list_path
 from dakara_player.version import __version__, __date__
 
 
@@ -64,6 +81,56 @@ def get_parser():
         action="store_true",
     )
 
+    # show settings subparser
+    show_settings_subparser = subparsers.add_parser(
+        "show-settings",
+        description="Show the effective performance settings of the media players",
+        help="Show the effective performance settings of the media players",
+    )
+    show_settings_subparser.set_defaults(function=show_settings)
+
+    # probe decoders subparser
+    probe_decoders_subparser = subparsers.add_parser(
+        "probe-decoders",
+        description="Find the fastest working decoder setting of the media player "
+        "and write it in the config file",
+        help="Find the fastest working decoder setting of the media player",
+    )
+    probe_decoders_subparser.set_defaults(function=probe_decoders_command)
+
+    probe_decoders_subparser.add_argument(
+        "file", nargs="?", help="video file to decode, default to a bundled sample"
+    )
+
+    probe_decoders_subparser.add_argument(
+        "--dry-run",
+        help="do not write the decoder setting in the config file",
+        action="store_true",
+    )
+
+    # check library subparser
+    check_library_subparser = subparsers.add_parser(
+        "check-library",
+        description="Check that the songs of the karaoke folder can be played "
+        "and write a report and a list of songs to reject",
+        help="Check that the songs of the karaoke folder can be played",
+    )
+    check_library_subparser.set_defaults(function=check_library_command)
+
+    check_library_subparser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="number of songs checked in parallel, default to the number of CPUs",
+    )
+
+    check_library_subparser.add_argument(
+        "--report",
+        help="path of the report, default to '{}' in the config directory".format(
+            LIBRARY_REPORT_NAME
+        ),
+    )
+
     return parser
 
 
@@ -118,6 +185,85 @@ def create_config(args):
     logger.info("Please edit this file")
 
 
+def show_settings(args):
+    """Show the effective performance settings
+
+    Args:
+        args (argparse.Namespace): arguments from command line.
+    """
+    create_logger(custom_log_format="%(message)s", custom_log_level="INFO")
+    config = load_config(
+        get_config_file(CONFIG_FILE), args.debug, mandatory_keys=["player"]
+    )
+
+    for line in get_effective_settings(config["player"]):
+        logger.info(line)
+
+
+def probe_decoders_command(args):
+    """Probe the decoder settings and write the best one in the config
+
+    Args:
+        args (argparse.Namespace): arguments from command line.
+    """
+    create_logger(custom_log_format="%(message)s", custom_log_level="INFO")
+    config_path = get_config_file(CONFIG_FILE)
+    config = load_config(config_path, args.debug, mandatory_keys=["player"])
+
+    player_name = config["player"].get("player_name", "vlc")
+    sample_path = get_sample_path(args.file)
+    logger.info("Probing decoders of %s with '%s'", player_name, sample_path)
+
+    results = probe_decoders(player_name, sample_path)
+    for result in results:
+        logger.info(result)
+
+    best = select_result(results)
+    if best is None:
+        raise DecoderProbeError("No decoder setting could decode the sample")
+
+    logger.info("Best decoder setting: %s", best.setting)
+
+    if args.dry_run:
+        return
+
+    write_setting(config_path, player_name, best.setting)
+    logger.info("Decoder setting written in '%s'", config_path)
+
+
+def check_library_command(args):
+    """Check the songs of the karaoke folder
+
+    Args:
+        args (argparse.Namespace): arguments from command line.
+    """
+    create_logger(custom_log_format="%(message)s", custom_log_level="INFO")
+    config = load_config(
+        get_config_file(CONFIG_FILE), args.debug, mandatory_keys=["player"]
+    )
+
+    kara_folder = Path(config["player"].get("kara_folder", "")).expand().abspath()
+    player_name = config["player"].get("player_name", "vlc")
+    logger.info("Checking songs of '%s' with %s", kara_folder, player_name)
+
+    report = check_library(kara_folder, player_name, args.jobs)
+    report_path = Path(
+        args.report or get_config_directory() / LIBRARY_REPORT_NAME
+    ).expand()
+    write_json(report_path, report)
+
+    reject_list_path = get_reject_list_path(config["player"])
+    reject_list = get_reject_list(report)
+    write_json(reject_list_path, reject_list)
+
+    for path, song in reject_list.items():
+        logger.warning("Rejected '%s': %s", path, "; ".join(song["errors"]))
+
+    logger.info("%i songs checked, %i rejected", len(report["songs"]), len(reject_list))
+    logger.info("Report written in '%s'", report_path)
+    logger.info("Reject list written in '%s'", reject_list_path)
+
+
 def main():
     """Main command
     """
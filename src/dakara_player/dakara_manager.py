@@ -1,5 +1,7 @@
 import logging
 
+from dakara_player.playlist_entry import InvalidPlaylistEntryError, PlaylistEntry
+
 
 logger = logging.getLogger("dakara_manager")
 
@@ -43,12 +45,13 @@ class DakaraManager:
 
         # set dakara server websocket callbacks
         self.dakara_server_websocket.set_callback("idle", self.play_idle_screen)
+        self.dakara_server_websocket.set_callback("idle_info", self.update_idle_screen)
         self.dakara_server_websocket.set_callback(
             "playlist_entry", self.play_playlist_entry
         )
         self.dakara_server_websocket.set_callback("command", self.do_command)
         self.dakara_server_websocket.set_callback(
-            "connection_lost", self.play_idle_screen
+            "connection_lost", self.handle_connection_lost
         )
 
     def handle_error(self, playlist_entry_id, message):
@@ -113,9 +116,44 @@ class DakaraManager:
     def play_playlist_entry(self, playlist_entry):
         """Play the requested playlist entry
 
+        The playlist entry is parsed and validated here. If it is invalid, it
+        is reported as an error and considered it cannot be played. If it is
+        already played, because it has been resumed after a crash, it is only
+        reported as started.
+
         Args:
             playlist_entry (dict): dictionary of the playlist entry.
         """
+        try:
+            playlist_entry = PlaylistEntry.from_dict(
+                playlist_entry, self.media_player.kara_folder_path
+            )
+
+        except InvalidPlaylistEntryError as error:
+            logger.error("Invalid playlist entry: %s", error)
+
+            # the error can only be reported if the entry has an ID
+            playlist_entry_id = (
+                playlist_entry.get("id") if isinstance(playlist_entry, dict) else None
+            )
+            if isinstance(playlist_entry_id, int):
+                self.handle_error(playlist_entry_id, str(error))
+                self.handle_could_not_play(playlist_entry_id)
+
+            return
+
+        current_playlist_entry = self.media_player.playlist_entry
+        if (
+            current_playlist_entry is not None
+            and current_playlist_entry.id == playlist_entry.id
+            and self.media_player.is_playing_this("song")
+        ):
+            logger.info("Playlist entry %i is already playing", playlist_entry.id)
+            self.handle_started_transition(playlist_entry.id)
+            self.handle_started_song(playlist_entry.id)
+
+            return
+
         self.media_player.set_playlist_entry(playlist_entry)
 
     def play_idle_screen(self):
@@ -123,6 +161,22 @@ class DakaraManager:
         """
         self.media_player.play("idle")
 
+    def update_idle_screen(self, info):
+        """Update the information displayed on the idle screen
+
+        Args:
+            info (dict): information sent by the server with the idle order.
+        """
+        self.media_player.update_idle_screen(connected=True, **info)
+
+    def handle_connection_lost(self):
+        """Callback when the connection to the server is lost
+
+        The idle screen is played and tells the server cannot be reached.
+        """
+        self.media_player.update_idle_screen(connected=False)
+        self.play_idle_screen()
+
     def do_command(self, command):
         """Execute a player command
 
@@ -1,6 +1,8 @@
 import logging
 from contextlib import ExitStack
+from queue import Empty, Queue
 from tempfile import TemporaryDirectory
+from threading import Event
 
 from dakara_base.safe_workers import Runner, WorkerSafeThread
 from dakara_base.exceptions import DakaraError
@@ -12,17 +14,23 @@ from dakara_player.dakara_server import (
     DakaraServerHTTPConnection,
     DakaraServerWebSocketConnection,
 )
+from dakara_player.media_player.host import MediaPlayerHost
+from dakara_player.media_player.libmpv import MediaPlayerLibmpv
 from dakara_player.media_player.mpv import MediaPlayerMpv
 from dakara_player.media_player.vlc import MediaPlayerVlc
+from dakara_player.rooms import SharedResources, get_rooms_config
 from dakara_player.version import check_version
 
 FontLoader = get_font_loader_class()
 
 MEDIA_PLAYER_CLASSES = {
+    "libmpv": MediaPlayerLibmpv,
     "mpv": MediaPlayerMpv,
     "vlc": MediaPlayerVlc,
 }
 
+ROOM_CHECK_INTERVAL = 0.5
+
 logger = logging.getLogger(__name__)
 
 
@@ -55,7 +63,14 @@ class DakaraPlayer(Runner):
 
     def run(self):
         """Launch the worker and wait for the end
+
+        If several rooms are declared in the config, they are all run in this
+        process.
         """
+        if self.config.get("rooms"):
+            self.run_safe(DakaraRoomsWorker, self.config)
+            return
+
         self.run_safe(DakaraWorker, self.config)
 
 
@@ -66,20 +81,31 @@ class DakaraWorker(WorkerSafeThread):
     the main thread and waits for the end.
     """
 
-    def init_worker(self, config):
+    def init_worker(self, config, resources=None, name=None):
         """Initialization
 
         Load the config and set the logger loglevel.
 
         Args:
             config (dict): configuration for the program.
+            resources (dakara_player.rooms.SharedResources): resources shared
+                with the other rooms, if the worker runs a room.
+            name (str): name of the room, if the worker runs a room.
         """
         self.config = config
+        self.resources = resources
+        self.name = name
 
         # set thread
-        self.thread = self.create_thread(target=self.run)
+        self.thread = self.create_thread(
+            target=self.run, name="room-{}".format(name) if name else None
+        )
 
         # inform the user
+        if name:
+            logger.debug("Starting Dakara worker for room %s", name)
+            return
+
         logger.debug("Starting Dakara worker")
 
     def get_media_player_class(self):
@@ -128,21 +154,47 @@ class DakaraWorker(WorkerSafeThread):
             # temporary directory
             tempdir = Path(stack.enter_context(TemporaryDirectory(suffix=".dakara")))
 
-            # font loader
-            font_loader = stack.enter_context(FontLoader())
-            font_loader.load()
+            # font loader, possibly shared with other rooms
+            if self.resources is not None:
+                font_loader = self.resources.font_loader
+
+            else:
+                font_loader = stack.enter_context(FontLoader())
+                font_loader.load()
+
+            # media player, possibly in a separate process
+            media_player_class = self.get_media_player_class()
+            if self.config["player"].get("separate_process", False):
+                media_player = stack.enter_context(
+                    MediaPlayerHost(
+                        self.stop,
+                        self.errors,
+                        self.config["player"],
+                        tempdir,
+                        media_player_class,
+                    )
+                )
 
-            # media player
-            media_player = stack.enter_context(
-                self.get_media_player_class()(
-                    self.stop, self.errors, self.config["player"], tempdir
+            else:
+                media_player = stack.enter_context(
+                    media_player_class(
+                        self.stop,
+                        self.errors,
+                        self.config["player"],
+                        tempdir,
+                        resources=self.resources,
+                    )
                 )
-            )
+
             media_player.load()
 
+            # resume the song played before a crash, before connecting to the
+            # server
+            media_player.resume_checkpoint()
+
             # communication with the dakara HTTP server
             dakara_server_http = DakaraServerHTTPConnection(
-                self.config["server"], endpoint_prefix="api/", mute_raise=True
+                self.config["server"], endpoint_prefix="api/", mute_raise=True,
             )
             dakara_server_http.authenticate()
             token_header = dakara_server_http.get_token_header()
@@ -173,6 +225,75 @@ class DakaraWorker(WorkerSafeThread):
             # stopping the program
 
 
+class DakaraRoomsWorker(WorkerSafeThread):
+    """Class associated with the worker thread of several rooms
+
+    Each room declared in the config is run by its own `DakaraWorker`, with
+    its own stop event and errors queue, so that a room that fails stops
+    alone. The fonts, the filesystem access and the templates are shared by
+    the rooms.
+
+    The worker stops when all the rooms have failed, with the error of the
+    last one.
+    """
+
+    def init_worker(self, config):
+        """Initialization
+
+        Args:
+            config (dict): configuration for the program.
+        """
+        self.rooms_config = get_rooms_config(config)
+
+        # set thread
+        self.thread = self.create_thread(target=self.run)
+
+        # inform the user
+        logger.debug("Starting Dakara worker for %i rooms", len(self.rooms_config))
+
+    def run(self):
+        """Worker main method
+
+        It starts the worker of each room and waits for the end. A room which
+        fails is logged and left stopped.
+        """
+        with ExitStack() as stack:
+            # font loader
+            font_loader = stack.enter_context(FontLoader())
+            font_loader.load()
+
+            # shared resources
+            resources = SharedResources(font_loader)
+
+            # rooms
+            rooms = {}
+            for name, room_config in self.rooms_config:
+                room = stack.enter_context(
+                    DakaraWorker(Event(), Queue(), room_config, resources, name)
+                )
+                room.thread.start()
+                rooms[name] = room
+                logger.info("Started room %s", name)
+
+            # wait for stop event, or for all the rooms to fail
+            while not self.stop.wait(ROOM_CHECK_INTERVAL):
+                for name, room in list(rooms.items()):
+                    try:
+                        _, error, traceback = room.errors.get_nowait()
+
+                    except Empty:
+                        continue
+
+                    logger.error("Room %s has stopped: %s", name, error)
+                    del rooms[name]
+
+                    if not rooms:
+                        raise error.with_traceback(traceback)
+
+            # leaving this method means leaving all the context managers and
+            # stopping the rooms
+
+
 class UnsupportedMediaPlayerError(DakaraError):
     """Raised if an unknown media player is requested
     """
@@ -258,6 +258,7 @@ class DakaraServerWebSocketConnection(WebSocketClient):
         """Set all the default callbacks
         """
         self.set_callback("idle", lambda: None)
+        self.set_callback("idle_info", lambda info: None)
         self.set_callback("playlist_entry", lambda playlist_entry: None)
         self.set_callback("command", lambda command: None)
         self.set_callback("connection_lost", lambda: None)
@@ -275,10 +276,15 @@ class DakaraServerWebSocketConnection(WebSocketClient):
     def receive_idle(self, content):
         """Receive idle order
 
+        Extra information of the event, if any, is passed to the idle screen.
+
         Args:
             content (dict): dictionary of the event
         """
         logger.debug("Received idle order")
+        if isinstance(content, dict):
+            self.callbacks["idle_info"](content)
+
         self.callbacks["idle"]()
 
     def receive_playlist_entry(self, content):
@@ -0,0 +1,392 @@
+import logging
+from threading import Event
+from time import monotonic
+
+import yaml
+from dakara_base.exceptions import DakaraError
+from path import Path
+
+try:
+    import python_mpv_jsonipc as mpv
+
+except ImportError:
+    mpv = None
+
+try:
+    import vlc
+
+except ImportError:
+    vlc = None
+
+from dakara_player.resources_manager import get_sample
+
+PROBE_TIMEOUT = 60
+
+# VLC cannot decode as fast as possible, the sample is played faster instead,
+# so its decoding rate cannot exceed this many times the frame rate of the
+# sample
+PROBE_RATE = 8
+
+# candidate decoder settings by media player, the first one is the software
+# decoder which is always available
+DECODER_CANDIDATES = {
+    "vlc": ["none", "any", "vaapi", "vdpau", "dxva2", "d3d11va"],
+    "mpv": [
+        "no",
+        "auto-safe",
+        "vaapi",
+        "vdpau",
+        "nvdec",
+        "dxva2",
+        "d3d11va",
+        "videotoolbox",
+    ],
+}
+DECODER_CANDIDATES["libmpv"] = DECODER_CANDIDATES["mpv"]
+
+logger = logging.getLogger(__name__)
+
+
+class ProbeResult:
+    """Result of the decoding of the sample with a decoder setting
+
+    Args:
+        setting (str): Decoder setting.
+
+    Attributes:
+        setting (str): Decoder setting.
+        frames (int): Number of frames decoded.
+        dropped (int): Number of frames dropped.
+        elapsed (float): Duration of the decoding in seconds.
+        error (str): Reason why the setting does not work, None if it works.
+    """
+
+    def __init__(self, setting):
+        self.setting = setting
+        self.frames = 0
+        self.dropped = 0
+        self.elapsed = 0
+        self.error = None
+
+    @property
+    def fps(self):
+        """Decoding rate in frames per second
+
+        For VLC, the sample is played at `PROBE_RATE` times its normal speed,
+        so the rate is capped to `PROBE_RATE` times the frame rate of the
+        sample and tells which settings keep up with this speed rather than
+        how fast they decode.
+        """
+        return self.frames / self.elapsed if self.elapsed else 0
+
+    @property
+    def works(self):
+        """True if the setting decoded the sample
+        """
+        return self.error is None and self.frames > 0
+
+    def __str__(self):
+        if not self.works:
+            return "{}: not working ({})".format(
+                self.setting, self.error or "no frame decoded"
+            )
+
+        return "{}: {:.1f} fps, {} frames dropped".format(
+            self.setting, self.fps, self.dropped
+        )
+
+
+def get_sample_path(path=None):
+    """Get the path of the sample to decode
+
+    The sample shipped with the package is used by default.
+
+    Args:
+        path (str): Path given by the user, if any.
+
+    Returns:
+        path.Path: Path of the sample.
+
+    Raises:
+        DecoderProbeError: If the sample does not exist.
+    """
+    sample_path = Path(path).expand() if path else get_sample()
+    if not sample_path.isfile():
+        raise DecoderProbeError("Sample file '{}' not found".format(sample_path))
+
+    return sample_path
+
+
+def probe_mpv(sample_path, setting, start=None, length=None):
+    """Decode the sample with mpv
+
+    mpv decodes as fast as possible without video and audio outputs. A
+    hardware decoder is considered not working if mpv falls back to the
+    software decoder.
+
+    Args:
+        sample_path (path.Path): Path of the sample.
+        setting (str): Value of the `hwdec` option.
+        start (float): Position where to start decoding in seconds. Default
+            to the beginning.
+        length (float): Duration to decode in seconds. Default to the end.
+
+    Returns:
+        ProbeResult: Result of the decoding.
+    """
+    result = ProbeResult(setting)
+    if mpv is None:
+        result.error = "python-mpv-jsonipc is not installed"
+        return result
+
+    ended = Event()
+
+    def handle_eof_reached(name, value):
+        if value:
+            ended.set()
+
+    def handle_end_file(event):
+        if event.get("reason") == "error":
+            result.error = event.get("file_error") or "unable to decode"
+            ended.set()
+
+    options = {}
+    if start is not None:
+        options["start"] = start
+
+    if length is not None:
+        options["length"] = length
+
+    try:
+        player = mpv.MPV(
+            vo="null",
+            ao="null",
+            untimed=True,
+            keep_open="yes",
+            hwdec=setting,
+            **options
+        )
+
+    except (OSError, mpv.MPVError) as error:
+        result.error = "unable to start mpv: {}".format(error)
+        return result
+
+    try:
+        player.bind_property_observer("eof-reached", handle_eof_reached)
+        player.bind_event("end-file", handle_end_file)
+
+        start = monotonic()
+        player.play(str(sample_path))
+        if not ended.wait(PROBE_TIMEOUT):
+            result.error = "timeout"
+            return result
+
+        result.elapsed = monotonic() - start
+        if result.error is not None:
+            return result
+
+        result.frames = player.estimated_frame_number or 0
+        result.dropped = (player.frame_drop_count or 0) + (
+            player.decoder_frame_drop_count or 0
+        )
+
+        hwdec_current = player.hwdec_current
+        if setting != "no" and hwdec_current in (None, "no"):
+            result.error = "fell back to software decoding"
+
+    except (OSError, mpv.MPVError) as error:
+        result.error = str(error)
+
+    finally:
+        player.terminate()
+
+    return result
+
+
+def probe_vlc(sample_path, setting, start=None, length=None):
+    """Decode the sample with VLC
+
+    VLC plays the sample `PROBE_RATE` times faster than normal, without
+    video and audio outputs. As the playback is paced, the measured decoding
+    rate cannot exceed `PROBE_RATE` times the frame rate of the sample: a
+    setting decoding faster than this gets the same rate, so settings are
+    mostly told apart by the frames they drop.
+
+    Args:
+        sample_path (path.Path): Path of the sample.
+        setting (str): Value of the `avcodec-hw` option.
+        start (float): Position where to start decoding in seconds. Default
+            to the beginning.
+        length (float): Duration to decode in seconds. Default to the end.
+
+    Returns:
+        ProbeResult: Result of the decoding.
+    """
+    result = ProbeResult(setting)
+    if vlc is None:
+        result.error = "python-vlc is not installed"
+        return result
+
+    # python-vlc raises NameError when libvlc cannot be loaded
+    try:
+        instance = vlc.Instance(
+            ["--vout=dummy", "--aout=dummy", "--no-video-title-show"]
+        )
+
+    except NameError:
+        result.error = "VLC is not installed"
+        return result
+
+    if instance is None:
+        result.error = "unable to start VLC"
+        return result
+
+    ended = Event()
+
+    def handle_end_reached(event):
+        ended.set()
+
+    def handle_encountered_error(event):
+        result.error = "unable to decode"
+        ended.set()
+
+    player = instance.media_player_new()
+    media = instance.media_new_path(str(sample_path))
+    media.add_options("avcodec-hw={}".format(setting))
+    if start is not None:
+        media.add_options("start-time={}".format(start))
+
+    if length is not None:
+        media.add_options("stop-time={}".format((start or 0) + length))
+
+    player.set_media(media)
+
+    event_manager = player.event_manager()
+    event_manager.event_attach(vlc.EventType.MediaPlayerEndReached, handle_end_reached)
+    event_manager.event_attach(
+        vlc.EventType.MediaPlayerEncounteredError, handle_encountered_error
+    )
+
+    try:
+        start = monotonic()
+        player.play()
+        player.set_rate(PROBE_RATE)
+        if not ended.wait(PROBE_TIMEOUT):
+            result.error = "timeout"
+            return result
+
+        result.elapsed = monotonic() - start
+        if result.error is not None:
+            return result
+
+        stats = vlc.MediaStats()
+        if not media.get_stats(stats):
+            result.error = "no statistics available"
+            return result
+
+        result.frames = stats.decoded_video
+        result.dropped = stats.lost_pictures
+
+    finally:
+        player.stop()
+        player.release()
+        instance.release()
+
+    return result
+
+
+PROBE_FUNCTIONS = {"vlc": probe_vlc, "mpv": probe_mpv, "libmpv": probe_mpv}
+
+
+def probe_decoders(player_name, sample_path):
+    """Decode the sample with each candidate decoder setting
+
+    Args:
+        player_name (str): Name of the media player.
+        sample_path (path.Path): Path of the sample.
+
+    Returns:
+        list of ProbeResult: Result of each candidate.
+
+    Raises:
+        DecoderProbeError: If the media player is unknown.
+    """
+    player_name = player_name.lower()
+    if player_name not in PROBE_FUNCTIONS:
+        raise DecoderProbeError("No media player for '{}'".format(player_name))
+
+    probe = PROBE_FUNCTIONS[player_name]
+    results = []
+    for setting in DECODER_CANDIDATES[player_name]:
+        logger.debug("Probing decoder setting '%s'", setting)
+        results.append(probe(sample_path, setting))
+
+    return results
+
+
+def select_result(results):
+    """Select the best working decoder setting
+
+    The setting with the fewest dropped frames wins, then the one with the
+    highest decoding rate.
+
+    Args:
+        results (list of ProbeResult): Results to select from.
+
+    Returns:
+        ProbeResult: Best result, None if no setting works.
+    """
+    working = [result for result in results if result.works]
+    if not working:
+        return None
+
+    return min(working, key=lambda result: (result.dropped, -result.fps))
+
+
+def write_setting(config_path, player_name, setting):
+    """Write the decoder setting in the config file
+
+    The previous config file is kept with a `.bak` suffix, as its comments
+    are lost.
+
+    Args:
+        config_path (path.Path): Path of the config file.
+        player_name (str): Name of the media player.
+        setting (str): Decoder setting.
+
+    Raises:
+        DecoderProbeError: If the config file is not a mapping.
+    """
+    with config_path.open() as file:
+        config = yaml.safe_load(file) or {}
+
+    if not isinstance(config, dict):
+        raise DecoderProbeError("Invalid config file '{}'".format(config_path))
+
+    config_player = config.get("player") or {}
+    config["player"] = config_player
+    if player_name.lower() == "vlc":
+        config_vlc = config_player.get("vlc") or {}
+        config_vlc["media_parameters"] = [
+            parameter
+            for parameter in config_vlc.get("media_parameters") or []
+            if not parameter.startswith("avcodec-hw=")
+        ] + ["avcodec-hw={}".format(setting)]
+        config_player["vlc"] = config_vlc
+
+    else:
+        config_mpv = config_player.get("mpv") or {}
+        config_mpv["hwdec"] = setting
+        config_player["mpv"] = config_mpv
+
+    backup_path = config_path + ".bak"
+    config_path.copyfile(backup_path)
+    logger.debug("Previous config file saved as '%s'", backup_path)
+
+    with config_path.open("w") as file:
+        yaml.safe_dump(config, file, default_flow_style=False, sort_keys=False)
+
+
+class DecoderProbeError(DakaraError):
+    """Error when the decoders cannot be probed
+    """
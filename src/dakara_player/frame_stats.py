@@ -0,0 +1,213 @@
+import json
+import logging
+
+FRAME_STATS_INTERVAL = 5
+DEGRADATION_THRESHOLD = 0.1
+DEGRADATION_SAMPLES = 2
+
+logger = logging.getLogger(__name__)
+
+
+class FrameStats:
+    """Frame statistics of a playlist entry
+
+    Media players give cumulative counters of dropped and displayed frames.
+    The counters are sampled periodically, and the statistics of the entry
+    are computed from their differences between two samples. Counters going
+    backwards (e.g. the media has been reloaded) start from zero again.
+
+    >>> frame_stats = FrameStats(playlist_entry)
+    >>> frame_stats.record(0, 0, 24)
+    >>> frame_stats.record(5, 95, 23.9)
+    0.05
+
+    Args:
+        playlist_entry (dakara_player.playlist_entry.PlaylistEntry): Playlist
+            entry played.
+
+    Attributes:
+        playlist_entry (dakara_player.playlist_entry.PlaylistEntry): Playlist
+            entry played.
+        samples (int): Number of samples recorded.
+        dropped (int): Number of frames dropped.
+        displayed (int): Number of frames displayed.
+        max_drop_rate (float): Highest ratio of dropped frames between two
+            samples.
+        min_fps (float): Lowest frame rate sampled, None if unknown.
+        degradations (int): Number of times the settings of the media player
+            have been degraded during the entry.
+        last (tuple): Counters of dropped and displayed frames of the last
+            sample, None if no sample has been recorded yet.
+    """
+
+    def __init__(self, playlist_entry):
+        self.playlist_entry = playlist_entry
+        self.samples = 0
+        self.dropped = 0
+        self.displayed = 0
+        self.max_drop_rate = 0
+        self.min_fps = None
+        self.degradations = 0
+        self.last = None
+
+    def record(self, dropped, displayed, fps=None):
+        """Record a sample of the counters of the media player
+
+        Args:
+            dropped (int): Cumulative number of frames dropped.
+            displayed (int): Cumulative number of frames displayed.
+            fps (float): Current frame rate, if known.
+
+        Returns:
+            float: Ratio of frames dropped since the last sample, None if it
+            cannot be computed.
+        """
+        last, self.last = self.last, (dropped, displayed)
+        self.samples += 1
+
+        if fps:
+            self.min_fps = fps if self.min_fps is None else min(self.min_fps, fps)
+
+        if last is None:
+            return None
+
+        last_dropped, last_displayed = last
+        delta_dropped = dropped - last_dropped if dropped >= last_dropped else dropped
+        delta_displayed = (
+            displayed - last_displayed if displayed >= last_displayed else displayed
+        )
+        self.dropped += delta_dropped
+        self.displayed += delta_displayed
+
+        total = delta_dropped + delta_displayed
+        if not total:
+            return None
+
+        drop_rate = delta_dropped / total
+        self.max_drop_rate = max(self.max_drop_rate, drop_rate)
+
+        return drop_rate
+
+    def get_drop_rate(self):
+        """Get the ratio of frames dropped during the entry
+
+        Returns:
+            float: Ratio of frames dropped, 0 if no frame has been counted.
+        """
+        total = self.dropped + self.displayed
+        return self.dropped / total if total else 0
+
+    def to_dict(self):
+        """Export the statistics
+
+        Returns:
+            dict: Statistics of the entry.
+        """
+        return {
+            "id": self.playlist_entry.id,
+            "title": self.playlist_entry.title,
+            "samples": self.samples,
+            "dropped": self.dropped,
+            "displayed": self.displayed,
+            "drop_rate": self.get_drop_rate(),
+            "max_drop_rate": self.max_drop_rate,
+            "min_fps": self.min_fps,
+            "degradations": self.degradations,
+        }
+
+
+def append_frame_stats(path, frame_stats):
+    """Append the statistics of an entry to a JSON lines file
+
+    Args:
+        path (path.Path): Path of the file.
+        frame_stats (FrameStats): Statistics to append.
+    """
+    try:
+        with open(path, "a") as file:
+            file.write(json.dumps(frame_stats.to_dict()) + "\n")
+
+    except OSError as error:
+        logger.error("Unable to export frame statistics: %s", error)
+
+
+class DegradationPolicy:
+    """Policy degrading the settings of a media player that drops frames
+
+    When the ratio of dropped frames exceeds the threshold for a number of
+    consecutive samples, the next step of settings is applied. Steps are
+    applied in order, and are kept until the program stops.
+
+    >>> policy = DegradationPolicy([{"deband": False}], samples=1)
+    >>> policy.check(0.5)
+    {'deband': False}
+    >>> policy.check(0.5)
+
+    Args:
+        steps (list of dict): Successive settings to apply.
+        threshold (float): Ratio of dropped frames above which a sample is
+            considered bad.
+        samples (int): Number of consecutive bad samples before degrading.
+
+    Attributes:
+        steps (list of dict): Successive settings to apply.
+        threshold (float): Ratio of dropped frames above which a sample is
+            considered bad.
+        samples (int): Number of consecutive bad samples before degrading.
+        bad_samples (int): Number of consecutive bad samples so far.
+        applied (int): Number of steps applied.
+    """
+
+    def __init__(
+        self, steps, threshold=DEGRADATION_THRESHOLD, samples=DEGRADATION_SAMPLES
+    ):
+        self.steps = steps
+        self.threshold = threshold
+        self.samples = samples
+        self.bad_samples = 0
+        self.applied = 0
+
+    @classmethod
+    def from_config(cls, config, default_steps):
+        """Create a policy from the configuration
+
+        Args:
+            config (dict): Degradation configuration.
+            default_steps (list of dict): Steps used if the configuration
+                does not define any.
+
+        Returns:
+            DegradationPolicy: New policy.
+        """
+        return cls(
+            config.get("steps") or default_steps,
+            threshold=config.get("threshold", DEGRADATION_THRESHOLD),
+            samples=config.get("samples", DEGRADATION_SAMPLES),
+        )
+
+    def check(self, drop_rate):
+        """Check a sample and get the settings to apply
+
+        Args:
+            drop_rate (float): Ratio of frames dropped during the sample, None
+                if unknown.
+
+        Returns:
+            dict: Settings to apply, None if nothing has to be done.
+        """
+        if drop_rate is None:
+            return None
+
+        if drop_rate <= self.threshold:
+            self.bad_samples = 0
+            return None
+
+        self.bad_samples += 1
+        if self.bad_samples < self.samples or self.applied >= len(self.steps):
+            return None
+
+        self.bad_samples = 0
+        step = self.steps[self.applied]
+        self.applied += 1
+
+        return step
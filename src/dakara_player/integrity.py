@@ -0,0 +1,337 @@
+import os
+
+from dakara_base.exceptions import DakaraError
+
+EBML_MAGIC = b"\x1a\x45\xdf\xa3"
+MP4_MAGIC = b"ftyp"
+
+# Matroska element IDs
+EBML_ID = 0x1A45DFA3
+DOC_TYPE_ID = 0x4282
+SEGMENT_ID = 0x18538067
+TRACKS_ID = 0x1654AE6B
+CLUSTER_ID = 0x1F43B675
+VOID_ID = 0xEC
+CRC_ID = 0xBF
+CLUSTER_CHILDREN_IDS = {
+    0xE7,  # Timestamp
+    0x5854,  # SilentTracks
+    0xA7,  # Position
+    0xAB,  # PrevSize
+    0xA3,  # SimpleBlock
+    0xA0,  # BlockGroup
+    VOID_ID,
+    CRC_ID,
+}
+MATROSKA_DOC_TYPES = ("matroska", "webm")
+
+MAX_ELEMENTS = 256
+MAX_HEADER_SIZE = 4096
+
+
+def check_file_integrity(file_path):
+    """Check the container of a media file is not broken
+
+    Only the structure of the container is checked, by reading the headers
+    of its elements and skipping their content. For Matroska and WebM files,
+    the EBML header, the segment up to the first cluster and the elements of
+    the first cluster are checked. For MP4 files, the size of the top level
+    boxes and the tracks are checked. Other containers are only checked not to be empty.
+
+    Args:
+        file_path (path.Path): Path of the media file.
+
+    Returns:
+        str: Name of the container, None if it is not supported.
+
+    Raises:
+        FileIntegrityError: If the container is broken.
+        OSError: If the file cannot be read.
+    """
+    with open(file_path, "rb") as file:
+        file_size = os.fstat(file.fileno()).st_size
+        if file_size == 0:
+            raise FileIntegrityError("File is empty")
+
+        magic = file.read(8)
+
+        if magic[:4] == EBML_MAGIC:
+            check_matroska(file, file_size)
+            return "matroska"
+
+        if magic[4:8] == MP4_MAGIC:
+            check_mp4(file, file_size)
+            return "mp4"
+
+    return None
+
+
+def check_matroska(file, file_size):
+    """Check the structure of a Matroska file
+
+    Args:
+        file (io.BufferedReader): Media file opened in binary mode.
+        file_size (int): Size of the file in bytes.
+
+    Raises:
+        FileIntegrityError: If the structure is broken.
+    """
+    # check the EBML header
+    element_id, size, position = read_element_header(file, 0, file_size)
+    if element_id != EBML_ID or size is None or size > MAX_HEADER_SIZE:
+        raise FileIntegrityError("Invalid EBML header")
+
+    end = position + size
+    if end > file_size:
+        raise FileIntegrityError("File is truncated in EBML header")
+
+    doc_type = None
+    for element_id, size, position in iter_elements(file, position, end):
+        if element_id == DOC_TYPE_ID:
+            file.seek(position)
+            doc_type = file.read(size).rstrip(b"\x00").decode("ascii", "replace")
+
+    if doc_type not in MATROSKA_DOC_TYPES:
+        raise FileIntegrityError("Unsupported document type: {}".format(doc_type))
+
+    # check the segment
+    position = end
+    while True:
+        element_id, size, position = read_element_header(file, position, file_size)
+        if element_id == SEGMENT_ID:
+            break
+
+        if element_id != VOID_ID or size is None:
+            raise FileIntegrityError("No segment found")
+
+        position += size
+
+    end = file_size if size is None else min(position + size, file_size)
+
+    # check the segment up to the first cluster
+    has_tracks = False
+    for element_id, size, position in iter_elements(file, position, end):
+        if element_id == TRACKS_ID:
+            has_tracks = True
+
+        if element_id == CLUSTER_ID:
+            if not has_tracks:
+                raise FileIntegrityError("No tracks found before first cluster")
+
+            check_matroska_cluster(file, position, size, file_size)
+            return
+
+    raise FileIntegrityError("No cluster found")
+
+
+def check_matroska_cluster(file, position, size, file_size):
+    """Check the structure of a Matroska cluster
+
+    Args:
+        file (io.BufferedReader): Media file opened in binary mode.
+        position (int): Position of the content of the cluster.
+        size (int): Size of the content of the cluster, None if unknown.
+        file_size (int): Size of the file in bytes.
+
+    Raises:
+        FileIntegrityError: If the structure is broken.
+    """
+    if size is not None and position + size > file_size:
+        raise FileIntegrityError("File is truncated in first cluster")
+
+    end = file_size if size is None else position + size
+    has_children = False
+    for element_id, _, _ in iter_elements(file, position, end, allow_unknown=True):
+        # a cluster of unknown size ends with the next top level element
+        if size is None and element_id not in CLUSTER_CHILDREN_IDS:
+            break
+
+        if element_id not in CLUSTER_CHILDREN_IDS:
+            raise FileIntegrityError(
+                "Invalid element in first cluster: {:X}".format(element_id)
+            )
+
+        has_children = True
+
+    if not has_children:
+        raise FileIntegrityError("First cluster is empty")
+
+
+def iter_elements(file, position, end, allow_unknown=False):
+    """Iterate over the headers of consecutive Matroska elements
+
+    Args:
+        file (io.BufferedReader): Media file opened in binary mode.
+        position (int): Position of the first element.
+        end (int): Position where to stop.
+        allow_unknown (bool): If True, the iteration stops on an element of
+            unknown size instead of raising an error.
+
+    Yields:
+        tuple: ID, size of the content and position of the content of each
+        element.
+
+    Raises:
+        FileIntegrityError: If an element is broken.
+    """
+    for _ in range(MAX_ELEMENTS):
+        if position >= end:
+            return
+
+        element_id, size, position = read_element_header(file, position, end)
+        yield element_id, size, position
+
+        if size is None:
+            if allow_unknown:
+                return
+
+            raise FileIntegrityError("Element of unknown size: {:X}".format(element_id))
+
+        position += size
+        if position > end:
+            raise FileIntegrityError(
+                "File is truncated in element {:X}".format(element_id)
+            )
+
+
+def read_element_header(file, position, end):
+    """Read the ID and the size of a Matroska element
+
+    Args:
+        file (io.BufferedReader): Media file opened in binary mode.
+        position (int): Position of the element.
+        end (int): Position the element header cannot exceed.
+
+    Returns:
+        tuple: ID, size of the content, None if unknown, and position of the
+        content of the element.
+
+    Raises:
+        FileIntegrityError: If the header is broken.
+    """
+    file.seek(position)
+    data = file.read(min(12, end - position))
+
+    element_id, id_length = read_vint(data, 0, 4)
+    element_id |= 1 << (7 * id_length)
+    size, size_length = read_vint(data, id_length, 8)
+
+    # a size with all its bits set is unknown
+    if size == (1 << (7 * size_length)) - 1:
+        size = None
+
+    return element_id, size, position + id_length + size_length
+
+
+def read_vint(data, offset, max_length):
+    """Read a variable size integer
+
+    Args:
+        data (bytes): Data to read from.
+        offset (int): Position of the integer in the data.
+        max_length (int): Maximal length of the integer in bytes.
+
+    Returns:
+        tuple: Value of the integer, without its length marker, and its
+        length in bytes.
+
+    Raises:
+        FileIntegrityError: If the integer is broken.
+    """
+    if offset >= len(data):
+        raise FileIntegrityError("File is truncated")
+
+    first = data[offset]
+    length = 9 - first.bit_length()
+    if length > max_length:
+        raise FileIntegrityError("Invalid element header")
+
+    if offset + length > len(data):
+        raise FileIntegrityError("File is truncated")
+
+    value = int.from_bytes(data[offset : offset + length], "big")
+    return value & ((1 << (7 * length)) - 1), length
+
+
+def check_mp4(file, file_size):
+    """Check the structure of a MP4 file
+
+    Boxes of any type are accepted, as long as they fit in the file, so that
+    fragmented files, with movie fragment boxes, are supported. Only the file
+    type box and the movie box are required.
+
+    Args:
+        file (io.BufferedReader): Media file opened in binary mode.
+        file_size (int): Size of the file in bytes.
+
+    Raises:
+        FileIntegrityError: If the structure is broken.
+    """
+    moov = None
+    for box_type, position, end in iter_boxes(file, 0, file_size):
+        if box_type == b"moov" and moov is None:
+            moov = (position, end)
+
+    if moov is None:
+        raise FileIntegrityError("No movie box found")
+
+    if not any(box_type == b"trak" for box_type, _, _ in iter_boxes(file, *moov)):
+        raise FileIntegrityError("No tracks found")
+
+
+def iter_boxes(file, position, end):
+    """Iterate over the headers of consecutive MP4 boxes
+
+    Args:
+        file (io.BufferedReader): Media file opened in binary mode.
+        position (int): Position of the first box.
+        end (int): Position where to stop.
+
+    Yields:
+        tuple: Type, position of the content and position of the end of each
+        box.
+
+    Raises:
+        FileIntegrityError: If a box is broken.
+    """
+    for _ in range(MAX_ELEMENTS):
+        if position >= end:
+            return
+
+        file.seek(position)
+        data = file.read(8)
+        if len(data) < 8:
+            raise FileIntegrityError("File is truncated")
+
+        size = int.from_bytes(data[:4], "big")
+        box_type = data[4:8]
+        content = position + 8
+
+        # 64 bits size
+        if size == 1:
+            data = file.read(8)
+            if len(data) < 8:
+                raise FileIntegrityError("File is truncated")
+
+            size = int.from_bytes(data, "big")
+            content += 8
+
+        # box extending to the end
+        elif size == 0:
+            size = end - position
+
+        box_end = position + size
+        if box_end < content:
+            raise FileIntegrityError("Invalid size of box {}".format(box_type))
+
+        if box_end > end:
+            raise FileIntegrityError("File is truncated in box {}".format(box_type))
+
+        yield box_type, content, box_end
+
+        position = box_end
+
+
+class FileIntegrityError(DakaraError):
+    """Error raised when the container of a media file is broken
+    """
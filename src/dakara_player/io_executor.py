@@ -0,0 +1,294 @@
+import logging
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from threading import Lock, Thread
+from time import monotonic
+
+from dakara_base.exceptions import DakaraError
+from path import Path
+
+IO_TIMEOUT = 2
+POSITIVE_CACHE_DURATION = 60
+NEGATIVE_CACHE_DURATION = 5
+MAX_PENDING_CALLS = 8
+ROOT_DEPTH = 2
+MAX_CACHE_SIZE = 1024
+
+logger = logging.getLogger(__name__)
+
+
+class IOExecutor:
+    """Executor of blocking filesystem calls with a deadline
+
+    Calls on a hung network mount can block for minutes. Each call is run in
+    a separate daemon thread, and the caller waits at most for the deadline.
+    A thread stuck on a call cannot be interrupted, but it does not prevent
+    the program to exit. Calls for the same key already running are shared,
+    and the number of running calls is limited for each root directory (see
+    `get_root`), so that calls hung on a mount do not prevent to access
+    other ones.
+
+    Results are cached by key: truthy results for `positive_cache_duration`
+    seconds, falsy results and deadline misses for `negative_cache_duration`
+    seconds. A deadline miss is then reported immediately until the cache
+    entry expires.
+
+    >>> io_executor = IOExecutor(timeout=1)
+    >>> io_executor.exists(Path("/"))
+    True
+
+    Args:
+        timeout (float): Default deadline of calls in seconds.
+        positive_cache_duration (float): Duration truthy results are cached
+            in seconds.
+        negative_cache_duration (float): Duration falsy results and deadline
+            misses are cached in seconds.
+        max_pending_calls (int): Maximal number of calls running at the same
+            time for a root directory.
+
+    Attributes:
+        timeout (float): Default deadline of calls in seconds.
+        positive_cache_duration (float): Duration truthy results are cached
+            in seconds.
+        negative_cache_duration (float): Duration falsy results and deadline
+            misses are cached in seconds.
+        max_pending_calls (int): Maximal number of calls running at the same
+            time for a root directory.
+        cache (dict): Cached results by key, as a tuple of expiration time,
+            result and error.
+        pending (dict of concurrent.futures.Future): Future of running calls
+            by key.
+        pending_roots (dict of int): Number of running calls by root
+            directory.
+        lock (threading.Lock): Lock for cache and running calls.
+    """
+
+    def __init__(
+        self,
+        timeout=IO_TIMEOUT,
+        positive_cache_duration=POSITIVE_CACHE_DURATION,
+        negative_cache_duration=NEGATIVE_CACHE_DURATION,
+        max_pending_calls=MAX_PENDING_CALLS,
+    ):
+        self.timeout = timeout
+        self.positive_cache_duration = positive_cache_duration
+        self.negative_cache_duration = negative_cache_duration
+        self.max_pending_calls = max_pending_calls
+        self.cache = {}
+        self.pending = {}
+        self.pending_roots = {}
+        self.lock = Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Create an executor from the configuration
+
+        Args:
+            config (dict): Filesystem configuration.
+
+        Returns:
+            IOExecutor: New executor.
+        """
+        return cls(
+            timeout=config.get("timeout", IO_TIMEOUT),
+            positive_cache_duration=config.get(
+                "positive_cache_duration", POSITIVE_CACHE_DURATION
+            ),
+            negative_cache_duration=config.get(
+                "negative_cache_duration", NEGATIVE_CACHE_DURATION
+            ),
+        )
+
+    def call(self, function, path, key=None, timeout=None):
+        """Call a function on a path within a deadline
+
+        Exceptions raised by the function are passed to the caller and are
+        not cached.
+
+        Args:
+            function (function): Function to call with the path as argument.
+            path (path.Path): Path to access.
+            key (hashable): Key used for caching. Default to the function and
+                the path.
+            timeout (float): Deadline of the call in seconds. Default to
+                `timeout`.
+
+        Returns:
+            any: Result of the function.
+
+        Raises:
+            IOTimeoutError: If the deadline is missed, or if too many calls
+                are running for the root directory of the path.
+        """
+        key = key if key is not None else (function, path)
+        timeout = self.timeout if timeout is None else timeout
+
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached is not None and cached[0] > monotonic():
+                _, result, error = cached
+                if error is not None:
+                    raise error
+
+                return result
+
+            future = self.pending.get(key)
+            if future is None:
+                root = get_root(path)
+                pending_root = self.pending_roots.get(root, 0)
+                if pending_root >= self.max_pending_calls:
+                    raise IOTimeoutError(
+                        "Too many pending filesystem calls to access '{}'".format(path)
+                    )
+
+                future = Future()
+                self.pending[key] = future
+                self.pending_roots[root] = pending_root + 1
+                thread = Thread(
+                    target=self.run,
+                    args=(key, root, future, function, path),
+                    name="io-executor",
+                    daemon=True,
+                )
+                thread.start()
+
+        try:
+            return future.result(timeout)
+
+        except FutureTimeoutError:
+            error = IOTimeoutError(
+                "Unable to access '{}' within {} s".format(path, timeout)
+            )
+            logger.debug(error)
+
+            with self.lock:
+                self.store(key, None, error)
+
+            raise error
+
+    def run(self, key, root, future, function, path):
+        """Run a call and store its result
+
+        Args:
+            key (hashable): Key used for caching.
+            root (path.Path): Root directory of the path.
+            future (concurrent.futures.Future): Future of the call.
+            function (function): Function to call with the path as argument.
+            path (path.Path): Path to access.
+        """
+        try:
+            result = function(path)
+
+        except BaseException as error:
+            with self.lock:
+                self.release(key, root)
+
+            future.set_exception(error)
+            return
+
+        with self.lock:
+            self.release(key, root)
+            self.store(key, result)
+
+        future.set_result(result)
+
+    def release(self, key, root):
+        """Remove a finished call from the running calls
+
+        Must be called with the lock acquired.
+
+        Args:
+            key (hashable): Key used for caching.
+            root (path.Path): Root directory of the path.
+        """
+        self.pending.pop(key, None)
+
+        pending_root = self.pending_roots.pop(root, 0) - 1
+        if pending_root > 0:
+            self.pending_roots[root] = pending_root
+
+    def store(self, key, result, error=None):
+        """Store a result in the cache
+
+        Must be called with the lock acquired.
+
+        Args:
+            key (hashable): Key used for caching.
+            result (any): Result of the call.
+            error (IOTimeoutError): Error to raise for this key, if any.
+        """
+        now = monotonic()
+
+        # remove expired entries if the cache is too large
+        if len(self.cache) >= MAX_CACHE_SIZE:
+            self.cache = {
+                cached_key: cached
+                for cached_key, cached in self.cache.items()
+                if cached[0] > now
+            }
+
+            if len(self.cache) >= MAX_CACHE_SIZE:
+                self.cache.clear()
+
+        duration = (
+            self.positive_cache_duration
+            if result and error is None
+            else self.negative_cache_duration
+        )
+        self.cache[key] = (now + duration, result, error)
+
+    def exists(self, path, timeout=None):
+        """Check if a path exists within a deadline
+
+        Args:
+            path (path.Path): Path to check.
+            timeout (float): Deadline of the call in seconds. Default to
+                `timeout`.
+
+        Returns:
+            bool: True if the path exists.
+
+        Raises:
+            IOTimeoutError: If the deadline is missed.
+        """
+        return self.call(path_exists, path, key=("exists", path), timeout=timeout)
+
+    def clear_cache(self):
+        """Clear the cache
+        """
+        with self.lock:
+            self.cache.clear()
+
+
+def get_root(path):
+    """Get the root directory of a path
+
+    The root directory is made of the first `ROOT_DEPTH` directories of the
+    absolute path, which usually identifies the mount point, like
+    `/mnt/karaoke` or `/media/usb`. It is computed without accessing the
+    filesystem.
+
+    Args:
+        path (path.Path): Path to access.
+
+    Returns:
+        path.Path: Root directory of the path.
+    """
+    parts = Path(path).abspath().splitall()
+    return Path.joinpath(*parts[: ROOT_DEPTH + 1])
+
+
+def path_exists(path):
+    """Check if a path exists
+
+    Args:
+        path (path.Path): Path to check.
+
+    Returns:
+        bool: True if the path exists.
+    """
+    return Path(path).exists()
+
+
+class IOTimeoutError(DakaraError, TimeoutError):
+    """Error raised when a filesystem call exceeds its deadline
+    """
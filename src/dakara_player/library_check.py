@@ -0,0 +1,269 @@
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from time import time
+
+import filetype
+from dakara_base.exceptions import DakaraError
+
+from dakara_player.audio import get_audio_files
+from dakara_player.decoder_probe import (
+    DECODER_CANDIDATES,
+    PROBE_FUNCTIONS,
+    DecoderProbeError,
+    get_sample_path,
+)
+from dakara_player.integrity import FileIntegrityError, check_file_integrity
+from dakara_player.media_info import read_media_info
+from dakara_player.subtitle import SUBTITLE_EXTENSIONS
+
+LIBRARY_REPORT_NAME = "library_report.json"
+
+# duration decoded at each position of a song, in seconds
+DECODE_LENGTH = 3
+
+logger = logging.getLogger(__name__)
+
+
+def is_video_file(file_path):
+    """Detect if a file is a video file based on standard magic numbers
+
+    Args:
+        file_path (path.Path): Path of the file to investigate.
+
+    Returns:
+        bool: True if the file is a video file, False otherwise.
+    """
+    kind = filetype.guess(str(file_path))
+    if not kind:
+        return False
+
+    maintype, _ = kind.mime.split("/")
+
+    return maintype == "video"
+
+
+def check_song(file_path, player_name, decode=True):
+    """Check a song file can be played
+
+    The container of the file is checked, then a few seconds are decoded at
+    the start and in the middle of the song by the media player, with the
+    software decoder and without video and audio outputs. The subtitle file
+    and the instrumental track are resolved as the media players do.
+
+    This function is run in a separate process.
+
+    Args:
+        file_path (path.Path): Path of the song file.
+        player_name (str): Name of the media player.
+        decode (bool): If False, the song is not decoded.
+
+    Returns:
+        dict: Report of the song, None if the file is not a video file.
+    """
+    try:
+        if not is_video_file(file_path):
+            return None
+
+        stat = os.stat(file_path)
+
+    except OSError:
+        return None
+
+    report = {
+        "path": str(file_path),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "container": None,
+        "duration": None,
+        "subtitle": None,
+        "instrumental": None,
+        "errors": [],
+        "warnings": [],
+    }
+
+    # check the container
+    try:
+        report["container"] = check_file_integrity(file_path)
+
+    except (FileIntegrityError, OSError) as error:
+        report["errors"].append("Invalid file: {}".format(error))
+        return report
+
+    try:
+        media_info = read_media_info(file_path)
+
+    except (FileIntegrityError, OSError, ValueError):
+        media_info = None
+
+    if media_info is not None:
+        report["duration"] = media_info.duration
+
+    # resolve the subtitle file
+    for subtitle_extension in SUBTITLE_EXTENSIONS:
+        path_subtitle = file_path.stripext() + subtitle_extension
+        if path_subtitle.exists():
+            report["subtitle"] = str(path_subtitle)
+            break
+
+    else:
+        report["warnings"].append("No subtitle file found")
+
+    # resolve the instrumental
+    if len(get_audio_files(file_path)) == 1:
+        report["instrumental"] = "file"
+
+    elif media_info is not None and media_info.get_instrumental_index() is not None:
+        report["instrumental"] = "track"
+
+    else:
+        report["warnings"].append("No instrumental file or track found")
+
+    if not decode:
+        report["warnings"].append("Not decoded")
+        return report
+
+    # decode the start and the middle of the song
+    probe = PROBE_FUNCTIONS[player_name]
+    setting = DECODER_CANDIDATES[player_name][0]
+    starts = [0]
+    if report["duration"] is None:
+        report["warnings"].append("Duration unknown, middle of the song not decoded")
+
+    elif report["duration"] > 2 * DECODE_LENGTH:
+        starts.append(round(report["duration"] / 2, 3))
+
+    for start in starts:
+        result = probe(file_path, setting, start=start, length=DECODE_LENGTH)
+        if not result.works:
+            report["errors"].append(
+                "Unable to decode at {}s: {}".format(
+                    start, result.error or "no frame decoded"
+                )
+            )
+
+    return report
+
+
+def check_library(kara_folder, player_name, jobs=None):
+    """Check the song files of the karaoke folder
+
+    Songs are checked in parallel by a pool of processes. The bundled sample
+    is decoded first: if the media player cannot decode it, songs are checked
+    without being decoded, so that a media player which cannot decode
+    anything does not reject every song.
+
+    Args:
+        kara_folder (path.Path): Path of the karaoke folder.
+        player_name (str): Name of the media player.
+        jobs (int): Number of processes. Default to the number of CPUs.
+
+    Returns:
+        dict: Report of the library, with the report of each song.
+
+    Raises:
+        LibraryCheckError: If the karaoke folder does not exist, or if there
+            is no media player for the given name.
+    """
+    if not kara_folder.isdir():
+        raise LibraryCheckError(
+            "Karaoke folder '{}' does not exist".format(kara_folder)
+        )
+
+    player_name = player_name.lower()
+    if player_name not in PROBE_FUNCTIONS:
+        raise LibraryCheckError("No media player for '{}'".format(player_name))
+
+    decode = check_sample(player_name)
+
+    file_paths = sorted(kara_folder.walkfiles())
+    logger.debug("Found %i files in '%s'", len(file_paths), kara_folder)
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        reports = executor.map(
+            check_song,
+            file_paths,
+            [player_name] * len(file_paths),
+            [decode] * len(file_paths),
+            chunksize=4,
+        )
+        songs = [report for report in reports if report is not None]
+
+    return {
+        "kara_folder": str(kara_folder),
+        "player_name": player_name,
+        "time": time(),
+        "songs": songs,
+    }
+
+
+def check_sample(player_name):
+    """Check the media player can decode the bundled sample
+
+    Args:
+        player_name (str): Name of the media player.
+
+    Returns:
+        bool: True if the sample has been decoded.
+    """
+    try:
+        sample_path = get_sample_path()
+
+    except DecoderProbeError as error:
+        logger.warning("Songs will not be decoded: %s", error)
+        return False
+
+    result = PROBE_FUNCTIONS[player_name](
+        sample_path, DECODER_CANDIDATES[player_name][0], length=DECODE_LENGTH
+    )
+    if not result.works:
+        logger.warning(
+            "Songs will not be decoded, unable to decode the sample with %s: %s",
+            player_name,
+            result.error or "no frame decoded",
+        )
+        return False
+
+    return True
+
+
+def get_reject_list(report):
+    """Get the songs that cannot be played from a library report
+
+    Args:
+        report (dict): Report of the library.
+
+    Returns:
+        dict: Size, modification time and errors of each rejected song file,
+        by path.
+    """
+    return {
+        song["path"]: {
+            "size": song["size"],
+            "mtime": song["mtime"],
+            "errors": song["errors"],
+        }
+        for song in report["songs"]
+        if song["errors"]
+    }
+
+
+def write_json(path, content):
+    """Write a JSON file
+
+    The file is written to a temporary file first and then renamed, so that
+    it is never partially written.
+
+    Args:
+        path (path.Path): Path of the file.
+        content (any): Content to write.
+    """
+    path_temporary = path + ".tmp"
+    path_temporary.write_text(json.dumps(content, indent=2))
+    os.replace(path_temporary, path)
+
+
+class LibraryCheckError(DakaraError):
+    """Error when the library cannot be checked
+    """
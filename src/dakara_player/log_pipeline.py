@@ -0,0 +1,263 @@
+import logging
+from collections import defaultdict
+from queue import Empty, Full, Queue
+from threading import Lock, Thread
+from time import monotonic
+
+from dakara_base.config import ConfigInvalidError
+
+LOG_QUEUE_SIZE = 1000
+LOG_RATE_LIMIT = 20
+FLUSH_INTERVAL = 1
+
+logger = logging.getLogger(__name__)
+
+
+class LogPipeline:
+    """Non-blocking pipeline of the log messages of a media player backend
+
+    Backends emit log messages from their own threads, which must not be
+    blocked by the log handlers. Messages are filtered by level and put in a
+    bounded queue, and a dedicated thread forwards them to the target logger.
+    Messages are dropped if the queue is full.
+
+    The thread rate limits the messages of each component, and summarizes
+    consecutive identical messages. Summaries are logged when another message
+    is received, and every `FLUSH_INTERVAL` seconds, even if messages keep
+    coming.
+
+    >>> log_pipeline = LogPipeline(logging.getLogger("mpv"), {"ffmpeg": 30})
+    >>> log_pipeline.start()
+    >>> log_pipeline.submit(logging.ERROR, "ffmpeg/video", "error message")
+    >>> log_pipeline.stop()
+
+    Args:
+        target (logging.Logger): Logger receiving the messages.
+        levels (dict of int): Minimal level of messages by component. The
+            level of a component applies to its sub-components, separated by
+            a slash.
+        rate_limit (float): Maximal number of messages forwarded per second
+            for each component. No limit if 0.
+        queue_size (int): Maximal number of messages waiting to be forwarded.
+
+    Attributes:
+        target (logging.Logger): Logger receiving the messages.
+        levels (dict of int): Minimal level of messages by component.
+        rate_limit (float): Maximal number of messages forwarded per second
+            for each component.
+        queue (queue.Queue): Messages waiting to be forwarded.
+        thread (threading.Thread): Thread forwarding the messages, if started.
+        dropped (int): Number of messages dropped since the last summary.
+        lock (threading.Lock): Lock for the number of dropped messages.
+        last (tuple): Level, component and text of the last message forwarded.
+        repeats (int): Number of times the last message has been repeated.
+        allowances (dict of tuple): For each component, number of messages
+            that can be forwarded right now, and monotonic time of its
+            computation.
+        suppressed (collections.defaultdict of int): Number of messages
+            suppressed by the rate limit, by component.
+    """
+
+    def __init__(
+        self, target, levels=None, rate_limit=LOG_RATE_LIMIT, queue_size=LOG_QUEUE_SIZE
+    ):
+        self.target = target
+        self.levels = levels or {}
+        self.rate_limit = rate_limit
+        self.queue = Queue(maxsize=queue_size)
+        self.thread = None
+        self.dropped = 0
+        self.lock = Lock()
+        self.last = None
+        self.repeats = 0
+        self.allowances = {}
+        self.suppressed = defaultdict(int)
+
+    @classmethod
+    def from_config(cls, target, config):
+        """Create a pipeline from the configuration
+
+        Args:
+            target (logging.Logger): Logger receiving the messages.
+            config (dict): Backend logs configuration.
+
+        Returns:
+            LogPipeline: New pipeline.
+
+        Raises:
+            ConfigInvalidError: If the level of a component is unknown.
+        """
+        levels = {}
+        for component, level_name in (config.get("levels") or {}).items():
+            level = logging.getLevelName(str(level_name).upper())
+            if not isinstance(level, int):
+                raise ConfigInvalidError(
+                    "Unknown log level '{}' for component '{}'".format(
+                        level_name, component
+                    )
+                )
+
+            levels[component] = level
+
+        return cls(
+            target,
+            levels,
+            rate_limit=config.get("rate_limit", LOG_RATE_LIMIT),
+            queue_size=config.get("queue_size", LOG_QUEUE_SIZE),
+        )
+
+    def get_level(self, component):
+        """Get the minimal level of messages of a component
+
+        Args:
+            component (str): Name of the component.
+
+        Returns:
+            int: Level of the component, or of its closest parent. 0 if none
+            is set.
+        """
+        parts = component.split("/")
+        while parts:
+            level = self.levels.get("/".join(parts))
+            if level is not None:
+                return level
+
+            parts.pop()
+
+        return logging.NOTSET
+
+    def submit(self, level, component, message):
+        """Submit a message to be forwarded
+
+        Never blocks.
+
+        Args:
+            level (int): Level of the message.
+            component (str): Component of the backend that emitted the
+                message.
+            message (str): Text of the message.
+        """
+        if level < self.get_level(component) or not self.target.isEnabledFor(level):
+            return
+
+        try:
+            self.queue.put_nowait((level, component, message))
+
+        except Full:
+            with self.lock:
+                self.dropped += 1
+
+    def start(self):
+        """Start to forward the messages
+        """
+        self.thread = Thread(target=self.run, name="log-pipeline", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Forward the remaining messages and stop
+
+        The messages submitted afterwards are kept in the queue.
+        """
+        if self.thread is None:
+            return
+
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+
+    def run(self):
+        """Forward the messages until the pipeline is stopped
+        """
+        next_flush = monotonic() + FLUSH_INTERVAL
+        while True:
+            try:
+                record = self.queue.get(timeout=max(next_flush - monotonic(), 0))
+
+            except Empty:
+                pass
+
+            else:
+                if record is None:
+                    break
+
+                self.process(*record)
+
+            # flush periodically, even if messages keep coming
+            if monotonic() >= next_flush:
+                self.flush()
+                next_flush = monotonic() + FLUSH_INTERVAL
+
+        self.flush()
+
+    def process(self, level, component, message):
+        """Forward a message
+
+        Args:
+            level (int): Level of the message.
+            component (str): Component of the backend that emitted the
+                message.
+            message (str): Text of the message.
+        """
+        record = (level, component, message)
+        if record == self.last:
+            self.repeats += 1
+            return
+
+        self.flush_repeats()
+        self.last = record
+
+        if not self.acquire(component):
+            self.suppressed[component] += 1
+            return
+
+        self.target.log(level, "%s: %s", component, message)
+
+    def acquire(self, component):
+        """Consume the allowance of a component to forward a message
+
+        Args:
+            component (str): Name of the component.
+
+        Returns:
+            bool: True if the message can be forwarded.
+        """
+        if not self.rate_limit:
+            return True
+
+        now = monotonic()
+        allowance, last = self.allowances.get(component, (self.rate_limit, now))
+        allowance = min(self.rate_limit, allowance + (now - last) * self.rate_limit)
+
+        if allowance < 1:
+            self.allowances[component] = (allowance, now)
+            return False
+
+        self.allowances[component] = (allowance - 1, now)
+        return True
+
+    def flush_repeats(self):
+        """Log the number of repeats of the last message, if any
+        """
+        if not self.repeats:
+            return
+
+        level, component, _ = self.last
+        self.target.log(level, "%s: message repeated %i times", component, self.repeats)
+        self.repeats = 0
+
+    def flush(self):
+        """Log the summaries of repeated, suppressed and dropped messages
+        """
+        self.flush_repeats()
+        self.last = None
+
+        for component, count in self.suppressed.items():
+            self.target.warning("%s: %i messages suppressed", component, count)
+
+        self.suppressed.clear()
+
+        with self.lock:
+            dropped, self.dropped = self.dropped, 0
+
+        if dropped:
+            logger.warning("%i backend log messages dropped, queue is full", dropped)
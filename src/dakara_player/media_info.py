@@ -0,0 +1,516 @@
+import mmap
+import os
+import struct
+
+from dakara_player.integrity import (
+    CLUSTER_ID,
+    EBML_ID,
+    EBML_MAGIC,
+    MP4_MAGIC,
+    SEGMENT_ID,
+    TRACKS_ID,
+    VOID_ID,
+    FileIntegrityError,
+    iter_boxes,
+    iter_elements,
+    read_element_header,
+)
+
+# Matroska element IDs
+INFO_ID = 0x1549A966
+TIMESTAMP_SCALE_ID = 0x2AD7B1
+DURATION_ID = 0x4489
+TRACK_ENTRY_ID = 0xAE
+TRACK_NUMBER_ID = 0xD7
+TRACK_TYPE_ID = 0x83
+CODEC_ID_ID = 0x86
+LANGUAGE_ID = 0x22B59C
+LANGUAGE_BCP47_ID = 0x22B59D
+NAME_ID = 0x536E
+MATROSKA_TRACK_TYPES = {1: "video", 2: "audio", 17: "subtitle"}
+MATROSKA_DEFAULT_LANGUAGE = "eng"
+MATROSKA_DEFAULT_TIMESTAMP_SCALE = 1000000
+
+# MP4 handler types
+MP4_TRACK_TYPES = {
+    b"vide": "video",
+    b"soun": "audio",
+    b"sbtl": "subtitle",
+    b"subt": "subtitle",
+    b"text": "subtitle",
+}
+
+# words in the title of an audio track designating an instrumental track
+INSTRUMENTAL_KEYWORDS = ("instrumental", "karaoke", "off vocal", "backing")
+
+
+class TrackInfo:
+    """Track of a media file
+
+    Args:
+        number (int): Number of the track in the container.
+        track_type (str): Type of the track, "video", "audio" or "subtitle".
+            None if unknown.
+        codec (str): Codec of the track, as named by the container.
+        language (str): Language of the track, None if undefined.
+        title (str): Title of the track, None if undefined.
+
+    Attributes:
+        number (int): Number of the track in the container.
+        type (str): Type of the track, "video", "audio" or "subtitle". None if
+            unknown.
+        codec (str): Codec of the track, as named by the container.
+        language (str): Language of the track, None if undefined.
+        title (str): Title of the track, None if undefined.
+    """
+
+    def __init__(self, number, track_type, codec=None, language=None, title=None):
+        self.number = number
+        self.type = track_type
+        self.codec = codec
+        self.language = language
+        self.title = title
+
+    def to_dict(self):
+        """Export the track
+
+        Returns:
+            dict: Attributes of the track.
+        """
+        return {
+            "number": self.number,
+            "type": self.type,
+            "codec": self.codec,
+            "language": self.language,
+            "title": self.title,
+        }
+
+
+class MediaInfo:
+    """Tracks and duration of a media file
+
+    Args:
+        container (str): Name of the container.
+        tracks (list of TrackInfo): Tracks of the file, in container order.
+        duration (float): Duration of the file in seconds, None if unknown.
+
+    Attributes:
+        container (str): Name of the container.
+        tracks (list of TrackInfo): Tracks of the file, in container order.
+        duration (float): Duration of the file in seconds, None if unknown.
+    """
+
+    def __init__(self, container, tracks=None, duration=None):
+        self.container = container
+        self.tracks = tracks or []
+        self.duration = duration
+
+    def get_audio_tracks(self):
+        """Get the audio tracks
+
+        Returns:
+            list of TrackInfo: Audio tracks, in container order.
+        """
+        return [track for track in self.tracks if track.type == "audio"]
+
+    def get_instrumental_index(self):
+        """Get the index of the instrumental track among the audio tracks
+
+        The instrumental track is the first extra audio track whose title
+        designates it, or the second audio track otherwise.
+
+        Returns:
+            int: Index of the instrumental track among the audio tracks,
+            starting from 0. None if there is only one audio track.
+        """
+        audio_tracks = self.get_audio_tracks()
+        if len(audio_tracks) < 2:
+            return None
+
+        for index, track in enumerate(audio_tracks[1:], 1):
+            title = (track.title or "").lower().replace("-", " ")
+            if any(keyword in title for keyword in INSTRUMENTAL_KEYWORDS):
+                return index
+
+        return 1
+
+    def to_dict(self):
+        """Export the media information
+
+        Returns:
+            dict: Container, duration and tracks.
+        """
+        return {
+            "container": self.container,
+            "duration": self.duration,
+            "tracks": [track.to_dict() for track in self.tracks],
+        }
+
+
+def read_media_info(file_path):
+    """Read the tracks and the duration of a media file from its headers
+
+    The file is memory-mapped, so that only the pages containing the headers
+    are read. Matroska, WebM and MP4 files are supported.
+
+    Args:
+        file_path (path.Path): Path of the media file.
+
+    Returns:
+        MediaInfo: Information of the file, None if its container is not
+        supported.
+
+    Raises:
+        FileIntegrityError: If the headers are broken.
+        OSError: If the file cannot be read.
+    """
+    with open(file_path, "rb") as file:
+        file_size = os.fstat(file.fileno()).st_size
+        if file_size == 0:
+            raise FileIntegrityError("File is empty")
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic = data[:8]
+
+            if magic[:4] == EBML_MAGIC:
+                return read_matroska_info(data, file_size)
+
+            if magic[4:8] == MP4_MAGIC:
+                return read_mp4_info(data, file_size)
+
+    return None
+
+
+def read_matroska_info(data, file_size):
+    """Read the tracks and the duration of a Matroska file
+
+    Elements of the segment are read up to the first cluster.
+
+    Args:
+        data (mmap.mmap): Content of the file.
+        file_size (int): Size of the file in bytes.
+
+    Returns:
+        MediaInfo: Information of the file.
+
+    Raises:
+        FileIntegrityError: If the headers are broken.
+    """
+    # skip the EBML header
+    element_id, size, position = read_element_header(data, 0, file_size)
+    if element_id != EBML_ID or size is None:
+        raise FileIntegrityError("Invalid EBML header")
+
+    # find the segment
+    position += size
+    while True:
+        element_id, size, position = read_element_header(data, position, file_size)
+        if element_id == SEGMENT_ID:
+            break
+
+        if element_id != VOID_ID or size is None:
+            raise FileIntegrityError("No segment found")
+
+        position += size
+
+    end = file_size if size is None else min(position + size, file_size)
+
+    media_info = MediaInfo("matroska")
+    tracks_found = False
+    timestamp_scale = MATROSKA_DEFAULT_TIMESTAMP_SCALE
+    duration = None
+    for element_id, size, position in iter_elements(
+        data, position, end, allow_unknown=True
+    ):
+        if element_id == CLUSTER_ID or size is None:
+            break
+
+        if element_id == INFO_ID:
+            for child_id, child_size, child_position in iter_elements(
+                data, position, position + size
+            ):
+                value = data[child_position : child_position + child_size]
+                if child_id == TIMESTAMP_SCALE_ID:
+                    timestamp_scale = int.from_bytes(value, "big")
+
+                elif child_id == DURATION_ID:
+                    duration = read_float(value)
+
+        elif element_id == TRACKS_ID:
+            tracks_found = True
+            for child_id, child_size, child_position in iter_elements(
+                data, position, position + size
+            ):
+                if child_id == TRACK_ENTRY_ID:
+                    media_info.tracks.append(
+                        read_matroska_track(data, child_position, child_size)
+                    )
+
+    if not tracks_found:
+        raise FileIntegrityError("No tracks found before first cluster")
+
+    if duration is not None:
+        media_info.duration = duration * timestamp_scale / 1e9
+
+    return media_info
+
+
+def read_matroska_track(data, position, size):
+    """Read a Matroska track entry
+
+    Args:
+        data (mmap.mmap): Content of the file.
+        position (int): Position of the content of the track entry.
+        size (int): Size of the content of the track entry.
+
+    Returns:
+        TrackInfo: Track.
+
+    Raises:
+        FileIntegrityError: If the track entry is broken.
+    """
+    values = {}
+    for element_id, element_size, element_position in iter_elements(
+        data, position, position + size
+    ):
+        values[element_id] = data[element_position : element_position + element_size]
+
+    language = read_string(
+        values.get(LANGUAGE_BCP47_ID)
+        or values.get(LANGUAGE_ID)
+        or MATROSKA_DEFAULT_LANGUAGE.encode()
+    )
+
+    return TrackInfo(
+        int.from_bytes(values.get(TRACK_NUMBER_ID, b""), "big"),
+        MATROSKA_TRACK_TYPES.get(int.from_bytes(values.get(TRACK_TYPE_ID, b""), "big")),
+        codec=read_string(values.get(CODEC_ID_ID)),
+        language=None if language == "und" else language,
+        title=read_string(values.get(NAME_ID)),
+    )
+
+
+def read_mp4_info(data, file_size):
+    """Read the tracks and the duration of a MP4 file
+
+    Args:
+        data (mmap.mmap): Content of the file.
+        file_size (int): Size of the file in bytes.
+
+    Returns:
+        MediaInfo: Information of the file.
+
+    Raises:
+        FileIntegrityError: If the headers are broken.
+    """
+    moov = find_box(data, 0, file_size, b"moov")
+    if moov is None:
+        raise FileIntegrityError("No movie box found")
+
+    media_info = MediaInfo("mp4")
+    for box_type, position, end in iter_boxes(data, *moov):
+        if box_type == b"mvhd":
+            timescale, duration = read_mp4_duration(data, position, end)
+            if timescale:
+                media_info.duration = duration / timescale
+
+        elif box_type == b"trak":
+            media_info.tracks.append(read_mp4_track(data, position, end))
+
+    if not media_info.tracks:
+        raise FileIntegrityError("No tracks found")
+
+    return media_info
+
+
+def read_mp4_track(data, position, end):
+    """Read a MP4 track box
+
+    Args:
+        data (mmap.mmap): Content of the file.
+        position (int): Position of the content of the track box.
+        end (int): Position of the end of the track box.
+
+    Returns:
+        TrackInfo: Track.
+
+    Raises:
+        FileIntegrityError: If the track box is broken.
+    """
+    track = TrackInfo(0, None)
+
+    tkhd = find_box(data, position, end, b"tkhd")
+    if tkhd is not None:
+        # the track ID follows the creation and modification times
+        offset = 20 if data[tkhd[0]] == 1 else 12
+        track.number = read_uint(data, tkhd[0] + offset, 4, tkhd[1])
+
+    mdia = find_box(data, position, end, b"mdia")
+    if mdia is not None:
+        mdhd = find_box(data, *mdia, b"mdhd")
+        if mdhd is not None:
+            # the language follows the times, the timescale and the duration
+            offset = 32 if data[mdhd[0]] == 1 else 20
+            track.language = read_mp4_language(
+                read_uint(data, mdhd[0] + offset, 2, mdhd[1])
+            )
+
+        hdlr = find_box(data, *mdia, b"hdlr")
+        if hdlr is not None:
+            track.type = MP4_TRACK_TYPES.get(data[hdlr[0] + 8 : hdlr[0] + 12])
+
+        stsd = find_box_path(data, *mdia, [b"minf", b"stbl", b"stsd"])
+        if stsd is not None and stsd[1] - stsd[0] >= 16:
+            # the first sample entry follows the entry count
+            track.codec = read_string(data[stsd[0] + 12 : stsd[0] + 16])
+
+    name = find_box_path(data, position, end, [b"udta", b"name"])
+    if name is not None:
+        track.title = read_string(data[name[0] : name[1]])
+
+    return track
+
+
+def read_mp4_duration(data, position, end):
+    """Read the timescale and the duration of a MP4 movie header box
+
+    Args:
+        data (mmap.mmap): Content of the file.
+        position (int): Position of the content of the box.
+        end (int): Position of the end of the box.
+
+    Returns:
+        tuple: Timescale and duration.
+
+    Raises:
+        FileIntegrityError: If the box is broken.
+    """
+    if read_uint(data, position, 1, end) == 1:
+        return (
+            read_uint(data, position + 20, 4, end),
+            read_uint(data, position + 24, 8, end),
+        )
+
+    return (
+        read_uint(data, position + 12, 4, end),
+        read_uint(data, position + 16, 4, end),
+    )
+
+
+def read_mp4_language(value):
+    """Decode a packed ISO 639-2/T language code
+
+    Args:
+        value (int): Packed language code.
+
+    Returns:
+        str: Language code, None if undefined.
+    """
+    language = "".join(chr(((value >> shift) & 0x1F) + 0x60) for shift in (10, 5, 0))
+    if language == "und" or not language.isalpha():
+        return None
+
+    return language
+
+
+def find_box(data, position, end, box_type):
+    """Find a MP4 box among consecutive boxes
+
+    Args:
+        data (mmap.mmap): Content of the file.
+        position (int): Position of the first box.
+        end (int): Position where to stop.
+        box_type (bytes): Type of the box to find.
+
+    Returns:
+        tuple: Position of the content and position of the end of the box,
+        None if not found.
+
+    Raises:
+        FileIntegrityError: If a box is broken.
+    """
+    for current_type, content, box_end in iter_boxes(data, position, end):
+        if current_type == box_type:
+            return content, box_end
+
+    return None
+
+
+def find_box_path(data, position, end, box_types):
+    """Find a nested MP4 box
+
+    Args:
+        data (mmap.mmap): Content of the file.
+        position (int): Position of the first box.
+        end (int): Position where to stop.
+        box_types (list of bytes): Types of the successive parent boxes and
+            of the box to find.
+
+    Returns:
+        tuple: Position of the content and position of the end of the box,
+        None if not found.
+
+    Raises:
+        FileIntegrityError: If a box is broken.
+    """
+    box = (position, end)
+    for box_type in box_types:
+        box = find_box(data, *box, box_type)
+        if box is None:
+            return None
+
+    return box
+
+
+def read_uint(data, position, size, end):
+    """Read a big endian unsigned integer
+
+    Args:
+        data (mmap.mmap): Content of the file.
+        position (int): Position of the integer.
+        size (int): Size of the integer in bytes.
+        end (int): Position the integer cannot exceed.
+
+    Returns:
+        int: Value of the integer.
+
+    Raises:
+        FileIntegrityError: If the integer exceeds the end.
+    """
+    if position + size > end:
+        raise FileIntegrityError("File is truncated")
+
+    return int.from_bytes(data[position : position + size], "big")
+
+
+def read_float(value):
+    """Read a big endian float of 4 or 8 bytes
+
+    Args:
+        value (bytes): Content of the element.
+
+    Returns:
+        float: Value of the float, None if its size is invalid.
+    """
+    if len(value) == 4:
+        return struct.unpack(">f", value)[0]
+
+    if len(value) == 8:
+        return struct.unpack(">d", value)[0]
+
+    return None
+
+
+def read_string(value):
+    """Decode a string padded with null bytes
+
+    Args:
+        value (bytes): Content of the string.
+
+    Returns:
+        str: Decoded string, None if empty.
+    """
+    if not value:
+        return None
+
+    return value.split(b"\x00", 1)[0].decode("utf-8", "replace") or None
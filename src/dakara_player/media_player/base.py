@@ -1,28 +1,80 @@
 import logging
 from abc import ABC, abstractmethod
-from threading import Timer
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, RLock, Timer
+from time import monotonic, strftime
 
+from dakara_base.config import get_config_directory
 from dakara_base.exceptions import DakaraError
 from dakara_base.safe_workers import Worker
 from path import Path
 
 from dakara_player.background_loader import BackgroundLoader
 from dakara_player.resources_manager import PATH_BACKGROUNDS
+from dakara_player.state_manager import State
 from dakara_player.audio import get_audio_files
-from dakara_player.text_generator import TextGenerator
+from dakara_player.checkpoint import (
+    CHECKPOINT_INTERVAL,
+    CHECKPOINT_MAX_AGE,
+    Checkpoint,
+)
+from dakara_player.frame_stats import (
+    FRAME_STATS_INTERVAL,
+    DegradationPolicy,
+    FrameStats,
+    append_frame_stats,
+)
+from dakara_player.integrity import FileIntegrityError, check_file_integrity
+from dakara_player.io_executor import IOExecutor, IOTimeoutError
+from dakara_player.media_info import read_media_info
+from dakara_player.metrics import Metrics
+from dakara_player.preparation import Preparation
+from dakara_player.profiles import apply_profile
+from dakara_player.reject_list import RejectList, get_reject_list_path
+from dakara_player.text_generator import TemplateRenderError, TextGenerator
 from dakara_player.version import __version__
 
 
 TRANSITION_BG_NAME = "transition.png"
 TRANSITION_TEXT_NAME = "transition.ass"
 TRANSITION_DURATION = 2
+TRANSITION_GATE_MARGIN = 0.5
+TRANSITION_GATE_INTERVAL = 0.1
+MAX_TRANSITION_EXTENSION = 10
 
 IDLE_BG_NAME = "idle.png"
 IDLE_TEXT_NAME = "idle.ass"
 IDLE_DURATION = 300
+IDLE_UPDATE_INTERVAL = 1
 
 PLAYER_CLOSING_DURATION = 3
 
+PREPARATION_WORKERS = 3
+
+# the song is usually ready when the transition ends, as the transition screen
+# is extended while it is not, this wait must not block event threads
+PREPARATION_WAIT_TIMEOUT = 1
+
+# the resumed song has no transition screen to wait for its preparation, this
+# wait must stay shorter than the timeout of calls to the media player host
+RESUME_WAIT_TIMEOUT = 5
+
+STALL_CHECK_INTERVAL = 1
+STALL_THRESHOLD = 10
+MAX_STALL_RELOADS = 1
+
+CHECKPOINT_NAME = "player_checkpoint.json"
+
+# type of media handled in each state of the media player
+STATES_MEDIA = {
+    "idle": "idle",
+    "transition_loading": "transition",
+    "transition": "transition",
+    "song_loading": "song",
+    "song": "song",
+    "paused": None,
+}
+
 
 logger = logging.getLogger(__name__)
 
@@ -49,22 +101,107 @@ class MediaPlayer(Worker, ABC):
         player_name (str): Name of the media player.
         fullscreen (bool): If True, the media player will be fullscreen.
         kara_folder_path (path.Path): Path to the karaoke folder.
-        playlist_entry (dict): Playlist entyr object.
+        playlist_entry (dakara_player.playlist_entry.PlaylistEntry): Playlist
+            entry object.
         callbacks (dict): High level callbacks associated with the media
             player.
         warn_long_exit (bool): If True, display a warning message if the media
             player takes too long to stop.
         durations (dict of int): Duration of the different screens in seconds.
         text_paths (dict of path.Path): Path of the different text screens.
+        texts (dict of str): Last generated content of the different text
+            screens.
+        text_lock (threading.Lock): Lock for writing the text screens.
+        idle_info (dict): Extra information displayed on the idle screen.
+        idle_update_interval (float): Minimal interval between two updates of
+            the idle screen text in seconds.
+        idle_update_last (float): Monotonic time of the last idle screen text
+            update.
+        idle_update_timer (threading.Timer): Timer of the next pending idle
+            screen text update, if any.
+        idle_update_lock (threading.Lock): Lock for idle screen text updates.
+        io_executor (dakara_player.io_executor.IOExecutor): Executor of
+            filesystem checks within a deadline.
         text_generator (dakara_player.text_generator.TextGenerator): Text
             generator instance.
         background_loader
         (dakara_player.background_loader.BackgroundLoader): Background
             loader instance.
+        states (dict of dakara_player.state_manager.State): States of the
+            media player.
+        state (str): Name of the current state, None if nothing has been
+            requested to play yet.
+        state_paused (str): Name of the state the media player was in before
+            being paused.
+        generation (int): Counter incremented each time the media player is
+            requested to play something.
+        state_lock (threading.RLock): Lock for state changes.
+        metrics (dakara_player.metrics.Metrics): Performance measurements of
+            the media player.
+        skip_time (float): Monotonic time of the last skip request, None if
+            the media replacing the skipped one has already started.
+        preparation_executor (concurrent.futures.ThreadPoolExecutor): Thread
+            pool running the preparation stages of playlist entries.
+        preparation (dakara_player.preparation.Preparation): Preparation of
+            the current playlist entry, if any.
+        max_transition_extension (float): Maximal duration the transition
+            screen can be extended while the song is not ready, in seconds.
+        transition_gate_timer (threading.Timer): Timer checking if the song
+            is ready before the transition screen ends.
+        transition_hold_pending (bool): True if the media player has been
+            paused to extend the transition screen and the corresponding
+            pause event has not been received yet.
+        transition_held (bool): True while the transition screen is extended.
+        state_reloaded (bool): True if the current media has been reloaded
+            after a stall.
+        stall_threshold (float): Duration without position progress after
+            which the playback is considered stalled, in seconds. The
+            watchdog is disabled if 0.
+        stall_tracked (dict of bool): For each media type, True if its
+            position is expected to progress.
+        watchdog_thread (threading.Thread): Thread checking the playback
+            progress, if started.
+        watchdog_generation (int): Generation of the media observed by the
+            watchdog.
+        watchdog_position (float): Last position observed by the watchdog, in
+            seconds.
+        watchdog_progress (float): Monotonic time of the last position
+            progress observed by the watchdog.
+        stall_detected (float): Monotonic time the current stall was
+            detected, None if the playback is not stalled.
+        stall_reloads (int): Number of reloads tried for the current stall.
+        stall_generation (int): Generation of the media reloaded after the
+            current stall.
+        checkpoint (dakara_player.checkpoint.Checkpoint): Record of the song
+            being played, None if disabled.
+        reject_list (dakara_player.reject_list.RejectList): Songs that cannot
+            be played according to the library check.
+        supervise_player (bool): If True, the watchdog checks periodically
+            that the media player backend is alive.
+        log_pipeline (dakara_player.log_pipeline.LogPipeline): Pipeline
+            forwarding the log messages of the backend, if any.
+        frame_stats_interval (float): Interval between two samples of the
+            frame statistics, in seconds. Disabled if 0.
+        frame_stats_path (path.Path): Path of the file the frame statistics of
+            each entry are appended to, None if they are only logged.
+        frame_stats_last (float): Monotonic time of the last sample of the
+            frame statistics.
+        frame_stats (dakara_player.frame_stats.FrameStats): Frame statistics
+            of the song being played, None if no song is sampled.
+        degradation (dakara_player.frame_stats.DegradationPolicy): Policy
+            degrading the settings of the media player when it drops frames,
+            None if disabled.
     """
 
     player_name = None
 
+    # successive settings of the backend degraded when it drops frames
+    degradation_steps = []
+
+    # if False, the backend cannot update the idle screen text without
+    # restarting its background, so the clock is not refreshed periodically
+    refresh_idle_clock = True
+
     @staticmethod
     @abstractmethod
     def is_available():
@@ -76,7 +213,7 @@ class MediaPlayer(Worker, ABC):
             bool: True if the media player is useable.
         """
 
-    def init_worker(self, config, tempdir, warn_long_exit=True):
+    def init_worker(self, config, tempdir, warn_long_exit=True, resources=None):
         """Initialize the base objects of the media player.
 
         Actions performed in this method should not have any side effects
@@ -87,9 +224,16 @@ class MediaPlayer(Worker, ABC):
             tempdir (path.Path): Path of the temporary directory.
             warn_long_exit (bool): If True, the class will display a warning
                 message if the media player takes too long to stop.
+            resources (dakara_player.rooms.SharedResources): Resources shared
+                with the media players of other rooms, if any.
         """
         self.check_is_available()
 
+        # apply performance profile
+        config = apply_profile(config)
+        if config.get("profile"):
+            logger.info("Using %s performance profile", config["profile"])
+
         # karaoke parameters
         self.fullscreen = config.get("fullscreen", False)
         self.kara_folder_path = Path(config.get("kara_folder", ""))
@@ -113,10 +257,91 @@ class MediaPlayer(Worker, ABC):
             "idle": tempdir / IDLE_TEXT_NAME,
             "transition": tempdir / TRANSITION_TEXT_NAME,
         }
+        self.texts = {}
+        self.text_lock = Lock()
+
+        # set idle screen updates
+        self.idle_info = {}
+        self.idle_update_interval = config_durations.get(
+            "idle_update_interval", IDLE_UPDATE_INTERVAL
+        )
+        self.idle_update_last = 0
+        self.idle_update_timer = None
+        self.idle_update_lock = Lock()
+
+        # set transition screen extension
+        self.max_transition_extension = config_durations.get(
+            "max_transition_extension", MAX_TRANSITION_EXTENSION
+        )
+        self.transition_gate_timer = None
+        self.transition_hold_pending = False
+        self.transition_held = False
+
+        # set playback watchdog
+        self.stall_threshold = config_durations.get("stall_threshold", STALL_THRESHOLD)
+        self.stall_tracked = {"idle": False, "transition": False, "song": True}
+        self.watchdog_thread = None
+        self.watchdog_generation = None
+        self.watchdog_position = None
+        self.watchdog_progress = None
+        self.stall_detected = None
+        self.stall_reloads = 0
+        self.stall_generation = None
+        self.supervise_player = False
+
+        # set playback checkpoint
+        config_checkpoint = config.get("checkpoint") or {}
+        checkpoint_interval = config_checkpoint.get("interval", CHECKPOINT_INTERVAL)
+        self.checkpoint = (
+            Checkpoint(
+                Path(
+                    config_checkpoint.get(
+                        "path", get_config_directory() / CHECKPOINT_NAME
+                    )
+                ).expand(),
+                interval=checkpoint_interval,
+                max_age=config_checkpoint.get("max_age", CHECKPOINT_MAX_AGE),
+            )
+            if checkpoint_interval
+            else None
+        )
+
+        # set library check reject list
+        self.reject_list = RejectList(get_reject_list_path(config))
+
+        # set frame statistics
+        config_frame_stats = config.get("frame_stats") or {}
+        self.frame_stats_interval = config_frame_stats.get(
+            "interval", FRAME_STATS_INTERVAL
+        )
+        frame_stats_path = config_frame_stats.get("path")
+        self.frame_stats_path = (
+            Path(frame_stats_path).expand() if frame_stats_path else None
+        )
+        self.frame_stats_last = 0
+        self.frame_stats = None
+        config_degradation = config_frame_stats.get("degradation") or {}
+        self.degradation = (
+            DegradationPolicy.from_config(config_degradation, self.degradation_steps)
+            if config_degradation.get("enabled", False)
+            else None
+        )
+
+        # set filesystem access
+        config_filesystem = config.get("filesystem") or {}
+        self.io_executor = (
+            resources.get_io_executor(config_filesystem)
+            if resources is not None
+            else IOExecutor.from_config(config_filesystem)
+        )
 
         # set text generator
         config_texts = config.get("templates") or {}
-        self.text_generator = TextGenerator(config_texts)
+        self.text_generator = (
+            resources.get_text_generator(config_texts)
+            if resources is not None
+            else TextGenerator(config_texts)
+        )
 
         # set background loader
         config_backgrounds = config.get("backgrounds") or {}
@@ -131,11 +356,33 @@ class MediaPlayer(Worker, ABC):
                 "transition": TRANSITION_BG_NAME,
                 "idle": IDLE_BG_NAME,
             },
+            io_executor=self.io_executor,
+        )
+
+        # set states
+        self.states = {name: State() for name in STATES_MEDIA}
+        self.state = None
+        self.state_paused = None
+        self.generation = 0
+        self.state_reloaded = False
+        self.state_lock = RLock()
+
+        # set performance measurements
+        self.metrics = Metrics()
+        self.skip_time = None
+
+        # set playlist entries preparation
+        self.preparation_executor = ThreadPoolExecutor(
+            max_workers=PREPARATION_WORKERS, thread_name_prefix="preparation"
         )
+        self.preparation = None
 
         # set default callbacks
         self.set_default_callbacks()
 
+        # set backend logs, if the backend uses them
+        self.log_pipeline = None
+
         # call specialized constructor
         self.init_player(config, tempdir)
 
@@ -164,14 +411,37 @@ class MediaPlayer(Worker, ABC):
         # load backgrounds
         self.background_loader.load()
 
+        # load songs rejected by the library check
+        self.reject_list.load()
+
+        # only video backgrounds are expected to progress
+        self.stall_tracked["idle"] = self.background_loader.is_video("idle")
+        self.stall_tracked["transition"] = self.background_loader.is_video("transition")
+
+        # forward backend logs
+        if self.log_pipeline is not None:
+            self.log_pipeline.start()
+
         self.load_player()
 
+        self.start_watchdog()
+
     def load_player(self):
         """Perform actions with side effects for specialized media player initialization.
 
         Can be overriden.
         """
 
+    @abstractmethod
+    def get_position(self):
+        """Get the precise position in the current media.
+
+        Must be overriden.
+
+        Returns:
+            float: Position in seconds, None if it cannot be obtained.
+        """
+
     @abstractmethod
     def get_timing(self):
         """Get media player timing.
@@ -213,23 +483,544 @@ class MediaPlayer(Worker, ABC):
             bool: True if the media player is paused.
         """
 
-    @abstractmethod
     def is_playing_this(self, what):
         """Query if the media player is playing the requested media type.
 
-        Must be overriden.
+        The answer is given by the current state of the media player, without
+        querying it.
 
         Args:
             what (str): Tell if the media player current track is of the
                 requested type, but not if it is actually playing it (it can be
-                in pause).
+                loading or in pause).
 
         Returns:
             bool: True if the media player is playing the requested type.
         """
+        with self.state_lock:
+            state = self.state_paused if self.state == "paused" else self.state
+
+        return STATES_MEDIA.get(state) == what
+
+    def set_state(self, state):
+        """Set the current state of the media player.
+
+        The previous state is finished and the new one is started.
+
+        Args:
+            state (str): Name of the new state.
+        """
+        with self.state_lock:
+            if self.state is not None:
+                self.states[self.state].finish()
+
+            self.state = state
+            self.states[state].start()
+
+        logger.debug("Player state is now %s", state)
+
+    def load_state(self, what, reloaded=False):
+        """Register that the media player is requested to play something.
+
+        The generation is incremented, so that events related to the
+        previously played media can be identified as stale. The idle screen
+        is not related to any playlist entry and has no loading state.
+
+        Args:
+            what (str): What media is requested to play.
+            reloaded (bool): If True, the media is reloaded after a stall and
+                its start must not be notified again.
+
+        Returns:
+            int: New generation.
+        """
+        with self.state_lock:
+            self.generation += 1
+            self.state_paused = None
+            self.state_reloaded = reloaded
+            self.transition_hold_pending = False
+            self.set_state(what if what == "idle" else what + "_loading")
+
+            return self.generation
+
+    def advance_state(self, expected, state):
+        """Set the current state only if the media player is in the expected one.
+
+        Args:
+            expected (str): Name of the expected current state.
+            state (str): Name of the new state.
+
+        Returns:
+            bool: True if the state has been changed.
+        """
+        with self.state_lock:
+            if self.state != expected:
+                return False
+
+            self.set_state(state)
+
+            return True
+
+    def enter_pause(self):
+        """Register that the media player has been paused.
+
+        Returns:
+            bool: True if the media player was not already paused and was
+            playing a transition screen or a song.
+        """
+        with self.state_lock:
+            if self.state not in ("transition", "song"):
+                return False
+
+            self.state_paused = self.state
+            self.set_state("paused")
+
+            return True
+
+    def leave_pause(self):
+        """Register that the media player has been unpaused.
+
+        Returns:
+            bool: True if the media player was paused.
+        """
+        with self.state_lock:
+            if self.state != "paused":
+                return False
+
+            self.set_state(self.state_paused)
+            self.state_paused = None
+
+            return True
+
+    def play_if_current(self, what, generation):
+        """Request the media player to play something if nothing else has been
+        requested in the meantime.
+
+        Args:
+            what (str): What media to play.
+            generation (int): Generation at the time the request was issued.
+        """
+        if generation != self.generation:
+            logger.debug("Discarding stale request to play %s", what)
+            return
+
+        self.play(what)
+
+    def start_transition_gate(self):
+        """Schedule to check if the song is ready before the transition ends.
+
+        Must be called when the transition screen starts.
+        """
+        self.metrics.increment("transitions")
+
+        if self.transition_gate_timer is not None:
+            self.transition_gate_timer.cancel()
+
+        delay = max(self.durations["transition"] - TRANSITION_GATE_MARGIN, 0)
+        self.transition_gate_timer = self.create_timer(
+            delay, self.check_song_ready, args=(self.generation,)
+        )
+        self.transition_gate_timer.start()
+
+    def check_song_ready(self, generation):
+        """Extend the transition screen until the song is ready.
+
+        If the song is not ready, the media player is paused on the transition
+        screen, without notifying it, and the song is checked again every
+        `TRANSITION_GATE_INTERVAL` seconds, until it is ready or until
+        `max_transition_extension` seconds have passed. The timer thread is
+        never blocked while waiting. How often and how long the transition
+        screen is extended is recorded.
+
+        Args:
+            generation (int): Generation at the time the transition screen
+                started.
+        """
+        # the transition screen has been replaced or paused by the user
+        if generation != self.generation or self.state != "transition":
+            return
+
+        if self.wait_preparation(timeout=0):
+            return
+
+        logger.info("Song is not ready, extending transition screen")
+        with self.state_lock:
+            self.transition_hold_pending = True
+            self.transition_held = True
+
+        self.pause_player(True)
+        self.schedule_song_ready_check(generation, monotonic())
+
+    def schedule_song_ready_check(self, generation, start):
+        """Schedule to check again if the song of the extended transition is ready.
+
+        Args:
+            generation (int): Generation at the time the transition screen
+                started.
+            start (float): Monotonic time when the transition screen was
+                extended.
+        """
+        self.transition_gate_timer = self.create_timer(
+            TRANSITION_GATE_INTERVAL,
+            self.check_song_ready_extended,
+            args=(generation, start),
+        )
+        self.transition_gate_timer.start()
+
+    def check_song_ready_extended(self, generation, start):
+        """Release the extended transition screen if the song is ready.
+
+        The check is scheduled again if the song is not ready, until
+        `max_transition_extension` seconds have passed. The playlist entry is
+        then rejected and the idle screen is played. The transition screen is
+        released at once if it has been replaced.
+
+        Args:
+            generation (int): Generation at the time the transition screen
+                started.
+            start (float): Monotonic time when the transition screen was
+                extended.
+        """
+        if self.stop.is_set():
+            return
+
+        ready = self.wait_preparation(timeout=0)
+        duration = monotonic() - start
+        current = generation == self.generation
+
+        if not ready and current and duration < self.max_transition_extension:
+            self.schedule_song_ready_check(generation, start)
+            return
+
+        self.transition_held = False
+
+        self.metrics.increment("transition_extensions")
+        self.metrics.record_duration("transition_extension", duration)
+
+        if not current:
+            return
+
+        if not ready:
+            logger.warning(
+                "Song still not ready after extending transition screen for %.1f s",
+                duration,
+            )
+
+            # give up the playlist entry, unless it got ready in the meantime
+            if not self.wait_song_ready(timeout=0):
+                return
+
+        # release the transition screen
+        self.pause_player(False)
+
+    def is_transition_hold_event(self):
+        """Tell if a pause event comes from the extension of the transition.
+
+        Returns:
+            bool: True if the pause event must be ignored.
+        """
+        with self.state_lock:
+            pending, self.transition_hold_pending = self.transition_hold_pending, False
+
+        return pending
+
+    def start_watchdog(self):
+        """Start the thread checking the playback progress.
+
+        Does nothing if the watchdog, the checkpoint, the supervision of the
+        media player backend and the frame statistics are disabled.
+        """
+        if (
+            not self.stall_threshold
+            and self.checkpoint is None
+            and not self.supervise_player
+            and not self.frame_stats_interval
+        ):
+            return
+
+        self.watchdog_thread = self.create_thread(
+            target=self.run_watchdog, name="watchdog", daemon=True
+        )
+        self.watchdog_thread.start()
+
+    def run_watchdog(self):
+        """Check the playback progress periodically until the program stops.
+
+        The media player backend is checked, the checkpoint is saved, the
+        frame statistics are sampled and the clock of the idle screen is
+        updated at the same time.
+        """
+        while not self.stop.wait(STALL_CHECK_INTERVAL):
+            if self.supervise_player:
+                self.check_player()
+
+            if self.stall_threshold:
+                self.check_stall()
+
+            if self.checkpoint is not None:
+                self.save_checkpoint()
+
+            if self.frame_stats_interval:
+                self.sample_frame_stats()
+
+            if self.refresh_idle_clock and self.is_playing_this("idle"):
+                self.update_idle_clock()
+
+    def check_player(self):
+        """Check the media player backend is alive, and recover it otherwise.
+
+        Called periodically by the watchdog if `supervise_player` is True.
+
+        Can be overriden.
+        """
+
+    def get_frame_stats(self):
+        """Get the frame counters of the media player backend.
+
+        Can be overriden.
+
+        Returns:
+            tuple: Contains the cumulative number of dropped frames, the
+            cumulative number of displayed frames and the current frame rate
+            (None if unknown). None if the counters cannot be obtained.
+        """
+        return None
+
+    def apply_degradation(self, settings):
+        """Apply degraded settings to the media player backend.
+
+        Can be overriden.
+
+        Args:
+            settings (dict): Settings to apply.
+        """
+
+    def sample_frame_stats(self):
+        """Sample the frame statistics of the song being played.
+
+        Samples are taken every `frame_stats_interval` seconds. The statistics
+        of a song are finished when another media is played. If the
+        degradation policy is enabled, settings are degraded when too many
+        frames are dropped.
+        """
+        now = monotonic()
+        if now - self.frame_stats_last < self.frame_stats_interval:
+            return
+
+        self.frame_stats_last = now
+
+        with self.state_lock:
+            state = self.state
+            playlist_entry = self.playlist_entry
+
+        # counters do not progress during a pause
+        if state == "paused":
+            return
+
+        if STATES_MEDIA.get(state) != "song" or playlist_entry is None:
+            self.finish_frame_stats()
+            return
+
+        counters = self.get_frame_stats()
+        if counters is None:
+            return
+
+        if (
+            self.frame_stats is not None
+            and self.frame_stats.playlist_entry is not playlist_entry
+        ):
+            self.finish_frame_stats()
+
+        if self.frame_stats is None:
+            self.frame_stats = FrameStats(playlist_entry)
+
+        drop_rate = self.frame_stats.record(*counters)
+
+        if self.degradation is None:
+            return
+
+        settings = self.degradation.check(drop_rate)
+        if settings is None:
+            return
+
+        logger.warning(
+            "Dropping %.0f%% of frames, degrading settings: %s",
+            drop_rate * 100,
+            ", ".join("{}={}".format(key, value) for key, value in settings.items()),
+        )
+        self.frame_stats.degradations += 1
+        self.metrics.increment("degradations")
+        self.apply_degradation(settings)
+
+    def finish_frame_stats(self):
+        """Log and export the frame statistics of the last song, if any.
+        """
+        frame_stats, self.frame_stats = self.frame_stats, None
+        if frame_stats is None:
+            return
+
+        logger.info(
+            "Frames of '%s': %i dropped, %i displayed (%.1f%%, max %.1f%%)",
+            frame_stats.playlist_entry.title,
+            frame_stats.dropped,
+            frame_stats.displayed,
+            frame_stats.get_drop_rate() * 100,
+            frame_stats.max_drop_rate * 100,
+        )
+        self.metrics.increment("dropped_frames", frame_stats.dropped)
+        self.metrics.increment("displayed_frames", frame_stats.displayed)
+
+        if self.frame_stats_path is not None:
+            append_frame_stats(self.frame_stats_path, frame_stats)
+
+    def save_checkpoint(self):
+        """Save the song being played and its position in the checkpoint.
+
+        The checkpoint is cleared when no song is played.
+        """
+        with self.state_lock:
+            state = self.state_paused if self.state == "paused" else self.state
+            playlist_entry = self.playlist_entry
+
+        if STATES_MEDIA.get(state) != "song" or playlist_entry is None:
+            self.checkpoint.clear()
+            return
+
+        position = self.get_position()
+        if position is None:
+            return
+
+        self.checkpoint.save(playlist_entry, position)
+
+    def resume_checkpoint(self):
+        """Resume the song saved in the checkpoint, if it is recent.
+
+        The song is prepared and played directly at its saved position,
+        without transition screen. Its preparation is waited for at most
+        `RESUME_WAIT_TIMEOUT` seconds, the playlist entry is rejected if it is
+        still not ready. Its start is not notified.
+
+        Returns:
+            bool: True if a song is resumed.
+        """
+        if self.checkpoint is None:
+            return False
+
+        loaded = self.checkpoint.load(self.kara_folder_path)
+        if loaded is None:
+            return False
+
+        playlist_entry, position = loaded
+        logger.info("Resuming '%s' at %.1f s", playlist_entry.title, position)
+        self.metrics.increment("resumes")
+
+        self.set_playlist_entry(playlist_entry, autoplay=False)
+        self.wait_preparation(timeout=RESUME_WAIT_TIMEOUT)
+        self.play("song", position)
+
+        return self.is_playing_this("song")
+
+    def check_stall(self):
+        """Check if the position of the current media progresses.
+
+        The position of song, transition and idle screens is tracked, as long
+        as it is expected to progress. If it does not progress for more than
+        `stall_threshold` seconds, the playback is considered stalled and is
+        recovered. The time to recover is recorded when the position of the
+        reloaded media progresses.
+        """
+        with self.state_lock:
+            state = self.state
+            generation = self.generation
+            held = self.transition_held
+
+        media = STATES_MEDIA.get(state)
+
+        # nothing expected to progress
+        if media is None or held or not self.stall_tracked[media]:
+            self.watchdog_generation = None
+            return
+
+        position = self.get_position()
+        now = monotonic()
+
+        # another media is played
+        if generation != self.watchdog_generation:
+            if generation != self.stall_generation:
+                self.stall_detected = None
+                self.stall_reloads = 0
+
+            self.watchdog_generation = generation
+            self.watchdog_position = position
+            self.watchdog_progress = now
+
+            return
+
+        # the position progresses
+        if position != self.watchdog_position:
+            if self.stall_detected is not None:
+                self.metrics.record_duration(
+                    "stall_recovery", now - self.stall_detected
+                )
+                self.stall_detected = None
+                self.stall_reloads = 0
+
+            self.watchdog_position = position
+            self.watchdog_progress = now
+
+            return
+
+        if now - self.watchdog_progress >= self.stall_threshold:
+            self.recover_stall(media, position)
+
+    def recover_stall(self, what, position):
+        """Recover a stalled playback.
+
+        The media is reloaded at the last position where it progressed. If it
+        is still stalled afterwards, the song or the transition screen is
+        skipped and the error callback is called. The idle screen cannot be
+        skipped and is always reloaded.
+
+        Args:
+            what (str): What media is stalled.
+            position (float): Last position where the media progressed, in
+                seconds, None if unknown.
+        """
+        logger.warning(
+            "Playback of %s stalled for %.1f s",
+            what,
+            monotonic() - self.watchdog_progress,
+        )
+
+        if self.stall_detected is None:
+            self.stall_detected = monotonic()
+            self.metrics.increment("stalls")
+
+        if self.stall_reloads < MAX_STALL_RELOADS or what == "idle":
+            self.stall_reloads += 1
+            self.metrics.increment("stall_reloads")
+            logger.info("Reloading %s at %.1f s", what, position or 0)
+            self.play(what, position or 0)
+            self.stall_generation = self.generation
+
+            return
+
+        playlist_entry = self.playlist_entry
+        if playlist_entry is None:
+            return
+
+        logger.error("Unable to recover playback of %s", what)
+        self.metrics.increment("stall_skips")
+        self.metrics.record_duration(
+            "stall_recovery", monotonic() - self.stall_detected
+        )
+        self.stall_detected = None
+        self.stall_reloads = 0
+        self.callbacks["error"](playlist_entry.id, "Playback stalled")
+        self.skip()
 
     @abstractmethod
-    def play(self, what):
+    def play(self, what, position=None):
         """Request the media player to play something.
 
         No preparation should be done by this function, i.e. the media track
@@ -239,6 +1030,9 @@ class MediaPlayer(Worker, ABC):
 
         Args:
             what (str): What media to play.
+            position (float): Position to start from, in seconds. If given,
+                the media is reloaded after a stall, even if it is already
+                played, and its start is not notified.
         """
 
     @abstractmethod
@@ -255,12 +1049,52 @@ class MediaPlayer(Worker, ABC):
             paused (bool): If True, pause the media player.
         """
 
+    @abstractmethod
+    def pause_player(self, paused):
+        """Request the media player to pause or unpause, unconditionally.
+
+        Contrary to `pause`, the state of the media player is not checked.
+
+        Must be overriden.
+
+        Args:
+            paused (bool): If True, pause the media player.
+        """
+
     @abstractmethod
     def skip(self):
         """Request to skip the current media.
 
         Can only work on transition screens or songs. The media player should
-        continue playing, but media has to be considered already finished.
+        switch to the idle screen immediately, and the media has to be
+        considered already finished.
+
+        Must be overriden.
+        """
+
+    def start_skip(self):
+        """Register that the current media is being skipped.
+        """
+        self.skip_time = monotonic()
+
+    def end_skip(self):
+        """Register that a new media has started after a skip.
+
+        The time between the skip request and the start of the new media is
+        recorded.
+        """
+        skip_time, self.skip_time = self.skip_time, None
+
+        if skip_time is None:
+            return
+
+        self.metrics.record_duration("skip", monotonic() - skip_time)
+
+    @abstractmethod
+    def reload_idle_text(self):
+        """Request the media player to reload the idle screen text.
+
+        The idle screen background media must be left untouched.
 
         Must be overriden.
         """
@@ -272,51 +1106,301 @@ class MediaPlayer(Worker, ABC):
         Must be overriden.
         """
 
+    def update_idle_screen(self, **info):
+        """Update the information displayed on the idle screen.
+
+        Only the text of the idle screen is regenerated and pushed to the media
+        player, the background media is not reloaded. Updates are rate limited
+        to one every `idle_update_interval` seconds, updates requested in the
+        meantime are merged and pushed at the end of the interval.
+
+        Args:
+            info (dict): Extra information passed to the idle screen template.
+        """
+        with self.idle_update_lock:
+            self.idle_info.update(info)
+
+            # an update is already pending, it will use the new information
+            if self.idle_update_timer is not None:
+                return
+
+            delay = self.idle_update_last + self.idle_update_interval - monotonic()
+            if delay > 0:
+                self.idle_update_timer = self.create_timer(delay, self.push_idle_text)
+                self.idle_update_timer.start()
+                return
+
+        self.push_idle_text()
+
+    def update_idle_clock(self):
+        """Update the time displayed on the idle screen when it has changed.
+
+        Called periodically by the watchdog while the idle screen is played,
+        if `refresh_idle_clock` is True.
+        """
+        clock = strftime("%H:%M")
+        if self.idle_info.get("time") == clock:
+            return
+
+        self.update_idle_screen(time=clock)
+
+    def push_idle_text(self):
+        """Regenerate the idle screen text and push it to the media player.
+
+        Nothing is pushed if the idle screen is not playing or if the text has
+        not changed.
+        """
+        with self.idle_update_lock:
+            self.idle_update_timer = None
+            self.idle_update_last = monotonic()
+
+        if not self.is_playing_this("idle"):
+            return
+
+        text_previous = self.texts.get("idle")
+        self.generate_text("idle")
+
+        if self.texts["idle"] == text_previous:
+            logger.debug("Idle screen text unchanged")
+            return
+
+        logger.debug("Updating idle screen text")
+        self.reload_idle_text()
+
     def set_playlist_entry(self, playlist_entry, autoplay=True):
         """Prepare playlist entry base data to be played.
 
+        The playlist entry is prepared by a pipeline of stages run
+        concurrently, this method does not wait for them. The preparation of
+        any previous playlist entry is cancelled.
+
         Check if the song file exists, otherwise consider the song cannot be
-        played.
+        played. This check and the preparation of the transition screen are
+        prioritized. The integrity of the song file is then checked while the
+        transition screen is played.
 
         Args:
-            playlist_entry (dict): Playlist entry object.
+            playlist_entry (dakara_player.playlist_entry.PlaylistEntry): Playlist
+                entry object.
             autoplay (bool): If True, start to play transition screen as soon
                 as possible.
         """
-        file_path = self.kara_folder_path / playlist_entry["song"]["file_path"]
+        self.cancel_preparation()
+        self.clear_playlist_entry_player()
+        self.playlist_entry = playlist_entry
 
-        if not file_path.exists():
-            logger.error("File not found '%s'", file_path)
-            self.callbacks["error"](playlist_entry["id"], "File not found")
-            self.callbacks["could_not_play"](playlist_entry["id"])
-            return
+        preparation = Preparation(
+            self.stop, self.errors, self.preparation_executor, self.metrics
+        )
+        preparation.add_stage(
+            "file",
+            lambda: self.check_playlist_entry_file(preparation, playlist_entry),
+            critical=True,
+        )
+        preparation.add_stage(
+            "integrity",
+            lambda: self.check_playlist_entry_integrity(preparation, playlist_entry),
+            requires=["file"],
+        )
+        self.prepare_playlist_entry_player(
+            preparation, playlist_entry, playlist_entry.file_path
+        )
 
-        self.playlist_entry = playlist_entry
+        # start playing transition right away if requested
+        if autoplay:
+            preparation.add_stage(
+                "autoplay",
+                lambda: self.play("transition"),
+                requires=["file", "transition"],
+                critical=True,
+            )
+
+        self.preparation = preparation
+        preparation.start()
 
-        self.set_playlist_entry_player(playlist_entry, file_path, autoplay)
+    def check_playlist_entry_file(self, preparation, playlist_entry):
+        """Check the file of a playlist entry exists.
+
+        If the file does not exist, has been rejected by the library check, or
+        cannot be accessed within the deadline of the filesystem executor, the
+        preparation is cancelled and the playlist entry is considered as not
+        playable.
+
+        Args:
+            preparation (dakara_player.preparation.Preparation): Preparation of
+                the playlist entry.
+            playlist_entry (dakara_player.playlist_entry.PlaylistEntry): Playlist
+                entry object.
+        """
+        file_path = playlist_entry.file_path
+
+        try:
+            if not self.io_executor.exists(file_path):
+                self.reject_playlist_entry(
+                    preparation, playlist_entry, "File not found"
+                )
+                return
+
+            if not self.reject_list:
+                return
+
+            reason = self.io_executor.call(self.reject_list.get_reason, file_path)
+            if reason is not None:
+                self.reject_playlist_entry(
+                    preparation,
+                    playlist_entry,
+                    "File rejected by library check",
+                    reason,
+                )
+
+        except IOTimeoutError:
+            self.metrics.increment("filesystem_timeouts")
+            self.reject_playlist_entry(
+                preparation, playlist_entry, "File not reachable"
+            )
+
+    def check_playlist_entry_integrity(self, preparation, playlist_entry):
+        """Check the container of the file of a playlist entry is not broken.
+
+        If the file is broken, or cannot be read within the deadline of the
+        filesystem executor, the preparation is cancelled and the playlist
+        entry is considered as not playable.
+
+        Args:
+            preparation (dakara_player.preparation.Preparation): Preparation of
+                the playlist entry.
+            playlist_entry (dakara_player.playlist_entry.PlaylistEntry): Playlist
+                entry object.
+        """
+        try:
+            self.io_executor.call(check_file_integrity, playlist_entry.file_path)
+
+        except IOTimeoutError:
+            self.metrics.increment("filesystem_timeouts")
+            self.reject_playlist_entry(
+                preparation, playlist_entry, "File not reachable"
+            )
+
+        except (FileIntegrityError, OSError) as error:
+            self.metrics.increment("integrity_failures")
+            self.reject_playlist_entry(
+                preparation, playlist_entry, "Invalid file", error
+            )
+
+    def reject_playlist_entry(self, preparation, playlist_entry, message, error=None):
+        """Consider a playlist entry as not playable.
+
+        The preparation is cancelled and the callbacks `callbacks["error"]` and
+        `callbacks["could_not_play"]` are called. If the playlist entry is
+        still the current one, it is cleared and the idle screen is played in
+        case the transition screen has already started.
+
+        Args:
+            preparation (dakara_player.preparation.Preparation): Preparation of
+                the playlist entry.
+            playlist_entry (dakara_player.playlist_entry.PlaylistEntry): Playlist
+                entry object.
+            message (str): Reason of the rejection.
+            error (Exception): Detailed error, if any.
+        """
+        preparation.cancel()
+
+        if error is not None:
+            logger.error("%s '%s': %s", message, playlist_entry.file_path, error)
+
+        else:
+            logger.error("%s '%s'", message, playlist_entry.file_path)
+
+        self.callbacks["error"](playlist_entry.id, message)
+        self.callbacks["could_not_play"](playlist_entry.id)
+
+        # another playlist entry may have been set in the meantime
+        with self.state_lock:
+            if self.preparation is not preparation:
+                return
+
+            self.clear_playlist_entry()
+
+            if self.state not in (None, "idle"):
+                self.play("idle")
 
     @abstractmethod
-    def set_playlist_entry_player(self, playlist_entry, file_path, autoplay):
-        """Prepare playlist entry data to be played.
+    def prepare_playlist_entry_player(self, preparation, playlist_entry, file_path):
+        """Add the stages preparing playlist entry data to be played.
+
+        Stages prepare all media objects, subtitles, etc. for being played,
+        for the transition screen and the song. Such data should be stored on
+        a dedicated object, like `playlist_entry_data`, that stages should
+        capture when they are created, as they may still run after the
+        preparation has been cancelled.
 
-        Prepare all media objects, subtitles, etc. for being played, for the
-        transition screen and the song. Such data should be stored on a
-        dedicated object, like `playlist_entry_data`.
+        A stage named "transition" must prepare the transition screen, it
+        should be critical.
 
         Must be overriden.
 
         Args:
-            playlist_entry (dict): Playlist entry object.
+            preparation (dakara_player.preparation.Preparation): Preparation of
+                the playlist entry.
+            playlist_entry (dakara_player.playlist_entry.PlaylistEntry): Playlist
+                entry object.
             file_path (path.Path): Absolute path to the song file.
-            autoplay (bool): If True, start to play transition screen as soon
-                as possible (i.e. as soon as the transition screen media is
-                ready). The song media is prepared when the transition screen
-                is playing.
         """
 
+    def cancel_preparation(self):
+        """Cancel the preparation of the current playlist entry, if any.
+        """
+        preparation, self.preparation = self.preparation, None
+
+        if preparation is not None:
+            preparation.cancel()
+
+    def wait_preparation(self, timeout=None):
+        """Wait for the preparation of the current playlist entry to finish.
+
+        Args:
+            timeout (float): Maximum duration of the wait in seconds. If not
+                given, wait indefinitely.
+
+        Returns:
+            bool: True if the playlist entry is ready to be played, or if
+            there is no preparation.
+        """
+        preparation = self.preparation
+
+        if preparation is None:
+            return True
+
+        return preparation.wait(timeout=timeout)
+
+    def wait_song_ready(self, timeout):
+        """Wait for the song of the current playlist entry to be ready.
+
+        If the song is still not ready at the end of the wait, the playlist
+        entry is rejected, so that the server can move to the next one.
+
+        Args:
+            timeout (float): Maximum duration of the wait in seconds.
+
+        Returns:
+            bool: True if the song is ready to be played, or if there is no
+            preparation.
+        """
+        preparation, playlist_entry = self.preparation, self.playlist_entry
+
+        if preparation is None or preparation.wait(timeout=timeout):
+            return True
+
+        self.reject_playlist_entry(
+            preparation, playlist_entry, "Song not ready to be played"
+        )
+
+        return False
+
     def clear_playlist_entry(self):
         """Clean playlist entry base data after being played.
         """
+        self.cancel_preparation()
         self.playlist_entry = None
 
         self.clear_playlist_entry_player()
@@ -337,16 +1421,23 @@ class MediaPlayer(Worker, ABC):
         """
         self.callbacks[name] = callback
 
-    @staticmethod
-    def get_instrumental_file(filepath):
+    def get_instrumental_file(self, filepath):
         """Get the instrumental audio file associated to a given song file.
 
         Consider that this instrumental file should be the only one audio file found.
+        If the song folder cannot be accessed within the deadline of the
+        filesystem executor, no instrumental file is considered.
 
         Returns:
             path.Path: Path to the instrumental file. None if not found.
         """
-        audio_files = get_audio_files(filepath)
+        try:
+            audio_files = self.io_executor.call(get_audio_files, filepath)
+
+        except IOTimeoutError as error:
+            self.metrics.increment("filesystem_timeouts")
+            logger.warning("Unable to look for instrumental file: %s", error)
+            return None
 
         # accept only one audio file
         if len(audio_files) == 1:
@@ -355,10 +1446,44 @@ class MediaPlayer(Worker, ABC):
         # otherwise return None
         return None
 
+    def get_media_info(self, file_path):
+        """Get the tracks of a song file from the headers of its container.
+
+        If the file cannot be read within the deadline of the filesystem
+        executor, or if its headers cannot be read, no information is
+        considered.
+
+        Args:
+            file_path (path.Path): Path of the song file.
+
+        Returns:
+            dakara_player.media_info.MediaInfo: Information of the file. None
+            if not available.
+        """
+        try:
+            return self.io_executor.call(read_media_info, file_path)
+
+        except IOTimeoutError as error:
+            self.metrics.increment("filesystem_timeouts")
+            logger.warning("Unable to read tracks of '%s': %s", file_path, error)
+
+        except (FileIntegrityError, OSError, ValueError) as error:
+            logger.debug("Unable to read tracks of '%s': %s", file_path, error)
+
+        return None
+
     def check_kara_folder_path(self):
         """Check if the karaoke folder exists.
         """
-        if not self.kara_folder_path.exists():
+        try:
+            exists = self.io_executor.exists(self.kara_folder_path)
+
+        except IOTimeoutError as error:
+            raise KaraFolderNotFound(
+                'Karaoke folder "{}" cannot be reached'.format(self.kara_folder_path)
+            ) from error
+
+        if not exists:
             raise KaraFolderNotFound(
                 'Karaoke folder "{}" does not exist'.format(self.kara_folder_path)
             )
@@ -390,6 +1515,26 @@ class MediaPlayer(Worker, ABC):
         after `PLAYER_CLOSING_DURATION` seconds if the worker is not closed
         yet.
         """
+        # cancel pending idle screen text update
+        with self.idle_update_lock:
+            if self.idle_update_timer is not None:
+                self.idle_update_timer.cancel()
+                self.idle_update_timer = None
+
+        # stop the playback watchdog
+        if self.watchdog_thread is not None:
+            self.watchdog_thread.join()
+
+        self.finish_frame_stats()
+
+        # cancel pending transition screen check
+        if self.transition_gate_timer is not None:
+            self.transition_gate_timer.cancel()
+
+        # cancel pending preparation
+        self.cancel_preparation()
+        self.preparation_executor.shutdown(wait=False)
+
         if self.warn_long_exit:
             # send a warning within if the player has not stopped already
             timer_stop_player_too_long = Timer(
@@ -404,46 +1549,104 @@ class MediaPlayer(Worker, ABC):
             # clear the warning
             timer_stop_player_too_long.cancel()
 
+        # forward remaining backend logs
+        if self.log_pipeline is not None:
+            self.log_pipeline.stop()
+
+        self.metrics.log_summary()
+
     @classmethod
     def warn_stop_player_too_long(cls):
         """Notify the user that the player takes too long to stop.
         """
         logger.warning("{} takes too long to stop".format(cls.player_name))
 
-    def generate_text(self, what, *args, **kwargs):
+    def generate_text(
+        self, what, *args, playlist_entry=None, preparation=None, **kwargs
+    ):
         """Generate text screens for the requested action.
 
         Extra arguments are passed to `TextGenerator.create_*_text`.
 
+        If the template takes too long to render or is rejected by the
+        sandbox, the error is reported through the `callbacks["error"]`
+        callback and the text is generated again with the default template.
+
         Args:
             what (str): What text screen to generate.
+            playlist_entry (dakara_player.playlist_entry.PlaylistEntry):
+                Playlist entry of the transition screen.
+            preparation (dakara_player.preparation.Preparation): Preparation
+                the text screen is generated for, if any. If it has been
+                cancelled once the text is created, the text screen is not
+                written.
 
         Returns:
-            path.Path: Path of the text screen.
+            path.Path: Path of the text screen, None if the preparation has
+            been cancelled.
+        """
+        try:
+            text = self.create_text(
+                what, *args, playlist_entry=playlist_entry, **kwargs
+            )
+
+        except TemplateRenderError as error:
+            logger.error(error)
+
+            # the idle screen is not related to any playlist entry, so the
+            # error cannot be reported to the server
+            if what == "transition":
+                self.callbacks["error"](playlist_entry.id, str(error))
+
+            # the template has been replaced by the default one
+            text = self.create_text(
+                what, *args, playlist_entry=playlist_entry, **kwargs
+            )
+
+        # the text screen file is shared by all the playlist entries, a newer
+        # preparation cancels this one before writing its own text
+        with self.text_lock:
+            if preparation is not None and preparation.is_cancelled():
+                logger.debug("Discarding %s text of cancelled preparation", what)
+                return None
+
+            self.text_paths[what].write_text(text, "utf-8")
+            self.texts[what] = text
+
+        return self.text_paths[what]
+
+    def create_text(self, what, *args, playlist_entry=None, **kwargs):
+        """Create text screens content for the requested action.
+
+        Extra arguments are passed to `TextGenerator.create_*_text`.
+
+        Args:
+            what (str): What text screen to create.
+            playlist_entry (dakara_player.playlist_entry.PlaylistEntry):
+                Playlist entry of the transition screen.
+
+        Returns:
+            str: Content of the text screen.
         """
         if what == "idle":
-            text = self.text_generator.create_idle_text(
+            return self.text_generator.create_idle_text(
                 {
+                    **self.idle_info,
                     "notes": [
                         "{} {}".format(self.player_name, self.get_version()),
                         "Dakara player {}".format(__version__),
-                    ]
+                    ],
                 },
                 *args,
                 **kwargs
             )
 
-        elif what == "transition":
-            text = self.text_generator.create_transition_text(
-                self.playlist_entry, *args, **kwargs
+        if what == "transition":
+            return self.text_generator.create_transition_text(
+                playlist_entry, *args, **kwargs
             )
 
-        else:
-            raise ValueError("Unexpected action to generate text to: {}".format(what))
-
-        self.text_paths[what].write_text(text, "utf-8")
-
-        return self.text_paths[what]
+        raise ValueError("Unexpected action to generate text to: {}".format(what))
 
 
 class KaraFolderNotFound(DakaraError):
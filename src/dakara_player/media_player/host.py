@@ -0,0 +1,626 @@
+import logging
+import multiprocessing
+import pickle
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from queue import Empty, Queue
+from threading import Event, Lock
+from time import monotonic, time
+
+from dakara_base.exceptions import DakaraError
+from dakara_base.safe_workers import Worker
+from path import Path
+
+from dakara_player.metrics import Metrics
+
+HOST_START_TIMEOUT = 30
+HOST_CALL_TIMEOUT = 10
+HOST_STOP_TIMEOUT = 10
+HOST_POLL_INTERVAL = 0.1
+
+# callbacks of the media player forwarded from the host process
+CALLBACK_NAMES = (
+    "started_transition",
+    "started_song",
+    "could_not_play",
+    "finished",
+    "paused",
+    "resumed",
+    "error",
+)
+
+logger = logging.getLogger(__name__)
+
+
+class MediaPlayerHost(Worker):
+    """Media player running in a separate process.
+
+    The host process runs a regular media player class. Each method call is
+    sent to the host process and waits for its result, each callback of the
+    media player is forwarded to the callbacks of this object, and each log
+    record is forwarded to the loggers of this process. A crash of the media
+    player, or of the library it uses, only stops the host process.
+
+    Messages are tuples sent through a pipe. The host process sends:
+        - `("ready",)` when the media player is loaded;
+        - `("failed", error)` when the media player stops on an error;
+        - `("reply", request_id, result, error)` for a method call;
+        - `("event", name, args, time)` for a callback;
+        - `("log", name, level, message)` for a log record.
+
+    This process sends:
+        - `("call", request_id, name, args, kwargs)` for a method call;
+        - `("stop",)` to stop the host process.
+
+    If the host process stops unexpectedly, it is started again and the song
+    saved in the checkpoint of the media player is resumed, or the idle
+    screen is played. Method calls made in the meantime wait for the new host
+    process.
+
+    Callbacks and restarts of the host process are run in order by a
+    dispatcher thread, not by the thread receiving messages, so that they can
+    call methods of the media player.
+
+    Only the methods used to control the media player are available.
+
+    Args:
+        stop (threading.Event): Stop event that notify to stop the entire
+            program when set.
+        errors (queue.Queue): Error queue to communicate the exception to the
+            main thread.
+        config (dict): Dictionary of configuration.
+        tempdir (path.Path): Path of the temporary directory.
+        player_class (type): Class of the media player to run in the host
+            process.
+
+    Attributes:
+        stop (threading.Event): Stop event that notify to stop the entire
+            program when set.
+        errors (queue.Queue): Error queue to communicate the exception to the
+            main thread.
+        config (dict): Dictionary of configuration.
+        tempdir (path.Path): Path of the temporary directory.
+        player_class (type): Class of the media player to run in the host
+            process.
+        player_name (str): Name of the media player.
+        kara_folder_path (path.Path): Path to the karaoke folder.
+        callbacks (dict): High level callbacks associated with the media
+            player.
+        metrics (dakara_player.metrics.Metrics): Performance measurements of
+            the host process.
+        process (multiprocessing.Process): Host process, if started.
+        connection (multiprocessing.connection.Connection): End of the pipe
+            to the host process.
+        connection_lock (threading.Lock): Lock for sending messages.
+        ready (threading.Event): Event set when the host process is loaded or
+            has failed.
+        available (threading.Event): Event set when method calls can be sent
+            to the host process, cleared while it is restarted.
+        loaded (bool): True if the media player of the current host process
+            has been loaded.
+        failure (Exception): Error that stopped the host process, if any.
+        pending (dict of concurrent.futures.Future): Future of the method calls
+            waiting for their result, by request ID.
+        request_id (int): ID of the last method call.
+        stopping (bool): True if the host process is requested to stop.
+        dispatch_queue (queue.Queue): Functions to run by the dispatcher
+            thread, with their arguments.
+    """
+
+    def init_worker(self, config, tempdir, player_class):
+        """Initialize the objects of the host.
+
+        Args:
+            config (dict): Dictionary of configuration.
+            tempdir (path.Path): Path of the temporary directory.
+            player_class (type): Class of the media player to run in the host
+                process.
+        """
+        self.config = config
+        self.tempdir = tempdir
+        self.player_class = player_class
+        self.player_name = player_class.player_name
+        self.kara_folder_path = Path(config.get("kara_folder", ""))
+
+        self.callbacks = {name: lambda *args: None for name in CALLBACK_NAMES}
+        self.metrics = Metrics()
+
+        self.process = None
+        self.connection = None
+        self.connection_lock = Lock()
+        self.ready = Event()
+        self.available = Event()
+        self.loaded = False
+        self.failure = None
+        self.pending = {}
+        self.request_id = 0
+        self.stopping = False
+        self.dispatch_queue = Queue()
+
+    def load(self):
+        """Start the host process and load the media player in it.
+
+        The dispatcher thread is started first.
+        """
+        thread = self.create_thread(target=self.run_dispatcher, daemon=True)
+        thread.start()
+
+        self.start_host()
+
+    def dispatch(self, function, *args):
+        """Request the dispatcher thread to run a function.
+
+        Args:
+            function (function): Function to run.
+            args (list): Positional arguments of the function.
+        """
+        self.dispatch_queue.put((function, args))
+
+    def run_dispatcher(self):
+        """Run the requested functions in order until the program stops.
+        """
+        while not self.stop.is_set():
+            try:
+                function, args = self.dispatch_queue.get(timeout=HOST_POLL_INTERVAL)
+
+            except Empty:
+                continue
+
+            function(*args)
+
+    def start_host(self):
+        """Start the host process and wait for the media player to be loaded.
+
+        The `spawn` start method is used, as forking a process with several
+        threads is not safe.
+
+        Raises:
+            Exception: Error raised by the media player when loading.
+            HostError: If the media player is not loaded within
+                `HOST_START_TIMEOUT` seconds.
+        """
+        context = multiprocessing.get_context("spawn")
+        connection, connection_host = context.Pipe()
+
+        self.ready.clear()
+        self.loaded = False
+        self.failure = None
+        self.connection = connection
+        self.process = context.Process(
+            target=run_host,
+            args=(
+                connection_host,
+                self.player_class,
+                self.config,
+                self.tempdir,
+                logging.getLogger().getEffectiveLevel(),
+            ),
+            name="{}_host".format(self.player_name),
+            daemon=True,
+        )
+
+        start = monotonic()
+        self.process.start()
+        connection_host.close()
+
+        thread = self.create_thread(
+            target=self.receive_messages, args=(connection,), daemon=True
+        )
+        thread.start()
+
+        if not self.ready.wait(HOST_START_TIMEOUT):
+            self.process.terminate()
+            raise HostError(
+                "Media player host has not started within {} s".format(
+                    HOST_START_TIMEOUT
+                )
+            )
+
+        if self.failure is not None:
+            raise self.failure
+
+        self.available.set()
+        self.metrics.record_duration("host_start", monotonic() - start)
+        logger.debug("Started media player host process %i", self.process.pid)
+
+    def restart_host(self):
+        """Start the host process again after it has stopped unexpectedly.
+
+        The song saved in the checkpoint is resumed, or the idle screen is
+        played.
+        """
+        logger.error("Media player host has stopped unexpectedly, restarting it")
+        self.metrics.increment("host_restarts")
+        self.start_host()
+
+        if not self.call("resume_checkpoint"):
+            self.call("play", "idle")
+
+    def receive_messages(self, connection):
+        """Receive and handle messages from the host process until it stops.
+
+        Args:
+            connection (multiprocessing.connection.Connection): End of the
+                pipe to the host process.
+        """
+        try:
+            while True:
+                self.handle_message(connection.recv())
+
+        except (EOFError, OSError):
+            pass
+
+        restart = not self.stopping and self.loaded and connection is self.connection
+
+        # new method calls wait for the host process to be restarted
+        if restart:
+            self.available.clear()
+
+        # the host process has stopped
+        self.fail_pending(HostError("Media player host has stopped"))
+
+        if not self.ready.is_set():
+            self.failure = HostError("Media player host has stopped while loading")
+            self.ready.set()
+
+        if restart:
+            self.dispatch(self.restart_host)
+
+    def handle_message(self, message):
+        """Handle a message from the host process.
+
+        Args:
+            message (tuple): Message sent by the host process.
+        """
+        kind = message[0]
+
+        if kind == "reply":
+            _, request_id, result, error = message
+            future = self.pending.pop(request_id, None)
+            if future is None:
+                return
+
+            if error is not None:
+                future.set_exception(error)
+                return
+
+            future.set_result(result)
+            return
+
+        if kind == "event":
+            _, name, args, sent = message
+            self.metrics.record_duration("host_event", max(time() - sent, 0))
+            self.dispatch(self.callbacks[name], *args)
+            return
+
+        if kind == "log":
+            _, name, level, text = message
+            logging.getLogger(name).log(level, text)
+            return
+
+        if kind == "ready":
+            self.loaded = True
+            self.ready.set()
+            return
+
+        if kind == "failed":
+            _, error = message
+            self.failure = error
+            logger.error("Media player host has failed: %s", error)
+            self.ready.set()
+            return
+
+        raise ValueError("Unexpected message from host: {}".format(kind))
+
+    def fail_pending(self, error):
+        """Make all the pending method calls fail.
+
+        Args:
+            error (Exception): Error raised by the pending method calls.
+        """
+        pending, self.pending = self.pending, {}
+        for future in pending.values():
+            future.set_exception(error)
+
+    def call(self, name, *args, **kwargs):
+        """Call a method of the media player in the host process.
+
+        If the host process is being restarted, the call waits for it to be
+        loaded. The duration between the call and the reception of its result
+        is recorded.
+
+        Args:
+            name (str): Name of the method.
+            args (list): Positional arguments of the method.
+            kwargs (dict): Keyword arguments of the method.
+
+        Returns:
+            any: Result of the method.
+
+        Raises:
+            HostError: If the host process has stopped, if it has not been
+                restarted within `HOST_START_TIMEOUT` seconds, or if the method
+                has not returned within `HOST_CALL_TIMEOUT` seconds.
+        """
+        future = Future()
+        start = monotonic()
+
+        if not self.available.wait(HOST_START_TIMEOUT):
+            raise HostError(
+                "Media player host has not restarted within {} s".format(
+                    HOST_START_TIMEOUT
+                )
+            )
+
+        with self.connection_lock:
+            self.request_id += 1
+            request_id = self.request_id
+            self.pending[request_id] = future
+
+            try:
+                self.connection.send(("call", request_id, name, args, kwargs))
+
+            except (OSError, ValueError) as error:
+                self.pending.pop(request_id, None)
+                raise HostError("Media player host is not reachable") from error
+
+        try:
+            result = future.result(HOST_CALL_TIMEOUT)
+
+        except FutureTimeoutError as error:
+            self.pending.pop(request_id, None)
+            raise HostError(
+                "Media player host has not answered to {} within {} s".format(
+                    name, HOST_CALL_TIMEOUT
+                )
+            ) from error
+
+        self.metrics.record_duration("host_call", monotonic() - start)
+
+        return result
+
+    @property
+    def playlist_entry(self):
+        """Playlist entry currently played by the media player
+        """
+        return self.call("get_playlist_entry")
+
+    def set_callback(self, name, callback):
+        """Assign an arbitrary callback.
+
+        Args:
+            name (str): Name of the callback.
+            callback (function): Function to assign.
+        """
+        self.callbacks[name] = callback
+
+    def resume_checkpoint(self):
+        """Resume the song saved in the checkpoint, if it is recent.
+
+        Returns:
+            bool: True if a song is resumed.
+        """
+        return self.call("resume_checkpoint")
+
+    def set_playlist_entry(self, playlist_entry, autoplay=True):
+        """Prepare playlist entry data to be played.
+
+        Args:
+            playlist_entry (dakara_player.playlist_entry.PlaylistEntry):
+                Playlist entry object.
+            autoplay (bool): If True, start to play transition screen as soon
+                as possible.
+        """
+        self.call("set_playlist_entry", playlist_entry, autoplay=autoplay)
+
+    def is_playing_this(self, what):
+        """Query if the media player is playing the requested media type.
+
+        Args:
+            what (str): What media type to check.
+
+        Returns:
+            bool: True if the media player is playing the requested type.
+        """
+        return self.call("is_playing_this", what)
+
+    def get_timing(self):
+        """Get the media player timing.
+
+        Returns:
+            int: Current song timing in seconds if a song is playing, or 0 when
+            idle or during transition screen.
+        """
+        return self.call("get_timing")
+
+    def play(self, what):
+        """Request the media player to play something.
+
+        Args:
+            what (str): What media to play.
+        """
+        self.call("play", what)
+
+    def pause(self, paused):
+        """Request the media player to pause or unpause.
+
+        Args:
+            paused (bool): If True, pause the media player.
+        """
+        self.call("pause", paused)
+
+    def skip(self):
+        """Request to skip the current media.
+        """
+        self.call("skip")
+
+    def update_idle_screen(self, **info):
+        """Update the information displayed on the idle screen.
+
+        Args:
+            info (dict): Extra information passed to the idle screen template.
+        """
+        self.call("update_idle_screen", **info)
+
+    def exit_worker(self, *args, **kwargs):
+        """Exit the worker.
+
+        The host process is requested to stop, and is terminated if it has not
+        stopped within `HOST_STOP_TIMEOUT` seconds.
+        """
+        self.stopping = True
+
+        if self.process is not None:
+            try:
+                with self.connection_lock:
+                    self.connection.send(("stop",))
+
+            except (OSError, ValueError):
+                pass
+
+            self.process.join(HOST_STOP_TIMEOUT)
+            if self.process.is_alive():
+                logger.warning("Media player host takes too long to stop")
+                self.process.terminate()
+
+            self.connection.close()
+
+        self.metrics.log_summary()
+
+
+class HostLogHandler(logging.Handler):
+    """Log handler forwarding records from the host process
+
+    Args:
+        send (function): Function sending a message to the main process.
+    """
+
+    def __init__(self, send):
+        super().__init__()
+        self.send = send
+
+    def emit(self, record):
+        try:
+            self.send(("log", record.name, record.levelno, self.format(record)))
+
+        except (OSError, ValueError):
+            pass
+
+
+def run_host(connection, player_class, config, tempdir, loglevel):
+    """Run a media player in the host process.
+
+    Messages are received from the main process until it requests to stop,
+    or until the media player stops on an error.
+
+    Args:
+        connection (multiprocessing.connection.Connection): End of the pipe to
+            the main process.
+        player_class (type): Class of the media player.
+        config (dict): Dictionary of configuration.
+        tempdir (path.Path): Path of the temporary directory.
+        loglevel (int): Minimal level of the log records to forward.
+    """
+    lock = Lock()
+
+    def send(message):
+        with lock:
+            connection.send(message)
+
+    forward_logs(send, loglevel)
+
+    stop = Event()
+    errors = Queue()
+
+    try:
+        with player_class(stop, errors, config, tempdir) as media_player:
+            # forward callbacks
+            for name in CALLBACK_NAMES:
+                media_player.set_callback(
+                    name, lambda *args, name=name: send(("event", name, args, time()))
+                )
+
+            media_player.load()
+            send(("ready",))
+
+            while not stop.is_set():
+                if not connection.poll(HOST_POLL_INTERVAL):
+                    continue
+
+                message = connection.recv()
+                if message[0] == "stop":
+                    break
+
+                _, request_id, name, args, kwargs = message
+                send(
+                    ("reply", request_id)
+                    + call_player(media_player, name, args, kwargs)
+                )
+
+    except Exception as error:
+        errors.put_nowait((type(error), error, None))
+
+    # report the error that stopped the media player
+    if not errors.empty():
+        _, error, _ = errors.get()
+        send(("failed", picklable_error(error)))
+
+    connection.close()
+
+
+def forward_logs(send, loglevel):
+    """Forward the log records of the host process to the main process.
+
+    Args:
+        send (function): Function sending a message to the main process.
+        loglevel (int): Minimal level of the log records to forward.
+    """
+    root_logger = logging.getLogger()
+    root_logger.setLevel(loglevel)
+    root_logger.addHandler(HostLogHandler(send))
+
+
+def call_player(media_player, name, args, kwargs):
+    """Call a method of the media player.
+
+    Args:
+        media_player (dakara_player.media_player.base.MediaPlayer): Media
+            player.
+        name (str): Name of the method, or `get_playlist_entry` to get the
+            current playlist entry.
+        args (list): Positional arguments of the method.
+        kwargs (dict): Keyword arguments of the method.
+
+    Returns:
+        tuple: Result of the method and error it raised.
+    """
+    try:
+        if name == "get_playlist_entry":
+            return media_player.playlist_entry, None
+
+        return getattr(media_player, name)(*args, **kwargs), None
+
+    except Exception as error:
+        return None, picklable_error(error)
+
+
+def picklable_error(error):
+    """Make sure an error can be sent to the main process.
+
+    Args:
+        error (Exception): Error to send.
+
+    Returns:
+        Exception: The error, or a `HostError` with the same message if the
+        error cannot be pickled.
+    """
+    try:
+        pickle.loads(pickle.dumps(error))
+        return error
+
+    except Exception:
+        return HostError(str(error))
+
+
+class HostError(DakaraError):
+    """Error raised when the media player host process cannot be used
+    """
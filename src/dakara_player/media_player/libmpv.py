@@ -0,0 +1,190 @@
+import logging
+
+try:
+    import mpv as libmpv
+
+except (ImportError, OSError):
+    libmpv = None
+
+from dakara_player.media_player.mpv import MediaPlayerMpv
+
+
+logger = logging.getLogger(__name__)
+
+
+class MediaPlayerLibmpv(MediaPlayerMpv):
+    """Class to manipulate mpv through libmpv.
+
+    mpv runs in the process of the program, instead of being a separate
+    process reached through a socket. Properties are read directly from
+    libmpv and events are received from its event loop, without any round
+    trip. Apart from this, the class behaves as `MediaPlayerMpv`, except that
+    mpv cannot be kept running when the program stops.
+
+    The class can be used as a context manager that closes mpv
+    automatically on exit.
+
+    Any exception in callbacks make the application to crash.
+
+    Args:
+        stop (threading.Event): Stop event that notify to stop the entire
+            program when set.
+        errors (queue.Queue): Error queue to communicate the exception to the
+            main thread.
+        config (dict): Dictionary of configuration.
+        tempdir (path.Path): Path of the temporary directory.
+
+    Attributes:
+        player (mpv.MPV): Instance of libmpv.
+        paused (bool): Last value of the pause property of mpv, None if it has
+            not been received yet.
+    """
+
+    player_name = "libmpv"
+
+    # errors raised by libmpv when its core has shut down (`ShutdownError` is a
+    # `SystemError`) or when it fails to run a command
+    player_errors = (OSError, SystemError, RuntimeError)
+
+    # errors raised by libmpv when it refuses an option, only expected when
+    # setting options, as they would hide programming errors elsewhere
+    option_errors = (AttributeError, TypeError, ValueError)
+
+    @staticmethod
+    def is_available():
+        """Indicate if libmpv is available.
+
+        Returns:
+            bool: True if libmpv is useable.
+        """
+        if libmpv is None:
+            return False
+
+        try:
+            player = libmpv.MPV()
+            player.terminate()
+            return True
+
+        except (OSError, SystemError):
+            return False
+
+    def init_player(self, config, tempdir):
+        """Initialize the objects of libmpv.
+
+        Actions performed in this method should not have any side effects
+        (query file system, etc.).
+
+        Args:
+            config (dict): Dictionary of configuration.
+            tempdir (path.Path): Path of the temporary directory.
+        """
+        self.paused = None
+
+        super().init_player(config, tempdir)
+
+        if self.persistent:
+            logger.warning("Persistent mpv is not supported with libmpv")
+            self.persistent = False
+
+    def create_player(self):
+        """Create a libmpv instance and set its options.
+
+        Returns:
+            mpv.MPV: Instance of libmpv.
+        """
+        player = libmpv.MPV(log_handler=self.handle_libmpv_log, loglevel=self.loglevel)
+
+        for key, value in self.config_mpv.items():
+            try:
+                self.set_property(player, key, value)
+
+            except self.option_errors + self.player_errors:
+                logger.error(f"Unable to set mpv option '{key}' to value '{value}'")
+
+        return player
+
+    def set_property(self, player, name, value):
+        """Set a property of libmpv.
+
+        The bindings of libmpv forward any attribute to mpv, with hyphens or
+        underscores, and convert the value to the format of the property.
+
+        Args:
+            player (mpv.MPV): Instance of libmpv.
+            name (str): Name of the property, with hyphens or underscores.
+            value (any): Value of the property.
+        """
+        setattr(player, name, value)
+
+    def check_player(self):
+        """Check the core of libmpv is alive, and respawn it otherwise.
+
+        The core is considered dead if it has shut down, for instance if its
+        window has been closed. The position in the current media is read to
+        restore it.
+        """
+        if self.player.core_shutdown:
+            logger.error("mpv core has shut down")
+            self.respawn_player()
+            return
+
+        try:
+            self.heartbeat_position = self.player.time_pos
+
+        except self.player_errors as error:
+            logger.error("mpv core is not reachable: %s", error)
+            self.respawn_player()
+
+    def create_ipc_client(self):
+        """Do not use the pipelined IPC client, as libmpv has no IPC.
+
+        Returns:
+            None: No client.
+        """
+        return None
+
+    def terminate_player(self):
+        """Terminate a dead libmpv instance.
+        """
+        self.player.terminate()
+
+    def set_mpv_default_callbacks(self):
+        """Set libmpv default callbacks.
+
+        As libmpv does not send pause events, the pause property is observed
+        instead.
+        """
+        self.player.event_callback("end-file")(self.handle_end_file)
+        self.player.event_callback("start-file")(self.handle_start_file)
+        self.paused = None
+        self.player.observe_property("pause", self.handle_pause_property)
+
+    def handle_pause_property(self, name, value):
+        """Callback called when the pause property changes.
+
+        The first value received is the initial one, and is not considered as
+        a change.
+
+        Args:
+            name (str): Name of the property.
+            value (bool): New value of the property.
+        """
+        paused, self.paused = self.paused, value
+        if paused is None or value == paused:
+            return
+
+        if value:
+            self.handle_pause(None)
+            return
+
+        self.handle_unpause(None)
+
+    def handle_libmpv_log(self, loglevel, component, message):
+        """Callback called when libmpv emits a log message.
+
+        Args:
+            loglevel (str): Level of the log message.
+            component (str): Component of mpv that generated the message.
+            message (str): Actual log message, ending with a new line.
+        """
+        self.handle_log_messages(loglevel, component, message.rstrip())
@@ -1,8 +1,17 @@
 import logging
+import os
 import re
-
+import socket
+import subprocess
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from tempfile import gettempdir
+from threading import Thread
+from time import monotonic, sleep
+
+from dakara_base.exceptions import DakaraError
 from dakara_base.safe_workers import safe
 from packaging.version import parse
+from path import Path
 
 try:
     import python_mpv_jsonipc as mpv
@@ -10,21 +19,22 @@ try:
 except ImportError:
     mpv = None
 
+from dakara_player.io_executor import IOTimeoutError
+from dakara_player.log_pipeline import LogPipeline
 from dakara_player.media_player.base import (
+    PREPARATION_WAIT_TIMEOUT,
+    STATES_MEDIA,
     InvalidStateError,
     MediaPlayer,
     VersionNotFoundError,
 )
+from dakara_player.media_player.mpv_ipc import MpvIpcClient, MpvIpcError
+from dakara_player.subtitle import SUBTITLE_EXTENSIONS
 
 
 logger = logging.getLogger(__name__)
 mpv_logger = logging.getLogger("mpv")
 
-SUBTITLE_EXTENSIONS = [
-    ".ass",
-    ".ssa",
-]
-
 MPV_ERROR_LEVELS = {
     "fatal": logging.CRITICAL,
     "error": logging.ERROR,
@@ -33,6 +43,13 @@ MPV_ERROR_LEVELS = {
     "debug": logging.DEBUG,
 }
 
+HEARTBEAT_TIMEOUT = 2
+RESPAWN_BUDGET = 10
+
+IPC_SOCKET_NAME = "dakara_player_mpv.sock"
+MPV_START_TIMEOUT = 10
+MPV_IDLE_TIMEOUT = 2
+
 
 class MediaPlayerMpv(MediaPlayer):
     """Class to manipulate mpv.
@@ -58,7 +75,8 @@ class MediaPlayerMpv(MediaPlayer):
         player_name (str): Name of mpv.
         fullscreen (bool): If True, mpv will be fullscreen.
         kara_folder_path (path.Path): Path to the karaoke folder.
-        playlist_entry (dict): Playlist entyr object.
+        playlist_entry (dakara_player.playlist_entry.PlaylistEntry): Playlist
+            entry object.
         callbacks (dict): High level callbacks associated with the media
             player.
         warn_long_exit (bool): If True, display a warning message if the media
@@ -72,11 +90,36 @@ class MediaPlayerMpv(MediaPlayer):
             loader instance.
         player (mpv.MPV): Instance of mpv.
         playlist_entry_data (dict): Extra data of the playlist entry.
-        player_data (dict): Extra data of the player.
+        loglevel (str): Minimal level of the mpv messages to log.
+        config_mpv (dict): Options passed to mpv.
+        respawn_budget (float): Maximal duration to respawn mpv and restore
+            the current screen, in seconds. The supervision of mpv is
+            disabled if 0.
+        heartbeat_position (float): Position in the current media given by
+            the last heartbeat of mpv, in seconds.
+        persistent (bool): If True, mpv is kept running when the player stops
+            and reused when it starts again.
+        ipc_socket (path.Path): Path of the IPC socket of the persistent mpv.
+        process (subprocess.Popen): Process of the persistent mpv, if it has
+            been started by this instance.
+        ipc_client (dakara_player.media_player.mpv_ipc.MpvIpcClient): Client
+            sending pipelined requests to mpv, None if not available.
     """
 
     player_name = "mpv"
 
+    # errors raised by mpv when it cannot be reached or refuses a request
+    player_errors = (
+        (OSError, mpv.MPVError, MpvIpcError) if mpv is not None else (OSError,)
+    )
+
+    # cheaper rendering of bands, then of subtitles, then hardware decoding
+    degradation_steps = [
+        {"deband": False},
+        {"blend-subtitles": "video"},
+        {"hwdec": "auto-safe"},
+    ]
+
     @staticmethod
     def is_available():
         """Indicate if mpv is available.
@@ -105,37 +148,182 @@ class MediaPlayerMpv(MediaPlayer):
             config (dict): Dictionary of configuration.
             tempdir (path.Path): Path of the temporary directory.
         """
-        # set mpv player options and logging
-        loglevel = config.get("loglevel", "info")
-        self.player = mpv.MPV(log_handler=self.handle_log_messages, loglevel=loglevel)
-        config_mpv = config.get("mpv") or {}
+        # set persistent mpv
+        config_persistent = config.get("persistent_mpv") or {}
+        self.persistent = config_persistent.get("enabled", False)
+        self.ipc_socket = Path(
+            config_persistent.get("ipc_socket", Path(gettempdir()) / IPC_SOCKET_NAME)
+        ).expand()
+        self.process = None
+
+        if self.persistent and os.name == "nt":
+            logger.warning("Persistent mpv is not supported on Windows")
+            self.persistent = False
 
-        for key, value in config_mpv.items():
-            try:
-                self.player.__setattr__(key, value)
+        # set mpv player options and logging
+        self.loglevel = config.get("loglevel", "info")
+        self.log_pipeline = LogPipeline.from_config(
+            mpv_logger, config.get("backend_logs") or {}
+        )
+        self.config_mpv = dict(config.get("mpv") or {})
+        self.player = self.create_player()
+        self.ipc_client = None
 
-            except mpv.MPVError:
-                logger.error(f"Unable to set mpv option '{key}' to value '{value}'")
+        # set mpv supervision
+        config_durations = config.get("durations") or {}
+        self.respawn_budget = config_durations.get("respawn_budget", RESPAWN_BUDGET)
+        self.supervise_player = bool(self.respawn_budget)
+        self.heartbeat_position = None
 
         # playlist entry objects
         self.playlist_entry_data = {}
         self.clear_playlist_entry_player()
 
-        # player objects
-        self.player_data = {"skip": False}
+    def create_player(self):
+        """Start a mpv process and set its options.
+
+        In persistent mode, an already running mpv is reused if it answers on
+        the IPC socket, otherwise a new one is started.
+
+        Returns:
+            mpv.MPV: Instance of mpv.
+        """
+        if self.persistent:
+            player = self.attach_player()
+
+        else:
+            player = mpv.MPV(
+                log_handler=self.handle_log_messages, loglevel=self.loglevel
+            )
+
+        for key, value in self.config_mpv.items():
+            try:
+                self.set_property(player, key, value)
+
+            except self.player_errors:
+                logger.error(f"Unable to set mpv option '{key}' to value '{value}'")
+
+        return player
+
+    def set_property(self, player, name, value):
+        """Set a property of mpv.
+
+        The property is set with a command, as the bindings only forward to
+        mpv the attributes named after a known property with underscores, and
+        silently keep any other attribute, like an option name with hyphens.
+
+        Args:
+            player (mpv.MPV): Instance of mpv.
+            name (str): Name of the property, with hyphens or underscores.
+            value (any): Value of the property.
+        """
+        player.command("set_property", name.replace("_", "-"), value)
+
+    def attach_player(self):
+        """Connect to the persistent mpv, starting it if necessary.
+
+        A reused mpv may still play a media from a previous run. It is
+        stopped before any callback is set, so that its events are not
+        received.
+
+        Returns:
+            mpv.MPV: Instance of mpv.
+        """
+        reattached = probe_ipc_socket(self.ipc_socket, HEARTBEAT_TIMEOUT)
+        if not reattached:
+            self.start_process()
+
+        player = mpv.MPV(
+            start_mpv=False,
+            ipc_socket=self.ipc_socket,
+            log_handler=self.handle_log_messages,
+            loglevel=self.loglevel,
+        )
+
+        if reattached:
+            logger.info("Reattached to running mpv on %s", self.ipc_socket)
+            self.reconcile_player(player)
+
+        return player
+
+    def start_process(self):
+        """Start a persistent mpv process.
+
+        The process is started in its own session, so that it is not stopped
+        when the player is interrupted.
+
+        Raises:
+            MpvStartError: If mpv has not created its IPC socket within
+                `MPV_START_TIMEOUT` seconds.
+        """
+        self.ipc_socket.remove_p()
+
+        logger.debug("Starting persistent mpv on %s", self.ipc_socket)
+        self.process = subprocess.Popen(
+            [
+                "mpv",
+                "--idle=yes",
+                "--input-ipc-server={}".format(self.ipc_socket),
+                "--input-terminal=no",
+                "--terminal=no",
+            ],
+            start_new_session=True,
+        )
+
+        deadline = monotonic() + MPV_START_TIMEOUT
+        while monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise MpvStartError(
+                    "mpv has exited with code {}".format(self.process.returncode)
+                )
+
+            if probe_ipc_socket(self.ipc_socket, HEARTBEAT_TIMEOUT):
+                return
+
+            sleep(0.1)
+
+        self.process.terminate()
+        raise MpvStartError("mpv has not started within {} s".format(MPV_START_TIMEOUT))
+
+    def reconcile_player(self, player):
+        """Bring a reused mpv back to an empty state.
+
+        The media played by the previous run is stopped, and the end of its
+        playback is waited for at most `MPV_IDLE_TIMEOUT` seconds. The window
+        is kept open.
+
+        Args:
+            player (mpv.MPV): Instance of the reused mpv.
+        """
+        logger.debug("Stopping media left by previous run: %s", player.path)
+        player.pause = False
+        player.command("stop")
+
+        deadline = monotonic() + MPV_IDLE_TIMEOUT
+        while not player.idle_active:
+            if monotonic() >= deadline:
+                logger.warning("Reused mpv has not stopped its media")
+                return
+
+            sleep(0.05)
 
     def load_player(self):
         """Perform actions with side effects for mpv initialization.
         """
+        self.setup_player()
+
+        # log mpv version
+        logger.info("mpv %s", self.get_version())
+
+    def setup_player(self):
+        """Set the callbacks and the window of mpv.
+        """
         # set mpv callbacks
         self.set_mpv_default_callbacks()
 
         # set mpv fullscreen
         self.player.fullscreen = self.fullscreen
 
-        # log mpv version
-        logger.info("mpv %s", self.get_version())
-
         # set mpv as a single non-interactive window
         self.player.force_window = "immediate"
         self.player.input_default_bindings = False
@@ -145,6 +333,203 @@ class MediaPlayerMpv(MediaPlayer):
         # set window title
         self.player.title = "Dakara player mpv"
 
+        # set pipelined requests
+        self.ipc_client = self.create_ipc_client()
+
+    def create_ipc_client(self):
+        """Connect a pipelined IPC client to mpv.
+
+        The client uses its own connection to the IPC socket of mpv. It is
+        not available on Windows.
+
+        Returns:
+            dakara_player.media_player.mpv_ipc.MpvIpcClient: Connected
+            client, or None if it cannot be used.
+        """
+        if os.name == "nt":
+            return None
+
+        ipc_socket = (
+            self.ipc_socket if self.persistent else self.player.mpv_process.ipc_socket
+        )
+        client = MpvIpcClient(ipc_socket)
+        try:
+            client.connect()
+
+        except OSError as error:
+            logger.warning("Unable to pipeline requests to mpv: %s", error)
+            return None
+
+        return client
+
+    def close_ipc_client(self):
+        """Close the pipelined IPC client, if any.
+        """
+        if self.ipc_client is None:
+            return
+
+        self.ipc_client.close()
+        self.ipc_client = None
+
+    def check_player(self):
+        """Check mpv is alive, and respawn it otherwise.
+
+        mpv is considered dead if its process has exited, or if it does not
+        answer to a heartbeat request within `HEARTBEAT_TIMEOUT` seconds. The
+        heartbeat requests the position in the current media, which is used
+        to restore it.
+        """
+        process = (
+            self.process
+            if self.persistent
+            else getattr(self.player.mpv_process, "process", None)
+        )
+        if process is not None and process.poll() is not None:
+            logger.error("mpv has exited with code %s", process.returncode)
+            self.respawn_player()
+            return
+
+        try:
+            self.heartbeat_position = call_within(
+                lambda: self.player.time_pos, HEARTBEAT_TIMEOUT
+            )
+
+        except TimeoutError:
+            logger.error("mpv has not answered within %i s", HEARTBEAT_TIMEOUT)
+            self.respawn_player()
+
+        except self.player_errors as error:
+            logger.error("mpv connection is lost: %s", error)
+            self.respawn_player()
+
+    def respawn_player(self):
+        """Replace a dead mpv by a new one and restore the current screen.
+
+        The new mpv receives the same options and callbacks as the dead one.
+        The current media is reloaded at the position given by the last
+        heartbeat, without notifying its start again, and paused again if it
+        was paused. The whole operation must be done within `respawn_budget`
+        seconds. In persistent mode, the new mpv is persistent as well.
+
+        Raises:
+            MpvRespawnError: If mpv cannot be respawned within the time
+                budget.
+        """
+        start = monotonic()
+        self.metrics.increment("respawns")
+
+        with self.state_lock:
+            paused = self.state == "paused"
+            what = STATES_MEDIA.get(self.state_paused if paused else self.state)
+
+        position = self.heartbeat_position
+
+        def respawn():
+            try:
+                self.terminate_player()
+
+            except self.player_errors as error:
+                logger.debug("Unable to terminate dead mpv: %s", error)
+
+            self.player = self.create_player()
+            self.setup_player()
+
+            if what is None:
+                return
+
+            self.play(what, position or 0)
+
+            if paused:
+                self.player.pause = True
+                with self.state_lock:
+                    self.state_paused = what
+                    self.set_state("paused")
+
+        try:
+            call_within(respawn, self.respawn_budget)
+
+        except TimeoutError as error:
+            raise MpvRespawnError(
+                "Unable to respawn mpv within {} s".format(self.respawn_budget)
+            ) from error
+
+        except self.player_errors as error:
+            raise MpvRespawnError("Unable to respawn mpv: {}".format(error)) from error
+
+        duration = monotonic() - start
+        self.metrics.record_duration("respawn", duration)
+        logger.info("Respawned mpv in %.2f s", duration)
+
+    def terminate_player(self):
+        """Terminate a dead mpv without waiting for it.
+        """
+        self.close_ipc_client()
+        self.player.terminate(join=False)
+
+        if self.process is not None:
+            self.process.terminate()
+            self.process = None
+
+    def get_frame_stats(self):
+        """Get the frame counters of mpv.
+
+        Frames dropped by the video output and by the decoder are counted
+        together. The number of the current frame, estimated from the
+        position, already counts the dropped frames, so they are subtracted
+        from it to get the number of displayed frames. With the pipelined IPC
+        client, all the counters are requested in one round trip.
+
+        Returns:
+            tuple: Contains the cumulative number of dropped frames, the
+            cumulative number of displayed frames and the frame rate of the
+            video filters output. None if the counters cannot be obtained.
+        """
+        names = [
+            "frame-drop-count",
+            "decoder-frame-drop-count",
+            "estimated-frame-number",
+            "estimated-vf-fps",
+        ]
+
+        try:
+            if self.ipc_client is not None:
+                values = self.ipc_client.batch(
+                    [["get_property", name] for name in names]
+                )
+
+            else:
+                values = [
+                    getattr(self.player, name.replace("-", "_")) for name in names
+                ]
+
+        except self.player_errors as error:
+            logger.debug("Unable to get frame counters: %s", error)
+            return None
+
+        dropped_output, dropped_decoder, frame_number, fps = values
+        if frame_number is None:
+            return None
+
+        dropped = (dropped_output or 0) + (dropped_decoder or 0)
+        return dropped, max(frame_number - dropped, 0), fps
+
+    def apply_degradation(self, settings):
+        """Set degraded options of mpv.
+
+        The options are kept if mpv is respawned.
+
+        Args:
+            settings (dict): Options to set.
+        """
+        for key, value in settings.items():
+            self.config_mpv[key] = value
+
+            try:
+                self.set_property(self.player, key, value)
+
+            except self.player_errors:
+                logger.error(f"Unable to set mpv option '{key}' to value '{value}'")
+
     def get_timing(self):
         """Get mpv timing.
 
@@ -159,6 +544,14 @@ class MediaPlayerMpv(MediaPlayer):
 
         return int(timing)
 
+    def get_position(self):
+        """Get the precise position in the current media.
+
+        Returns:
+            float: Position in seconds, None if mpv has not started to play.
+        """
+        return self.player.time_pos
+
     def get_version(self):
         """Get media player version.
 
@@ -220,39 +613,7 @@ class MediaPlayerMpv(MediaPlayer):
         """
         return self.player.pause
 
-    def is_playing_this(self, what):
-        """Query if mpv is playing the requested media type.
-
-        It is pretty difficult to get what mpv is/was playing, as it does not
-        have a media object, but only a path to the current media file (that
-        disappears when the said file ends), and a playlist that contains the
-        path of the latest media file (that disappears when another file is set
-        to play). We can only rely on the playlist path, and this is pretty
-        weak. I don't have any better solution for now.
-
-        Args:
-            what (str): Tell if mpv current track is of the requested type, but
-                not if it is actually playing it (it can be in pause).
-
-        Returns:
-            bool: True if mpv is playing the requested type.
-        """
-        playlist = self.player.playlist
-
-        if len(playlist) == 0:
-            return False
-
-        assert len(playlist) == 1, "Too many entries in mpv internal playlist"
-
-        media = playlist[0]
-        path = media.get("filename")
-
-        if what == "idle":
-            return path == self.background_loader.backgrounds["idle"]
-
-        return path == self.playlist_entry_data[what].path
-
-    def play(self, what):
+    def play(self, what, position=None):
         """Request mpv to play something.
 
         No preparation should be done by this function, i.e. the media track
@@ -260,57 +621,102 @@ class MediaPlayerMpv(MediaPlayer):
 
         Args:
             what (str): What media to play.
+            position (float): Position to start from, in seconds. If given,
+                the media is reloaded after a stall, even if it is already
+                played, and its start is not notified.
         """
+        # if already idle, do nothing
+        if what == "idle" and position is None and self.is_playing_this("idle"):
+            return
+
+        # the song must be prepared, otherwise it is given up
+        if what == "song" and not self.wait_song_ready(
+            timeout=PREPARATION_WAIT_TIMEOUT
+        ):
+            return
+
         # reset player
-        self.player.image_display_duration = 0
-        self.player.sub_files = []
-        self.player.audio_files = []
-        self.player.audio = "auto"
-        self.player.pause = False
+        properties = {
+            "image_display_duration": 0,
+            "sub_files": [],
+            "audio_files": [],
+            "audio": "auto",
+            "pause": False,
+            "start": "none" if position is None else "{:.3f}".format(position),
+        }
+        reloaded = position is not None
 
         if what == "idle":
-            # if already idle, do nothing
-            if self.is_playing_this("idle"):
-                return
-
-            self.player.image_display_duration = "inf"
-            self.player.sub_files = [self.text_paths["idle"]]
+            self.cancel_preparation()
+            self.load_state("idle", reloaded=reloaded)
+            properties["image_display_duration"] = "inf"
+            properties["sub_files"] = [self.text_paths["idle"]]
             self.generate_text("idle")
-            self.player.play(self.background_loader.backgrounds["idle"])
+            self.load_media(properties, self.background_loader.backgrounds["idle"])
 
             return
 
         if what == "transition":
-            self.player.image_display_duration = int(self.durations["transition"])
-            self.player.sub_files = [self.text_paths["transition"]]
-            self.player.play(self.playlist_entry_data["transition"].path)
+            self.load_state("transition", reloaded=reloaded)
+            properties["image_display_duration"] = int(self.durations["transition"])
+            properties["sub_files"] = [self.text_paths["transition"]]
+            self.load_media(properties, self.playlist_entry_data["transition"].path)
 
             return
 
         if what == "song":
+            self.load_state("song", reloaded=reloaded)
+
             # manage instrumental track/file
             path_audio = self.playlist_entry_data["song"].path_audio
             if path_audio:
                 if path_audio == "self":
-                    # mpv use different index for each track, so we can safely request
-                    # the second audio track
-                    self.player.audio = 2
-                    logger.debug("Requesting to play audio track 2")
+                    audio_track_id = self.playlist_entry_data["song"].audio_track_id
+                    properties["audio"] = audio_track_id
+                    logger.debug("Requesting to play audio track %i", audio_track_id)
 
                 else:
-                    self.player.audio_files = [path_audio]
+                    properties["audio_files"] = [path_audio]
                     logger.debug("Requesting to play audio file %s", path_audio)
 
             # if the subtitle file cannot be discovered, do not request it
             if self.playlist_entry_data["song"].path_subtitle:
-                self.player.sub_files = [self.playlist_entry_data["song"].path_subtitle]
+                properties["sub_files"] = [
+                    self.playlist_entry_data["song"].path_subtitle
+                ]
 
-            self.player.play(self.playlist_entry_data["song"].path)
+            self.load_media(properties, self.playlist_entry_data["song"].path)
 
             return
 
         raise ValueError("Unexpected action to play: {}".format(what))
 
+    def load_media(self, properties, path):
+        """Set properties of mpv and load a media.
+
+        With the pipelined IPC client, the whole screen change is sent as one
+        batch of requests, so that it costs one round trip. Otherwise,
+        requests are sent one by one.
+
+        Args:
+            properties (dict): Values of the properties to set, by attribute
+                name.
+            path (path.Path): Path of the media to load.
+        """
+        if self.ipc_client is None:
+            for name, value in properties.items():
+                self.set_property(self.player, name, value)
+
+            self.player.play(path)
+            return
+
+        commands = [
+            ["set_property", name.replace("_", "-"), value]
+            for name, value in properties.items()
+        ]
+        commands.append(["loadfile", path])
+        self.ipc_client.batch(commands)
+
     def pause(self, pause):
         """Request mpv to pause or unpause.
 
@@ -340,92 +746,164 @@ class MediaPlayerMpv(MediaPlayer):
         logger.info("Resuming play")
         self.player.pause = False
 
+    def pause_player(self, paused):
+        """Request mpv to pause or unpause, unconditionally.
+
+        Args:
+            paused (bool): If True, pause mpv.
+        """
+        self.player.pause = paused
+
     def skip(self):
         """Request to skip the current media.
 
-        Can only work on transition screens or songs. mpv should
-        continue playing, but media has to be considered already finished.
+        Can only work on transition screens or songs. mpv switches to the idle
+        screen right away, and media has to be considered already finished.
         """
         if self.is_playing_this("transition") or self.is_playing_this("song"):
-            logger.info("Skipping '%s'", self.playlist_entry["song"]["title"])
-            self.player_data["skip"] = True
-            self.callbacks["finished"](self.playlist_entry["id"])
+            logger.info("Skipping '%s'", self.playlist_entry.title)
+            self.start_skip()
+            self.play("idle")
+            self.callbacks["finished"](self.playlist_entry.id)
             self.clear_playlist_entry()
 
+    def reload_idle_text(self):
+        """Request mpv to reload the idle screen text.
+
+        The current subtitle file is read again, without restarting the idle
+        screen background.
+        """
+        self.player.command("sub-reload")
+
     def stop_player(self):
         """Request to stop mpv.
+
+        In persistent mode, mpv is left running if the program stops without
+        error, and only the connection to it is closed.
         """
+        self.close_ipc_client()
+
+        if self.persistent and self.errors.empty():
+            logger.info("Detaching from player")
+            self.player.terminate()
+            logger.debug("Detached from player")
+            return
+
+        if self.process is not None:
+            self.process.terminate()
+
         logger.info("Stopping player")
         self.player.terminate()
         logger.debug("Stopped player")
 
-    def set_playlist_entry_player(self, playlist_entry, file_path, autoplay):
-        """Prepare playlist entry data to be played.
+    def prepare_playlist_entry_player(self, preparation, playlist_entry, file_path):
+        """Add the stages preparing playlist entry data to be played.
 
-        Prepare all media objects, subtitles, etc. for being played, for the
-        transition screen and the song. Such data are stored on the dedicated
-        object `playlist_entry_data`.
+        Stages prepare all media objects, subtitles, etc. for being played,
+        for the transition screen and the song. Such data are stored on the
+        dedicated object `playlist_entry_data`.
 
         Args:
-            playlist_entry (dict): Playlist entry object.
+            preparation (dakara_player.preparation.Preparation): Preparation of
+                the playlist entry.
+            playlist_entry (dakara_player.playlist_entry.PlaylistEntry): Playlist
+                entry object.
             file_path (path.Path): Absolute path to the song file.
-            autoplay (bool): If True, start to play transition screen as soon
-                as possible (i.e. as soon as the transition screen media is
-                ready). The song media is prepared when the transition screen
-                is playing.
         """
-        # if the player is playing the idle screen, mark to skip it
-        if self.is_playing_this("idle"):
-            self.player_data["skip"] = True
+        playlist_entry_data = self.playlist_entry_data
+
+        preparation.add_stage(
+            "transition",
+            lambda: self.prepare_transition(
+                preparation, playlist_entry, playlist_entry_data
+            ),
+            critical=True,
+        )
+
+        # set song
+        playlist_entry_data["song"].path = file_path
+
+        preparation.add_stage(
+            "subtitle", lambda: self.manage_subtitle(file_path, playlist_entry_data)
+        )
 
-        # set transition
-        self.playlist_entry_data[
+        # manage instrumental
+        if playlist_entry.use_instrumental:
+            preparation.add_stage(
+                "instrumental",
+                lambda: self.manage_instrumental(
+                    playlist_entry, file_path, playlist_entry_data
+                ),
+            )
+
+    def prepare_transition(self, preparation, playlist_entry, playlist_entry_data):
+        """Prepare the transition screen.
+
+        Args:
+            preparation (dakara_player.preparation.Preparation): Preparation of
+                the playlist entry.
+            playlist_entry (dakara_player.playlist_entry.PlaylistEntry): Playlist
+                entry object.
+            playlist_entry_data (dict): Extra data of the playlist entry.
+        """
+        playlist_entry_data["transition"].path = self.background_loader.backgrounds[
             "transition"
-        ].path = self.background_loader.backgrounds["transition"]
-        self.generate_text("transition", fade_in=False)
+        ]
+        self.generate_text(
+            "transition",
+            fade_in=False,
+            playlist_entry=playlist_entry,
+            preparation=preparation,
+        )
 
-        if autoplay:
-            self.play("transition")
+    def manage_subtitle(self, file_path, playlist_entry_data):
+        """Find the subtitle file of the song.
 
-        # set song
-        self.playlist_entry_data["song"].path = file_path
+        The subtitles are manually set as a workaround for the matching of mpv
+        being too permissive.
 
-        # manually set the subtitles as a workaround for the matching of
-        # mpv being too permissive
+        Args:
+            file_path (path.Path): Path of the song file.
+            playlist_entry_data (dict): Extra data of the playlist entry.
+        """
         path_without_ext = file_path.dirname() / file_path.stem
-        for subtitle_extension in SUBTITLE_EXTENSIONS:
-            path_subtitle = path_without_ext + subtitle_extension
-            if path_subtitle.exists():
-                break
+        try:
+            for subtitle_extension in SUBTITLE_EXTENSIONS:
+                path_subtitle = path_without_ext + subtitle_extension
+                if self.io_executor.exists(path_subtitle):
+                    break
 
-        else:
-            path_subtitle = None
+            else:
+                path_subtitle = None
 
-        self.playlist_entry_data["song"].path_subtitle = path_subtitle
+        except IOTimeoutError as error:
+            self.metrics.increment("filesystem_timeouts")
+            logger.warning("Unable to look for subtitle file: %s", error)
+            path_subtitle = None
 
-        # manage instrumental
-        if playlist_entry["use_instrumental"]:
-            self.manage_instrumental(playlist_entry, file_path)
+        playlist_entry_data["song"].path_subtitle = path_subtitle
 
-    def manage_instrumental(self, playlist_entry, file_path):
+    def manage_instrumental(self, playlist_entry, file_path, playlist_entry_data):
         """Manage the requested instrumental track.
 
         Instrumental track is searched first in audio files having the same
         name as the video file, then in extra audio tracks of the video file.
 
-        As mpv cannot fetch information of a media in advance, we have to
-        discover and set the instrumental track when the media starts.
+        As mpv cannot fetch information of a media in advance, tracks of the
+        video file are read from the headers of its container. If they cannot
+        be read, the second audio track is requested.
 
         Args:
-            playlist_entry (dict): Playlist entry data. Must contain the key
-                `use_instrumental`.
+            playlist_entry (dakara_player.playlist_entry.PlaylistEntry):
+                Playlist entry object.
             file_path (path.Path): Path of the song file.
+            playlist_entry_data (dict): Extra data of the playlist entry.
         """
         # get instrumental file if possible
         audio_path = self.get_instrumental_file(file_path)
 
         if audio_path:
-            self.playlist_entry_data["song"].path_audio = audio_path
+            playlist_entry_data["song"].path_audio = audio_path
             logger.info(
                 "Requesting to play instrumental file '%s' for '%s'",
                 audio_path,
@@ -434,9 +912,18 @@ class MediaPlayerMpv(MediaPlayer):
 
             return
 
-        # otherwise mark to look for instrumental track in internal tracks when
-        # starting to read the media
-        self.playlist_entry_data["song"].path_audio = "self"
+        # otherwise mark to play the instrumental track in internal tracks
+        media_info = self.get_media_info(file_path)
+        audio_index = 1 if media_info is None else media_info.get_instrumental_index()
+        if audio_index is None:
+            logger.warning(
+                "Cannot find instrumental file or track for file '%s'", file_path
+            )
+            return
+
+        # mpv numbers audio tracks from 1
+        playlist_entry_data["song"].path_audio = "self"
+        playlist_entry_data["song"].audio_track_id = audio_index + 1
         logger.info("Requesting to play instrumental track of '%s'", file_path)
 
     def clear_playlist_entry_player(self):
@@ -455,63 +942,70 @@ class MediaPlayerMpv(MediaPlayer):
             - A transition screen ends, leading to playing the actual song;
             - A song ends normally, leading to calling the callback
                 `callbacks["finished"]`;
-            - A song ends because it has been skipped, this case is ignored.
+            - A song ends because it has been skipped or replaced, this case
+                is ignored.
+
+        The song is played from another thread, as waiting for it to be ready
+        must not block the event thread of mpv.
 
         Args:
             event (dict): mpv event.
         """
         logger.debug("File end callback called")
 
-        # only handle when a file naturally ends (i.e. is not skipped)
-        # i know this strategy is risky, but it is not possible to not capture
-        # end-file for EOF only with the stable version of mpv (0.32.0)
-        if self.player_data["skip"]:
-            self.player_data["skip"] = False
-            logger.debug("File has been skipped")
-            return
+        with self.state_lock:
+            state = self.state
+            generation = self.generation
 
         # the transition screen has finished, request to play the song itself
-        if self.is_playing_this("transition"):
-            logger.debug("Will play '{}'".format(self.playlist_entry_data["song"].path))
-            self.play("song")
+        if state == "transition":
+            logger.debug("Will play '{}'".format(self.playlist_entry.file_path))
+            thread = self.create_thread(
+                target=self.play_if_current, args=("song", generation)
+            )
+            thread.start()
 
             return
 
         # the media has finished, so call the according callback and clean memory
-        if self.is_playing_this("song"):
-            self.callbacks["finished"](self.playlist_entry["id"])
+        if state == "song":
+            self.callbacks["finished"](self.playlist_entry.id)
             self.clear_playlist_entry()
 
             return
 
         # if no state can be determined, raise an error
-        raise InvalidStateError("End file on an undeterminated state")
+        if state is None:
+            raise InvalidStateError("End file on an undeterminated state")
+
+        # the previous media has been replaced by a new one, or the idle
+        # screen has been replaced
+        logger.debug("Discarding stale end file event in state %s", state)
 
     @safe
     def handle_log_messages(self, loglevel, component, message):
         """Callback called when a log message occurs.
 
-        Direct the message to the logger for Dakara Player. If the level is
-        "fatal" or higher, call the callback `callbacks["error"]` and skip the
-        media.
+        Submit the message to the log pipeline, that directs it to the mpv
+        logger without blocking. If the level is "fatal" or higher, call the
+        callback `callbacks["error"]` and skip the media.
 
         Args:
             loglevel (str): Level of the log message.
             component (str): Component of mpv that generated the message.
             message (str): Actual log message.
         """
-        logger.debug("Log message callback called")
         intlevel = MPV_ERROR_LEVELS.get(loglevel, logging.NOTSET)
 
         # use a proper logger for mpv logs
-        mpv_logger.log(intlevel, "%s: %s", component, message)
+        self.log_pipeline.submit(intlevel, component, message)
 
         # handle all errors here
         if intlevel == logging.CRITICAL:
             if self.is_playing_this("song"):
                 logger.error("Unable to play '%s'", self.player.path)
                 self.callbacks["error"](
-                    self.playlist_entry["id"],
+                    self.playlist_entry.id,
                     "Unable to play current song: {}".format(message),
                 )
                 self.skip()
@@ -531,32 +1025,38 @@ class MediaPlayerMpv(MediaPlayer):
         logger.debug("Start file callback called")
 
         # the transition screen starts to play
-        if self.is_playing_this("transition"):
-            self.callbacks["started_transition"](self.playlist_entry["id"])
-            logger.info(
-                "Playing transition for '%s'", self.playlist_entry["song"]["title"]
-            )
+        if self.advance_state("transition_loading", "transition"):
+            self.end_skip()
+            self.start_transition_gate()
+
+            if not self.state_reloaded:
+                self.callbacks["started_transition"](self.playlist_entry.id)
+
+            logger.info("Playing transition for '%s'", self.playlist_entry.title)
 
             return
 
         # the song starts to play
-        if self.is_playing_this("song"):
-            self.callbacks["started_song"](self.playlist_entry["id"])
+        if self.advance_state("song_loading", "song"):
+            if not self.state_reloaded:
+                self.callbacks["started_song"](self.playlist_entry.id)
             logger.info(
-                "Now playing '%s' ('%s')",
-                self.playlist_entry["song"]["title"],
-                self.player.path,
+                "Now playing '%s' ('%s')", self.playlist_entry.title, self.player.path,
             )
 
             return
 
         # the idle screen starts to play
-        if self.is_playing_this("idle"):
+        if self.state == "idle":
+            self.end_skip()
             logger.debug("Playing idle screen")
 
             return
 
-        raise InvalidStateError("Start file on an undeterminated state")
+        if self.state is None:
+            raise InvalidStateError("Start file on an undeterminated state")
+
+        logger.debug("Discarding stale start file event in state %s", self.state)
 
     def get_audio_tracks_id(self):
         """Get ID of audio tracks for the current media.
@@ -579,8 +1079,16 @@ class MediaPlayerMpv(MediaPlayer):
         """
         logger.debug("Pause callback called")
 
+        if self.is_transition_hold_event():
+            logger.debug("Transition screen held")
+            return
+
+        if not self.enter_pause():
+            logger.debug("Discarding stale pause event in state %s", self.state)
+            return
+
         # call paused callback
-        self.callbacks["paused"](self.playlist_entry["id"], self.get_timing())
+        self.callbacks["paused"](self.playlist_entry.id, self.get_timing())
 
         logger.debug("Paused")
 
@@ -593,11 +1101,80 @@ class MediaPlayerMpv(MediaPlayer):
         """
         logger.debug("Unpause callback called")
 
-        self.callbacks["resumed"](self.playlist_entry["id"], self.get_timing())
+        if not self.leave_pause():
+            logger.debug("Discarding stale unpause event in state %s", self.state)
+            return
+
+        self.callbacks["resumed"](self.playlist_entry.id, self.get_timing())
 
         logger.debug("Resumed play")
 
 
+def call_within(function, timeout):
+    """Call a function in a separate thread and wait for its result.
+
+    The thread cannot be interrupted if the function does not return, but it
+    does not prevent the program to exit.
+
+    Args:
+        function (function): Function to call without arguments.
+        timeout (float): Maximal duration to wait for the result, in seconds.
+
+    Returns:
+        any: Result of the function.
+
+    Raises:
+        TimeoutError: If the function has not returned within the timeout.
+    """
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(function())
+
+        except BaseException as error:
+            future.set_exception(error)
+
+    Thread(target=run, daemon=True).start()
+
+    try:
+        return future.result(timeout)
+
+    except FutureTimeoutError as error:
+        raise TimeoutError("No result within {} s".format(timeout)) from error
+
+
+def probe_ipc_socket(ipc_socket, timeout):
+    """Check if a mpv answers on an IPC socket.
+
+    Args:
+        ipc_socket (path.Path): Path of the IPC socket.
+        timeout (float): Maximal duration to wait for an answer, in seconds.
+
+    Returns:
+        bool: True if mpv has answered.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX) as client:
+            client.settimeout(timeout)
+            client.connect(str(ipc_socket))
+            client.sendall(b'{"command": ["get_property", "pid"]}\n')
+            return bool(client.recv(1024))
+
+    except OSError:
+        return False
+
+
+class MpvStartError(DakaraError):
+    """Error raised when a persistent mpv cannot be started
+    """
+
+
+class MpvRespawnError(DakaraError):
+    """Error raised when mpv cannot be respawned
+    """
+
+
 class Media:
     """Media class.
     """
@@ -610,7 +1187,10 @@ class MediaSong(Media):
     """Song class.
     """
 
-    def __init__(self, *args, path_subtitle=None, path_audio=None, **kwargs):
+    def __init__(
+        self, *args, path_subtitle=None, path_audio=None, audio_track_id=None, **kwargs
+    ):
         super().__init__(*args, **kwargs)
         self.path_subtitle = path_subtitle
         self.path_audio = path_audio
+        self.audio_track_id = audio_track_id
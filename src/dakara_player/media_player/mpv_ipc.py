@@ -0,0 +1,399 @@
+import json
+import logging
+import socket
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from itertools import count
+from queue import Empty, Queue
+from threading import Lock, Thread
+from time import monotonic
+
+from dakara_base.exceptions import DakaraError
+
+COMMAND_TIMEOUT = 10
+RECEIVE_SIZE = 65536
+
+
+logger = logging.getLogger(__name__)
+
+
+class MpvIpcClient:
+    """Lean client for the JSON IPC of mpv, with pipelined requests
+
+    Each request is tagged with a `request_id` and is answered through a
+    future. Requests are not serialized: several of them can be written on
+    the socket at once, and their replies are matched as they arrive. Events
+    are ignored, except the changes of observed properties, which are passed
+    to property streams.
+
+    Only Unix sockets are supported.
+
+    >>> with MpvIpcClient("/tmp/mpv.sock") as client:
+    ...     client.connect()
+    ...     client.batch([["set_property", "pause", True], ["get_property", "path"]])
+    [None, '/path/to/file.mkv']
+
+    Args:
+        ipc_socket (path.Path): Path of the IPC socket of mpv.
+        timeout (float): Maximal duration to wait for a reply, in seconds.
+
+    Attributes:
+        ipc_socket (path.Path): Path of the IPC socket of mpv.
+        timeout (float): Maximal duration to wait for a reply, in seconds.
+        socket (socket.socket): Connection to mpv, None if not connected.
+        thread (threading.Thread): Thread receiving the messages of mpv.
+        pending (dict of concurrent.futures.Future): Futures of the requests
+            waiting for a reply, by request ID.
+        streams (dict of PropertyStream): Property streams by observer ID.
+        ids (itertools.count): Generator of request and observer IDs.
+        lock (threading.Lock): Lock for sending requests.
+        closed (bool): True once the connection has been closed or lost.
+    """
+
+    def __init__(self, ipc_socket, timeout=COMMAND_TIMEOUT):
+        self.ipc_socket = ipc_socket
+        self.timeout = timeout
+        self.socket = None
+        self.thread = None
+        self.pending = {}
+        self.streams = {}
+        self.ids = count(1)
+        self.lock = Lock()
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def connect(self):
+        """Connect to mpv and start to receive its messages
+
+        Raises:
+            OSError: If mpv cannot be reached.
+        """
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(str(self.ipc_socket))
+        self.thread = Thread(target=self.receive, name="mpv-ipc", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        """Close the connection
+
+        Requests still waiting for a reply fail.
+        """
+        with self.lock:
+            if self.socket is not None:
+                try:
+                    self.socket.shutdown(socket.SHUT_RDWR)
+
+                except OSError:
+                    pass
+
+                self.socket.close()
+
+        if self.thread is not None:
+            self.thread.join()
+
+        self.fail_all("connection closed")
+
+    def send(self, commands):
+        """Send several requests at once, without waiting for their replies
+
+        Args:
+            commands (list of list): Commands to send, each as a list of the
+                name of the command and its arguments.
+
+        Returns:
+            list of concurrent.futures.Future: Future of the reply of each
+            request, in the same order.
+
+        Raises:
+            MpvIpcError: If the connection is closed or cannot be written.
+        """
+        futures = []
+        data = b""
+        with self.lock:
+            if self.closed or self.socket is None:
+                raise MpvIpcError("Connection to mpv is closed")
+
+            for command in commands:
+                request_id = next(self.ids)
+                future = Future()
+                self.pending[request_id] = future
+                futures.append(future)
+                data += (
+                    json.dumps({"command": command, "request_id": request_id}).encode()
+                    + b"\n"
+                )
+
+            try:
+                self.socket.sendall(data)
+
+            except OSError as error:
+                raise MpvIpcError(
+                    "Unable to send requests to mpv: {}".format(error)
+                ) from error
+
+        return futures
+
+    def wait(self, futures):
+        """Wait for the replies of requests
+
+        All the replies are waited for, even if one of them is an error.
+
+        Args:
+            futures (list of concurrent.futures.Future): Futures of the
+                requests.
+
+        Returns:
+            list: Data of each reply, None if the property requested is
+            unavailable.
+
+        Raises:
+            MpvIpcError: If a request has failed or has not been answered in
+                time. The first error is raised.
+        """
+        deadline = monotonic() + self.timeout
+        results = []
+        error = None
+        for future in futures:
+            try:
+                results.append(future.result(max(deadline - monotonic(), 0)))
+
+            except FutureTimeoutError:
+                error = error or MpvIpcError(
+                    "mpv has not answered within {} s".format(self.timeout)
+                )
+                results.append(None)
+
+            except MpvIpcError as request_error:
+                error = error or request_error
+                results.append(None)
+
+        if error is not None:
+            raise error
+
+        return results
+
+    def batch(self, commands):
+        """Send several requests at once and wait for their replies
+
+        mpv processes the requests in order.
+
+        Args:
+            commands (list of list): Commands to send, each as a list of the
+                name of the command and its arguments.
+
+        Returns:
+            list: Data of each reply.
+
+        Raises:
+            MpvIpcError: If a request has failed or has not been answered in
+                time.
+        """
+        return self.wait(self.send(commands))
+
+    def command(self, *command):
+        """Send a request and wait for its reply
+
+        Args:
+            command (list): Name of the command and its arguments.
+
+        Returns:
+            any: Data of the reply.
+
+        Raises:
+            MpvIpcError: If the request has failed or has not been answered in
+                time.
+        """
+        return self.batch([list(command)])[0]
+
+    def observe(self, name):
+        """Observe the changes of a property
+
+        Args:
+            name (str): Name of the property.
+
+        Returns:
+            PropertyStream: Stream of the values of the property. Its first
+            value is the current one.
+        """
+        observer_id = next(self.ids)
+        stream = PropertyStream(self, observer_id, name)
+        self.streams[observer_id] = stream
+        self.command("observe_property", observer_id, name)
+
+        return stream
+
+    def unobserve(self, stream):
+        """Stop to observe the changes of a property
+
+        Args:
+            stream (PropertyStream): Stream of the property.
+        """
+        if self.streams.pop(stream.observer_id, None) is None:
+            return
+
+        if not self.closed:
+            self.command("unobserve_property", stream.observer_id)
+
+    def receive(self):
+        """Receive the messages of mpv until the connection is closed
+
+        Malformed messages are logged and ignored. The requests waiting for a
+        reply and the property streams always fail when the reception stops.
+        """
+        buffer = b""
+        try:
+            while True:
+                try:
+                    data = self.socket.recv(RECEIVE_SIZE)
+
+                except OSError:
+                    break
+
+                if not data:
+                    break
+
+                buffer += data
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    if not line:
+                        continue
+
+                    try:
+                        message = json.loads(line.decode("utf-8", "ignore"))
+
+                    except ValueError as error:
+                        logger.warning("Invalid message from mpv: %s", error)
+                        continue
+
+                    if not isinstance(message, dict):
+                        logger.warning("Invalid message from mpv: %s", message)
+                        continue
+
+                    self.handle_message(message)
+
+        finally:
+            self.fail_all("connection lost")
+
+    def handle_message(self, message):
+        """Handle a message received from mpv
+
+        Args:
+            message (dict): Decoded message.
+        """
+        if "request_id" in message:
+            future = self.pending.pop(message["request_id"], None)
+            if future is None:
+                return
+
+            error = message.get("error", "success")
+            if error in ("success", "property unavailable"):
+                future.set_result(message.get("data"))
+                return
+
+            future.set_exception(MpvIpcError("mpv request failed: {}".format(error)))
+            return
+
+        if message.get("event") == "property-change":
+            stream = self.streams.get(message.get("id"))
+            if stream is not None:
+                stream.queue.put(message.get("data"))
+
+    def fail_all(self, reason):
+        """Fail the requests waiting for a reply and end the property streams
+
+        Args:
+            reason (str): Reason of the failure.
+        """
+        with self.lock:
+            self.closed = True
+            pending, self.pending = self.pending, {}
+
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(MpvIpcError("mpv {}".format(reason)))
+
+        for stream in list(self.streams.values()):
+            stream.queue.put(PropertyStream.END)
+
+
+class PropertyStream:
+    """Stream of the values of an observed property of mpv
+
+    The stream can be iterated over, and used as a context manager that stops
+    the observation on exit.
+
+    >>> with client.observe("idle-active") as stream:
+    ...     for value in stream:
+    ...         if value:
+    ...             break
+
+    Args:
+        client (MpvIpcClient): Client observing the property.
+        observer_id (int): ID of the observer.
+        name (str): Name of the property.
+
+    Attributes:
+        client (MpvIpcClient): Client observing the property.
+        observer_id (int): ID of the observer.
+        name (str): Name of the property.
+        queue (queue.Queue): Values received and not consumed yet.
+    """
+
+    # marker of the end of the stream
+    END = object()
+
+    def __init__(self, client, observer_id, name):
+        self.client = client
+        self.observer_id = observer_id
+        self.name = name
+        self.queue = Queue()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        while True:
+            value = self.get()
+            if value is self.END:
+                return
+
+            yield value
+
+    def get(self, timeout=None):
+        """Get the next value of the property
+
+        Args:
+            timeout (float): Maximal duration to wait for a value, in seconds.
+                If None, wait indefinitely.
+
+        Returns:
+            any: Value of the property, or `PropertyStream.END` if the
+            connection is closed.
+
+        Raises:
+            MpvIpcError: If no value has been received in time.
+        """
+        try:
+            return self.queue.get(timeout=timeout)
+
+        except Empty as error:
+            raise MpvIpcError(
+                "Property {} has not changed within {} s".format(self.name, timeout)
+            ) from error
+
+    def close(self):
+        """Stop to observe the property
+        """
+        self.client.unobserve(self)
+
+
+class MpvIpcError(DakaraError):
+    """Error raised when a request to mpv fails
+    """
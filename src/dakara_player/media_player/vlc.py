@@ -1,6 +1,9 @@
+import ctypes
+import ctypes.util
 import logging
-import json
+import os
 import re
+from functools import lru_cache
 
 from dakara_base.exceptions import DakaraError
 from dakara_base.safe_workers import safe
@@ -12,21 +15,26 @@ try:
 except ImportError:
     vlc = None
 
+from dakara_player.log_pipeline import LogPipeline
 from dakara_player.media_player.base import (
+    PREPARATION_WAIT_TIMEOUT,
     MediaPlayer,
     InvalidStateError,
     VersionNotFoundError,
 )
 from dakara_player.mrl import path_to_mrl, mrl_to_path
 
+logger = logging.getLogger(__name__)
+vlc_logger = logging.getLogger("vlc")
 
-try:
-    METADATA_KEY = vlc.Meta.Setting
+VLC_LOG_LEVELS = {
+    0: logging.DEBUG,
+    2: logging.INFO,
+    3: logging.WARNING,
+    4: logging.ERROR,
+}
 
-except AttributeError:
-    METADATA_KEY = None
-
-logger = logging.getLogger(__name__)
+VLC_LOG_SIZE = 1024
 
 
 class MediaPlayerVlc(MediaPlayer):
@@ -53,7 +61,8 @@ class MediaPlayerVlc(MediaPlayer):
         player_name (str): Name of VLC.
         fullscreen (bool): If True, VLC will be fullscreen.
         kara_folder_path (path.Path): Path to the karaoke folder.
-        playlist_entry (dict): Playlist entyr object.
+        playlist_entry (dakara_player.playlist_entry.PlaylistEntry): Playlist
+            entry object.
         callbacks (dict): High level callbacks associated with the media
             player.
         warn_long_exit (bool): If True, display a warning message if the media
@@ -70,11 +79,22 @@ class MediaPlayerVlc(MediaPlayer):
         player (vlc.MediaPlayer): VLC player.
         event_manager (vlc.EventManager): VLC event manager.
         vlc_callbacks (dict): Low level callbacks associated with VLC.
+        vlc_log_callback (vlc.CallbackDecorators.LogCb): Callback receiving
+            the log messages of libvlc.
         playlist_entry_data (dict): Extra data of the playlist entry.
     """
 
     player_name = "VLC"
 
+    # cheaper decoding of the next medias, then hardware decoding
+    degradation_steps = [
+        {"avcodec-skiploopfilter": 4},
+        {"avcodec-hw": "any"},
+    ]
+
+    # reloading the idle screen text restarts its background
+    refresh_idle_clock = False
+
     @staticmethod
     def is_available():
         """Indicate if VLC is available.
@@ -106,6 +126,12 @@ class MediaPlayerVlc(MediaPlayer):
         # vlc callbacks
         self.vlc_callbacks = {}
 
+        # vlc logging
+        self.log_pipeline = LogPipeline.from_config(
+            vlc_logger, config.get("backend_logs") or {}
+        )
+        self.vlc_log_callback = vlc.CallbackDecorators.LogCb(self.handle_vlc_log)
+
         # playlist entry objects
         self.playlist_entry_data = {}
         self.clear_playlist_entry_player()
@@ -118,6 +144,7 @@ class MediaPlayerVlc(MediaPlayer):
 
         # set VLC callbacks
         self.set_vlc_default_callbacks()
+        self.instance.log_set(self.vlc_log_callback, None)
 
         # set VLC fullscreen
         self.player.set_fullscreen(self.fullscreen)
@@ -125,6 +152,37 @@ class MediaPlayerVlc(MediaPlayer):
         # print VLC version
         logger.info("VLC %s", self.get_version())
 
+    def get_frame_stats(self):
+        """Get the frame counters of VLC.
+
+        Returns:
+            tuple: Contains the cumulative numbers of lost and displayed
+            pictures of the current media, and None as the frame rate is not
+            known. None if the counters cannot be obtained.
+        """
+        media = self.player.get_media()
+        if media is None:
+            return None
+
+        stats = vlc.MediaStats()
+        if not media.get_stats(stats):
+            return None
+
+        return stats.lost_pictures, stats.displayed_pictures, None
+
+    def apply_degradation(self, settings):
+        """Add degraded options to the parameters of the medias.
+
+        As VLC cannot change them on the media being played, the options apply
+        from the next prepared media.
+
+        Args:
+            settings (dict): Options to add.
+        """
+        self.media_parameters = self.media_parameters + [
+            "{}={}".format(key, value) for key, value in settings.items()
+        ]
+
     def get_timing(self):
         """Get VLC timing.
 
@@ -143,6 +201,19 @@ class MediaPlayerVlc(MediaPlayer):
 
         return timing // 1000
 
+    def get_position(self):
+        """Get the precise position in the current media.
+
+        Returns:
+            float: Position in seconds, None if VLC has not started to play.
+        """
+        timing = self.player.get_time()
+
+        if timing == -1:
+            return None
+
+        return timing / 1000
+
     @staticmethod
     def get_version():
         """Get VLC version.
@@ -210,19 +281,7 @@ class MediaPlayerVlc(MediaPlayer):
         """
         return self.player.get_state() == vlc.State.Paused
 
-    def is_playing_this(self, what):
-        """Query if VLC is playing the requested media type.
-
-        Args:
-            what (str): Tell if VLC current track is of the requested type, but
-                not if it is actually playing it (it can be in pause).
-
-        Returns:
-            bool: True if VLC is playing the requested type.
-        """
-        return get_metadata(self.player.get_media())["type"] == what
-
-    def play(self, what):
+    def play(self, what, position=None):
         """Request VLC to play something.
 
         No preparation should be done by this function, i.e. the media track
@@ -230,33 +289,43 @@ class MediaPlayerVlc(MediaPlayer):
 
         Args:
             what (str): What media to play.
+            position (float): Position to start from, in seconds. If given,
+                the media is reloaded after a stall, even if it is already
+                played, and its start is not notified.
         """
         if what == "idle":
-            # create idle screen media
-            media = self.instance.media_new_path(
-                self.background_loader.backgrounds["idle"]
-            )
-
-            media.add_options(
-                *self.media_parameters,
-                "image-duration={}".format(self.durations["idle"]),
-                "sub-file={}".format(self.text_paths["idle"]),
-                "no-sub-autodetect-file",
-            )
+            # if already idle, do nothing, unless the idle screen has ended
+            if (
+                position is None
+                and self.is_playing_this("idle")
+                and self.player.get_state() != vlc.State.Ended
+            ):
+                return
 
-            set_metadata(media, {"type": "idle"})
+            self.cancel_preparation()
 
+            media = self.create_idle_media()
             self.generate_text("idle")
 
         elif what == "transition":
             media = self.playlist_entry_data["transition"].media
 
         elif what == "song":
+            if not self.wait_song_ready(timeout=PREPARATION_WAIT_TIMEOUT):
+                return
+
             media = self.playlist_entry_data["song"].media
 
         else:
             raise ValueError("Unexpected action to play: {}".format(what))
 
+        # start from the requested position on a copy of the media, so that
+        # the prepared media is not modified
+        if position is not None:
+            media = media.duplicate()
+            media.add_option("start-time={:.3f}".format(position))
+
+        self.load_state(what, reloaded=position is not None)
         self.player.set_media(media)
         self.player.play()
 
@@ -291,40 +360,122 @@ class MediaPlayerVlc(MediaPlayer):
         logger.info("Resuming play")
         self.player.play()
 
+    def pause_player(self, paused):
+        """Request VLC to pause or unpause, unconditionally.
+
+        Args:
+            paused (bool): If True, pause VLC.
+        """
+        self.player.set_pause(paused)
+
     def skip(self):
         """Request to skip the current media.
 
-        Can only work on transition screens or songs. VLC should continue
-        playing, but media has to be considered already finished.
+        Can only work on transition screens or songs. VLC switches to the idle
+        screen right away, and media has to be considered already finished.
+
+        As this method can be called from a VLC event callback, the idle
+        screen is played from another thread.
         """
         if self.is_playing_this("transition") or self.is_playing_this("song"):
-            self.callbacks["finished"](self.playlist_entry["id"])
-            logger.info("Skipping '%s'", self.playlist_entry["song"]["title"])
+            logger.info("Skipping '%s'", self.playlist_entry.title)
+            self.start_skip()
+            thread = self.create_thread(
+                target=self.play_if_current, args=("idle", self.generation)
+            )
+            thread.start()
+            self.callbacks["finished"](self.playlist_entry.id)
             self.clear_playlist_entry()
 
+    def create_idle_media(self):
+        """Create the media of the idle screen.
+
+        Returns:
+            vlc.Media: Idle screen background with its text as subtitle.
+        """
+        media = self.instance.media_new_path(self.background_loader.backgrounds["idle"])
+        media.add_options(
+            *self.media_parameters,
+            "image-duration={}".format(self.durations["idle"]),
+            "sub-file={}".format(self.text_paths["idle"]),
+            "no-sub-autodetect-file",
+        )
+
+        return media
+
+    def reload_idle_text(self):
+        """Request VLC to reload the idle screen text.
+
+        VLC cannot read a subtitle file again, and each subtitle slave added to
+        the current media would stay as an extra track. The idle screen media
+        is then replaced by a new one with the new text, started at the
+        current position of the background. As this restarts the background,
+        the clock of the idle screen is not refreshed periodically with VLC.
+        """
+        media = self.create_idle_media()
+        position = self.get_position()
+        if position:
+            media.add_option("start-time={:.3f}".format(position))
+
+        self.load_state("idle", reloaded=True)
+        self.player.set_media(media)
+        self.player.play()
+
     def stop_player(self):
         """Request to stop VLC.
         """
         logger.info("Stopping player")
         self.player.stop()
+        self.instance.log_unset()
         logger.debug("Stopped player")
 
-    def set_playlist_entry_player(self, playlist_entry, file_path, autoplay):
-        """Prepare playlist entry data to be played.
+    def prepare_playlist_entry_player(self, preparation, playlist_entry, file_path):
+        """Add the stages preparing playlist entry data to be played.
 
-        Prepare all media objects, subtitles, etc. for being played, for the
-        transition screen and the song. Such data should be stored on a
-        dedicated object, like `playlist_entry_data`.
+        Stages prepare all media objects, subtitles, etc. for being played,
+        for the transition screen and the song. Such data are stored on the
+        dedicated object `playlist_entry_data`.
 
         Args:
-            playlist_entry (dict): Playlist entry object.
+            preparation (dakara_player.preparation.Preparation): Preparation of
+                the playlist entry.
+            playlist_entry (dakara_player.playlist_entry.PlaylistEntry): Playlist
+                entry object.
             file_path (path.Path): Absolute path to the song file.
-            autoplay (bool): If True, start to play transition screen as soon
-                as possible (i.e. as soon as the transition screen media is
-                ready). The song media is prepared when the transition screen
-                is playing.
         """
-        # create transition screen media
+        playlist_entry_data = self.playlist_entry_data
+
+        preparation.add_stage(
+            "transition",
+            lambda: self.prepare_transition(
+                preparation, playlist_entry, playlist_entry_data
+            ),
+            critical=True,
+        )
+        preparation.add_stage(
+            "song", lambda: self.prepare_song(playlist_entry_data, file_path)
+        )
+
+        # manage instrumental
+        if playlist_entry.use_instrumental:
+            preparation.add_stage(
+                "instrumental",
+                lambda: self.manage_instrumental(
+                    playlist_entry, file_path, playlist_entry_data
+                ),
+                requires=["song"],
+            )
+
+    def prepare_transition(self, preparation, playlist_entry, playlist_entry_data):
+        """Prepare the transition screen media.
+
+        Args:
+            preparation (dakara_player.preparation.Preparation): Preparation of
+                the playlist entry.
+            playlist_entry (dakara_player.playlist_entry.PlaylistEntry): Playlist
+                entry object.
+            playlist_entry_data (dict): Extra data of the playlist entry.
+        """
         media_transition = self.instance.media_new_path(
             self.background_loader.backgrounds["transition"]
         )
@@ -336,52 +487,54 @@ class MediaPlayerVlc(MediaPlayer):
             "no-sub-autodetect-file",
         )
 
-        set_metadata(
-            media_transition,
-            {"type": "transition", "playlist_entry": self.playlist_entry},
+        self.generate_text(
+            "transition", playlist_entry=playlist_entry, preparation=preparation
         )
 
-        self.generate_text("transition")
-
-        self.playlist_entry_data["transition"].media = media_transition
+        playlist_entry_data["transition"].media = media_transition
 
-        # start playing transition right away if requested
-        if autoplay:
-            self.play("transition")
+    def prepare_song(self, playlist_entry_data, file_path):
+        """Prepare the song media.
 
-        # create song media
+        Args:
+            playlist_entry_data (dict): Extra data of the playlist entry.
+            file_path (path.Path): Absolute path to the song file.
+        """
         media_song = self.instance.media_new_path(file_path)
         media_song.add_options(*self.media_parameters)
-        set_metadata(
-            media_song, {"type": "song", "playlist_entry": self.playlist_entry}
-        )
 
-        self.playlist_entry_data["song"].media = media_song
+        playlist_entry_data["song"].media = media_song
 
-        # manage instrumental
-        if playlist_entry["use_instrumental"]:
-            self.manage_instrumental(playlist_entry, file_path)
-
-    def manage_instrumental(self, playlist_entry, file_path):
+    def manage_instrumental(self, playlist_entry, file_path, playlist_entry_data):
         """Manage the requested instrumental track.
 
         Instrumental track is searched first in audio files having the same
         name as the video file, then in extra audio tracks of the video file.
+        The track is selected by an option of the media, so that VLC starts
+        decoding it right away instead of switching tracks once the song
+        plays.
+
+        Tracks of the video file are read from the headers of its container
+        if possible, which is faster than parsing the media with VLC.
 
         Args:
-            playlist_entry (dict): Playlist entry data. Must contain the key
-                `use_instrumental`.
+            playlist_entry (dakara_player.playlist_entry.PlaylistEntry):
+                Playlist entry object.
             file_path (path.Path): Path of the song file.
+            playlist_entry_data (dict): Extra data of the playlist entry.
         """
         # get instrumental file if possible
         audio_path = self.get_instrumental_file(file_path)
+        media_info = self.get_media_info(file_path)
 
         # if audio file is present, request to add the file to the media
         # as a slave and register to play this extra track (which will be
         # the last audio track of the media)
         if audio_path:
-            number_tracks = self.get_number_tracks(
-                self.playlist_entry_data["song"].media
+            number_tracks = (
+                len(media_info.tracks)
+                if media_info is not None
+                else self.get_number_tracks(playlist_entry_data["song"].media)
             )
             logger.info(
                 "Requesting to play instrumental file '%s' for '%s'",
@@ -390,7 +543,7 @@ class MediaPlayerVlc(MediaPlayer):
             )
             try:
                 # try to add the instrumental file
-                self.playlist_entry_data["song"].media.slaves_add(
+                playlist_entry_data["song"].media.slaves_add(
                     vlc.MediaSlaveType.audio, 4, path_to_mrl(audio_path).encode()
                 )
 
@@ -402,25 +555,49 @@ class MediaPlayerVlc(MediaPlayer):
                 )
                 return
 
-            self.playlist_entry_data["song"].audio_track_id = number_tracks
+            self.select_audio_track(playlist_entry_data["song"], number_tracks)
             return
 
-        # get audio tracks
-        audio_tracks_id = self.get_audio_tracks_id(
-            self.playlist_entry_data["song"].media
-        )
+        # if the tracks have been read from the file, register to play the
+        # instrumental one by its number among audio tracks
+        if media_info is not None:
+            audio_index = media_info.get_instrumental_index()
+            if audio_index is not None:
+                logger.info("Requesting to play instrumental track of '%s'", file_path)
+                logger.debug("Requesting to play audio track number %i", audio_index)
+                playlist_entry_data["song"].media.add_options(
+                    "audio-track={}".format(audio_index)
+                )
+                return
 
-        # if more than 1 audio track is present, register to play the 2nd one
-        if len(audio_tracks_id) > 1:
-            logger.info("Requesting to play instrumental track of '%s'", file_path)
-            self.playlist_entry_data["song"].audio_track_id = audio_tracks_id[1]
-            return
+        # otherwise, if more than 1 audio track is present in the parsed media,
+        # register to play the 2nd one
+        else:
+            audio_tracks_id = self.get_audio_tracks_id(
+                playlist_entry_data["song"].media
+            )
+            if len(audio_tracks_id) > 1:
+                logger.info("Requesting to play instrumental track of '%s'", file_path)
+                self.select_audio_track(playlist_entry_data["song"], audio_tracks_id[1])
+                return
 
         # otherwise, fallback to register to play the first track and log it
         logger.warning(
             "Cannot find instrumental file or track for file '%s'", file_path
         )
 
+    @staticmethod
+    def select_audio_track(media_song, audio_track_id):
+        """Select the audio track to play before the song starts.
+
+        Args:
+            media_song (MediaSong): Song object.
+            audio_track_id (int): ID of the audio track.
+        """
+        logger.debug("Requesting to play audio track %i", audio_track_id)
+        media_song.media.add_options("audio-track-id={}".format(audio_track_id))
+        media_song.audio_track_id = audio_track_id
+
     def clear_playlist_entry_player(self):
         """Clean playlist entry data after being played.
         """
@@ -462,6 +639,30 @@ class MediaPlayerVlc(MediaPlayer):
 
         return audio
 
+    def handle_vlc_log(self, data, level, context, fmt, args):
+        """Callback called when libvlc emits a log message.
+
+        The message is formatted and submitted to the log pipeline, which
+        directs it to the VLC logger without blocking. Messages whose level is
+        not logged are not formatted.
+
+        Args:
+            data (int): Data passed when the callback was set.
+            level (int): Level of the log message.
+            context (vlc.Log_ptr): Context of the log message.
+            fmt (bytes): Format string of the log message.
+            args (int): Pointer to the arguments of the format string.
+        """
+        intlevel = VLC_LOG_LEVELS.get(level, logging.NOTSET)
+        if not vlc_logger.isEnabledFor(intlevel):
+            return
+
+        component = get_vlc_log_module(context)
+        if intlevel < self.log_pipeline.get_level(component):
+            return
+
+        self.log_pipeline.submit(intlevel, component, format_vlc_log(fmt, args))
+
     @safe
     def handle_end_reached(self, event):
         """Callback called when a media ends.
@@ -472,41 +673,49 @@ class MediaPlayerVlc(MediaPlayer):
                 `callbacks["finished"]`;
             - An idle screen ends, leading to reloop it.
 
-        A new thread is created in any case.
+        A new thread is created when another media has to be played. Events
+        received while a new media is loading are stale and are discarded.
 
         Args:
             event (vlc.EventType): VLC event object.
         """
         logger.debug("End reached callback called")
 
+        with self.state_lock:
+            state = self.state
+            generation = self.generation
+
         # the transition screen has finished, request to play the song itself
-        if self.is_playing_this("transition"):
-            logger.debug(
-                "Will play '{}'".format(
-                    mrl_to_path(self.playlist_entry_data["song"].media.get_mrl())
-                )
+        if state == "transition":
+            logger.debug("Will play '{}'".format(self.playlist_entry.file_path))
+            thread = self.create_thread(
+                target=self.play_if_current, args=("song", generation)
             )
-            thread = self.create_thread(target=self.play, args=("song",))
             thread.start()
 
             return
 
         # the media has finished, so call the according callback and clean memory
-        if self.is_playing_this("song"):
-            self.callbacks["finished"](self.playlist_entry["id"])
+        if state == "song":
+            self.callbacks["finished"](self.playlist_entry.id)
             self.clear_playlist_entry()
 
             return
 
         # the idle screen has finished, simply restart it
-        if self.is_playing_this("idle"):
-            thread = self.create_thread(target=self.play, args=("idle",))
+        if state == "idle":
+            thread = self.create_thread(
+                target=self.play_if_current, args=("idle", generation)
+            )
             thread.start()
 
             return
 
         # if no state can be determined, raise an error
-        raise InvalidStateError("End reached on an undeterminated state")
+        if state is None:
+            raise InvalidStateError("End reached on an undeterminated state")
+
+        logger.debug("Discarding stale end reached event in state %s", state)
 
     @safe
     def handle_encountered_error(self, event):
@@ -528,7 +737,7 @@ class MediaPlayerVlc(MediaPlayer):
                 "Unable to play '%s'", mrl_to_path(self.player.get_media().get_mrl())
             )
             self.callbacks["error"](
-                self.playlist_entry["id"], "Unable to play current song"
+                self.playlist_entry.id, "Unable to play current song"
             )
             self.skip()
 
@@ -543,7 +752,7 @@ class MediaPlayerVlc(MediaPlayer):
         This happens when:
             - The player resumes from pause;
             - A transition screen starts;
-            - A song starts, leading to set the requested audio track to play;
+            - A song starts;
             - An idle screen starts.
 
         Args:
@@ -552,57 +761,48 @@ class MediaPlayerVlc(MediaPlayer):
         logger.debug("Playing callback called")
 
         # the media or the transition is resuming from pause
-        # it is pretty hard to detect this case, as we do not have a previous
-        # state in memory
-        # we rely on a specific flag stored in `playlist_entry_data` Media
-        # objects which is set to True when the corresponding media starts
-        if (
-            self.is_playing_this("transition")
-            and self.playlist_entry_data["transition"].started
-            or self.is_playing_this("song")
-            and self.playlist_entry_data["song"].started
-        ):
-            self.callbacks["resumed"](self.playlist_entry["id"], self.get_timing())
+        if self.leave_pause():
+            self.callbacks["resumed"](self.playlist_entry.id, self.get_timing())
             logger.debug("Resumed play")
 
             return
 
         # the transition screen starts to play
-        if self.is_playing_this("transition"):
-            self.callbacks["started_transition"](self.playlist_entry["id"])
-            self.playlist_entry_data["transition"].started = True
-            logger.info(
-                "Playing transition for '%s'", self.playlist_entry["song"]["title"]
-            )
+        if self.advance_state("transition_loading", "transition"):
+            self.end_skip()
+            self.start_transition_gate()
+
+            if not self.state_reloaded:
+                self.callbacks["started_transition"](self.playlist_entry.id)
+
+            logger.info("Playing transition for '%s'", self.playlist_entry.title)
 
             return
 
         # the song starts to play
-        if self.is_playing_this("song"):
-            self.callbacks["started_song"](self.playlist_entry["id"])
-
-            # set instrumental track if necessary
-            audio_track_id = self.playlist_entry_data["song"].audio_track_id
-            if audio_track_id is not None:
-                logger.debug("Requesting to play audio track %i", audio_track_id)
-                self.player.audio_set_track(audio_track_id)
+        if self.advance_state("song_loading", "song"):
+            if not self.state_reloaded:
+                self.callbacks["started_song"](self.playlist_entry.id)
 
-            self.playlist_entry_data["song"].started = True
             logger.info(
                 "Now playing '%s' ('%s')",
-                self.playlist_entry["song"]["title"],
+                self.playlist_entry.title,
                 mrl_to_path(self.player.get_media().get_mrl()),
             )
 
             return
 
         # the idle screen starts to play
-        if self.is_playing_this("idle"):
+        if self.state == "idle":
+            self.end_skip()
             logger.debug("Playing idle screen")
 
             return
 
-        raise InvalidStateError("Playing on an undeterminated state")
+        if self.state is None:
+            raise InvalidStateError("Playing on an undeterminated state")
+
+        logger.debug("Discarding stale playing event in state %s", self.state)
 
     @safe
     def handle_paused(self, event):
@@ -613,36 +813,103 @@ class MediaPlayerVlc(MediaPlayer):
         """
         logger.debug("Paused callback called")
 
+        if self.is_transition_hold_event():
+            logger.debug("Transition screen held")
+            return
+
+        if not self.enter_pause():
+            logger.debug("Discarding stale paused event in state %s", self.state)
+            return
+
         # call paused callback
-        self.callbacks["paused"](self.playlist_entry["id"], self.get_timing())
+        self.callbacks["paused"](self.playlist_entry.id, self.get_timing())
 
         logger.debug("Paused")
 
 
-def set_metadata(media, metadata):
-    """Set metadata to media.
+@lru_cache(maxsize=None)
+def get_log_functions():
+    """Get the C functions needed to read the log messages of libvlc.
 
-    Use the `METADATA_KEY` for storage. The metadata can be extracted after.
+    Returns:
+        tuple: Contains the `vsnprintf` function of the C library and the
+        `libvlc_log_get_context` function of libvlc, each one being None if
+        it cannot be found.
+    """
+    try:
+        if os.name == "nt":
+            vsnprintf = ctypes.cdll.msvcrt._vsnprintf
+
+        else:
+            vsnprintf = ctypes.CDLL(ctypes.util.find_library("c")).vsnprintf
+
+        vsnprintf.argtypes = [
+            ctypes.c_char_p,
+            ctypes.c_size_t,
+            ctypes.c_char_p,
+            ctypes.c_void_p,
+        ]
+        vsnprintf.restype = ctypes.c_int
+
+    except (OSError, AttributeError):
+        vsnprintf = None
+
+    try:
+        get_context = vlc.dll.libvlc_log_get_context
+        get_context.argtypes = [
+            ctypes.c_void_p,
+            ctypes.POINTER(ctypes.c_char_p),
+            ctypes.POINTER(ctypes.c_char_p),
+            ctypes.POINTER(ctypes.c_uint),
+        ]
+        get_context.restype = None
+
+    except (OSError, AttributeError):
+        get_context = None
+
+    return vsnprintf, get_context
+
+
+def format_vlc_log(fmt, args):
+    """Format a log message of libvlc.
 
     Args:
-        media (vlc.Media): Media to set metadata in.
-        metadata (any): JSON representable data.
+        fmt (bytes): Format string of the message.
+        args (int): Pointer to the arguments of the format string.
+
+    Returns:
+        str: Formatted message, or the format string if the C library cannot
+        be used.
     """
-    media.set_meta(METADATA_KEY, json.dumps(metadata))
+    vsnprintf, _ = get_log_functions()
+    if vsnprintf is None:
+        return fmt.decode("utf-8", "replace")
+
+    buffer = ctypes.create_string_buffer(VLC_LOG_SIZE)
+    vsnprintf(buffer, VLC_LOG_SIZE, fmt, args)
 
+    return buffer.value.decode("utf-8", "replace")
 
-def get_metadata(media):
-    """Get metadata from media.
 
-    Use the `METADATA_KEY` for storage.
+def get_vlc_log_module(context):
+    """Get the name of the VLC module that emitted a log message.
 
     Args:
-        media (vlc.Media): Media to get metadata from.
+        context (vlc.Log_ptr): Context of the message.
 
     Returns:
-        any: JSON representable data.
+        str: Name of the module, "vlc" if unknown.
     """
-    return json.loads(media.get_meta(METADATA_KEY))
+    _, get_context = get_log_functions()
+    if get_context is None:
+        return "vlc"
+
+    module = ctypes.c_char_p()
+    file = ctypes.c_char_p()
+    line = ctypes.c_uint()
+    get_context(context, ctypes.byref(module), ctypes.byref(file), ctypes.byref(line))
+
+    return module.value.decode("utf-8", "replace") if module.value else "vlc"
 
 
 class Media:
@@ -651,7 +918,6 @@ class Media:
 
     def __init__(self, media=None):
         self.media = media
-        self.started = False
 
 
 class MediaSong(Media):
@@ -0,0 +1,178 @@
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from threading import Lock
+from time import monotonic
+
+logger = logging.getLogger(__name__)
+
+
+class Metrics:
+    """Collection of performance counters and durations
+
+    Measurements are aggregated as soon as they are recorded, so that the
+    memory used does not grow with the uptime of the player. The collection
+    can be used from any thread.
+
+    >>> metrics = Metrics()
+    >>> with metrics.measure("transition"):
+    ...     pass
+    >>> metrics.increment("stalls")
+    >>> metrics.get_counter("stalls")
+    1
+
+    Attributes:
+        counters (collections.defaultdict of int): Counters by name.
+        durations (dict of Duration): Aggregated durations by name.
+        lock (threading.Lock): Lock for updates.
+    """
+
+    def __init__(self):
+        self.counters = defaultdict(int)
+        self.durations = {}
+        self.lock = Lock()
+
+    def increment(self, name, value=1):
+        """Increment a counter
+
+        Args:
+            name (str): Name of the counter.
+            value (int): Value to add to the counter.
+        """
+        with self.lock:
+            self.counters[name] += value
+
+    def record_duration(self, name, duration):
+        """Record a duration
+
+        Args:
+            name (str): Name of the duration.
+            duration (float): Duration in seconds.
+        """
+        with self.lock:
+            if name not in self.durations:
+                self.durations[name] = Duration()
+
+            self.durations[name].record(duration)
+
+        logger.debug("Measured %s: %.3f s", name, duration)
+
+    @contextmanager
+    def measure(self, name):
+        """Context manager to record the duration of a block of code
+
+        The duration is recorded even if the block raises an exception.
+
+        Args:
+            name (str): Name of the duration.
+        """
+        start = monotonic()
+
+        try:
+            yield
+
+        finally:
+            self.record_duration(name, monotonic() - start)
+
+    def get_counter(self, name):
+        """Get the value of a counter
+
+        Args:
+            name (str): Name of the counter.
+
+        Returns:
+            int: Value of the counter, 0 if never incremented.
+        """
+        with self.lock:
+            return self.counters.get(name, 0)
+
+    def get_duration(self, name):
+        """Get aggregated values of a duration
+
+        Args:
+            name (str): Name of the duration.
+
+        Returns:
+            dict: Aggregated values of the duration, None if never recorded.
+        """
+        with self.lock:
+            duration = self.durations.get(name)
+            return duration.as_dict() if duration is not None else None
+
+    def get_summary(self):
+        """Get all the counters and durations
+
+        Returns:
+            dict: Values of the counters and aggregated values of the durations.
+        """
+        with self.lock:
+            return {
+                "counters": dict(self.counters),
+                "durations": {
+                    name: duration.as_dict()
+                    for name, duration in self.durations.items()
+                },
+            }
+
+    def log_summary(self):
+        """Log all the counters and durations
+        """
+        summary = self.get_summary()
+
+        for name, value in sorted(summary["counters"].items()):
+            logger.info("%s: %i", name, value)
+
+        for name, duration in sorted(summary["durations"].items()):
+            logger.info(
+                "%s: %i times, mean %.3f s, max %.3f s",
+                name,
+                duration["count"],
+                duration["mean"],
+                duration["max"],
+            )
+
+
+class Duration:
+    """Aggregated values of a duration
+
+    Attributes:
+        count (int): Number of recorded durations.
+        total (float): Sum of recorded durations in seconds.
+        minimum (float): Shortest recorded duration in seconds.
+        maximum (float): Longest recorded duration in seconds.
+        last (float): Last recorded duration in seconds.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.minimum = None
+        self.maximum = None
+        self.last = None
+
+    def record(self, duration):
+        """Record a new duration
+
+        Args:
+            duration (float): Duration in seconds.
+        """
+        self.count += 1
+        self.total += duration
+        self.last = duration
+        self.minimum = duration if self.minimum is None else min(self.minimum, duration)
+        self.maximum = duration if self.maximum is None else max(self.maximum, duration)
+
+    def as_dict(self):
+        """Get the aggregated values
+
+        Returns:
+            dict: Aggregated values.
+        """
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0,
+            "min": self.minimum,
+            "max": self.maximum,
+            "last": self.last,
+        }
@@ -0,0 +1,165 @@
+from collections.abc import Mapping
+from types import MappingProxyType
+
+from dakara_base.exceptions import DakaraError
+from path import Path
+
+
+class PlaylistEntry:
+    """Immutable playlist entry
+
+    The playlist entry is parsed and validated once from the data sent by the
+    server, then passed as is to the different parts of the player. Frequently
+    used values are computed on creation.
+
+    >>> playlist_entry = PlaylistEntry.from_dict(
+    ...     {
+    ...         "id": 42,
+    ...         "song": {"title": "Song title", "file_path": "song.mkv"},
+    ...         "owner": {"username": "me"},
+    ...         "use_instrumental": False,
+    ...     },
+    ...     Path("/path/to/kara_folder"),
+    ... )
+    >>> playlist_entry.file_path
+    Path('/path/to/kara_folder/song.mkv')
+
+    Args:
+        data (dict): raw data of the playlist entry, as sent by the server.
+        file_path (path.Path): absolute path of the song file.
+
+    Attributes:
+        id (int): ID of the playlist entry.
+        title (str): title of the song.
+        file_path (path.Path): absolute path of the song file.
+        use_instrumental (bool): if True, the instrumental version of the song
+            is requested.
+        data (types.MappingProxyType): read-only copy of the raw data of the
+            playlist entry, where nested dictionaries are read-only as well
+            and lists are tuples.
+    """
+
+    __slots__ = ("id", "title", "file_path", "use_instrumental", "data")
+
+    def __init__(self, data, file_path):
+        object.__setattr__(self, "id", data["id"])
+        object.__setattr__(self, "title", data["song"]["title"])
+        object.__setattr__(self, "file_path", Path(file_path))
+        object.__setattr__(
+            self, "use_instrumental", bool(data.get("use_instrumental", False))
+        )
+        object.__setattr__(self, "data", freeze(data))
+
+    @classmethod
+    def from_dict(cls, data, kara_folder_path):
+        """Parse and validate a playlist entry
+
+        Args:
+            data (collections.abc.Mapping): raw data of the playlist entry, as
+                sent by the server.
+            kara_folder_path (path.Path): path of the karaoke folder.
+
+        Returns:
+            PlaylistEntry: parsed playlist entry.
+
+        Raises:
+            InvalidPlaylistEntryError: if the data are invalid.
+        """
+        if not isinstance(data, Mapping):
+            raise InvalidPlaylistEntryError("Playlist entry must be a dictionary")
+
+        if not isinstance(data.get("id"), int):
+            raise InvalidPlaylistEntryError("Playlist entry has no valid ID")
+
+        song = data.get("song")
+        if not isinstance(song, Mapping):
+            raise InvalidPlaylistEntryError(
+                "Playlist entry {} has no song".format(data["id"])
+            )
+
+        if not song.get("file_path"):
+            raise InvalidPlaylistEntryError(
+                "Playlist entry {} has no file path".format(data["id"])
+            )
+
+        if not isinstance(song.get("title"), str):
+            raise InvalidPlaylistEntryError(
+                "Playlist entry {} has no title".format(data["id"])
+            )
+
+        return cls(data, Path(kara_folder_path) / song["file_path"])
+
+    def to_dict(self):
+        """Get the raw data of the playlist entry
+
+        Returns:
+            dict: new mutable copy of the raw data.
+        """
+        return thaw(self.data)
+
+    def get_context(self, **kwargs):
+        """Get the data of the playlist entry to populate a template
+
+        Args:
+            kwargs: extra values to add to the context.
+
+        Returns:
+            dict: new dictionary of the playlist entry data and the extra
+            values.
+        """
+        return {**self.to_dict(), **kwargs}
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Playlist entry is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Playlist entry is immutable")
+
+    def __reduce__(self):
+        return (self.__class__, (self.to_dict(), self.file_path))
+
+    def __repr__(self):
+        return "<{} {} '{}'>".format(self.__class__.__name__, self.id, self.title)
+
+
+def freeze(value):
+    """Make a read-only copy of data
+
+    Args:
+        value (any): data to copy.
+
+    Returns:
+        any: copy of the data, where dictionaries are converted to read-only
+        mappings and lists to tuples.
+    """
+    if isinstance(value, (dict, MappingProxyType)):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+
+    return value
+
+
+def thaw(value):
+    """Make a mutable copy of data made read-only by `freeze`
+
+    Args:
+        value (any): data to copy.
+
+    Returns:
+        any: copy of the data, where read-only mappings are converted to
+        dictionaries and tuples to lists.
+    """
+    if isinstance(value, MappingProxyType):
+        return {key: thaw(item) for key, item in value.items()}
+
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+
+    return value
+
+
+class InvalidPlaylistEntryError(DakaraError, ValueError):
+    """Error raised when a playlist entry is invalid
+    """
@@ -0,0 +1,267 @@
+import logging
+from threading import Event, Lock
+from time import monotonic
+
+from dakara_base.safe_workers import Worker, safe
+
+logger = logging.getLogger(__name__)
+
+
+class Preparation(Worker):
+    """Pipeline of stages preparing a playlist entry to be played
+
+    Stages are run concurrently on a thread pool, that can be shared among
+    several preparations. A stage is submitted as soon as the stages it
+    requires are finished. When several stages can be submitted at the same
+    time, critical ones are submitted first.
+
+    The pipeline can be cancelled at any time: stages not started yet will not
+    run, and stages being run can check `is_cancelled`. Waiting for a stage of
+    a cancelled pipeline returns immediately.
+
+    Any exception raised by a stage is put in the errors queue.
+
+    >>> from concurrent.futures import ThreadPoolExecutor
+    >>> from queue import Queue
+    >>> from threading import Event
+    >>> preparation = Preparation(Event(), Queue(), ThreadPoolExecutor())
+    >>> preparation.add_stage("first", lambda: None, critical=True)
+    >>> preparation.add_stage("second", lambda: None, requires=["first"])
+    >>> preparation.start()
+    >>> preparation.wait()
+    True
+
+    Args:
+        stop (threading.Event): Stop event that notify to stop the entire
+            program when set.
+        errors (queue.Queue): Error queue to communicate the exception to the
+            main thread.
+        executor (concurrent.futures.Executor): Executor to run the stages on.
+        metrics (dakara_player.metrics.Metrics): Collection where to record
+            the duration of each stage, if any.
+
+    Attributes:
+        stop (threading.Event): Stop event that notify to stop the entire
+            program when set.
+        errors (queue.Queue): Error queue to communicate the exception to the
+            main thread.
+        executor (concurrent.futures.Executor): Executor to run the stages on.
+        metrics (dakara_player.metrics.Metrics): Collection where to record
+            the duration of each stage, if any.
+        stages (dict of Stage): Stages of the pipeline by name.
+        cancelled (threading.Event): Event set when the pipeline is cancelled.
+        started (float): Monotonic time when the pipeline started.
+        finished (bool): True when all the stages are finished.
+        lock (threading.Lock): Lock for stages submission.
+    """
+
+    def init_worker(self, executor, metrics=None):
+        self.executor = executor
+        self.metrics = metrics
+        self.stages = {}
+        self.cancelled = Event()
+        self.started = None
+        self.finished = False
+        self.lock = Lock()
+
+    def add_stage(self, name, function, requires=None, critical=False):
+        """Add a stage to the pipeline
+
+        Stages must be added before the pipeline starts.
+
+        Args:
+            name (str): Name of the stage.
+            function (function): Function to call without arguments.
+            requires (list of str): Name of the stages that must be finished
+                before this one starts.
+            critical (bool): If True, the stage is submitted before the other
+                ones.
+        """
+        for required in requires or []:
+            if required not in self.stages:
+                raise ValueError("Unknown required stage: {}".format(required))
+
+        self.stages[name] = Stage(name, function, requires, critical)
+
+    def start(self):
+        """Start the pipeline
+        """
+        self.started = monotonic()
+        self.submit_ready()
+
+    def submit_ready(self):
+        """Submit the stages whose required stages are finished
+
+        When all the stages are finished, the total duration of the pipeline
+        is recorded.
+        """
+        with self.lock:
+            if self.is_cancelled() or self.finished:
+                return
+
+            if all(stage.is_done() for stage in self.stages.values()):
+                self.finished = True
+
+                if self.metrics is not None:
+                    self.metrics.record_duration(
+                        "preparation", monotonic() - self.started
+                    )
+
+                return
+
+            ready = [
+                stage
+                for stage in self.stages.values()
+                if not stage.submitted
+                and all(self.stages[required].is_done() for required in stage.requires)
+            ]
+
+            for stage in ready:
+                stage.submitted = True
+
+        # critical stages first
+        ready.sort(key=lambda stage: not stage.critical)
+
+        for stage in ready:
+            self.executor.submit(self.run_stage, stage)
+
+    @safe
+    def run_stage(self, stage):
+        """Run a stage of the pipeline
+
+        If the stage fails, the pipeline is cancelled.
+
+        Args:
+            stage (Stage): Stage to run.
+        """
+        if self.is_cancelled():
+            return
+
+        start = monotonic()
+
+        try:
+            stage.function()
+
+        except BaseException:
+            stage.finished.set()
+            self.cancel()
+            raise
+
+        stage.succeeded = True
+        stage.finished.set()
+
+        if self.metrics is not None:
+            self.metrics.record_duration(
+                "preparation.{}".format(stage.name), monotonic() - start
+            )
+
+        self.submit_ready()
+
+    def cancel(self):
+        """Cancel the pipeline
+
+        Stages not started yet will not run. Waiting threads are released.
+        """
+        with self.lock:
+            if self.is_cancelled():
+                return
+
+            self.cancelled.set()
+
+            for stage in self.stages.values():
+                stage.finished.set()
+
+        logger.debug("Preparation cancelled")
+
+    def is_cancelled(self):
+        """Tell if the pipeline has been cancelled
+
+        Returns:
+            bool: True if the pipeline has been cancelled.
+        """
+        return self.cancelled.is_set()
+
+    def is_ready(self, name=None):
+        """Tell if a stage or the whole pipeline is done
+
+        Args:
+            name (str): Name of the stage. If not given, all the stages are
+                considered.
+
+        Returns:
+            bool: True if the stage or all the stages have succeeded and the
+            pipeline has not been cancelled.
+        """
+        if self.is_cancelled():
+            return False
+
+        if name is not None:
+            return self.stages[name].is_done()
+
+        return all(stage.is_done() for stage in self.stages.values())
+
+    def wait(self, name=None, timeout=None):
+        """Wait for a stage or the whole pipeline to be done
+
+        Args:
+            name (str): Name of the stage. If not given, all the stages are
+                waited for.
+            timeout (float): Maximum duration of the wait in seconds, shared
+                among all the stages. If not given, wait indefinitely.
+
+        Returns:
+            bool: True if the stage or all the stages have succeeded and the
+            pipeline has not been cancelled.
+        """
+        stages = [self.stages[name]] if name is not None else self.stages.values()
+        deadline = monotonic() + timeout if timeout is not None else None
+
+        for stage in stages:
+            remaining = max(deadline - monotonic(), 0) if deadline is not None else None
+            if not stage.finished.wait(remaining):
+                return False
+
+        return self.is_ready(name)
+
+
+class Stage:
+    """Stage of a preparation pipeline
+
+    Args:
+        name (str): Name of the stage.
+        function (function): Function to call without arguments.
+        requires (list of str): Name of the stages that must be finished
+            before this one starts.
+        critical (bool): If True, the stage is submitted before the other
+            ones.
+
+    Attributes:
+        name (str): Name of the stage.
+        function (function): Function to call without arguments.
+        requires (list of str): Name of the stages that must be finished
+            before this one starts.
+        critical (bool): If True, the stage is submitted before the other
+            ones.
+        submitted (bool): True if the stage has been submitted to the
+            executor.
+        succeeded (bool): True if the stage ran without error.
+        finished (threading.Event): Event set when the stage has run, or when
+            the pipeline has been cancelled.
+    """
+
+    def __init__(self, name, function, requires=None, critical=False):
+        self.name = name
+        self.function = function
+        self.requires = list(requires or [])
+        self.critical = critical
+        self.submitted = False
+        self.succeeded = False
+        self.finished = Event()
+
+    def is_done(self):
+        """Tell if the stage has run without error
+
+        Returns:
+            bool: True if the stage has succeeded.
+        """
+        return self.finished.is_set() and self.succeeded
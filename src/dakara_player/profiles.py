@@ -0,0 +1,209 @@
+import ctypes
+import logging
+import os
+from copy import deepcopy
+
+from dakara_base.config import ConfigInvalidError
+
+# limits under which the hardware is considered a single-board computer
+SBC_MAX_CPU_COUNT = 4
+SBC_MAX_MEMORY = 2 * 1024 ** 3
+
+# performance settings of each profile, by media player backend
+PROFILES = {
+    # low-memory single-board computer: small buffers, few decoding threads
+    "sbc": {
+        "vlc": ["file-caching=300", "network-caching=1000", "avcodec-threads=2"],
+        "mpv": {
+            "cache": "no",
+            "demuxer-max-bytes": "32MiB",
+            "demuxer-max-back-bytes": "4MiB",
+            "vd-lavc-threads": 2,
+        },
+    },
+    # desktop computer: default buffers, one decoding thread per core
+    "desktop": {
+        "vlc": ["file-caching=1000", "network-caching=1000", "avcodec-threads=0"],
+        "mpv": {
+            "cache": "auto",
+            "demuxer-max-bytes": "150MiB",
+            "demuxer-max-back-bytes": "50MiB",
+            "vd-lavc-threads": 0,
+        },
+    },
+    # karaoke folder on a network storage: large buffers to absorb latency
+    "nas": {
+        "vlc": ["file-caching=5000", "network-caching=5000", "avcodec-threads=0"],
+        "mpv": {
+            "cache": "yes",
+            "cache-secs": 60,
+            "demuxer-max-bytes": "256MiB",
+            "demuxer-max-back-bytes": "50MiB",
+            "demuxer-readahead-secs": 20,
+            "vd-lavc-threads": 0,
+        },
+    },
+}
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_memory():
+    """Get the physical memory of the computer
+
+    Returns:
+        int: Memory in bytes, None if it cannot be detected.
+    """
+    if os.name == "nt":
+
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [
+                ("dwLength", ctypes.c_ulong),
+                ("dwMemoryLoad", ctypes.c_ulong),
+                ("ullTotalPhys", ctypes.c_ulonglong),
+                ("ullAvailPhys", ctypes.c_ulonglong),
+                ("ullTotalPageFile", ctypes.c_ulonglong),
+                ("ullAvailPageFile", ctypes.c_ulonglong),
+                ("ullTotalVirtual", ctypes.c_ulonglong),
+                ("ullAvailVirtual", ctypes.c_ulonglong),
+                ("sullAvailExtendedVirtual", ctypes.c_ulonglong),
+            ]
+
+        status = MemoryStatus()
+        status.dwLength = ctypes.sizeof(MemoryStatus)
+        if not ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return None
+
+        return status.ullTotalPhys
+
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def detect_profile():
+    """Select a profile according to the hardware
+
+    Computers with few cores and little memory get the single-board computer
+    profile, other ones get the desktop profile. As many desktops have four
+    cores, the memory must be known to select the single-board computer
+    profile.
+
+    Returns:
+        str: Name of the profile.
+    """
+    cpu_count = os.cpu_count()
+    memory = get_memory()
+    logger.debug("Detected %s CPU(s) and %s bytes of memory", cpu_count, memory)
+
+    if (
+        memory is not None
+        and memory < SBC_MAX_MEMORY
+        and (cpu_count is None or cpu_count <= SBC_MAX_CPU_COUNT)
+    ):
+        return "sbc"
+
+    return "desktop"
+
+
+def get_profile_name(config):
+    """Get the name of the profile requested by the configuration
+
+    Args:
+        config (dict): Configuration of the player.
+
+    Returns:
+        str: Name of the profile, None if no profile is used.
+
+    Raises:
+        ConfigInvalidError: If the profile is unknown.
+    """
+    name = config.get("profile")
+    if not name:
+        return None
+
+    if name == "auto":
+        return detect_profile()
+
+    if name not in PROFILES:
+        raise ConfigInvalidError(
+            "Unknown profile '{}', must be one of: auto, {}".format(
+                name, ", ".join(PROFILES)
+            )
+        )
+
+    return name
+
+
+def apply_profile(config):
+    """Apply the performance profile to the configuration of the player
+
+    Settings of the profile are merged with the media player settings of the
+    configuration, explicit settings taking precedence.
+
+    Args:
+        config (dict): Configuration of the player. It is not modified.
+
+    Returns:
+        dict: Effective configuration of the player.
+
+    Raises:
+        ConfigInvalidError: If the profile is unknown.
+    """
+    name = get_profile_name(config)
+    if name is None:
+        return config
+
+    profile = PROFILES[name]
+    effective = deepcopy(config)
+    effective["profile"] = name
+
+    # set VLC settings, latter parameters override former ones
+    config_vlc = effective.get("vlc") or {}
+    config_vlc["media_parameters"] = profile["vlc"] + (
+        config_vlc.get("media_parameters") or []
+    )
+    effective["vlc"] = config_vlc
+
+    # set mpv settings
+    config_mpv = dict(profile["mpv"])
+    config_mpv.update(effective.get("mpv") or {})
+    effective["mpv"] = config_mpv
+
+    return effective
+
+
+def get_effective_settings(config):
+    """Get the effective media player settings
+
+    Args:
+        config (dict): Configuration of the player.
+
+    Returns:
+        list of str: Lines describing the profile and the settings of each
+        media player.
+
+    Raises:
+        ConfigInvalidError: If the profile is unknown.
+    """
+    effective = apply_profile(config)
+    config_vlc = effective.get("vlc") or {}
+    lines = ["profile: {}".format(effective.get("profile") or "none"), "vlc:"]
+    lines.extend(
+        "  instance parameter: {}".format(parameter)
+        for parameter in config_vlc.get("instance_parameters") or []
+    )
+    lines.extend(
+        "  media parameter: {}".format(parameter)
+        for parameter in config_vlc.get("media_parameters") or []
+    )
+    lines.append("mpv:")
+    lines.extend(
+        "  {}: {}".format(key, value)
+        for key, value in (effective.get("mpv") or {}).items()
+    )
+
+    return lines
@@ -0,0 +1,97 @@
+import json
+import logging
+import os
+
+from dakara_base.config import get_config_directory
+from path import Path
+
+REJECT_LIST_NAME = "library_rejects.json"
+
+logger = logging.getLogger(__name__)
+
+
+def get_reject_list_path(config):
+    """Get the path of the reject list from the config
+
+    Args:
+        config (dict): Configuration of the player.
+
+    Returns:
+        path.Path: Path of the reject list file.
+    """
+    config_library_check = config.get("library_check") or {}
+    return Path(
+        config_library_check.get(
+            "reject_list", get_config_directory() / REJECT_LIST_NAME
+        )
+    ).expand()
+
+
+class RejectList:
+    """Songs that cannot be played according to the library check
+
+    A song is rejected only if its file has not changed since it has been
+    checked.
+
+    >>> reject_list = RejectList(Path("library_rejects.json"))
+    >>> reject_list.load()
+    >>> reject_list.get_reason(Path("/path/to/song.mkv"))
+    'Unable to decode at 0s: unable to decode'
+
+    Args:
+        path (path.Path): Path of the reject list file.
+
+    Attributes:
+        path (path.Path): Path of the reject list file.
+        songs (dict): Size, modification time and errors of each rejected
+            song file, by path.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.songs = {}
+
+    def __len__(self):
+        return len(self.songs)
+
+    def load(self):
+        """Load the reject list
+
+        Nothing is rejected if the file does not exist or is invalid.
+        """
+        if not self.path.exists():
+            return
+
+        try:
+            self.songs = json.loads(self.path.text())
+
+        except (OSError, ValueError) as error:
+            logger.warning("Unable to load library reject list: %s", error)
+            return
+
+        logger.debug("Loaded %i songs rejected by the library check", len(self))
+
+    def get_reason(self, file_path):
+        """Get the reason why a song file is rejected
+
+        Args:
+            file_path (path.Path): Path of the song file.
+
+        Returns:
+            str: Errors found by the library check, None if the song is not
+            rejected or if its file has changed since.
+        """
+        song = self.songs.get(str(Path(file_path).expand().abspath()))
+        if song is None:
+            return None
+
+        try:
+            stat = os.stat(file_path)
+
+        except OSError:
+            return None
+
+        if stat.st_size != song.get("size") or stat.st_mtime != song.get("mtime"):
+            return None
+
+        return "; ".join(song.get("errors") or [])
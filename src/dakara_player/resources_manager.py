@@ -1,6 +1,10 @@
 from pkg_resources import resource_filename
 
-from dakara_base.resources_manager import generate_get_resource, resource_listdir
+from dakara_base.resources_manager import (
+    generate_get_resource,
+    get_file,
+    resource_listdir,
+)
 from path import Path
 
 
@@ -17,6 +21,8 @@ LIST_BACKGROUNDS = resource_listdir(RESOURCES_BACKGROUNDS, "")
 LIST_TEMPLATES = resource_listdir(RESOURCES_TEMPLATES, "")
 LIST_FONTS = resource_listdir(RESOURCES_FONTS, "")
 
+SAMPLE_NAME = "sample.mkv"
+
 
 get_background = generate_get_resource(
     RESOURCES_BACKGROUNDS, LIST_BACKGROUNDS, "background"
@@ -26,6 +32,15 @@ get_background = generate_get_resource(
 get_template = generate_get_resource(RESOURCES_TEMPLATES, LIST_TEMPLATES, "template")
 
 
+def get_sample():
+    """Get the sample video file
+
+    Returns:
+        path.Path: absolute path to the file.
+    """
+    return get_file(RESOURCES, SAMPLE_NAME)
+
+
 def get_all_fonts():
     """Get all font resource files
 
@@ -0,0 +1,175 @@
+import logging
+from copy import deepcopy
+from tempfile import gettempdir
+from threading import Lock
+
+from dakara_base.config import ConfigInvalidError, get_config_directory
+from path import Path
+
+from dakara_player.io_executor import IOExecutor
+from dakara_player.text_generator import TextGenerator
+
+CHECKPOINT_NAME = "player_checkpoint_{}.json"
+IPC_SOCKET_NAME = "dakara_player_mpv_{}.sock"
+
+
+logger = logging.getLogger(__name__)
+
+
+def merge_config(config, overrides):
+    """Merge a configuration with overriding values
+
+    Dictionaries are merged recursively, other values are replaced.
+
+    Args:
+        config (dict): Base configuration. It is not modified.
+        overrides (dict): Values overriding the base configuration.
+
+    Returns:
+        dict: Merged configuration.
+    """
+    merged = deepcopy(config)
+    for key, value in (overrides or {}).items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+            continue
+
+        merged[key] = deepcopy(value)
+
+    return merged
+
+
+def get_rooms_config(config):
+    """Get the configuration of each room
+
+    Each room declared in the `rooms` key of the configuration overrides the
+    `player` and `server` parameters of the top level. The files and sockets
+    of a room default to names containing the name of the room, so that rooms
+    do not collide.
+
+    Args:
+        config (dict): Configuration of the program.
+
+    Returns:
+        list of tuple: Name and configuration of each room. The
+        configuration has the same structure as the configuration of the
+        program.
+
+    Raises:
+        ConfigInvalidError: If a room has no name, or if two rooms have the
+            same name.
+    """
+    rooms_config = []
+    names = set()
+    for room in config.get("rooms") or []:
+        name = room.get("name")
+        if not name:
+            raise ConfigInvalidError("A room has no name")
+
+        if name in names:
+            raise ConfigInvalidError("Room '{}' is declared twice".format(name))
+
+        names.add(name)
+
+        room_config = {
+            key: value
+            for key, value in config.items()
+            if key not in ("rooms", "player", "server")
+        }
+        room_config["player"] = merge_config(
+            config.get("player") or {}, room.get("player")
+        )
+        room_config["server"] = merge_config(
+            config.get("server") or {}, room.get("server")
+        )
+
+        # set files of the room
+        room_config["player"]["checkpoint"] = merge_config(
+            {"path": str(get_config_directory() / CHECKPOINT_NAME.format(name))},
+            room_config["player"].get("checkpoint"),
+        )
+        room_config["player"]["persistent_mpv"] = merge_config(
+            {"ipc_socket": str(Path(gettempdir()) / IPC_SOCKET_NAME.format(name))},
+            room_config["player"].get("persistent_mpv"),
+        )
+
+        rooms_config.append((name, room_config))
+
+    return rooms_config
+
+
+class SharedResources:
+    """Resources shared by the rooms of the process
+
+    The filesystem access of the media players (with its cache of the karaoke
+    folder), their text generators (with their compiled templates) and the
+    font loader are created once and shared by all the rooms. Filesystem
+    executors and text generators are shared between rooms with the same
+    configuration.
+
+    >>> resources = SharedResources(font_loader)
+    >>> io_executor = resources.get_io_executor({"timeout": 2})
+
+    Args:
+        font_loader (dakara_player.font_loader.FontLoader): Font loader,
+            already loaded.
+
+    Attributes:
+        font_loader (dakara_player.font_loader.FontLoader): Font loader.
+        io_executors (dict of dakara_player.io_executor.IOExecutor):
+            Filesystem executors by configuration.
+        text_generators (dict of dakara_player.text_generator.TextGenerator):
+            Text generators by configuration.
+        lock (threading.Lock): Lock for the creation of resources.
+    """
+
+    def __init__(self, font_loader):
+        self.font_loader = font_loader
+        self.io_executors = {}
+        self.text_generators = {}
+        self.lock = Lock()
+
+    @staticmethod
+    def get_key(config):
+        """Get a hashable key from a configuration
+
+        Args:
+            config (dict): Configuration.
+
+        Returns:
+            str: Key identifying the configuration.
+        """
+        return repr(sorted((config or {}).items()))
+
+    def get_io_executor(self, config):
+        """Get the filesystem executor for a configuration
+
+        Args:
+            config (dict): Filesystem configuration.
+
+        Returns:
+            dakara_player.io_executor.IOExecutor: Shared executor.
+        """
+        key = self.get_key(config)
+        with self.lock:
+            if key not in self.io_executors:
+                self.io_executors[key] = IOExecutor.from_config(config or {})
+
+            return self.io_executors[key]
+
+    def get_text_generator(self, config):
+        """Get the text generator for a configuration
+
+        Args:
+            config (dict): Templates configuration.
+
+        Returns:
+            dakara_player.text_generator.TextGenerator: Shared text
+            generator.
+        """
+        key = self.get_key(config)
+        with self.lock:
+            if key not in self.text_generators:
+                self.text_generators[key] = TextGenerator(config or {})
+
+            return self.text_generators[key]
@@ -0,0 +1,5 @@
+# extensions of the subtitle files of songs, by order of preference
+SUBTITLE_EXTENSIONS = [
+    ".ass",
+    ".ssa",
+]
@@ -1,9 +1,14 @@
 import json
 import logging
+from contextlib import contextmanager
+from threading import Lock, local
+from time import monotonic
 
 from dakara_base.exceptions import DakaraError
 from dakara_base.resources_manager import get_file
-from jinja2 import ChoiceLoader, Environment, FileSystemLoader
+from jinja2 import ChoiceLoader, FileSystemLoader, nodes
+from jinja2.exceptions import SecurityError
+from jinja2.sandbox import SandboxedEnvironment, safe_range
 from path import Path
 
 from dakara_player.resources_manager import PATH_TEMPLATES
@@ -14,6 +19,13 @@ IDLE_TEMPLATE_NAME = "idle.ass"
 
 ICON_MAP_FILE = "font-awesome.json"
 
+RENDER_TIMEOUT = 1
+
+# maximal length of a sequence and number of bits of an integer created by an
+# operation in a template
+MAX_RESULT_LENGTH = 100000
+MAX_RESULT_BITS = 100000
+
 LINK_TYPE_NAMES = {
     "OP": "Opening",
     "ED": "Ending",
@@ -45,24 +57,37 @@ class TextGenerator:
     ...     ]
     ... })
 
+    Templates are rendered in a sandboxed environment, with a time budget. If
+    a template exceeds this budget, it is replaced by the default one and the
+    `TemplateRenderTimeoutError` error is raised. If a template is rejected by
+    the sandbox, it is replaced as well and the `TemplateRenderError` error is
+    raised. Subsequent renderings will then use the default template.
+
     Args:
         config (dict): config dictionary, which may contain the keys
-            "directory", "transition_template_name" and "idle_template_name".
+            "directory", "transition_template_name", "idle_template_name" and
+            "render_timeout".
 
     Attributes:
         config (dict): config dictionary.
         directory (path.Path): path to custom templates directory.
-        environment (jinja2.Environment): environment for Jinja2.
+        render_timeout (float): time budget to render a template in seconds.
+        render_durations (dict): duration of the last rendering of each
+            template in seconds. Keys are template names.
+        environment (BudgetedSandboxedEnvironment): environment for Jinja2.
         transition_template_name (jinja2.Template): template to generate the
             transition text.
         idle_template_name (jinja2.Template): template to generate the idle
             text.
         icon_map (dict): map of icons. Keys are icon name, values are icon character.
+        load_lock (threading.Lock): lock for loading.
     """
 
     def __init__(self, config):
         self.config = config
         self.directory = Path(config.get("directory", ""))
+        self.render_timeout = config.get("render_timeout", RENDER_TIMEOUT)
+        self.render_durations = {}
 
         # Jinja2 elements
         self.environment = None
@@ -72,16 +97,23 @@ class TextGenerator:
         # icon map
         self.icon_map = {}
 
+        self.load_lock = Lock()
+
     def load(self):
         """Load the different parts of the class
 
-        Here are the actions with side effect.
+        Here are the actions with side effect. They are performed once, so that
+        the text generator can be shared by several media players.
         """
-        # load icon mapping
-        self.load_icon_map()
+        with self.load_lock:
+            if self.environment is not None:
+                return
 
-        # load templates
-        self.load_templates()
+            # load icon mapping
+            self.load_icon_map()
+
+            # load templates
+            self.load_templates()
 
     def load_icon_map(self):
         """Load the icon map
@@ -97,7 +129,7 @@ class TextGenerator:
         loaders = [FileSystemLoader(self.directory), FileSystemLoader(PATH_TEMPLATES)]
 
         # create Jinja2 environment
-        self.environment = Environment(loader=ChoiceLoader(loaders))
+        self.environment = BudgetedSandboxedEnvironment(loader=ChoiceLoader(loaders))
 
         # add filter for converting font icon name to character
         self.environment.filters["icon"] = self.convert_icon
@@ -199,6 +231,87 @@ class TextGenerator:
         """
         return LINK_TYPE_NAMES[link_type]
 
+    def render(self, what, info):
+        """Render a template within the time budget
+
+        The duration of the rendering is recorded. If the budget is exceeded,
+        or if the sandbox rejects the template, the template is replaced by
+        the default one.
+
+        Args:
+            what (str): kind of template to render, either "idle" or
+                "transition".
+            info (dict): data passed to the template.
+
+        Returns:
+            str: rendered text.
+
+        Raises:
+            TemplateRenderTimeoutError: if the rendering exceeds the time
+                budget.
+            TemplateRenderError: if the sandbox rejects the template.
+        """
+        template = getattr(self, "{}_template".format(what))
+        start = monotonic()
+
+        try:
+            with self.environment.budget(self.render_timeout):
+                return template.render(info)
+
+        except TemplateRenderTimeoutError as error:
+            logger.warning(
+                "Rendering %s template '%s' took too long, using default template",
+                what,
+                template.name,
+            )
+            self.fallback_template(what)
+
+            raise TemplateRenderTimeoutError(
+                "Rendering {} template '{}' exceeded {} s".format(
+                    what, template.name, self.render_timeout
+                )
+            ) from error
+
+        except (OverflowError, SecurityError) as error:
+            logger.warning(
+                "Rendering %s template '%s' failed, using default template",
+                what,
+                template.name,
+            )
+            self.fallback_template(what)
+
+            raise TemplateRenderError(
+                "Rendering {} template '{}' failed: {}".format(
+                    what, template.name, error
+                )
+            ) from error
+
+        finally:
+            duration = monotonic() - start
+            self.render_durations[template.name] = duration
+            logger.debug(
+                "Rendered %s template '%s' in %.3f s", what, template.name, duration
+            )
+
+    def fallback_template(self, what):
+        """Replace a template by the default one
+
+        Args:
+            what (str): kind of template to replace, either "idle" or
+                "transition".
+        """
+        _, loader_default = self.environment.loader.loaders
+        default_names = {
+            "idle": IDLE_TEMPLATE_NAME,
+            "transition": TRANSITION_TEMPLATE_NAME,
+        }
+
+        setattr(
+            self,
+            "{}_template".format(what),
+            loader_default.load(self.environment, default_names[what]),
+        )
+
     def create_idle_text(self, info):
         """Create custom idle text and save it
 
@@ -208,24 +321,171 @@ class TextGenerator:
         Returns:
             str: text containing the idle screen content.
         """
-        return self.idle_template.render(**info)
+        return self.render("idle", info)
 
     def create_transition_text(self, playlist_entry, fade_in=True):
         """Create custom transition text and save it
 
         Args:
-            playlist_entry (dict): dictionary containing keys for the playlist
-                entry.
+            playlist_entry (dakara_player.playlist_entry.PlaylistEntry):
+                playlist entry object.
             fade_in: text will appear with fade-in effect
 
         Returns:
             str: text containing the transition screen content.
         """
-        info = playlist_entry
-        info["fade_in"] = fade_in
-        return self.transition_template.render(info)
+        return self.render("transition", playlist_entry.get_context(fade_in=fade_in))
+
+
+class BudgetedSandboxedEnvironment(SandboxedEnvironment):
+    """Sandboxed Jinja environment with a time budget for rendering
+
+    The budget is checked each time a template accesses an attribute or an
+    item, calls a function, performs an arithmetic operation or iterates in a
+    loop. Repetitions and powers creating a result larger than
+    `MAX_RESULT_LENGTH` items or `MAX_RESULT_BITS` bits are refused, so that a
+    single operation cannot exceed the budget. Budgets are local to each
+    thread.
+
+    The budget is cooperative: a filter or a function called by the template
+    is not interrupted, it is only checked before and after the call.
+
+    >>> environment = BudgetedSandboxedEnvironment()
+    >>> with environment.budget(1):
+    ...     environment.from_string("{{ 1 + 1 }}").render()
+    '2'
+
+    Attributes:
+        deadline (threading.local): thread local storage of the deadline of
+            the current rendering.
+    """
+
+    intercepted_binops = frozenset(["+", "-", "*", "/", "//", "%", "**"])
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.deadline = local()
+        self.globals["range"] = self.budgeted_range
+
+    @contextmanager
+    def budget(self, timeout):
+        """Context manager to set the time budget of renderings
+
+        Args:
+            timeout (float): time budget in seconds. If None, there is no
+                budget.
+        """
+        self.deadline.value = monotonic() + timeout if timeout is not None else None
+
+        try:
+            yield
+
+        finally:
+            self.deadline.value = None
+
+    def check_budget(self):
+        """Check the time budget is not exceeded
+
+        Raises:
+            TemplateRenderTimeoutError: if the budget is exceeded.
+        """
+        deadline = getattr(self.deadline, "value", None)
+        if deadline is not None and monotonic() > deadline:
+            raise TemplateRenderTimeoutError("Template rendering took too long")
+
+    def budgeted_range(self, *args):
+        """Safe range that checks the time budget on each iteration
+        """
+        return self.budgeted_iter(safe_range(*args))
+
+    def budgeted_iter(self, iterable):
+        """Iterate and check the time budget on each iteration
+
+        Args:
+            iterable (iterable): object to iterate over.
+        """
+        for value in iterable:
+            self.check_budget()
+            yield value
+
+    def _parse(self, source, name, filename):
+        """Parse the template and make its loops check the time budget
+        """
+        template = super()._parse(source, name, filename)
+        for node in template.find_all(nodes.For):
+            node.iter = nodes.Call(
+                nodes.EnvironmentAttribute("budgeted_iter"),
+                [node.iter],
+                [],
+                None,
+                None,
+                lineno=node.lineno,
+            )
+
+        return template
+
+    def getattr(self, obj, attribute):
+        self.check_budget()
+        return super().getattr(obj, attribute)
+
+    def getitem(self, obj, argument):
+        self.check_budget()
+        return super().getitem(obj, argument)
+
+    def call(__self, __context, __obj, *args, **kwargs):
+        __self.check_budget()
+        return super().call(__context, __obj, *args, **kwargs)
+
+    def call_binop(self, context, operator, left, right):
+        self.check_budget()
+        check_result_size(operator, left, right)
+        result = super().call_binop(context, operator, left, right)
+        self.check_budget()
+
+        return result
+
+
+def check_result_size(operator, left, right):
+    """Check an operation does not create a too large result
+
+    Args:
+        operator (str): operator of the operation.
+        left (any): left operand.
+        right (any): right operand.
+
+    Raises:
+        TemplateRenderTimeoutError: if the result would have more than
+            `MAX_RESULT_LENGTH` items or more than `MAX_RESULT_BITS` bits.
+    """
+    if operator == "*":
+        for sequence, times in ((left, right), (right, left)):
+            if (
+                isinstance(sequence, (str, bytes, list, tuple))
+                and isinstance(times, int)
+                and len(sequence) * times > MAX_RESULT_LENGTH
+            ):
+                raise TemplateRenderTimeoutError("Template operation result too large")
+
+    if (
+        operator == "**"
+        and isinstance(left, int)
+        and isinstance(right, int)
+        and abs(left) > 1
+        and left.bit_length() * right > MAX_RESULT_BITS
+    ):
+        raise TemplateRenderTimeoutError("Template operation result too large")
 
 
 class TemplateNotFoundError(DakaraError, FileNotFoundError):
     """Error raised when a template cannot be found
     """
+
+
+class TemplateRenderError(DakaraError):
+    """Error raised when a template cannot be rendered
+    """
+
+
+class TemplateRenderTimeoutError(TemplateRenderError):
+    """Error raised when a template takes too long to render
+    """
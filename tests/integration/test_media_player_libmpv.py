@@ -0,0 +1,17 @@
+from unittest import skipUnless
+
+from dakara_player.media_player.libmpv import MediaPlayerLibmpv
+from tests.integration import test_media_player_mpv
+
+
+@skipUnless(MediaPlayerLibmpv.is_available(), "libmpv is not installed")
+class MediaPlayerLibmpvIntegrationTestCase(
+    test_media_player_mpv.MediaPlayerMpvIntegrationTestCase
+):
+    """Test the libmpv player class in real conditions
+
+    The tests of the mpv player class are run with libmpv. The mpv class is
+    accessed through its module, so that its tests are not collected twice.
+    """
+
+    player_class = MediaPlayerLibmpv
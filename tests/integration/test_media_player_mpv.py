@@ -15,6 +15,7 @@ from dakara_player.media_player.base import (
     TRANSITION_BG_NAME,
     TRANSITION_TEXT_NAME,
 )
+from dakara_player.playlist_entry import PlaylistEntry
 from dakara_player.resources_manager import get_background
 from tests.integration.base import TestCasePoller
 
@@ -26,6 +27,8 @@ class MediaPlayerMpvIntegrationTestCase(TestCasePoller):
     TIMEOUT = 30
     DELAY = 0.2
 
+    player_class = MediaPlayerMpv
+
     def setUp(self):
         # create fullscreen flag
         self.fullscreen = True
@@ -54,19 +57,25 @@ class MediaPlayerMpvIntegrationTestCase(TestCasePoller):
         self.song2_file_path = get_file("tests.resources", "song2.mkv")
 
         # create playlist entry
-        self.playlist_entry = {
-            "id": 42,
-            "song": {"title": "Song 1", "file_path": self.song_file_path},
-            "owner": "me",
-            "use_instrumental": False,
-        }
-
-        self.playlist_entry2 = {
-            "id": 43,
-            "song": {"title": "Song 2", "file_path": self.song2_file_path},
-            "owner": "me",
-            "use_instrumental": False,
-        }
+        self.playlist_entry = PlaylistEntry.from_dict(
+            {
+                "id": 42,
+                "song": {"title": "Song 1", "file_path": self.song_file_path},
+                "owner": "me",
+                "use_instrumental": False,
+            },
+            self.kara_folder,
+        )
+
+        self.playlist_entry2 = PlaylistEntry.from_dict(
+            {
+                "id": 43,
+                "song": {"title": "Song 2", "file_path": self.song2_file_path},
+                "owner": "me",
+                "use_instrumental": False,
+            },
+            self.kara_folder,
+        )
 
     @contextmanager
     def get_instance(self, config=None):
@@ -94,7 +103,7 @@ class MediaPlayerMpvIntegrationTestCase(TestCasePoller):
         with ExitStack() as stack:
             temp = Path(stack.enter_context(TemporaryDirectory()))
             mpv_player = stack.enter_context(
-                MediaPlayerMpv(Event(), Queue(), config, temp, warn_long_exit=False)
+                self.player_class(Event(), Queue(), config, temp, warn_long_exit=False)
             )
             output = stack.enter_context(
                 self.assertLogs("dakara_player.media_player.mpv", "DEBUG")
@@ -140,6 +149,9 @@ class MediaPlayerMpvIntegrationTestCase(TestCasePoller):
             # set playlist entry
             mpv_player.set_playlist_entry(self.playlist_entry, autoplay=False)
 
+            # wait for the playlist entry to be prepared
+            self.assertTrue(mpv_player.wait_preparation())
+
             # check memory
             self.assertEqual(
                 mpv_player.playlist_entry_data["transition"].path,
@@ -175,7 +187,7 @@ class MediaPlayerMpvIntegrationTestCase(TestCasePoller):
 
             # assert the started transition callback has been called
             mpv_player.callbacks["started_transition"].assert_called_with(
-                self.playlist_entry["id"]
+                self.playlist_entry.id
             )
 
             # wait for the media to start
@@ -190,7 +202,7 @@ class MediaPlayerMpvIntegrationTestCase(TestCasePoller):
 
             # assert the started song callback has been called
             mpv_player.callbacks["started_song"].assert_called_with(
-                self.playlist_entry["id"]
+                self.playlist_entry.id
             )
 
     @func_set_timeout(TIMEOUT)
@@ -198,7 +210,9 @@ class MediaPlayerMpvIntegrationTestCase(TestCasePoller):
         """Test to play a playlist entry using instrumental track
         """
         # request to use instrumental track
-        self.playlist_entry["use_instrumental"] = True
+        self.playlist_entry = PlaylistEntry.from_dict(
+            {**self.playlist_entry.data, "use_instrumental": True}, self.kara_folder
+        )
 
         with self.get_instance() as (mpv_player, _, _):
             # mock the callbacks
@@ -227,7 +241,7 @@ class MediaPlayerMpvIntegrationTestCase(TestCasePoller):
 
             # assert the started song callback has been called
             mpv_player.callbacks["started_song"].assert_called_with(
-                self.playlist_entry["id"]
+                self.playlist_entry.id
             )
 
     @func_set_timeout(TIMEOUT)
@@ -235,8 +249,17 @@ class MediaPlayerMpvIntegrationTestCase(TestCasePoller):
         """Test to play a playlist entry using instrumental file
         """
         # request to use instrumental file
-        self.playlist_entry["song"]["file_path"] = self.song2_file_path
-        self.playlist_entry["use_instrumental"] = True
+        self.playlist_entry = PlaylistEntry.from_dict(
+            {
+                **self.playlist_entry.data,
+                "song": {
+                    **self.playlist_entry.data["song"],
+                    "file_path": self.song2_file_path,
+                },
+                "use_instrumental": True,
+            },
+            self.kara_folder,
+        )
 
         with self.get_instance() as (mpv_player, _, _):
             # mock the callbacks
@@ -262,7 +285,7 @@ class MediaPlayerMpvIntegrationTestCase(TestCasePoller):
 
             # assert the started song callback has been called
             mpv_player.callbacks["started_song"].assert_called_with(
-                self.playlist_entry["id"]
+                self.playlist_entry.id
             )
 
     @func_set_timeout(TIMEOUT)
@@ -289,7 +312,7 @@ class MediaPlayerMpvIntegrationTestCase(TestCasePoller):
 
             # assert the callback
             mpv_player.callbacks["paused"].assert_called_with(
-                self.playlist_entry["id"], timing
+                self.playlist_entry.id, timing
             )
             mpv_player.callbacks["resumed"].assert_not_called()
 
@@ -307,7 +330,7 @@ class MediaPlayerMpvIntegrationTestCase(TestCasePoller):
             # assert the callback
             mpv_player.callbacks["paused"].assert_not_called()
             mpv_player.callbacks["resumed"].assert_called_with(
-                self.playlist_entry["id"],
+                self.playlist_entry.id,
                 timing,  # on a slow computer, the timing may be inaccurate
             )
 
@@ -406,9 +429,7 @@ class MediaPlayerMpvIntegrationTestCase(TestCasePoller):
 
             # check the song is stopped accordingly
             self.assertIsNone(mpv_player.playlist_entry)
-            mpv_player.callbacks["finished"].assert_called_with(
-                self.playlist_entry["id"]
-            )
+            mpv_player.callbacks["finished"].assert_called_with(self.playlist_entry.id)
 
             # request second playlist entry to play
             mpv_player.set_playlist_entry(self.playlist_entry2)
@@ -447,9 +468,7 @@ class MediaPlayerMpvIntegrationTestCase(TestCasePoller):
             mpv_player.skip()
 
             # check the song is stopped accordingly
-            mpv_player.callbacks["finished"].assert_called_with(
-                self.playlist_entry["id"]
-            )
+            mpv_player.callbacks["finished"].assert_called_with(self.playlist_entry.id)
 
             # request second playlist entry to play
             mpv_player.set_playlist_entry(self.playlist_entry2)
@@ -16,6 +16,7 @@ from dakara_player.media_player.base import (
     IDLE_BG_NAME,
     TRANSITION_BG_NAME,
 )
+from dakara_player.playlist_entry import PlaylistEntry
 from dakara_player.resources_manager import get_background
 from tests.integration.base import TestCasePoller
 
@@ -60,19 +61,25 @@ class MediaPlayerVlcIntegrationTestCase(TestCasePoller):
         self.song2_file_path = get_file("tests.resources", "song2.mkv")
 
         # create playlist entry
-        self.playlist_entry = {
-            "id": 42,
-            "song": {"title": "Song 1", "file_path": self.song_file_path},
-            "owner": "me",
-            "use_instrumental": False,
-        }
-
-        self.playlist_entry2 = {
-            "id": 43,
-            "song": {"title": "Song 2", "file_path": self.song2_file_path},
-            "owner": "me",
-            "use_instrumental": False,
-        }
+        self.playlist_entry = PlaylistEntry.from_dict(
+            {
+                "id": 42,
+                "song": {"title": "Song 1", "file_path": self.song_file_path},
+                "owner": "me",
+                "use_instrumental": False,
+            },
+            self.kara_folder,
+        )
+
+        self.playlist_entry2 = PlaylistEntry.from_dict(
+            {
+                "id": 43,
+                "song": {"title": "Song 2", "file_path": self.song2_file_path},
+                "owner": "me",
+                "use_instrumental": False,
+            },
+            self.kara_folder,
+        )
 
     @contextmanager
     def get_instance(self, config=None):
@@ -158,9 +165,11 @@ class MediaPlayerVlcIntegrationTestCase(TestCasePoller):
             # call the method
             vlc_player.set_playlist_entry(self.playlist_entry, autoplay=False)
 
+            # wait for the playlist entry to be prepared
+            self.assertTrue(vlc_player.wait_preparation())
+
             # check media did not started
-            self.assertFalse(vlc_player.playlist_entry_data["transition"].started)
-            self.assertFalse(vlc_player.playlist_entry_data["song"].started)
+            self.assertIsNone(vlc_player.state)
 
             # start playing
             vlc_player.play("transition")
@@ -173,8 +182,7 @@ class MediaPlayerVlcIntegrationTestCase(TestCasePoller):
             self.assertIsNotNone(vlc_player.playlist_entry)
 
             # check transition media only started
-            self.assertTrue(vlc_player.playlist_entry_data["transition"].started)
-            self.assertFalse(vlc_player.playlist_entry_data["song"].started)
+            self.assertEqual(vlc_player.state, "transition")
 
             # check media exists
             media = vlc_player.player.get_media()
@@ -193,7 +201,7 @@ class MediaPlayerVlcIntegrationTestCase(TestCasePoller):
 
             # assert the started transition callback has been called
             vlc_player.callbacks["started_transition"].assert_called_with(
-                self.playlist_entry["id"]
+                self.playlist_entry.id
             )
 
             # wait for the media to start
@@ -203,8 +211,8 @@ class MediaPlayerVlcIntegrationTestCase(TestCasePoller):
             self.assertEqual(vlc_player.player.get_state(), vlc.State.Playing)
 
             # check song media also started
-            self.assertTrue(vlc_player.playlist_entry_data["transition"].started)
-            self.assertTrue(vlc_player.playlist_entry_data["song"].started)
+            self.assertTrue(vlc_player.states["transition"].has_finished())
+            self.assertEqual(vlc_player.state, "song")
 
             # check media exists
             media = vlc_player.player.get_media()
@@ -220,7 +228,7 @@ class MediaPlayerVlcIntegrationTestCase(TestCasePoller):
 
             # assert the started song callback has been called
             vlc_player.callbacks["started_song"].assert_called_with(
-                self.playlist_entry["id"]
+                self.playlist_entry.id
             )
 
     @func_set_timeout(TIMEOUT)
@@ -228,7 +236,9 @@ class MediaPlayerVlcIntegrationTestCase(TestCasePoller):
         """Test to play a playlist entry using instrumental track
         """
         # request to use instrumental track
-        self.playlist_entry["use_instrumental"] = True
+        self.playlist_entry = PlaylistEntry.from_dict(
+            {**self.playlist_entry.data, "use_instrumental": True}, self.kara_folder
+        )
 
         with self.get_instance() as (vlc_player, _, _):
             # mock the callbacks
@@ -263,7 +273,7 @@ class MediaPlayerVlcIntegrationTestCase(TestCasePoller):
 
             # assert the started song callback has been called
             vlc_player.callbacks["started_song"].assert_called_with(
-                self.playlist_entry["id"]
+                self.playlist_entry.id
             )
 
     @skipIf(
@@ -274,8 +284,17 @@ class MediaPlayerVlcIntegrationTestCase(TestCasePoller):
         """Test to play a playlist entry using instrumental file
         """
         # request to use instrumental file
-        self.playlist_entry["song"]["file_path"] = self.song2_file_path
-        self.playlist_entry["use_instrumental"] = True
+        self.playlist_entry = PlaylistEntry.from_dict(
+            {
+                **self.playlist_entry.data,
+                "song": {
+                    **self.playlist_entry.data["song"],
+                    "file_path": self.song2_file_path,
+                },
+                "use_instrumental": True,
+            },
+            self.kara_folder,
+        )
 
         with self.get_instance() as (vlc_player, _, _):
             # mock the callbacks
@@ -310,7 +329,7 @@ class MediaPlayerVlcIntegrationTestCase(TestCasePoller):
 
             # assert the started song callback has been called
             vlc_player.callbacks["started_song"].assert_called_with(
-                self.playlist_entry["id"]
+                self.playlist_entry.id
             )
 
     @func_set_timeout(TIMEOUT)
@@ -337,7 +356,7 @@ class MediaPlayerVlcIntegrationTestCase(TestCasePoller):
 
             # assert the callback
             vlc_player.callbacks["paused"].assert_called_with(
-                self.playlist_entry["id"], timing
+                self.playlist_entry.id, timing
             )
             vlc_player.callbacks["resumed"].assert_not_called()
 
@@ -355,7 +374,7 @@ class MediaPlayerVlcIntegrationTestCase(TestCasePoller):
             # assert the callback
             vlc_player.callbacks["paused"].assert_not_called()
             vlc_player.callbacks["resumed"].assert_called_with(
-                self.playlist_entry["id"],
+                self.playlist_entry.id,
                 timing,  # on a slow computer, the timing may be inaccurate
             )
 
@@ -460,9 +479,7 @@ class MediaPlayerVlcIntegrationTestCase(TestCasePoller):
 
             # check the song is stopped accordingly
             self.assertIsNone(vlc_player.playlist_entry)
-            vlc_player.callbacks["finished"].assert_called_with(
-                self.playlist_entry["id"]
-            )
+            vlc_player.callbacks["finished"].assert_called_with(self.playlist_entry.id)
 
             # request second playlist entry to play
             vlc_player.set_playlist_entry(self.playlist_entry2)
@@ -507,9 +524,7 @@ class MediaPlayerVlcIntegrationTestCase(TestCasePoller):
             vlc_player.skip()
 
             # check the song is stopped accordingly
-            vlc_player.callbacks["finished"].assert_called_with(
-                self.playlist_entry["id"]
-            )
+            vlc_player.callbacks["finished"].assert_called_with(self.playlist_entry.id)
 
             # request second playlist entry to play
             vlc_player.set_playlist_entry(self.playlist_entry2)
@@ -1,12 +1,14 @@
 from unittest import TestCase
-from unittest.mock import call, patch
+from unittest.mock import MagicMock, call, patch
 
+from dakara_base.resources_manager import get_file
 from path import Path
 
 from dakara_player.background_loader import (
     BackgroundLoader,
     BackgroundNotFoundError,
 )
+from dakara_player.io_executor import IOTimeoutError
 
 
 class BackgroundLoaderTestCase(TestCase):
@@ -253,3 +255,54 @@ class BackgroundLoaderTestCase(TestCase):
 
         # assert the call of the mocked method
         mocked_exists.assert_called_with(Path("custom/background.png").normpath())
+
+    @patch("dakara_player.background_loader.exists", return_value=True, autospec=True)
+    def test_load_timeout(self, mocked_exists):
+        """Test to load a background from an unreachable custom directory
+        """
+        io_executor = MagicMock()
+        io_executor.call.side_effect = [IOTimeoutError("timeout"), True]
+        loader = BackgroundLoader(
+            directory=Path("custom"),
+            default_directory=Path("default"),
+            default_background_filenames={"background": "background.png"},
+            io_executor=io_executor,
+        )
+
+        # load the backgrounds
+        with self.assertLogs("dakara_player.background_loader", "DEBUG") as logger:
+            loader.load()
+
+        # assert the backgrounds
+        self.assertDictEqual(
+            loader.backgrounds,
+            {"background": Path("default/background.png").normpath()},
+        )
+
+        # assert the calls
+        io_executor.call.assert_has_calls(
+            [
+                call(mocked_exists, Path("custom/background.png").normpath()),
+                call(mocked_exists, Path("default/background.png").normpath()),
+            ]
+        )
+
+        # assert the logs
+        self.assertIn(
+            "WARNING:dakara_player.background_loader:"
+            "Unable to check background file: timeout",
+            logger.output,
+        )
+
+    def test_is_video(self):
+        """Test to detect a video background
+        """
+        loader = BackgroundLoader(
+            default_directory=get_file("tests.resources", ""),
+            default_background_filenames={"idle": "idle.png", "song": "song.mkv"},
+        )
+        loader.load()
+
+        # assert the detection
+        self.assertFalse(loader.is_video("idle"))
+        self.assertTrue(loader.is_video("song"))
@@ -0,0 +1,139 @@
+import json
+from unittest import TestCase
+from unittest.mock import patch
+
+from path import Path, TempDir
+
+from dakara_player.checkpoint import Checkpoint
+from dakara_player.playlist_entry import PlaylistEntry
+
+
+class CheckpointTestCase(TestCase):
+    """Test the checkpoint of the song being played
+    """
+
+    def setUp(self):
+        # create a temporary directory
+        self.tempdir = TempDir()
+        self.path = self.tempdir / "checkpoint.json"
+
+        # create a playlist entry
+        self.playlist_entry = PlaylistEntry.from_dict(
+            {"id": 42, "song": {"title": "Song title", "file_path": "song.mkv"}},
+            Path("kara"),
+        )
+
+    def tearDown(self):
+        self.tempdir.rmtree()
+
+    def test_save_load(self):
+        """Test to save and load a checkpoint
+        """
+        checkpoint = Checkpoint(self.path)
+
+        # call the methods
+        checkpoint.save(self.playlist_entry, 12.5)
+        loaded = checkpoint.load(Path("kara"))
+
+        # assert the result
+        playlist_entry, position = loaded
+        self.assertEqual(playlist_entry.id, 42)
+        self.assertEqual(playlist_entry.file_path, Path("kara") / "song.mkv")
+        self.assertEqual(position, 12.5)
+        self.assertListEqual(self.tempdir.listdir(), [self.path])
+
+    @patch("dakara_player.checkpoint.monotonic")
+    def test_save_throttled(self, mocked_monotonic):
+        """Test saves of the same playlist entry are throttled
+        """
+        checkpoint = Checkpoint(self.path, interval=2)
+        mocked_monotonic.side_effect = [0, 1, 3]
+
+        # call the method
+        checkpoint.save(self.playlist_entry, 1)
+        checkpoint.save(self.playlist_entry, 2)
+        self.assertEqual(json.loads(self.path.text())["position"], 1)
+
+        checkpoint.save(self.playlist_entry, 3)
+        self.assertEqual(json.loads(self.path.text())["position"], 3)
+
+    @patch("dakara_player.checkpoint.time")
+    @patch("dakara_player.checkpoint.monotonic")
+    def test_save_unchanged(self, mocked_monotonic, mocked_time):
+        """Test saves of an unchanged position refresh the time of the checkpoint
+        """
+        checkpoint = Checkpoint(self.path, interval=2)
+        mocked_monotonic.side_effect = [0, 3]
+        mocked_time.side_effect = [100, 103]
+
+        # call the method
+        checkpoint.save(self.playlist_entry, 1)
+        checkpoint.save(self.playlist_entry, 1)
+
+        # assert the result
+        self.assertEqual(json.loads(self.path.text())["time"], 103)
+
+    @patch("dakara_player.checkpoint.time")
+    def test_load_too_old(self, mocked_time):
+        """Test an old checkpoint is not loaded
+        """
+        checkpoint = Checkpoint(self.path, max_age=60)
+        mocked_time.return_value = 1000
+        checkpoint.save(self.playlist_entry, 12.5)
+
+        # call the method
+        mocked_time.return_value = 1061
+        with self.assertLogs("dakara_player.checkpoint", "DEBUG"):
+            self.assertIsNone(checkpoint.load(Path("kara")))
+
+    def test_load_missing(self):
+        """Test to load a checkpoint that does not exist
+        """
+        self.assertIsNone(Checkpoint(self.path).load(Path("kara")))
+
+    def test_load_invalid(self):
+        """Test to load an invalid checkpoint
+        """
+        self.path.write_text("{")
+
+        # call the method
+        with self.assertLogs("dakara_player.checkpoint", "DEBUG") as logger:
+            self.assertIsNone(Checkpoint(self.path).load(Path("kara")))
+
+        # assert the logs
+        self.assertEqual(len(logger.output), 1)
+        self.assertIn("Unable to read checkpoint", logger.output[0])
+
+    def test_load_invalid_playlist_entry(self):
+        """Test to load a checkpoint with an invalid playlist entry
+        """
+        self.path.write_text(
+            json.dumps(
+                {
+                    "playlist_entry": {"id": 42, "song": {"title": "Song title"}},
+                    "position": 12.5,
+                    "time": 0,
+                }
+            )
+        )
+
+        # call the method
+        with self.assertLogs("dakara_player.checkpoint", "DEBUG") as logger:
+            self.assertIsNone(Checkpoint(self.path).load(Path("kara")))
+
+        # assert the logs
+        self.assertEqual(len(logger.output), 1)
+        self.assertIn("Playlist entry 42 has no file path", logger.output[0])
+
+    def test_clear(self):
+        """Test to clear the checkpoint
+        """
+        checkpoint = Checkpoint(self.path)
+        checkpoint.save(self.playlist_entry, 12.5)
+
+        # call the method
+        checkpoint.clear()
+
+        # assert the effect
+        self.assertFalse(self.path.exists())
+        self.assertIsNone(checkpoint.load(Path("kara")))
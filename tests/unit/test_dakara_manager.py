@@ -1,7 +1,10 @@
 from unittest import TestCase
-from unittest.mock import MagicMock
+from unittest.mock import ANY, MagicMock
+
+from path import Path
 
 from dakara_player.dakara_manager import DakaraManager
+from dakara_player.playlist_entry import PlaylistEntry
 
 
 class DakaraManagerTestCase(TestCase):
@@ -39,17 +42,88 @@ class DakaraManagerTestCase(TestCase):
         self.media_player.play.assert_called_once_with("idle")
         self.media_player.set_playlist_entry.assert_not_called()
 
+    def test_update_idle_screen(self):
+        """Test to update the idle screen with the information of the server
+        """
+        # call the method
+        self.dakara_manager.update_idle_screen({"queue_length": 3})
+
+        # call assertions
+        self.media_player.update_idle_screen.assert_called_once_with(
+            connected=True, queue_length=3
+        )
+
+    def test_handle_connection_lost(self):
+        """Test the idle screen is played when the connection is lost
+        """
+        # call the method
+        self.dakara_manager.handle_connection_lost()
+
+        # call assertions
+        self.media_player.update_idle_screen.assert_called_once_with(connected=False)
+        self.media_player.play.assert_called_once_with("idle")
+
     def test_start_play_playlist_entry(self):
         """Test to launch the dakara manager when there is something to play
         """
-        playlist_entry = {"id": 42}
+        self.media_player.kara_folder_path = Path("kara")
+        playlist_entry = {"id": 42, "song": {"title": "Song", "file_path": "song"}}
 
         # call the methods and prevent to run as thread
         self.dakara_manager.play_playlist_entry(playlist_entry)
 
         # call assertions
         self.media_player.play.assert_not_called()
-        self.media_player.set_playlist_entry.assert_called_once_with(playlist_entry)
+        self.media_player.set_playlist_entry.assert_called_once_with(ANY)
+        (playlist_entry_parsed,), _ = self.media_player.set_playlist_entry.call_args
+        self.assertIsInstance(playlist_entry_parsed, PlaylistEntry)
+        self.assertEqual(playlist_entry_parsed.id, 42)
+        self.assertEqual(playlist_entry_parsed.file_path, Path("kara") / "song")
+
+    def test_start_play_playlist_entry_resumed(self):
+        """Test to launch the dakara manager when the entry is already playing
+        """
+        self.media_player.kara_folder_path = Path("kara")
+        self.media_player.playlist_entry.id = 42
+        self.media_player.is_playing_this.return_value = True
+        playlist_entry = {"id": 42, "song": {"title": "Song", "file_path": "song"}}
+
+        # call the methods and prevent to run as thread
+        with self.assertLogs("dakara_manager", "DEBUG") as logger:
+            self.dakara_manager.play_playlist_entry(playlist_entry)
+
+        # call assertions
+        self.media_player.is_playing_this.assert_called_with("song")
+        self.media_player.set_playlist_entry.assert_not_called()
+        self.dakara_server_http.update_started_transition.assert_called_with(42)
+        self.dakara_server_http.update_started_song.assert_called_with(42)
+        self.assertListEqual(
+            logger.output, ["INFO:dakara_manager:Playlist entry 42 is already playing"]
+        )
+
+    def test_start_play_playlist_entry_invalid(self):
+        """Test to launch the dakara manager with an invalid playlist entry
+        """
+        self.media_player.kara_folder_path = Path("kara")
+        playlist_entry = {"id": 42, "song": {"title": "Song"}}
+
+        # call the methods and prevent to run as thread
+        with self.assertLogs("dakara_manager", "DEBUG") as logger:
+            self.dakara_manager.play_playlist_entry(playlist_entry)
+
+        # call assertions
+        self.media_player.set_playlist_entry.assert_not_called()
+        self.dakara_server_http.create_player_error.assert_called_once_with(
+            42, "Playlist entry 42 has no file path"
+        )
+        self.dakara_server_http.update_could_not_play.assert_called_once_with(42)
+        self.assertListEqual(
+            logger.output,
+            [
+                "ERROR:dakara_manager:Invalid playlist entry: "
+                "Playlist entry 42 has no file path"
+            ],
+        )
 
     def test_handle_error(self):
         """Test the callback called on error
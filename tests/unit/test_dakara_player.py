@@ -1,15 +1,17 @@
 from copy import deepcopy
 from queue import Queue
-from threading import Event
+from threading import Event, Timer
 from unittest import TestCase
-from unittest.mock import ANY, patch
+from unittest.mock import ANY, MagicMock, patch
 
 from dakara_player.dakara_player import (
     DakaraPlayer,
+    DakaraRoomsWorker,
     DakaraWorker,
     UnsupportedMediaPlayerError,
 )
 from dakara_player.media_player.vlc import MediaPlayerVlc
+from dakara_player.media_player.libmpv import MediaPlayerLibmpv
 from dakara_player.media_player.mpv import MediaPlayerMpv
 
 
@@ -78,6 +80,19 @@ class DakaraWorkerTestCase(TestCase):
 
         self.assertIs(media_player_class, MediaPlayerMpv)
 
+    def test_get_media_player_class_libmpv(self):
+        """Test to get libmpv as media player
+        """
+        stop = Event()
+        errors = Queue()
+        config = deepcopy(CONFIG)
+        config["player"]["player_name"] = "libmpv"
+
+        worker = DakaraWorker(stop, errors, config)
+        media_player_class = worker.get_media_player_class()
+
+        self.assertIs(media_player_class, MediaPlayerLibmpv)
+
     def test_get_media_player_class_default(self):
         """Test to get the default media player
         """
@@ -155,8 +170,11 @@ class DakaraWorkerTestCase(TestCase):
         mocked_temporary_directory_class.assert_called_with(suffix=".dakara")
         mocked_font_loader_class.assert_called_with()
         mocked_font_loader.load.assert_called_with()
-        mocked_vlc_player_class.assert_called_with(stop, errors, CONFIG["player"], ANY)
+        mocked_vlc_player_class.assert_called_with(
+            stop, errors, CONFIG["player"], ANY, resources=None
+        )
         mocked_vlc_player.load.assert_called_with()
+        mocked_vlc_player.resume_checkpoint.assert_called_with()
         mocked_dakara_server_http_class.assert_called_with(
             CONFIG["server"], endpoint_prefix="api/", mute_raise=True
         )
@@ -177,6 +195,195 @@ class DakaraWorkerTestCase(TestCase):
         )
         mocked_dakara_server_websocket.timer.start.assert_called_with()
 
+    @patch("dakara_player.dakara_player.TemporaryDirectory", autospec=True)
+    @patch("dakara_player.dakara_player.FontLoader", autospec=True)
+    @patch("dakara_player.dakara_player.MediaPlayerHost", autospec=True)
+    @patch("dakara_player.dakara_player.MediaPlayerVlc", autospec=True)
+    @patch("dakara_player.dakara_player.DakaraServerHTTPConnection", autospec=True)
+    @patch(
+        "dakara_player.dakara_player.DakaraServerWebSocketConnection", autospec=True,
+    )
+    @patch("dakara_player.dakara_player.DakaraManager", autospec=True)
+    def test_run_separate_process(
+        self,
+        mocked_dakara_manager_class,
+        mocked_dakara_server_websocket_class,
+        mocked_dakara_server_http_class,
+        mocked_vlc_player_class,
+        mocked_media_player_host_class,
+        mocked_font_loader_class,
+        mocked_temporary_directory_class,
+    ):
+        """Test a dummy run with the media player in a separate process
+        """
+        # create mock instances
+        mocked_media_player_host = (
+            mocked_media_player_host_class.return_value.__enter__.return_value
+        )
+
+        # create safe worker control objects
+        stop = Event()
+        errors = Queue()
+
+        # create Dakara worker
+        config = dict(CONFIG, player=dict(CONFIG["player"], separate_process=True))
+        dakara_worker = DakaraWorker(stop, errors, config)
+
+        # set the stop event
+        stop.set()
+
+        # call the method
+        with patch.dict(
+            "dakara_player.dakara_player.MEDIA_PLAYER_CLASSES",
+            {"vlc": mocked_vlc_player_class},
+        ):
+            dakara_worker.run()
+
+        # assert the call
+        mocked_vlc_player_class.assert_not_called()
+        mocked_media_player_host_class.assert_called_with(
+            stop, errors, config["player"], ANY, mocked_vlc_player_class
+        )
+        mocked_media_player_host.load.assert_called_with()
+        mocked_media_player_host.resume_checkpoint.assert_called_with()
+        mocked_dakara_manager_class.assert_called_with(
+            mocked_font_loader_class.return_value.__enter__.return_value,
+            mocked_media_player_host,
+            mocked_dakara_server_http_class.return_value,
+            mocked_dakara_server_websocket_class.return_value.__enter__.return_value,
+        )
+
+
+@patch("dakara_player.dakara_player.ROOM_CHECK_INTERVAL", 0.01)
+@patch("dakara_player.dakara_player.SharedResources", autospec=True)
+@patch("dakara_player.dakara_player.FontLoader", autospec=True)
+@patch("dakara_player.dakara_player.DakaraWorker", autospec=True)
+class DakaraRoomsWorkerTestCase(TestCase):
+    """Test the `DakaraRoomsWorker` class
+    """
+
+    def setUp(self):
+        # create config with two rooms
+        self.config = dict(
+            CONFIG,
+            rooms=[
+                {"name": "room1", "server": {"login": "room1"}},
+                {"name": "room2", "server": {"login": "room2"}},
+            ],
+        )
+
+    def get_rooms(self, mocked_dakara_worker_class, failed=()):
+        """Create the mocked workers of the rooms
+
+        Args:
+            mocked_dakara_worker_class (unittest.mock.MagicMock): mocked class
+                of the workers.
+            failed (list of str): names of the rooms which fail at start.
+
+        Returns:
+            list of unittest.mock.MagicMock: workers of each room.
+        """
+        rooms = []
+
+        def create_room(stop, errors, config, resources, name):
+            room = MagicMock()
+            room.errors = errors
+            room.__enter__.return_value = room
+            if name in failed:
+                errors.put((ValueError, ValueError("error"), None))
+
+            rooms.append(room)
+            return room
+
+        mocked_dakara_worker_class.side_effect = create_room
+        return rooms
+
+    def test_run(
+        self,
+        mocked_dakara_worker_class,
+        mocked_font_loader_class,
+        mocked_shared_resources_class,
+    ):
+        """Test to run two rooms
+        """
+        rooms = self.get_rooms(mocked_dakara_worker_class)
+        stop = Event()
+        errors = Queue()
+        dakara_worker = DakaraRoomsWorker(stop, errors, self.config)
+        stop.set()
+
+        # call the method
+        with self.assertLogs("dakara_player.dakara_player", "INFO") as logger:
+            dakara_worker.run()
+
+        # assert the calls
+        mocked_font_loader = (
+            mocked_font_loader_class.return_value.__enter__.return_value
+        )
+        mocked_font_loader.load.assert_called_with()
+        mocked_shared_resources_class.assert_called_with(mocked_font_loader)
+        resources = mocked_shared_resources_class.return_value
+        mocked_dakara_worker_class.assert_any_call(ANY, ANY, ANY, resources, "room1")
+        mocked_dakara_worker_class.assert_any_call(ANY, ANY, ANY, resources, "room2")
+        self.assertEqual(len(rooms), 2)
+        for room in rooms:
+            room.thread.start.assert_called_with()
+            room.__exit__.assert_called_once()
+
+        # assert the effect on logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "INFO:dakara_player.dakara_player:Started room room1",
+                "INFO:dakara_player.dakara_player:Started room room2",
+            ],
+        )
+
+    def test_run_room_failed(
+        self,
+        mocked_dakara_worker_class,
+        mocked_font_loader_class,
+        mocked_shared_resources_class,
+    ):
+        """Test a room failing does not stop the other one
+        """
+        self.get_rooms(mocked_dakara_worker_class, failed=["room1"])
+        stop = Event()
+        errors = Queue()
+        dakara_worker = DakaraRoomsWorker(stop, errors, self.config)
+        timer = Timer(0.1, stop.set)
+        timer.start()
+
+        # call the method
+        with self.assertLogs("dakara_player.dakara_player", "ERROR") as logger:
+            dakara_worker.run()
+
+        timer.join()
+
+        # assert the effect on logs
+        self.assertListEqual(
+            logger.output,
+            ["ERROR:dakara_player.dakara_player:Room room1 has stopped: error"],
+        )
+
+    def test_run_all_rooms_failed(
+        self,
+        mocked_dakara_worker_class,
+        mocked_font_loader_class,
+        mocked_shared_resources_class,
+    ):
+        """Test the worker stops when all the rooms have failed
+        """
+        self.get_rooms(mocked_dakara_worker_class, failed=["room1", "room2"])
+        stop = Event()
+        errors = Queue()
+        dakara_worker = DakaraRoomsWorker(stop, errors, self.config)
+
+        # call the method
+        with self.assertRaisesRegex(ValueError, "error"):
+            with self.assertLogs("dakara_player.dakara_player", "ERROR"):
+                dakara_worker.run()
+
 
 class DakaraPlayerTestCase(TestCase):
     """Test the `DakaraPlayer` class
@@ -212,3 +419,14 @@ class DakaraPlayerTestCase(TestCase):
 
         # assert the call
         mocked_run_safe.assert_called_with(DakaraWorker, CONFIG)
+
+    @patch.object(DakaraPlayer, "run_safe")
+    def test_run_rooms(self, mocked_run_safe):
+        """Test a dummy run with several rooms
+        """
+        config = dict(CONFIG, rooms=[{"name": "room1"}, {"name": "room2"}])
+        dakara_player = DakaraPlayer(config)
+        dakara_player.run()
+
+        # assert the call
+        mocked_run_safe.assert_called_with(DakaraRoomsWorker, config)
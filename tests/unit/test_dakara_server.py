@@ -378,6 +378,23 @@ class DakaraServerWebSocketConnectionTestCase(TestCase):
         # assert the call
         mocked_idle_callback.assert_called_once_with()
 
+    def test_receive_idle_info(self):
+        """Test the receive idle event method with extra information
+        """
+        # mock the callbacks
+        mocked_idle_callback = MagicMock()
+        mocked_idle_info_callback = MagicMock()
+        self.dakara_server.set_callback("idle", mocked_idle_callback)
+        self.dakara_server.set_callback("idle_info", mocked_idle_info_callback)
+
+        # call the method
+        with self.assertLogs("dakara_player.dakara_server", "DEBUG"):
+            self.dakara_server.receive_idle({"queue_length": 3})
+
+        # assert the call
+        mocked_idle_info_callback.assert_called_once_with({"queue_length": 3})
+        mocked_idle_callback.assert_called_once_with()
+
     def test_receive_playlist_entry(self):
         """Test the receive new playlist entry event method
         """
@@ -0,0 +1,320 @@
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+import yaml
+from path import Path
+
+from dakara_player import decoder_probe
+from dakara_player.decoder_probe import (
+    DecoderProbeError,
+    ProbeResult,
+    get_sample_path,
+    probe_decoders,
+    probe_mpv,
+    probe_vlc,
+    select_result,
+    write_setting,
+)
+
+
+class ProbeResultTestCase(TestCase):
+    """Test the result of a probe
+    """
+
+    def test_works(self):
+        """Test a result with decoded frames works
+        """
+        result = ProbeResult("no")
+        result.frames = 50
+        result.elapsed = 0.5
+
+        self.assertTrue(result.works)
+        self.assertEqual(result.fps, 100)
+        self.assertEqual(str(result), "no: 100.0 fps, 0 frames dropped")
+
+    def test_not_works(self):
+        """Test a result without decoded frames does not work
+        """
+        result = ProbeResult("vaapi")
+
+        self.assertFalse(result.works)
+        self.assertEqual(str(result), "vaapi: not working (no frame decoded)")
+
+
+class GetSamplePathTestCase(TestCase):
+    """Test to get the sample to decode
+    """
+
+    def test_bundled(self):
+        """Test to get the bundled sample
+        """
+        self.assertTrue(get_sample_path().isfile())
+
+    def test_not_found(self):
+        """Test to get a sample that does not exist
+        """
+        with self.assertRaisesRegex(DecoderProbeError, "Sample file .* not found"):
+            get_sample_path("/no/video.mkv")
+
+
+@patch("dakara_player.decoder_probe.mpv")
+class ProbeMpvTestCase(TestCase):
+    """Test to probe the decoders of mpv
+    """
+
+    def create_player(self, mocked_mpv, hwdec_current):
+        """Create a mocked mpv that reaches the end of the file when played
+        """
+        mocked_player = mocked_mpv.MPV.return_value
+        mocked_player.estimated_frame_number = 100
+        mocked_player.frame_drop_count = 1
+        mocked_player.decoder_frame_drop_count = 2
+        mocked_player.hwdec_current = hwdec_current
+
+        def bind_property_observer(name, callback):
+            mocked_player.play.side_effect = lambda path: callback(name, True)
+
+        mocked_player.bind_property_observer.side_effect = bind_property_observer
+
+        return mocked_player
+
+    def test_software(self, mocked_mpv):
+        """Test to decode with the software decoder
+        """
+        mocked_player = self.create_player(mocked_mpv, "no")
+
+        # call the method
+        result = probe_mpv(Path("video.mkv"), "no")
+
+        # assert the result
+        self.assertTrue(result.works)
+        self.assertEqual(result.frames, 100)
+        self.assertEqual(result.dropped, 3)
+
+        # assert the calls
+        mocked_mpv.MPV.assert_called_with(
+            vo="null", ao="null", untimed=True, keep_open="yes", hwdec="no"
+        )
+        mocked_player.play.assert_called_with("video.mkv")
+        mocked_player.terminate.assert_called_with()
+
+    def test_segment(self, mocked_mpv):
+        """Test to decode a segment of the sample
+        """
+        self.create_player(mocked_mpv, "no")
+
+        # call the method
+        probe_mpv(Path("video.mkv"), "no", start=45, length=3)
+
+        # assert the calls
+        mocked_mpv.MPV.assert_called_with(
+            vo="null",
+            ao="null",
+            untimed=True,
+            keep_open="yes",
+            hwdec="no",
+            start=45,
+            length=3,
+        )
+
+    def test_fallback(self, mocked_mpv):
+        """Test a hardware decoder falling back to software does not work
+        """
+        self.create_player(mocked_mpv, "no")
+
+        # call the method
+        result = probe_mpv(Path("video.mkv"), "vaapi")
+
+        # assert the result
+        self.assertFalse(result.works)
+        self.assertEqual(result.error, "fell back to software decoding")
+
+
+@patch("dakara_player.decoder_probe.vlc")
+class ProbeVlcTestCase(TestCase):
+    """Test to probe the decoders of VLC
+    """
+
+    def test_decode(self, mocked_vlc):
+        """Test to decode the sample
+        """
+        mocked_instance = mocked_vlc.Instance.return_value
+        mocked_player = mocked_instance.media_player_new.return_value
+        mocked_media = mocked_instance.media_new_path.return_value
+        mocked_stats = mocked_vlc.MediaStats.return_value
+        mocked_stats.decoded_video = 100
+        mocked_stats.lost_pictures = 2
+
+        # end the file when played
+        callbacks = {}
+
+        def event_attach(event, callback):
+            callbacks[event] = callback
+
+        def play():
+            callbacks[mocked_vlc.EventType.MediaPlayerEndReached](None)
+
+        mocked_player.event_manager.return_value.event_attach.side_effect = event_attach
+        mocked_player.play.side_effect = play
+
+        # call the method
+        result = probe_vlc(Path("video.mkv"), "vaapi")
+
+        # assert the result
+        self.assertTrue(result.works)
+        self.assertEqual(result.frames, 100)
+        self.assertEqual(result.dropped, 2)
+
+        # assert the calls
+        mocked_media.add_options.assert_called_with("avcodec-hw=vaapi")
+        mocked_player.set_rate.assert_called_with(decoder_probe.PROBE_RATE)
+        mocked_media.get_stats.assert_called_with(mocked_stats)
+        mocked_instance.release.assert_called_with()
+
+    def test_segment(self, mocked_vlc):
+        """Test to decode a segment of the sample
+        """
+        mocked_instance = mocked_vlc.Instance.return_value
+        mocked_player = mocked_instance.media_player_new.return_value
+        mocked_media = mocked_instance.media_new_path.return_value
+
+        # end the file when played
+        callbacks = {}
+
+        def event_attach(event, callback):
+            callbacks[event] = callback
+
+        def play():
+            callbacks[mocked_vlc.EventType.MediaPlayerEndReached](None)
+
+        mocked_player.event_manager.return_value.event_attach.side_effect = event_attach
+        mocked_player.play.side_effect = play
+
+        # call the method
+        probe_vlc(Path("video.mkv"), "none", start=45, length=3)
+
+        # assert the calls
+        mocked_media.add_options.assert_any_call("start-time=45")
+        mocked_media.add_options.assert_any_call("stop-time=48")
+
+    def test_no_library(self, mocked_vlc):
+        """Test to decode when libvlc is not installed
+        """
+        mocked_vlc.Instance.side_effect = NameError("no function 'libvlc_new'")
+
+        # call the method
+        result = probe_vlc(Path("video.mkv"), "none")
+
+        # assert the result
+        self.assertEqual(result.error, "VLC is not installed")
+
+    def test_no_instance(self, mocked_vlc):
+        """Test to decode when VLC cannot start
+        """
+        mocked_vlc.Instance.return_value = None
+
+        # call the method
+        result = probe_vlc(Path("video.mkv"), "none")
+
+        # assert the result
+        self.assertEqual(result.error, "unable to start VLC")
+
+
+class ProbeDecodersTestCase(TestCase):
+    """Test to probe all the decoders
+    """
+
+    def test_probe(self):
+        """Test to probe each candidate
+        """
+        mocked_probe = MagicMock()
+
+        # call the function
+        with patch.dict(decoder_probe.PROBE_FUNCTIONS, {"vlc": mocked_probe}):
+            results = probe_decoders("VLC", Path("video.mkv"))
+
+        # assert the calls
+        self.assertEqual(len(results), len(decoder_probe.DECODER_CANDIDATES["vlc"]))
+        mocked_probe.assert_any_call(Path("video.mkv"), "none")
+
+    def test_unknown(self):
+        """Test to probe an unknown media player
+        """
+        with self.assertRaisesRegex(DecoderProbeError, "No media player for 'other'"):
+            probe_decoders("other", Path("video.mkv"))
+
+    def test_select_result(self):
+        """Test to select the best result
+        """
+        results = []
+        for setting, frames, dropped, elapsed in [
+            ("no", 100, 0, 2),
+            ("vaapi", 100, 0, 1),
+            ("vdpau", 100, 5, 0.5),
+            ("nvdec", 0, 0, 0),
+        ]:
+            result = ProbeResult(setting)
+            result.frames = frames
+            result.dropped = dropped
+            result.elapsed = elapsed
+            results.append(result)
+
+        self.assertEqual(select_result(results).setting, "vaapi")
+        self.assertIsNone(select_result(results[3:]))
+
+
+class WriteSettingTestCase(TestCase):
+    """Test to write the decoder setting in the config file
+    """
+
+    def setUp(self):
+        # create config file
+        self.tempdir = TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.config_path = Path(self.tempdir.name) / "player.yaml"
+        self.config_path.write_text(
+            "player:\n"
+            "  vlc:\n"
+            "    media_parameters:\n"
+            "      - avcodec-hw=any\n"
+            "      - file-caching=300\n"
+        )
+
+    def test_vlc(self):
+        """Test to write the setting of VLC
+        """
+        write_setting(self.config_path, "vlc", "none")
+
+        config = yaml.safe_load(self.config_path.text())
+        self.assertListEqual(
+            config["player"]["vlc"]["media_parameters"],
+            ["file-caching=300", "avcodec-hw=none"],
+        )
+        self.assertTrue((self.config_path + ".bak").isfile())
+
+    def test_mpv(self):
+        """Test to write the setting of mpv
+        """
+        write_setting(self.config_path, "mpv", "auto-safe")
+
+        config = yaml.safe_load(self.config_path.text())
+        self.assertDictEqual(config["player"]["mpv"], {"hwdec": "auto-safe"})
+
+    def test_empty(self):
+        """Test to write the setting in an empty config file
+        """
+        self.config_path.write_text("")
+
+        write_setting(self.config_path, "mpv", "auto-safe")
+
+        config = yaml.safe_load(self.config_path.text())
+        self.assertDictEqual(config, {"player": {"mpv": {"hwdec": "auto-safe"}}})
+
+    def test_invalid(self):
+        """Test to write the setting in a config file which is not a mapping
+        """
+        self.config_path.write_text("- player\n")
+
+        with self.assertRaisesRegex(DecoderProbeError, "Invalid config file"):
+            write_setting(self.config_path, "mpv", "auto-safe")
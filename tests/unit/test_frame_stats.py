@@ -0,0 +1,121 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from path import Path, TempDir
+
+from dakara_player.frame_stats import (
+    DegradationPolicy,
+    FrameStats,
+    append_frame_stats,
+)
+from dakara_player.playlist_entry import PlaylistEntry
+
+
+class FrameStatsTestCase(TestCase):
+    """Test the frame statistics of a playlist entry
+    """
+
+    def setUp(self):
+        # create playlist entry
+        self.playlist_entry = PlaylistEntry.from_dict(
+            {"id": 42, "song": {"title": "Song title", "file_path": "song.mkv"}},
+            Path("kara"),
+        )
+
+    def test_record(self):
+        """Test to record samples of counters
+        """
+        frame_stats = FrameStats(self.playlist_entry)
+
+        self.assertIsNone(frame_stats.record(10, 100, 24))
+        self.assertEqual(frame_stats.record(20, 190, 12), 0.1)
+        self.assertEqual(frame_stats.record(20, 190, None), None)
+
+        self.assertEqual(frame_stats.samples, 3)
+        self.assertEqual(frame_stats.dropped, 10)
+        self.assertEqual(frame_stats.displayed, 90)
+        self.assertEqual(frame_stats.min_fps, 12)
+        self.assertEqual(frame_stats.get_drop_rate(), 0.1)
+
+    def test_record_reset(self):
+        """Test to record counters going backwards
+        """
+        frame_stats = FrameStats(self.playlist_entry)
+        frame_stats.record(10, 100)
+
+        # call the method
+        drop_rate = frame_stats.record(1, 9)
+
+        # assert the counters have started from zero again
+        self.assertEqual(drop_rate, 0.1)
+        self.assertEqual(frame_stats.dropped, 1)
+        self.assertEqual(frame_stats.displayed, 9)
+
+    def test_append_frame_stats(self):
+        """Test to export the statistics to a file
+        """
+        frame_stats = FrameStats(self.playlist_entry)
+
+        with TempDir() as temp:
+            path = temp / "stats.jsonl"
+
+            # call the function twice
+            append_frame_stats(path, frame_stats)
+            append_frame_stats(path, frame_stats)
+
+            # assert the content
+            lines = path.lines()
+            self.assertEqual(len(lines), 2)
+            self.assertIn('"id": 42', lines[0])
+
+    @patch("dakara_player.frame_stats.open", side_effect=OSError("error"))
+    def test_append_frame_stats_error(self, mocked_open):
+        """Test to export the statistics to a file that cannot be written
+        """
+        frame_stats = FrameStats(self.playlist_entry)
+
+        with self.assertLogs("dakara_player.frame_stats", "DEBUG") as logger:
+            append_frame_stats("stats.jsonl", frame_stats)
+
+        self.assertListEqual(
+            logger.output,
+            [
+                "ERROR:dakara_player.frame_stats:Unable to export frame "
+                "statistics: error"
+            ],
+        )
+
+
+class DegradationPolicyTestCase(TestCase):
+    """Test the degradation policy
+    """
+
+    def test_check(self):
+        """Test to degrade the settings step by step
+        """
+        policy = DegradationPolicy(
+            [{"deband": False}, {"hwdec": "auto"}], threshold=0.1, samples=2
+        )
+
+        # a single bad sample is not enough
+        self.assertIsNone(policy.check(0.5))
+        self.assertIsNone(policy.check(0.01))
+        self.assertIsNone(policy.check(0.5))
+        self.assertDictEqual(policy.check(0.5), {"deband": False})
+
+        # unknown drop rates are ignored
+        self.assertIsNone(policy.check(None))
+        self.assertIsNone(policy.check(0.5))
+        self.assertDictEqual(policy.check(0.5), {"hwdec": "auto"})
+
+        # no more steps
+        self.assertIsNone(policy.check(0.5))
+        self.assertIsNone(policy.check(0.5))
+
+    def test_from_config(self):
+        """Test to create a policy with default steps
+        """
+        policy = DegradationPolicy.from_config({"threshold": 0.2}, [{"deband": False}])
+
+        self.assertListEqual(policy.steps, [{"deband": False}])
+        self.assertEqual(policy.threshold, 0.2)
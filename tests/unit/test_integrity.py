@@ -0,0 +1,145 @@
+from unittest import TestCase
+
+from dakara_base.resources_manager import get_file
+from path import TempDir
+
+from dakara_player.integrity import FileIntegrityError, check_file_integrity
+
+
+def box(box_type, content=b""):
+    """Create a MP4 box
+    """
+    return (len(content) + 8).to_bytes(4, "big") + box_type + content
+
+
+class CheckFileIntegrityTestCase(TestCase):
+    """Test the integrity check of media files
+    """
+
+    def setUp(self):
+        # create a temporary directory
+        self.tempdir = TempDir()
+
+        # read the content of a valid Matroska file
+        self.matroska = get_file("tests.resources", "song.mkv").bytes()
+
+    def tearDown(self):
+        self.tempdir.rmtree()
+
+    def write(self, content, name="file"):
+        """Write a file in the temporary directory
+        """
+        path = self.tempdir / name
+        path.write_bytes(content)
+        return path
+
+    def test_matroska(self):
+        """Test to check a valid Matroska file
+        """
+        self.assertEqual(
+            check_file_integrity(get_file("tests.resources", "song.mkv")), "matroska"
+        )
+
+    def test_matroska_truncated(self):
+        """Test to check a Matroska file truncated before the first cluster
+        """
+        path = self.write(self.matroska[:300])
+
+        with self.assertRaisesRegex(FileIntegrityError, "File is truncated"):
+            check_file_integrity(path)
+
+    def test_matroska_invalid_doc_type(self):
+        """Test to check a Matroska file with an unknown document type
+        """
+        path = self.write(self.matroska.replace(b"matroska", b"matrosko", 1))
+
+        with self.assertRaisesRegex(
+            FileIntegrityError, "Unsupported document type: matrosko"
+        ):
+            check_file_integrity(path)
+
+    def test_matroska_no_cluster(self):
+        """Test to check a Matroska file without cluster
+        """
+        cluster_index = self.matroska.index(b"\x1f\x43\xb6\x75")
+        path = self.write(self.matroska[:cluster_index])
+
+        with self.assertRaisesRegex(FileIntegrityError, "No cluster found"):
+            check_file_integrity(path)
+
+    def test_mp4(self):
+        """Test to check a valid MP4 file
+        """
+        path = self.write(
+            box(b"ftyp", b"isom\x00\x00\x02\x00")
+            + box(b"moov", box(b"mvhd", bytes(100)) + box(b"trak", bytes(20)))
+            + box(b"mdat", bytes(50))
+        )
+
+        self.assertEqual(check_file_integrity(path), "mp4")
+
+    def test_mp4_fragmented(self):
+        """Test to check a valid fragmented MP4 file
+        """
+        fragment = box(b"moof", box(b"mfhd", bytes(8)) + box(b"traf", bytes(20)))
+        path = self.write(
+            box(b"ftyp", b"iso6\x00\x00\x02\x00")
+            + box(b"moov", box(b"mvhd", bytes(100)) + box(b"trak", bytes(20)))
+            + fragment
+            + box(b"mdat", bytes(50))
+            + fragment
+            + box(b"mdat", bytes(50))
+            + box(b"mfra", box(b"mfro", bytes(8)))
+        )
+
+        self.assertEqual(check_file_integrity(path), "mp4")
+
+    def test_mp4_truncated(self):
+        """Test to check a truncated MP4 file
+        """
+        content = (
+            box(b"ftyp", b"isom\x00\x00\x02\x00")
+            + box(b"moov", box(b"trak", bytes(20)))
+            + box(b"mdat", bytes(50))
+        )
+        path = self.write(content[:-10])
+
+        with self.assertRaisesRegex(FileIntegrityError, "File is truncated"):
+            check_file_integrity(path)
+
+    def test_mp4_no_movie(self):
+        """Test to check a MP4 file without movie box
+        """
+        path = self.write(
+            box(b"ftyp", b"isom\x00\x00\x02\x00") + box(b"mdat", bytes(50))
+        )
+
+        with self.assertRaisesRegex(FileIntegrityError, "No movie box found"):
+            check_file_integrity(path)
+
+    def test_mp4_no_tracks(self):
+        """Test to check a MP4 file without tracks
+        """
+        path = self.write(
+            box(b"ftyp", b"isom\x00\x00\x02\x00")
+            + box(b"moov", box(b"mvhd", bytes(100)))
+            + box(b"mdat", bytes(50))
+        )
+
+        with self.assertRaisesRegex(FileIntegrityError, "No tracks found"):
+            check_file_integrity(path)
+
+    def test_empty(self):
+        """Test to check an empty file
+        """
+        path = self.write(b"")
+
+        with self.assertRaisesRegex(FileIntegrityError, "File is empty"):
+            check_file_integrity(path)
+
+    def test_unsupported(self):
+        """Test to check a file of unsupported container
+        """
+        path = self.write(b"RIFF\x00\x00\x00\x00AVI LIST")
+
+        self.assertIsNone(check_file_integrity(path))
@@ -0,0 +1,185 @@
+from threading import Event
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from path import Path
+
+from dakara_player.io_executor import IOExecutor, IOTimeoutError, get_root
+
+
+class IOExecutorTestCase(TestCase):
+    """Test the executor of filesystem calls
+    """
+
+    def setUp(self):
+        # create an event to release hung calls
+        self.release = Event()
+
+    def tearDown(self):
+        self.release.set()
+
+    def hang(self, path):
+        """Function simulating a call on a hung filesystem
+        """
+        self.release.wait()
+        return True
+
+    def test_from_config(self):
+        """Test to create an executor from the configuration
+        """
+        # call the method
+        io_executor = IOExecutor.from_config(
+            {"timeout": 5, "positive_cache_duration": 10}
+        )
+
+        # assert the values
+        self.assertEqual(io_executor.timeout, 5)
+        self.assertEqual(io_executor.positive_cache_duration, 10)
+        self.assertEqual(io_executor.negative_cache_duration, 5)
+
+    def test_call(self):
+        """Test to call a function
+        """
+        io_executor = IOExecutor()
+        function = MagicMock(return_value=["file"])
+
+        # call the method
+        result = io_executor.call(function, Path("path"))
+
+        # assert the result
+        self.assertListEqual(result, ["file"])
+        function.assert_called_once_with(Path("path"))
+
+    def test_call_cached(self):
+        """Test positive and negative results are cached
+        """
+        io_executor = IOExecutor()
+        function = MagicMock(side_effect=[True, False])
+
+        # call the method twice for each path
+        self.assertTrue(io_executor.call(function, Path("present")))
+        self.assertTrue(io_executor.call(function, Path("present")))
+        self.assertFalse(io_executor.call(function, Path("absent")))
+        self.assertFalse(io_executor.call(function, Path("absent")))
+
+        # assert the function was called once per path
+        self.assertEqual(function.call_count, 2)
+
+    @patch("dakara_player.io_executor.monotonic")
+    def test_call_cache_expired(self, mocked_monotonic):
+        """Test negative results expire before positive ones
+        """
+        io_executor = IOExecutor(positive_cache_duration=60, negative_cache_duration=5)
+        function = MagicMock(side_effect=[True, False, False])
+
+        # fill the cache
+        mocked_monotonic.return_value = 0
+        io_executor.call(function, Path("present"))
+        io_executor.call(function, Path("absent"))
+
+        # call again after the negative cache expired
+        mocked_monotonic.return_value = 10
+        io_executor.call(function, Path("present"))
+        io_executor.call(function, Path("absent"))
+
+        # assert only the negative result was requested again
+        self.assertEqual(function.call_count, 3)
+
+    def test_call_error(self):
+        """Test an error raised by the function is not cached
+        """
+        io_executor = IOExecutor()
+        function = MagicMock(side_effect=[PermissionError("denied"), True])
+
+        # call the method
+        with self.assertRaises(PermissionError):
+            io_executor.call(function, Path("path"))
+
+        # assert the function is called again
+        self.assertTrue(io_executor.call(function, Path("path")))
+
+    def test_call_timeout(self):
+        """Test a deadline miss is reported and cached
+        """
+        io_executor = IOExecutor(timeout=0.05)
+
+        # call the method
+        with self.assertRaisesRegex(
+            IOTimeoutError, r"Unable to access 'path' within 0.05 s"
+        ):
+            io_executor.call(self.hang, Path("path"))
+
+        # assert the second call fails without waiting
+        with self.assertRaises(IOTimeoutError):
+            io_executor.call(self.hang, Path("path"), timeout=10)
+
+    def test_call_timeout_released(self):
+        """Test a hung call completing later fills the cache
+        """
+        io_executor = IOExecutor(timeout=0.05)
+
+        # call the method
+        with self.assertRaises(IOTimeoutError):
+            io_executor.call(self.hang, Path("path"))
+
+        # release the call
+        future = io_executor.pending[(self.hang, Path("path"))]
+        self.release.set()
+        future.result(1)
+
+        # assert the result is cached
+        self.assertTrue(io_executor.call(self.hang, Path("path")))
+
+    def test_call_too_many_pending(self):
+        """Test calls are rejected when too many are hung on the same root
+        """
+        io_executor = IOExecutor(timeout=0.01, max_pending_calls=1)
+
+        # hang a call
+        with self.assertRaises(IOTimeoutError):
+            io_executor.call(self.hang, Path("/mnt/karaoke/first"))
+
+        # call the method
+        with self.assertRaisesRegex(
+            IOTimeoutError,
+            "Too many pending filesystem calls to access '/mnt/karaoke/second'",
+        ):
+            io_executor.call(self.hang, Path("/mnt/karaoke/second"))
+
+        # assert calls on other roots are not rejected
+        self.assertTrue(io_executor.call(MagicMock(), Path("/mnt/other/second")))
+
+    def test_call_pending_released(self):
+        """Test the root of a finished call accepts calls again
+        """
+        io_executor = IOExecutor(timeout=0.01, max_pending_calls=1)
+
+        # hang a call and release it
+        with self.assertRaises(IOTimeoutError):
+            io_executor.call(self.hang, Path("/mnt/karaoke/first"))
+
+        future = io_executor.pending[(self.hang, Path("/mnt/karaoke/first"))]
+        self.release.set()
+        future.result(1)
+
+        # assert the root accepts calls again
+        self.assertDictEqual(io_executor.pending_roots, {})
+        self.assertTrue(io_executor.call(MagicMock(), Path("/mnt/karaoke/second")))
+
+    def test_get_root(self):
+        """Test to get the root directory of a path
+        """
+        self.assertEqual(get_root(Path("/mnt/karaoke/songs/song.mkv")), "/mnt/karaoke")
+        self.assertEqual(get_root(Path("/song.mkv")), "/song.mkv")
+
+    @patch.object(Path, "exists", return_value=True)
+    def test_exists(self, mocked_exists):
+        """Test to check if a path exists
+        """
+        io_executor = IOExecutor()
+
+        # call the method
+        self.assertTrue(io_executor.exists(Path("path")))
+
+        # assert the call
+        mocked_exists.assert_called_once_with()
@@ -0,0 +1,274 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from dakara_base.resources_manager import get_file
+from path import TempDir
+
+from dakara_player import library_check
+from dakara_player.decoder_probe import DecoderProbeError, ProbeResult
+from dakara_player.library_check import (
+    LibraryCheckError,
+    check_library,
+    check_song,
+    get_reject_list,
+    write_json,
+)
+
+
+def get_result(setting, frames=100, error=None):
+    """Create a probe result
+    """
+    result = ProbeResult(setting)
+    result.frames = frames
+    result.elapsed = 1
+    result.error = error
+    return result
+
+
+class CheckSongTestCase(TestCase):
+    """Test to check a song file
+    """
+
+    def setUp(self):
+        # create a karaoke folder
+        self.tempdir = TempDir()
+        self.song_path = self.tempdir / "song.mkv"
+        get_file("tests.resources", "song.mkv").copy(self.song_path)
+
+        # mock the probe
+        self.mocked_probe = MagicMock()
+        self.mocked_probe.return_value = get_result("no")
+        patcher = patch.dict(library_check.PROBE_FUNCTIONS, {"mpv": self.mocked_probe})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tempdir.rmtree()
+
+    def test_playable(self):
+        """Test to check a song that can be played
+        """
+        get_file("tests.resources", "song.ass").copy(self.tempdir / "song.ass")
+
+        # call the function
+        report = check_song(self.song_path, "mpv")
+
+        # assert the report
+        self.assertEqual(report["path"], str(self.song_path))
+        self.assertEqual(report["container"], "matroska")
+        self.assertAlmostEqual(report["duration"], 5.062)
+        self.assertEqual(report["subtitle"], str(self.tempdir / "song.ass"))
+        self.assertEqual(report["instrumental"], "track")
+        self.assertListEqual(report["errors"], [])
+        self.assertListEqual(report["warnings"], [])
+
+        # assert the calls
+        self.mocked_probe.assert_called_once_with(
+            self.song_path, "no", start=0, length=library_check.DECODE_LENGTH
+        )
+
+    def test_instrumental_file(self):
+        """Test to check a song with an instrumental file
+        """
+        get_file("tests.resources", "song2.mp3").copy(self.tempdir / "song.mp3")
+
+        # call the function
+        report = check_song(self.song_path, "mpv")
+
+        # assert the report
+        self.assertEqual(report["instrumental"], "file")
+        self.assertListEqual(report["warnings"], ["No subtitle file found"])
+
+    def test_middle(self):
+        """Test to check the middle of a long song
+        """
+        with patch.object(library_check, "read_media_info") as mocked_read_media_info:
+            mocked_read_media_info.return_value.duration = 90
+
+            # call the function
+            check_song(self.song_path, "mpv")
+
+        # assert the calls
+        self.mocked_probe.assert_called_with(
+            self.song_path, "no", start=45, length=library_check.DECODE_LENGTH
+        )
+
+    def test_undecodable(self):
+        """Test to check a song that cannot be decoded
+        """
+        self.mocked_probe.return_value = get_result(
+            "no", frames=0, error="unable to decode"
+        )
+
+        # call the function
+        report = check_song(self.song_path, "mpv")
+
+        # assert the report
+        self.assertListEqual(
+            report["errors"], ["Unable to decode at 0s: unable to decode"]
+        )
+
+    def test_not_decoded(self):
+        """Test to check a song without decoding it
+        """
+        # call the function
+        report = check_song(self.song_path, "mpv", decode=False)
+
+        # assert the report
+        self.assertListEqual(report["errors"], [])
+        self.assertIn("Not decoded", report["warnings"])
+        self.mocked_probe.assert_not_called()
+
+    def test_invalid(self):
+        """Test to check a broken song
+        """
+        self.song_path.write_bytes(self.song_path.bytes()[:2000])
+
+        # call the function
+        report = check_song(self.song_path, "mpv")
+
+        # assert the report
+        self.assertEqual(len(report["errors"]), 1)
+        self.assertTrue(report["errors"][0].startswith("Invalid file: "))
+        self.mocked_probe.assert_not_called()
+
+    def test_not_video(self):
+        """Test to check a file that is not a video
+        """
+        self.assertIsNone(check_song(get_file("tests.resources", "song.ass"), "mpv"))
+
+
+@patch.object(library_check, "ProcessPoolExecutor", ThreadPoolExecutor)
+@patch.object(library_check, "check_song")
+class CheckLibraryTestCase(TestCase):
+    """Test to check the karaoke folder
+    """
+
+    def setUp(self):
+        # create a karaoke folder
+        self.tempdir = TempDir()
+        (self.tempdir / "song.mkv").touch()
+        (self.tempdir / "song.ass").touch()
+
+        # mock the probe
+        self.mocked_probe = MagicMock()
+        self.mocked_probe.return_value = get_result("none")
+        patcher = patch.dict(library_check.PROBE_FUNCTIONS, {"vlc": self.mocked_probe})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tempdir.rmtree()
+
+    def test_check(self, mocked_check_song):
+        """Test to check each file of the folder
+        """
+        mocked_check_song.side_effect = lambda path, player_name, decode: (
+            {"path": str(path)} if path.ext == ".mkv" else None
+        )
+
+        # call the function
+        report = check_library(self.tempdir, "VLC", jobs=2)
+
+        # assert the report
+        self.assertEqual(report["player_name"], "vlc")
+        self.assertListEqual(
+            report["songs"], [{"path": str(self.tempdir / "song.mkv")}]
+        )
+
+        # assert the calls
+        mocked_check_song.assert_any_call(self.tempdir / "song.ass", "vlc", True)
+
+    def test_sample_undecodable(self, mocked_check_song):
+        """Test to check with a media player that cannot decode the sample
+
+        Songs should be checked without being decoded.
+        """
+        self.mocked_probe.return_value = get_result(
+            "none", frames=0, error="VLC is not installed"
+        )
+
+        # call the function
+        with self.assertLogs("dakara_player.library_check", "DEBUG") as logger:
+            check_library(self.tempdir, "vlc")
+
+        # assert the calls
+        mocked_check_song.assert_any_call(self.tempdir / "song.mkv", "vlc", False)
+
+        # assert the logs
+        self.assertIn(
+            "WARNING:dakara_player.library_check:Songs will not be decoded, unable "
+            "to decode the sample with vlc: VLC is not installed",
+            logger.output,
+        )
+
+    @patch.object(library_check, "get_sample_path")
+    def test_sample_missing(self, mocked_get_sample_path, mocked_check_song):
+        """Test to check when the sample is missing
+
+        Songs should be checked without being decoded.
+        """
+        mocked_get_sample_path.side_effect = DecoderProbeError(
+            "Sample file 'sample.mkv' not found"
+        )
+
+        # call the function
+        with self.assertLogs("dakara_player.library_check", "DEBUG") as logger:
+            check_library(self.tempdir, "vlc")
+
+        # assert the calls
+        self.mocked_probe.assert_not_called()
+        mocked_check_song.assert_any_call(self.tempdir / "song.mkv", "vlc", False)
+
+        # assert the logs
+        self.assertIn(
+            "WARNING:dakara_player.library_check:Songs will not be decoded: "
+            "Sample file 'sample.mkv' not found",
+            logger.output,
+        )
+
+    def test_no_folder(self, mocked_check_song):
+        """Test to check a folder that does not exist
+        """
+        with self.assertRaisesRegex(LibraryCheckError, "Karaoke folder .* not exist"):
+            check_library(self.tempdir / "nothing", "vlc")
+
+    def test_unknown_player(self, mocked_check_song):
+        """Test to check with an unknown media player
+        """
+        with self.assertRaisesRegex(LibraryCheckError, "No media player for 'other'"):
+            check_library(self.tempdir, "other")
+
+
+class ReportTestCase(TestCase):
+    """Test to write the report and the reject list
+    """
+
+    def test_get_reject_list(self):
+        """Test to get the rejected songs of a report
+        """
+        report = {
+            "songs": [
+                {"path": "song1.mkv", "size": 1, "mtime": 2, "errors": []},
+                {"path": "song2.mkv", "size": 3, "mtime": 4, "errors": ["Invalid"]},
+            ]
+        }
+
+        self.assertDictEqual(
+            get_reject_list(report),
+            {"song2.mkv": {"size": 3, "mtime": 4, "errors": ["Invalid"]}},
+        )
+
+    def test_write_json(self):
+        """Test to write a JSON file
+        """
+        with TempDir() as tempdir:
+            path = tempdir / "report.json"
+
+            # call the function
+            write_json(path, {"songs": []})
+
+            # assert the file
+            self.assertEqual(path.text(), '{\n  "songs": []\n}')
+            self.assertFalse((tempdir / "report.json.tmp").exists())
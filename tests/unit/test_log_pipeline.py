@@ -0,0 +1,194 @@
+import logging
+from unittest import TestCase
+from unittest.mock import patch
+
+from dakara_base.config import ConfigInvalidError
+
+from dakara_player.log_pipeline import LogPipeline
+
+
+class LogPipelineTestCase(TestCase):
+    """Test the pipeline of backend log messages
+    """
+
+    def setUp(self):
+        # create target logger
+        self.target = logging.getLogger("backend")
+        self.target.setLevel(logging.DEBUG)
+        self.addCleanup(self.target.setLevel, logging.NOTSET)
+
+    def test_from_config(self):
+        """Test to create a pipeline from the configuration
+        """
+        log_pipeline = LogPipeline.from_config(
+            self.target,
+            {"levels": {"ffmpeg": "error"}, "rate_limit": 5, "queue_size": 10},
+        )
+
+        self.assertDictEqual(log_pipeline.levels, {"ffmpeg": logging.ERROR})
+        self.assertEqual(log_pipeline.rate_limit, 5)
+        self.assertEqual(log_pipeline.queue.maxsize, 10)
+
+    def test_from_config_invalid_level(self):
+        """Test to create a pipeline with an unknown level
+        """
+        with self.assertRaisesRegex(
+            ConfigInvalidError, "Unknown log level 'loud' for component 'ffmpeg'"
+        ):
+            LogPipeline.from_config(self.target, {"levels": {"ffmpeg": "loud"}})
+
+    def test_get_level(self):
+        """Test to get the level of components
+        """
+        log_pipeline = LogPipeline(
+            self.target, {"ffmpeg": logging.ERROR, "ffmpeg/audio": logging.INFO}
+        )
+
+        self.assertEqual(log_pipeline.get_level("ffmpeg/video"), logging.ERROR)
+        self.assertEqual(log_pipeline.get_level("ffmpeg/audio"), logging.INFO)
+        self.assertEqual(log_pipeline.get_level("cplayer"), logging.NOTSET)
+
+    def test_submit_filtered(self):
+        """Test messages below the level of their component are not queued
+        """
+        log_pipeline = LogPipeline(self.target, {"ffmpeg": logging.ERROR})
+
+        log_pipeline.submit(logging.WARNING, "ffmpeg/video", "message")
+        log_pipeline.submit(logging.WARNING, "cplayer", "message")
+
+        self.assertEqual(log_pipeline.queue.qsize(), 1)
+
+    def test_submit_full(self):
+        """Test messages are dropped when the queue is full
+        """
+        log_pipeline = LogPipeline(self.target, queue_size=1)
+
+        # call the method
+        log_pipeline.submit(logging.WARNING, "cplayer", "message 1")
+        log_pipeline.submit(logging.WARNING, "cplayer", "message 2")
+
+        # assert the message has been dropped
+        self.assertEqual(log_pipeline.dropped, 1)
+
+        # assert the summary
+        with self.assertLogs("dakara_player.log_pipeline", "DEBUG") as logger:
+            log_pipeline.flush()
+
+        self.assertListEqual(
+            logger.output,
+            [
+                "WARNING:dakara_player.log_pipeline:1 backend log messages "
+                "dropped, queue is full"
+            ],
+        )
+
+    def test_process_repeated(self):
+        """Test to summarize repeated messages
+        """
+        log_pipeline = LogPipeline(self.target)
+
+        # call the method
+        with self.assertLogs("backend", "DEBUG") as logger:
+            for _ in range(3):
+                log_pipeline.process(logging.WARNING, "vd", "frame dropped")
+
+            log_pipeline.process(logging.INFO, "vd", "other message")
+
+        # assert the logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "WARNING:backend:vd: frame dropped",
+                "WARNING:backend:vd: message repeated 2 times",
+                "INFO:backend:vd: other message",
+            ],
+        )
+
+    @patch("dakara_player.log_pipeline.monotonic")
+    def test_process_rate_limited(self, mocked_monotonic):
+        """Test to rate limit the messages of a component
+        """
+        mocked_monotonic.return_value = 10
+        log_pipeline = LogPipeline(self.target, rate_limit=2)
+
+        # call the method
+        with self.assertLogs("backend", "DEBUG") as logger:
+            for index in range(4):
+                log_pipeline.process(logging.INFO, "vd", "message {}".format(index))
+
+            log_pipeline.process(logging.INFO, "ao", "message")
+
+            # the allowance is restored with time
+            mocked_monotonic.return_value = 10.5
+            log_pipeline.process(logging.INFO, "vd", "message 4")
+            log_pipeline.flush()
+
+        # assert the logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "INFO:backend:vd: message 0",
+                "INFO:backend:vd: message 1",
+                "INFO:backend:ao: message",
+                "INFO:backend:vd: message 4",
+                "WARNING:backend:vd: 2 messages suppressed",
+            ],
+        )
+
+    @patch("dakara_player.log_pipeline.monotonic")
+    def test_run_flush_flooded(self, mocked_monotonic):
+        """Test summaries are logged periodically when messages keep coming
+        """
+        log_pipeline = LogPipeline(self.target, rate_limit=0)
+        clock = [0]
+        mocked_monotonic.side_effect = lambda: clock[0]
+
+        # each message takes some time to be processed
+        process = log_pipeline.process
+
+        def process_slowly(*record):
+            process(*record)
+            clock[0] += 0.6
+
+        log_pipeline.process = process_slowly
+
+        for _ in range(3):
+            log_pipeline.submit(logging.WARNING, "vd", "frame dropped")
+
+        log_pipeline.queue.put(None)
+
+        # call the method
+        with self.assertLogs("backend", "DEBUG") as logger:
+            log_pipeline.run()
+
+        # assert the logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "WARNING:backend:vd: frame dropped",
+                "WARNING:backend:vd: message repeated 1 times",
+                "WARNING:backend:vd: frame dropped",
+            ],
+        )
+
+    def test_start_stop(self):
+        """Test to forward messages from the thread
+        """
+        log_pipeline = LogPipeline(self.target)
+
+        # call the method
+        with self.assertLogs("backend", "DEBUG") as logger:
+            log_pipeline.start()
+            log_pipeline.submit(logging.WARNING, "cplayer", "message")
+            log_pipeline.submit(logging.WARNING, "cplayer", "message")
+            log_pipeline.stop()
+
+        # assert the logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "WARNING:backend:cplayer: message",
+                "WARNING:backend:cplayer: message repeated 1 times",
+            ],
+        )
+        self.assertIsNone(log_pipeline.thread)
@@ -0,0 +1,223 @@
+from unittest import TestCase
+
+from dakara_base.resources_manager import get_file
+from path import TempDir
+
+from dakara_player.integrity import FileIntegrityError
+from dakara_player.media_info import MediaInfo, TrackInfo, read_media_info
+
+
+def box(box_type, content=b""):
+    """Create a MP4 box
+    """
+    return (len(content) + 8).to_bytes(4, "big") + box_type + content
+
+
+def mp4_track(track_id, handler_type, codec, language, title=None):
+    """Create a MP4 track box
+    """
+    packed_language = 0
+    for character in language:
+        packed_language = (packed_language << 5) | (ord(character) - 0x60)
+
+    content = box(b"tkhd", bytes(12) + track_id.to_bytes(4, "big") + bytes(68))
+    content += box(
+        b"mdia",
+        box(b"mdhd", bytes(20) + packed_language.to_bytes(2, "big") + bytes(2))
+        + box(b"hdlr", bytes(8) + handler_type + bytes(12) + b"Handler\x00")
+        + box(
+            b"minf",
+            box(
+                b"stbl",
+                box(b"stsd", bytes(4) + (1).to_bytes(4, "big") + box(codec, bytes(8))),
+            ),
+        ),
+    )
+
+    if title:
+        content += box(b"udta", box(b"name", title.encode()))
+
+    return box(b"trak", content)
+
+
+class ReadMediaInfoTestCase(TestCase):
+    """Test to read the tracks of media files
+    """
+
+    def setUp(self):
+        # create a temporary directory
+        self.tempdir = TempDir()
+
+        # create a MP4 file with the movie box after the media data
+        self.mp4 = (
+            box(b"ftyp", b"isom\x00\x00\x02\x00")
+            + box(b"mdat", bytes(5000))
+            + box(
+                b"moov",
+                box(
+                    b"mvhd",
+                    bytes(12) + (1000).to_bytes(4, "big") + (90500).to_bytes(4, "big"),
+                )
+                + mp4_track(1, b"vide", b"avc1", "und")
+                + mp4_track(2, b"soun", b"mp4a", "jpn")
+                + mp4_track(3, b"soun", b"mp4a", "jpn", "Off-vocal")
+                + mp4_track(4, b"sbtl", b"tx3g", "eng"),
+            )
+        )
+
+    def tearDown(self):
+        self.tempdir.rmtree()
+
+    def write(self, content, name="file"):
+        """Write a file in the temporary directory
+        """
+        path = self.tempdir / name
+        path.write_bytes(content)
+        return path
+
+    def test_matroska(self):
+        """Test to read the tracks of a Matroska file
+        """
+        media_info = read_media_info(get_file("tests.resources", "song.mkv"))
+
+        self.assertEqual(media_info.container, "matroska")
+        self.assertAlmostEqual(media_info.duration, 5.062)
+        self.assertListEqual(
+            [track.to_dict() for track in media_info.tracks],
+            [
+                {
+                    "number": 1,
+                    "type": "video",
+                    "codec": "V_UNCOMPRESSED",
+                    "language": None,
+                    "title": None,
+                },
+                {
+                    "number": 2,
+                    "type": "audio",
+                    "codec": "A_AAC",
+                    "language": None,
+                    "title": None,
+                },
+                {
+                    "number": 3,
+                    "type": "audio",
+                    "codec": "A_AAC",
+                    "language": None,
+                    "title": None,
+                },
+                {
+                    "number": 4,
+                    "type": "subtitle",
+                    "codec": "S_TEXT/ASS",
+                    "language": None,
+                    "title": None,
+                },
+            ],
+        )
+
+    def test_matroska_truncated(self):
+        """Test to read a Matroska file truncated in its tracks
+        """
+        content = get_file("tests.resources", "song.mkv").bytes()
+        tracks_index = content.index(b"\x16\x54\xae\x6b")
+        path = self.write(content[: tracks_index + 20])
+
+        with self.assertRaisesRegex(FileIntegrityError, "File is truncated"):
+            read_media_info(path)
+
+    def test_mp4(self):
+        """Test to read the tracks of a MP4 file
+        """
+        media_info = read_media_info(self.write(self.mp4))
+
+        self.assertEqual(media_info.container, "mp4")
+        self.assertEqual(media_info.duration, 90.5)
+        self.assertListEqual(
+            [track.to_dict() for track in media_info.tracks],
+            [
+                {
+                    "number": 1,
+                    "type": "video",
+                    "codec": "avc1",
+                    "language": None,
+                    "title": None,
+                },
+                {
+                    "number": 2,
+                    "type": "audio",
+                    "codec": "mp4a",
+                    "language": "jpn",
+                    "title": None,
+                },
+                {
+                    "number": 3,
+                    "type": "audio",
+                    "codec": "mp4a",
+                    "language": "jpn",
+                    "title": "Off-vocal",
+                },
+                {
+                    "number": 4,
+                    "type": "subtitle",
+                    "codec": "tx3g",
+                    "language": "eng",
+                    "title": None,
+                },
+            ],
+        )
+
+    def test_mp4_no_moov(self):
+        """Test to read a MP4 file without movie box
+        """
+        path = self.write(box(b"ftyp", b"isom\x00\x00\x02\x00") + box(b"mdat"))
+
+        with self.assertRaisesRegex(FileIntegrityError, "No movie box found"):
+            read_media_info(path)
+
+    def test_unsupported(self):
+        """Test to read a file of an unsupported container
+        """
+        self.assertIsNone(read_media_info(get_file("tests.resources", "song2.mp3")))
+
+    def test_empty(self):
+        """Test to read an empty file
+        """
+        with self.assertRaisesRegex(FileIntegrityError, "File is empty"):
+            read_media_info(self.write(b""))
+
+
+class MediaInfoTestCase(TestCase):
+    """Test the information of media files
+    """
+
+    def test_get_instrumental_index_title(self):
+        """Test to get the instrumental track designated by its title
+        """
+        media_info = MediaInfo(
+            "mp4",
+            [
+                TrackInfo(1, "audio"),
+                TrackInfo(2, "audio", title="Commentary"),
+                TrackInfo(3, "audio", title="Off-Vocal"),
+            ],
+        )
+
+        self.assertEqual(media_info.get_instrumental_index(), 2)
+
+    def test_get_instrumental_index_second(self):
+        """Test to get the second audio track as instrumental track
+        """
+        media_info = MediaInfo(
+            "mp4",
+            [TrackInfo(1, "video"), TrackInfo(2, "audio"), TrackInfo(3, "audio")],
+        )
+
+        self.assertEqual(media_info.get_instrumental_index(), 1)
+
+    def test_get_instrumental_index_none(self):
+        """Test to get the instrumental track of a file with one audio track
+        """
+        media_info = MediaInfo("mp4", [TrackInfo(1, "video"), TrackInfo(2, "audio")])
+
+        self.assertIsNone(media_info.get_instrumental_index())
@@ -0,0 +1,307 @@
+import os
+from queue import Queue
+from threading import Event, Timer
+from unittest import TestCase
+from unittest.mock import MagicMock, call, patch
+
+from dakara_base.safe_workers import Worker
+from path import Path
+
+from dakara_player.media_player.host import (
+    HostError,
+    MediaPlayerHost,
+    call_player,
+    run_host,
+)
+from dakara_player.playlist_entry import PlaylistEntry
+
+
+class FakeMediaPlayer(Worker):
+    """Fake media player run in the host process
+    """
+
+    player_name = "fake"
+
+    def init_worker(self, config, tempdir):
+        self.callbacks = {}
+        self.playlist_entry = None
+
+    def set_callback(self, name, callback):
+        self.callbacks[name] = callback
+
+    def load(self):
+        pass
+
+    def resume_checkpoint(self):
+        return False
+
+    def set_playlist_entry(self, playlist_entry, autoplay=True):
+        self.playlist_entry = playlist_entry
+        self.callbacks["started_transition"](playlist_entry.id)
+
+    def play(self, what):
+        if what == "crash":
+            os._exit(1)
+
+    def get_pid(self):
+        return os.getpid()
+
+
+class MediaPlayerHostTestCase(TestCase):
+    """Test the media player host
+    """
+
+    def setUp(self):
+        # create playlist entry
+        self.playlist_entry = PlaylistEntry.from_dict(
+            {"id": 42, "song": {"title": "Song title", "file_path": "song.mkv"}},
+            Path("kara"),
+        )
+
+    def get_instance(self, player_class=FakeMediaPlayer):
+        """Get an instance of MediaPlayerHost
+
+        Args:
+            player_class (type): Class of the media player.
+
+        Returns:
+            MediaPlayerHost: Instance.
+        """
+        return MediaPlayerHost(
+            Event(), Queue(), {"kara_folder": "kara"}, Path("temp"), player_class
+        )
+
+    def test_handle_message_reply(self):
+        """Test to handle the result of a method call
+        """
+        host = self.get_instance()
+        future = MagicMock()
+        host.pending[1] = future
+
+        # call the method
+        host.handle_message(("reply", 1, True, None))
+
+        # assert the call
+        future.set_result.assert_called_with(True)
+        self.assertDictEqual(host.pending, {})
+
+    def test_handle_message_reply_error(self):
+        """Test to handle the error of a method call
+        """
+        host = self.get_instance()
+        future = MagicMock()
+        host.pending[1] = future
+        error = ValueError("error")
+
+        # call the method
+        host.handle_message(("reply", 1, None, error))
+
+        # assert the call
+        future.set_exception.assert_called_with(error)
+
+    def test_handle_message_event(self):
+        """Test to handle a callback of the media player
+        """
+        host = self.get_instance()
+        callback = MagicMock()
+        host.set_callback("finished", callback)
+
+        # call the method
+        host.handle_message(("event", "finished", (42,), 0))
+
+        # assert the callback is dispatched
+        callback.assert_not_called()
+        self.assertEqual(host.dispatch_queue.get_nowait(), (callback, (42,)))
+        self.assertEqual(host.metrics.get_duration("host_event")["count"], 1)
+
+    def test_run_dispatcher(self):
+        """Test to run the dispatched functions in order
+        """
+        host = self.get_instance()
+        function = MagicMock()
+        host.dispatch(function, 1)
+        host.dispatch(function, 2)
+        host.dispatch(host.stop.set)
+
+        # call the method
+        host.run_dispatcher()
+
+        # assert the calls
+        function.assert_has_calls([call(1), call(2)])
+
+    def test_handle_message_log(self):
+        """Test to handle a log record of the host process
+        """
+        host = self.get_instance()
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.vlc", "DEBUG") as logger:
+            host.handle_message(
+                ("log", "dakara_player.media_player.vlc", 20, "Playing idle")
+            )
+
+        # assert the logs
+        self.assertListEqual(
+            logger.output, ["INFO:dakara_player.media_player.vlc:Playing idle"]
+        )
+
+    def test_call_not_started(self):
+        """Test to call a method when the host process is not reachable
+        """
+        host = self.get_instance()
+        host.available.set()
+        host.connection = MagicMock()
+        host.connection.send.side_effect = OSError()
+
+        # call the method
+        with self.assertRaisesRegex(HostError, "Media player host is not reachable"):
+            host.call("play", "idle")
+
+        # assert no call is pending
+        self.assertDictEqual(host.pending, {})
+
+    def test_call_restarting(self):
+        """Test to call a method while the host process is restarted
+
+        The call should wait for the new host process.
+        """
+        host = self.get_instance()
+        connection_old = host.connection = MagicMock()
+        connection_new = MagicMock()
+
+        def restart():
+            host.connection = connection_new
+            host.available.set()
+
+        def reply(message):
+            _, request_id, _, _, _ = message
+            host.handle_message(("reply", request_id, 42, None))
+
+        connection_new.send.side_effect = reply
+        timer = Timer(0.1, restart)
+        timer.start()
+
+        # call the method
+        result = host.call("get_pid")
+        timer.join()
+
+        # assert the result
+        self.assertEqual(result, 42)
+        connection_old.send.assert_not_called()
+        connection_new.send.assert_called_once_with(("call", 1, "get_pid", (), {}))
+
+    @patch("dakara_player.media_player.host.HOST_START_TIMEOUT", 0.01)
+    def test_call_restart_timeout(self):
+        """Test to call a method when the host process is not restarted in time
+        """
+        host = self.get_instance()
+        host.connection = MagicMock()
+
+        # call the method
+        with self.assertRaisesRegex(
+            HostError, "Media player host has not restarted within 0.01 s"
+        ):
+            host.call("play", "idle")
+
+        # assert no call has been sent
+        host.connection.send.assert_not_called()
+
+    def test_call_player(self):
+        """Test to call a method of the media player
+        """
+        media_player = MagicMock()
+        media_player.is_playing_this.return_value = True
+
+        # call the function
+        result = call_player(media_player, "is_playing_this", ("song",), {})
+
+        # assert the result
+        self.assertEqual(result, (True, None))
+
+    def test_call_player_error(self):
+        """Test to call a method of the media player raising an error
+        """
+        media_player = MagicMock()
+        media_player.skip.side_effect = ValueError("error")
+
+        # call the function
+        _, error = call_player(media_player, "skip", (), {})
+
+        # assert the result
+        self.assertIsInstance(error, ValueError)
+
+    @patch("dakara_player.media_player.host.forward_logs")
+    def test_run_host(self, mocked_forward_logs):
+        """Test to run a media player in the host process
+        """
+        connection = MagicMock()
+        connection.poll.return_value = True
+        connection.recv.side_effect = [
+            ("call", 1, "get_playlist_entry", (), {}),
+            ("stop",),
+        ]
+
+        # call the function
+        run_host(connection, FakeMediaPlayer, {}, Path("temp"), 100)
+
+        # assert the calls
+        connection.send.assert_any_call(("ready",))
+        connection.send.assert_any_call(("reply", 1, None, None))
+        connection.close.assert_called_with()
+
+    @patch("dakara_player.media_player.host.forward_logs")
+    def test_run_host_load_failed(self, mocked_forward_logs):
+        """Test to run a media player that cannot be loaded
+        """
+        player_class = MagicMock()
+        error = ValueError("error")
+        player_class.return_value.__enter__.return_value.load.side_effect = error
+        connection = MagicMock()
+
+        # call the function
+        run_host(connection, player_class, {}, Path("temp"), 100)
+
+        # assert the calls
+        connection.send.assert_called_with(("failed", error))
+
+
+class MediaPlayerHostProcessTestCase(TestCase):
+    """Test the media player host with an actual host process
+    """
+
+    def test_process(self):
+        """Test to call methods, receive events and restart the host process
+        """
+        playlist_entry = PlaylistEntry.from_dict(
+            {"id": 42, "song": {"title": "Song title", "file_path": "song.mkv"}},
+            Path("kara"),
+        )
+        started_transition = Event()
+        host = MediaPlayerHost(
+            Event(), Queue(), {"kara_folder": "kara"}, Path("temp"), FakeMediaPlayer
+        )
+
+        # the callback calls the media player back
+        def on_started_transition(playlist_entry_id):
+            host.call("get_pid")
+            started_transition.set()
+
+        host.set_callback("started_transition", on_started_transition)
+
+        with host:
+            host.load()
+
+            # call methods, the callback calls a method too
+            host.set_playlist_entry(playlist_entry)
+            self.assertEqual(host.playlist_entry.id, 42)
+            self.assertTrue(started_transition.wait(5))
+            self.assertEqual(host.metrics.get_duration("host_call")["count"], 3)
+
+            # crash the host process
+            pid = host.call("get_pid")
+            with self.assertRaises(HostError):
+                host.play("crash")
+
+            # the call waits for the host process to be restarted
+            self.assertNotEqual(host.call("get_pid"), pid)
+            self.assertEqual(host.metrics.get_counter("host_restarts"), 1)
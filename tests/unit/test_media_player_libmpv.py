@@ -0,0 +1,235 @@
+from queue import Queue
+from contextlib import ExitStack
+from tempfile import gettempdir
+from threading import Event
+from unittest import TestCase
+from unittest.mock import PropertyMock, patch
+
+from path import Path
+
+from dakara_player.media_player.libmpv import MediaPlayerLibmpv
+
+
+class MediaPlayerLibmpvTestCase(TestCase):
+    """Test the libmpv player class unitary
+    """
+
+    def get_instance(self, config=None):
+        """Get a heavily mocked instance of MediaPlayerLibmpv
+
+        Args:
+            config (dict): Configuration passed to the constructor.
+
+        Returns:
+            tuple: Contains the following elements:
+                MediaPlayerLibmpv: Instance;
+                unittest.mock.MagicMock: libmpv module.
+        """
+        config = config or {"kara_folder": gettempdir()}
+
+        with ExitStack() as stack:
+            mocked_libmpv = stack.enter_context(
+                patch("dakara_player.media_player.libmpv.libmpv")
+            )
+            stack.enter_context(
+                patch("dakara_player.media_player.base.BackgroundLoader")
+            )
+            stack.enter_context(patch("dakara_player.media_player.base.TextGenerator"))
+
+            return (
+                MediaPlayerLibmpv(Event(), Queue(), config, Path("temp")),
+                mocked_libmpv,
+            )
+
+    @patch("dakara_player.media_player.libmpv.libmpv", None)
+    def test_is_available_not_installed(self):
+        """Test libmpv is not available if its bindings are not installed
+        """
+        self.assertFalse(MediaPlayerLibmpv.is_available())
+
+    def test_init(self):
+        """Test to create libmpv with options
+        """
+        mpv_player, mocked_libmpv = self.get_instance(
+            {"kara_folder": gettempdir(), "mpv": {"vo": "null"}}
+        )
+
+        # assert the call
+        mocked_libmpv.MPV.assert_called_with(
+            log_handler=mpv_player.handle_libmpv_log, loglevel="info"
+        )
+        self.assertEqual(mpv_player.player.vo, "null")
+
+    def test_init_persistent(self):
+        """Test the persistent mode is not available with libmpv
+        """
+        # call the method
+        with self.assertLogs("dakara_player.media_player.libmpv", "WARNING") as logger:
+            mpv_player, mocked_libmpv = self.get_instance(
+                {"kara_folder": gettempdir(), "persistent_mpv": {"enabled": True}}
+            )
+
+        # assert the result
+        self.assertFalse(mpv_player.persistent)
+        self.assertIsNone(mpv_player.process)
+
+        # assert the logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "WARNING:dakara_player.media_player.libmpv:"
+                "Persistent mpv is not supported with libmpv"
+            ],
+        )
+
+    def test_set_mpv_default_callbacks(self):
+        """Test to set the callbacks of libmpv
+        """
+        mpv_player, _ = self.get_instance()
+
+        # call the method
+        mpv_player.set_mpv_default_callbacks()
+
+        # assert the calls
+        mpv_player.player.event_callback.assert_any_call("end-file")
+        mpv_player.player.event_callback.assert_any_call("start-file")
+        mpv_player.player.event_callback.return_value.assert_any_call(
+            mpv_player.handle_end_file
+        )
+        mpv_player.player.observe_property.assert_called_with(
+            "pause", mpv_player.handle_pause_property
+        )
+
+    @patch.object(MediaPlayerLibmpv, "handle_unpause")
+    @patch.object(MediaPlayerLibmpv, "handle_pause")
+    def test_handle_pause_property(self, mocked_handle_pause, mocked_handle_unpause):
+        """Test changes of the pause property are converted to events
+        """
+        mpv_player, _ = self.get_instance()
+        mpv_player.set_mpv_default_callbacks()
+
+        # call the method with the initial value
+        mpv_player.handle_pause_property("pause", False)
+
+        # assert no event
+        mocked_handle_pause.assert_not_called()
+        mocked_handle_unpause.assert_not_called()
+
+        # call the method with changes
+        mpv_player.handle_pause_property("pause", True)
+        mpv_player.handle_pause_property("pause", True)
+        mpv_player.handle_pause_property("pause", False)
+
+        # assert the events
+        mocked_handle_pause.assert_called_once_with(None)
+        mocked_handle_unpause.assert_called_once_with(None)
+
+    def test_check_player_alive(self):
+        """Test to check a libmpv core alive
+        """
+        mpv_player, _ = self.get_instance()
+        mpv_player.player.core_shutdown = False
+        mpv_player.player.time_pos = 12.5
+
+        # call the method
+        with patch.object(mpv_player, "respawn_player") as mocked_respawn_player:
+            mpv_player.check_player()
+
+        # assert the call
+        mocked_respawn_player.assert_not_called()
+        self.assertEqual(mpv_player.heartbeat_position, 12.5)
+
+    def test_check_player_unreachable(self):
+        """Test to check a libmpv core failing to answer
+        """
+        mpv_player, _ = self.get_instance()
+        mpv_player.player.core_shutdown = False
+        type(mpv_player.player).time_pos = PropertyMock(
+            side_effect=SystemError("core shut down")
+        )
+
+        # call the method
+        with patch.object(mpv_player, "respawn_player") as mocked_respawn_player:
+            with self.assertLogs(
+                "dakara_player.media_player.libmpv", "DEBUG"
+            ) as logger:
+                mpv_player.check_player()
+
+        # assert the call
+        mocked_respawn_player.assert_called_with()
+
+        # assert the logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "ERROR:dakara_player.media_player.libmpv:mpv core is not "
+                "reachable: core shut down"
+            ],
+        )
+
+    def test_check_player_programming_error(self):
+        """Test a programming error is not mistaken for a dead libmpv core
+        """
+        mpv_player, _ = self.get_instance()
+        mpv_player.player.core_shutdown = False
+        type(mpv_player.player).time_pos = PropertyMock(side_effect=TypeError())
+
+        # call the method
+        with patch.object(mpv_player, "respawn_player") as mocked_respawn_player:
+            with self.assertRaises(TypeError):
+                mpv_player.check_player()
+
+        # assert the call
+        mocked_respawn_player.assert_not_called()
+
+    def test_check_player_shutdown(self):
+        """Test to check a libmpv core which has shut down
+        """
+        mpv_player, _ = self.get_instance()
+        mpv_player.player.core_shutdown = True
+
+        # call the method
+        with patch.object(mpv_player, "respawn_player") as mocked_respawn_player:
+            with self.assertLogs(
+                "dakara_player.media_player.libmpv", "DEBUG"
+            ) as logger:
+                mpv_player.check_player()
+
+        # assert the call
+        mocked_respawn_player.assert_called_with()
+
+        # assert the logs
+        self.assertListEqual(
+            logger.output,
+            ["ERROR:dakara_player.media_player.libmpv:mpv core has shut down"],
+        )
+
+    @patch.object(MediaPlayerLibmpv, "play")
+    def test_respawn_player(self, mocked_play):
+        """Test to respawn libmpv while idle
+        """
+        mpv_player, _ = self.get_instance()
+        mocked_player = mpv_player.player
+        mpv_player.state = "idle"
+
+        # call the method
+        with patch("dakara_player.media_player.libmpv.libmpv") as mocked_libmpv:
+            with self.assertLogs("dakara_player.media_player.mpv", "INFO"):
+                mpv_player.respawn_player()
+
+        # assert the calls
+        mocked_player.terminate.assert_called_with()
+        self.assertIs(mpv_player.player, mocked_libmpv.MPV.return_value)
+        mocked_play.assert_called_with("idle", 0)
+
+    @patch.object(MediaPlayerLibmpv, "handle_log_messages")
+    def test_handle_libmpv_log(self, mocked_handle_log_messages):
+        """Test to handle a log message of libmpv
+        """
+        mpv_player, _ = self.get_instance()
+
+        # call the method
+        mpv_player.handle_libmpv_log("error", "vo", "message\n")
+
+        # assert the call
+        mocked_handle_log_messages.assert_called_with("error", "vo", "message")
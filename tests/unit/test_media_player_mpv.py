@@ -1,3 +1,4 @@
+import logging
 from queue import Queue
 from contextlib import ExitStack
 from tempfile import gettempdir
@@ -5,10 +6,18 @@ from threading import Event
 from unittest import TestCase
 from unittest.mock import MagicMock, patch, call
 
-from path import Path
+import python_mpv_jsonipc
+from path import Path, TempDir
 
-from dakara_player.media_player.mpv import MediaPlayerMpv
+from dakara_player.media_info import MediaInfo, TrackInfo
+from dakara_player.media_player.mpv import (
+    MediaPlayerMpv,
+    MpvRespawnError,
+    MpvStartError,
+)
+from dakara_player.playlist_entry import PlaylistEntry
 from dakara_player.media_player.base import (
+    PREPARATION_WAIT_TIMEOUT,
     MediaPlayerNotAvailableError,
     InvalidStateError,
     VersionNotFoundError,
@@ -28,11 +37,34 @@ class MediaPlayerMpvTestCase(TestCase):
         self.subtitle_file_path = Path("file_sub")
 
         # create plàylist entry
-        self.playlist_entry = {
-            "id": self.id,
-            "song": {"title": "Song title", "file_path": self.song_file_path},
-            "owner": "me",
-        }
+        self.playlist_entry = PlaylistEntry.from_dict(
+            {
+                "id": self.id,
+                "song": {"title": "Song title", "file_path": self.song_file_path},
+                "owner": "me",
+            },
+            Path(gettempdir()),
+        )
+
+    def get_bindings_player(self, properties=()):
+        """Get an object of the mpv bindings, not connected to mpv
+
+        Only the command and terminate methods are mocked, so that attributes
+        behave as with an actual mpv.
+
+        Args:
+            properties (list of str): Names of the properties known by the
+                bindings, with underscores.
+
+        Returns:
+            python_mpv_jsonipc.MPV: Object of the bindings.
+        """
+        player = object.__new__(python_mpv_jsonipc.MPV)
+        player.properties = set(properties)
+        player.command = MagicMock()
+        player.terminate = MagicMock()
+
+        return player
 
     def get_instance(
         self,
@@ -115,12 +147,12 @@ class MediaPlayerMpvTestCase(TestCase):
                 ),
             )
 
-    def set_playlist_entry(self, mpv_player, started=True):
+    def set_playlist_entry(self, mpv_player, state="song"):
         """Set a playlist entry and make the player play it
 
         Args:
             mpv_player (MediaPlayerMpv): Instance of the mpv player.
-            started (bool): If True, make the player play the song.
+            state (str): State to put the player in, if not None.
         """
         mpv_player.playlist_entry = self.playlist_entry
 
@@ -137,8 +169,9 @@ class MediaPlayerMpvTestCase(TestCase):
             mpv_player.kara_folder_path / self.subtitle_file_path
         )
 
-        # set media has started
-        if started:
+        # set media state
+        if state is not None:
+            mpv_player.set_state(state)
             mpv_player.player.path = mpv_player.playlist_entry_data["song"].path
             mpv_player.player.sub_files = [
                 mpv_player.playlist_entry_data["song"].path_subtitle
@@ -241,8 +274,9 @@ class MediaPlayerMpvTestCase(TestCase):
 
         self.assertEqual(mpv_player.get_timing(), 0)
 
+    @patch.object(MediaPlayerMpv, "create_ipc_client")
     @patch.object(MediaPlayerMpv, "get_version")
-    def test_load_player(self, mocked_get_version):
+    def test_load_player(self, mocked_get_version, mocked_create_ipc_client):
         """Test to load the instance
         """
         # create mock
@@ -257,22 +291,28 @@ class MediaPlayerMpvTestCase(TestCase):
 
         # assert the calls
         mocked_get_version.assert_called_with()
+        self.assertIs(mpv_player.ipc_client, mocked_create_ipc_client.return_value)
 
         # assert the logs
         self.assertListEqual(
             logger.output, ["INFO:dakara_player.media_player.mpv:mpv 0.32.0"]
         )
 
+    @patch.object(MediaPlayerMpv, "create_thread")
     @patch.object(MediaPlayerMpv, "clear_playlist_entry")
     @patch.object(MediaPlayerMpv, "play")
-    def test_handle_end_file_transition(self, mocked_play, mocked_clear_playlist_entry):
+    def test_handle_end_file_transition(
+        self, mocked_play, mocked_clear_playlist_entry, mocked_create_thread
+    ):
         """Test end file callback for after a transition
+
+        The song should be played from another thread.
         """
         # create instance
         mpv_player, (mocked_player, _, _), _ = self.get_instance()
         mpv_player.set_callback("finished", MagicMock())
-        self.set_playlist_entry(mpv_player)
-        mocked_player.playlist[0]["filename"] = Path(gettempdir()) / "transition.png"
+        self.set_playlist_entry(mpv_player, "transition")
+        mpv_player.generation = 3
 
         # call the method
         with self.assertLogs("dakara_player.media_player.mpv", "DEBUG") as logger:
@@ -290,7 +330,11 @@ class MediaPlayerMpvTestCase(TestCase):
         )
 
         # assert the call
-        mocked_play.assert_called_with("song")
+        mocked_create_thread.assert_called_with(
+            target=mpv_player.play_if_current, args=("song", 3)
+        )
+        mocked_create_thread.return_value.start.assert_called_with()
+        mocked_play.assert_not_called()
         mocked_clear_playlist_entry.assert_not_called()
         mpv_player.callbacks["finished"].assert_not_called()
 
@@ -317,7 +361,37 @@ class MediaPlayerMpvTestCase(TestCase):
         # assert the call
         mocked_play.assert_not_called()
         mocked_clear_playlist_entry.assert_called_with()
-        mpv_player.callbacks["finished"].assert_called_with(self.playlist_entry["id"])
+        mpv_player.callbacks["finished"].assert_called_with(self.playlist_entry.id)
+
+    @patch.object(MediaPlayerMpv, "clear_playlist_entry")
+    @patch.object(MediaPlayerMpv, "play")
+    def test_handle_end_file_stale(self, mocked_play, mocked_clear_playlist_entry):
+        """Test end file callback while a new media is loading
+        """
+        # create instance
+        mpv_player, (mocked_player, _, _), _ = self.get_instance()
+        mpv_player.set_callback("finished", MagicMock())
+        self.set_playlist_entry(mpv_player, "transition_loading")
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.mpv", "DEBUG") as logger:
+            mpv_player.handle_end_file({"event": "end-file"})
+
+        # assert effect on logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "DEBUG:dakara_player.media_player.mpv:File end callback called",
+                "DEBUG:dakara_player.media_player.mpv:Discarding stale end file "
+                "event in state transition_loading",
+            ],
+        )
+
+        # assert the call
+        self.assertFalse(mpv_player.stop.is_set())
+        mocked_play.assert_not_called()
+        mocked_clear_playlist_entry.assert_not_called()
+        mpv_player.callbacks["finished"].assert_not_called()
 
     @patch.object(MediaPlayerMpv, "clear_playlist_entry")
     @patch.object(MediaPlayerMpv, "play")
@@ -327,8 +401,7 @@ class MediaPlayerMpvTestCase(TestCase):
         # create instance
         mpv_player, (mocked_player, _, _), _ = self.get_instance()
         mpv_player.set_callback("finished", MagicMock())
-        self.set_playlist_entry(mpv_player)
-        mocked_player.playlist[0]["filename"] = Path(gettempdir()) / "other"
+        self.set_playlist_entry(mpv_player, None)
 
         self.assertFalse(mpv_player.stop.is_set())
 
@@ -356,45 +429,40 @@ class MediaPlayerMpvTestCase(TestCase):
 
         # mock the call
         mpv_player.set_callback("error", MagicMock())
+        mpv_player.log_pipeline = MagicMock()
 
         # call the method
-        with self.assertLogs(
-            "dakara_player.media_player.mpv", "DEBUG"
-        ) as logger, self.assertLogs("mpv", "DEBUG") as logger_mpv:
+        with self.assertLogs("dakara_player.media_player.mpv", "DEBUG") as logger:
             mpv_player.handle_log_messages("fatal", "mpv.component", "error message")
 
         # assert effect on logs
         self.assertListEqual(
             logger.output,
             [
-                "DEBUG:dakara_player.media_player.mpv:Log message callback called",
                 "ERROR:dakara_player.media_player.mpv:Unable to play '{}'".format(
                     Path(gettempdir()) / self.song_file_path
                 ),
             ],
         )
-        self.assertListEqual(
-            logger_mpv.output, ["CRITICAL:mpv:mpv.component: error message"]
+        mpv_player.log_pipeline.submit.assert_called_with(
+            logging.CRITICAL, "mpv.component", "error message"
         )
 
         # assert the call
         mpv_player.callbacks["error"].assert_called_with(
-            self.playlist_entry["id"], "Unable to play current song: error message"
+            self.playlist_entry.id, "Unable to play current song: error message"
         )
         mocked_skip.assert_called_with()
 
-    @patch.object(MediaPlayerMpv, "is_playing_this")
-    def test_handle_start_file_transition(self, mocked_is_playing_this):
+    @patch.object(MediaPlayerMpv, "create_timer")
+    def test_handle_start_file_transition(self, mocked_create_timer):
         """Test start file callback for a transition
         """
         # create instance
         mpv_player, (mocked_player, _, _), _ = self.get_instance()
         mpv_player.set_callback("started_transition", MagicMock())
         mpv_player.set_callback("started_song", MagicMock())
-        self.set_playlist_entry(mpv_player)
-
-        # create mocks
-        mocked_is_playing_this.return_value = True
+        self.set_playlist_entry(mpv_player, "transition_loading")
 
         # call the method
         with self.assertLogs("dakara_player.media_player.mpv", "DEBUG") as logger:
@@ -412,23 +480,22 @@ class MediaPlayerMpvTestCase(TestCase):
 
         # assert the call
         mpv_player.callbacks["started_transition"].assert_called_with(
-            self.playlist_entry["id"]
+            self.playlist_entry.id
         )
         mpv_player.callbacks["started_song"].assert_not_called()
-        mocked_is_playing_this.assert_called_with("transition")
+        self.assertEqual(mpv_player.state, "transition")
+        mocked_create_timer.assert_called_with(
+            1.5, mpv_player.check_song_ready, args=(0,)
+        )
 
-    @patch.object(MediaPlayerMpv, "is_playing_this")
-    def test_handle_start_file_song(self, mocked_is_playing_this):
+    def test_handle_start_file_song(self):
         """Test start file callback for a song
         """
         # create instance
         mpv_player, (mocked_player, _, _), _ = self.get_instance()
         mpv_player.set_callback("started_transition", MagicMock())
         mpv_player.set_callback("started_song", MagicMock())
-        self.set_playlist_entry(mpv_player)
-
-        # create mocks
-        mocked_is_playing_this.side_effect = [False, True]
+        self.set_playlist_entry(mpv_player, "song_loading")
 
         # call the method
         with self.assertLogs("dakara_player.media_player.mpv", "DEBUG") as logger:
@@ -446,29 +513,17 @@ class MediaPlayerMpvTestCase(TestCase):
 
         # assert the call
         mpv_player.callbacks["started_transition"].assert_not_called()
-        mpv_player.callbacks["started_song"].assert_called_with(
-            self.playlist_entry["id"]
-        )
+        mpv_player.callbacks["started_song"].assert_called_with(self.playlist_entry.id)
+        self.assertEqual(mpv_player.state, "song")
 
-        # assert the call
-        mpv_player.callbacks["started_transition"].assert_not_called()
-        mpv_player.callbacks["started_song"].assert_called_with(
-            self.playlist_entry["id"]
-        )
-        mocked_is_playing_this.assert_has_calls([call("transition"), call("song")])
-
-    @patch.object(MediaPlayerMpv, "is_playing_this")
-    def test_handle_start_file_idle(self, mocked_is_playing_this):
+    def test_handle_start_file_idle(self):
         """Test start file callback for a idle
         """
         # create instance
         mpv_player, (mocked_player, _, _), _ = self.get_instance()
         mpv_player.set_callback("started_transition", MagicMock())
         mpv_player.set_callback("started_song", MagicMock())
-        self.set_playlist_entry(mpv_player)
-
-        # create mocks
-        mocked_is_playing_this.side_effect = [False, False, True]
+        mpv_player.set_state("idle")
 
         # call the method
         with self.assertLogs("dakara_player.media_player.mpv", "DEBUG") as logger:
@@ -486,22 +541,15 @@ class MediaPlayerMpvTestCase(TestCase):
         # assert the call
         mpv_player.callbacks["started_transition"].assert_not_called()
         mpv_player.callbacks["started_song"].assert_not_called()
-        mocked_is_playing_this.assert_has_calls(
-            [call("transition"), call("song"), call("idle")]
-        )
 
-    @patch.object(MediaPlayerMpv, "is_playing_this")
-    def test_handle_start_file_unknown(self, mocked_is_playing_this):
+    def test_handle_start_file_unknown(self):
         """Test start file callback for an unknown state
         """
         # create instance
         mpv_player, (mocked_player, _, _), _ = self.get_instance()
         mpv_player.set_callback("started_transition", MagicMock())
         mpv_player.set_callback("started_song", MagicMock())
-        self.set_playlist_entry(mpv_player)
-
-        # create mocks
-        mocked_is_playing_this.return_value = False
+        self.set_playlist_entry(mpv_player, None)
 
         self.assertFalse(mpv_player.stop.is_set())
 
@@ -543,8 +591,35 @@ class MediaPlayerMpvTestCase(TestCase):
         )
 
         # assert the call
-        mpv_player.callbacks["paused"].assert_called_with(self.playlist_entry["id"], 42)
+        mpv_player.callbacks["paused"].assert_called_with(self.playlist_entry.id, 42)
         mocked_get_timing.assert_called_with()
+        self.assertEqual(mpv_player.state, "paused")
+
+    def test_handle_pause_stale(self):
+        """Test pause callback when already paused
+        """
+        # create instance
+        mpv_player, _, _ = self.get_instance()
+        mpv_player.set_callback("paused", MagicMock())
+        self.set_playlist_entry(mpv_player)
+        mpv_player.enter_pause()
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.mpv", "DEBUG") as logger:
+            mpv_player.handle_pause({})
+
+        # assert effect on logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "DEBUG:dakara_player.media_player.mpv:Pause callback called",
+                "DEBUG:dakara_player.media_player.mpv:Discarding stale pause "
+                "event in state paused",
+            ],
+        )
+
+        # assert the call
+        mpv_player.callbacks["paused"].assert_not_called()
 
     @patch.object(MediaPlayerMpv, "get_timing")
     def test_handle_unpause(self, mocked_get_timing):
@@ -554,6 +629,7 @@ class MediaPlayerMpvTestCase(TestCase):
         mpv_player, _, _ = self.get_instance()
         mpv_player.set_callback("resumed", MagicMock())
         self.set_playlist_entry(mpv_player)
+        mpv_player.enter_pause()
 
         # create the mocks
         mocked_get_timing.return_value = 42
@@ -572,10 +648,58 @@ class MediaPlayerMpvTestCase(TestCase):
         )
 
         # assert the call
-        mpv_player.callbacks["resumed"].assert_called_with(
-            self.playlist_entry["id"], 42
-        )
+        mpv_player.callbacks["resumed"].assert_called_with(self.playlist_entry.id, 42)
         mocked_get_timing.assert_called_with()
+        self.assertEqual(mpv_player.state, "song")
+
+    @patch.object(MediaPlayerMpv, "play")
+    def test_skip(self, mocked_play):
+        """Test to skip a song
+        """
+        mpv_player, _, _ = self.get_instance()
+        mpv_player.set_callback("finished", MagicMock())
+        self.set_playlist_entry(mpv_player)
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.mpv", "DEBUG"):
+            mpv_player.skip()
+
+        # assert the call
+        mocked_play.assert_called_with("idle")
+        mpv_player.callbacks["finished"].assert_called_with(self.playlist_entry.id)
+        self.assertIsNone(mpv_player.playlist_entry)
+        self.assertIsNotNone(mpv_player.skip_time)
+
+    @patch.object(MediaPlayerMpv, "play")
+    def test_skip_idle(self, mocked_play):
+        """Test to skip the idle screen
+        """
+        mpv_player, _, _ = self.get_instance()
+        mpv_player.set_callback("finished", MagicMock())
+        mpv_player.set_state("idle")
+
+        # call the method
+        mpv_player.skip()
+
+        # assert the call
+        mocked_play.assert_not_called()
+        mpv_player.callbacks["finished"].assert_not_called()
+
+    def test_handle_start_file_idle_after_skip(self):
+        """Test start file callback for a idle screen after a skip
+        """
+        # create instance
+        mpv_player, _, _ = self.get_instance()
+        mpv_player.set_state("idle")
+        mpv_player.start_skip()
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.mpv", "DEBUG"):
+            mpv_player.handle_start_file({})
+
+        # assert the skip duration has been recorded
+        self.assertIsNone(mpv_player.skip_time)
+        self.assertEqual(mpv_player.metrics.get_duration("skip")["count"], 1)
 
     def test_init(self):
         """Test to initialize mpv player with custom config
@@ -583,7 +707,151 @@ class MediaPlayerMpvTestCase(TestCase):
         mpv_player, (mocked_player, _, _), _ = self.get_instance(
             {"mpv": {"key1": "value1"}}
         )
-        self.assertEqual(getattr(mocked_player, "key1"), "value1")
+        mocked_player.command.assert_called_with("set_property", "key1", "value1")
+
+    @patch("dakara_player.media_player.mpv.probe_ipc_socket")
+    def test_init_persistent_reattach(self, mocked_probe_ipc_socket):
+        """Test to initialize mpv player reusing a running mpv
+        """
+        mocked_probe_ipc_socket.return_value = True
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.mpv", "DEBUG") as logger:
+            (
+                mpv_player,
+                (mocked_player, _, _),
+                (mocked_mpv_class, _, _),
+            ) = self.get_instance(
+                {"persistent_mpv": {"enabled": True, "ipc_socket": "mpv.sock"}}
+            )
+
+        # assert the calls
+        mocked_mpv_class.assert_called_with(
+            start_mpv=False,
+            ipc_socket=Path("mpv.sock"),
+            log_handler=mpv_player.handle_log_messages,
+            loglevel="info",
+        )
+        mocked_player.command.assert_called_with("stop")
+        self.assertIsNone(mpv_player.process)
+
+        # assert the logs
+        self.assertIn(
+            "INFO:dakara_player.media_player.mpv:Reattached to running mpv on mpv.sock",
+            logger.output,
+        )
+
+    def test_init_profile(self):
+        """Test to initialize mpv player with a performance profile
+
+        Options with hyphens should reach mpv.
+        """
+        player = self.get_bindings_player(["cache", "demuxer_max_bytes"])
+
+        # call the method
+        with self.assertLogs(
+            "dakara_player.media_player.base", "DEBUG"
+        ) as logger, patch(
+            "dakara_player.media_player.mpv.mpv.MPV", return_value=player
+        ):
+            mpv_player, _, _ = self.get_instance(
+                {
+                    "kara_folder": gettempdir(),
+                    "profile": "sbc",
+                    "mpv": {"cache": "yes"},
+                },
+                mock_instance=False,
+            )
+
+        # assert the effect
+        self.assertEqual(mpv_player.config_mpv["demuxer-max-bytes"], "32MiB")
+        self.assertEqual(mpv_player.config_mpv["cache"], "yes")
+        player.command.assert_any_call("set_property", "demuxer-max-bytes", "32MiB")
+        player.command.assert_any_call("set_property", "cache", "yes")
+        self.assertNotIn("demuxer-max-bytes", vars(player))
+
+        # assert the logs
+        self.assertIn(
+            "INFO:dakara_player.media_player.base:Using sbc performance profile",
+            logger.output,
+        )
+
+    @patch("dakara_player.media_player.mpv.subprocess.Popen")
+    @patch("dakara_player.media_player.mpv.probe_ipc_socket")
+    def test_init_persistent_start(self, mocked_probe_ipc_socket, mocked_popen):
+        """Test to initialize mpv player starting a persistent mpv
+        """
+        mocked_probe_ipc_socket.side_effect = [False, True]
+        mocked_popen.return_value.poll.return_value = None
+
+        # call the method
+        mpv_player, (mocked_player, _, _), _ = self.get_instance(
+            {"persistent_mpv": {"enabled": True, "ipc_socket": "mpv.sock"}}
+        )
+
+        # assert the calls
+        mocked_popen.assert_called_with(
+            [
+                "mpv",
+                "--idle=yes",
+                "--input-ipc-server=mpv.sock",
+                "--input-terminal=no",
+                "--terminal=no",
+            ],
+            start_new_session=True,
+        )
+        self.assertIs(mpv_player.process, mocked_popen.return_value)
+        mocked_player.command.assert_not_called()
+
+    @patch("dakara_player.media_player.mpv.subprocess.Popen")
+    @patch("dakara_player.media_player.mpv.probe_ipc_socket")
+    def test_init_persistent_start_failed(self, mocked_probe_ipc_socket, mocked_popen):
+        """Test to initialize mpv player when a persistent mpv cannot start
+        """
+        mocked_probe_ipc_socket.return_value = False
+        mocked_popen.return_value.poll.return_value = 1
+        mocked_popen.return_value.returncode = 1
+
+        # call the method
+        with self.assertRaisesRegex(MpvStartError, "mpv has exited with code 1"):
+            self.get_instance(
+                {"persistent_mpv": {"enabled": True, "ipc_socket": "mpv.sock"}}
+            )
+
+    @patch("dakara_player.media_player.mpv.probe_ipc_socket")
+    def test_stop_player_persistent(self, mocked_probe_ipc_socket):
+        """Test to stop a persistent mpv without error
+        """
+        mocked_probe_ipc_socket.return_value = True
+        mpv_player, (mocked_player, _, _), _ = self.get_instance(
+            {"persistent_mpv": {"enabled": True, "ipc_socket": "mpv.sock"}}
+        )
+        mpv_player.process = MagicMock()
+
+        # call the method
+        mpv_player.stop_player()
+
+        # assert the calls
+        mocked_player.terminate.assert_called_with()
+        mpv_player.process.terminate.assert_not_called()
+
+    @patch("dakara_player.media_player.mpv.probe_ipc_socket")
+    def test_stop_player_persistent_error(self, mocked_probe_ipc_socket):
+        """Test to stop a persistent mpv after an error
+        """
+        mocked_probe_ipc_socket.return_value = True
+        mpv_player, (mocked_player, _, _), _ = self.get_instance(
+            {"persistent_mpv": {"enabled": True, "ipc_socket": "mpv.sock"}}
+        )
+        mpv_player.process = MagicMock()
+        mpv_player.errors.put_nowait(ValueError())
+
+        # call the method
+        mpv_player.stop_player()
+
+        # assert the calls
+        mocked_player.terminate.assert_called_with()
+        mpv_player.process.terminate.assert_called_with()
 
     def test_play_invalid(self):
         """Test to play invalid action
@@ -605,4 +873,466 @@ class MediaPlayerMpvTestCase(TestCase):
         mpv_player.play("song")
 
         mpv_player.player.play.assert_called_with("test_file")
-        self.assertNotEqual(mpv_player.player.sub_files, [None])
+        mpv_player.player.command.assert_any_call("set_property", "sub-files", [])
+
+    @patch.object(MediaPlayerMpv, "generate_text")
+    def test_play_song_not_ready(self, mocked_generate_text):
+        """Test to play a song that is not ready in time
+
+        The playlist entry should be rejected and the idle screen played.
+        """
+        mpv_player, _, _ = self.get_instance()
+        self.set_playlist_entry(mpv_player, "transition")
+        mpv_player.set_callback("error", MagicMock())
+        mpv_player.set_callback("could_not_play", MagicMock())
+        preparation = mpv_player.preparation = MagicMock()
+        preparation.wait.return_value = False
+
+        with self.assertLogs("dakara_player.media_player.base", "DEBUG") as logger:
+            mpv_player.play("song")
+
+        # assert effect on logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "ERROR:dakara_player.media_player.base:Song not ready to be played "
+                "'{}'".format(Path(gettempdir()) / self.song_file_path),
+                "DEBUG:dakara_player.media_player.base:Player state is now idle",
+            ],
+        )
+
+        # assert the call
+        preparation.wait.assert_called_with(timeout=PREPARATION_WAIT_TIMEOUT)
+        preparation.cancel.assert_called_with()
+        mpv_player.callbacks["error"].assert_called_with(
+            self.id, "Song not ready to be played"
+        )
+        mpv_player.callbacks["could_not_play"].assert_called_with(self.id)
+        self.assertIsNone(mpv_player.playlist_entry)
+        self.assertTrue(mpv_player.is_playing_this("idle"))
+
+    def test_play_reload(self):
+        """Test to reload a song at a given position
+        """
+        mpv_player, _, _ = self.get_instance()
+        self.set_playlist_entry(mpv_player, "song")
+        mpv_player.preparation = None
+
+        # call the method
+        mpv_player.play("song", 12.5)
+
+        # assert the call
+        mpv_player.player.command.assert_any_call("set_property", "start", "12.500")
+        mpv_player.player.play.assert_called_with(
+            mpv_player.playlist_entry_data["song"].path
+        )
+        self.assertEqual(mpv_player.state, "song_loading")
+        self.assertTrue(mpv_player.state_reloaded)
+
+    def test_play_batch(self):
+        """Test to play a song with pipelined requests
+        """
+        mpv_player, _, _ = self.get_instance()
+        self.set_playlist_entry(mpv_player, "song")
+        mpv_player.preparation = None
+        mpv_player.ipc_client = MagicMock()
+
+        # call the method
+        mpv_player.play("song", 12.5)
+
+        # assert the call
+        mpv_player.ipc_client.batch.assert_called_once_with(
+            [
+                ["set_property", "image-display-duration", 0],
+                [
+                    "set_property",
+                    "sub-files",
+                    [mpv_player.playlist_entry_data["song"].path_subtitle],
+                ],
+                ["set_property", "audio-files", []],
+                ["set_property", "audio", "auto"],
+                ["set_property", "pause", False],
+                ["set_property", "start", "12.500"],
+                ["loadfile", mpv_player.playlist_entry_data["song"].path],
+            ]
+        )
+        mpv_player.player.play.assert_not_called()
+
+    def test_play_instrumental_track(self):
+        """Test to play a song with its instrumental track
+        """
+        mpv_player, _, _ = self.get_instance()
+        self.set_playlist_entry(mpv_player, "song")
+        mpv_player.preparation = None
+        mpv_player.playlist_entry_data["song"].path_audio = "self"
+        mpv_player.playlist_entry_data["song"].audio_track_id = 3
+
+        # call the method
+        mpv_player.play("song")
+
+        # assert the call
+        mpv_player.player.command.assert_any_call("set_property", "audio", 3)
+
+    @patch.object(MediaPlayerMpv, "get_media_info")
+    @patch.object(MediaPlayerMpv, "get_instrumental_file")
+    def test_manage_instrumental_track(
+        self, mocked_get_instrumental_file, mocked_get_media_info
+    ):
+        """Test to request the instrumental track read from the file
+        """
+        mpv_player, _, _ = self.get_instance()
+        mocked_get_instrumental_file.return_value = None
+        mocked_get_media_info.return_value = MediaInfo(
+            "matroska",
+            [
+                TrackInfo(1, "video"),
+                TrackInfo(2, "audio"),
+                TrackInfo(3, "audio", title="Commentary"),
+                TrackInfo(4, "audio", title="Instrumental"),
+            ],
+        )
+
+        # call the method
+        mpv_player.manage_instrumental(
+            self.playlist_entry, self.song_file_path, mpv_player.playlist_entry_data
+        )
+
+        # assert the result
+        self.assertEqual(mpv_player.playlist_entry_data["song"].path_audio, "self")
+        self.assertEqual(mpv_player.playlist_entry_data["song"].audio_track_id, 3)
+
+        # assert the call
+        mocked_get_media_info.assert_called_with(self.song_file_path)
+
+    @patch.object(MediaPlayerMpv, "get_media_info")
+    @patch.object(MediaPlayerMpv, "get_instrumental_file")
+    def test_manage_instrumental_no_track(
+        self, mocked_get_instrumental_file, mocked_get_media_info
+    ):
+        """Test to request the instrumental track of a file with one audio track
+        """
+        mpv_player, _, _ = self.get_instance()
+        mocked_get_instrumental_file.return_value = None
+        mocked_get_media_info.return_value = MediaInfo(
+            "matroska", [TrackInfo(1, "video"), TrackInfo(2, "audio")]
+        )
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.mpv", "DEBUG") as logger:
+            mpv_player.manage_instrumental(
+                self.playlist_entry, self.song_file_path, mpv_player.playlist_entry_data
+            )
+
+        # assert the result
+        self.assertIsNone(mpv_player.playlist_entry_data["song"].path_audio)
+
+        # assert effect on logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "WARNING:dakara_player.media_player.mpv:Cannot find instrumental "
+                "file or track for file '{}'".format(self.song_file_path)
+            ],
+        )
+
+    @patch.object(MediaPlayerMpv, "get_media_info")
+    @patch.object(MediaPlayerMpv, "get_instrumental_file")
+    def test_manage_instrumental_unknown_tracks(
+        self, mocked_get_instrumental_file, mocked_get_media_info
+    ):
+        """Test to request the instrumental track when tracks cannot be read
+        """
+        mpv_player, _, _ = self.get_instance()
+        mocked_get_instrumental_file.return_value = None
+        mocked_get_media_info.return_value = None
+
+        # call the method
+        mpv_player.manage_instrumental(
+            self.playlist_entry, self.song_file_path, mpv_player.playlist_entry_data
+        )
+
+        # assert the result
+        self.assertEqual(mpv_player.playlist_entry_data["song"].path_audio, "self")
+        self.assertEqual(mpv_player.playlist_entry_data["song"].audio_track_id, 2)
+
+    def test_get_frame_stats(self):
+        """Test to get the frame counters of mpv with pipelined requests
+        """
+        mpv_player, _, _ = self.get_instance()
+        mpv_player.ipc_client = MagicMock()
+        mpv_player.ipc_client.batch.return_value = [2, 1, 240, 23.976]
+
+        # call the method
+        counters = mpv_player.get_frame_stats()
+
+        # assert the result
+        # the dropped frames are counted in the frame number
+        self.assertEqual(counters, (3, 237, 23.976))
+        mpv_player.ipc_client.batch.assert_called_with(
+            [
+                ["get_property", "frame-drop-count"],
+                ["get_property", "decoder-frame-drop-count"],
+                ["get_property", "estimated-frame-number"],
+                ["get_property", "estimated-vf-fps"],
+            ]
+        )
+
+    def test_get_frame_stats_no_video(self):
+        """Test to get the frame counters of mpv without video
+        """
+        mpv_player, (mocked_player, _, _), _ = self.get_instance()
+        mocked_player.frame_drop_count = None
+        mocked_player.decoder_frame_drop_count = None
+        mocked_player.estimated_frame_number = None
+        mocked_player.estimated_vf_fps = None
+
+        self.assertIsNone(mpv_player.get_frame_stats())
+
+    def test_apply_degradation(self):
+        """Test to set degraded options of mpv
+
+        Options with hyphens should reach mpv.
+        """
+        mpv_player, _, _ = self.get_instance()
+        player = mpv_player.player = self.get_bindings_player(
+            ["deband", "blend_subtitles"]
+        )
+
+        # call the method
+        for settings in MediaPlayerMpv.degradation_steps[:2]:
+            mpv_player.apply_degradation(settings)
+
+        # assert the effect
+        player.command.assert_has_calls(
+            [
+                call("set_property", "deband", False),
+                call("set_property", "blend-subtitles", "video"),
+            ]
+        )
+        self.assertNotIn("blend-subtitles", vars(player))
+        self.assertFalse(mpv_player.config_mpv["deband"])
+        self.assertEqual(mpv_player.config_mpv["blend-subtitles"], "video")
+
+    @patch("dakara_player.media_player.mpv.MpvIpcClient", autospec=True)
+    def test_create_ipc_client(self, mocked_ipc_client_class):
+        """Test to connect the pipelined IPC client
+        """
+        mpv_player, (mocked_player, _, _), _ = self.get_instance()
+        mocked_player.mpv_process.ipc_socket = "/tmp/mpv-socket"
+
+        # call the method
+        client = mpv_player.create_ipc_client()
+
+        # assert the call
+        self.assertIs(client, mocked_ipc_client_class.return_value)
+        mocked_ipc_client_class.assert_called_with("/tmp/mpv-socket")
+        client.connect.assert_called_with()
+
+    @patch("dakara_player.media_player.mpv.MpvIpcClient", autospec=True)
+    def test_create_ipc_client_error(self, mocked_ipc_client_class):
+        """Test to connect the pipelined IPC client to an unreachable mpv
+        """
+        mpv_player, _, _ = self.get_instance()
+        mocked_ipc_client_class.return_value.connect.side_effect = OSError("error")
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.mpv", "DEBUG") as logger:
+            client = mpv_player.create_ipc_client()
+
+        # assert the call
+        self.assertIsNone(client)
+
+        # assert the logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "WARNING:dakara_player.media_player.mpv:Unable to pipeline "
+                "requests to mpv: error"
+            ],
+        )
+
+    def test_check_player_alive(self):
+        """Test to check a mpv answering to the heartbeat
+        """
+        mpv_player, (mocked_player, _, _), _ = self.get_instance()
+        mocked_player.mpv_process.process.poll.return_value = None
+        mocked_player.time_pos = 12.5
+
+        # call the method
+        with patch.object(mpv_player, "respawn_player") as mocked_respawn_player:
+            mpv_player.check_player()
+
+        # assert the call
+        mocked_respawn_player.assert_not_called()
+        self.assertEqual(mpv_player.heartbeat_position, 12.5)
+
+    def test_check_player_exited(self):
+        """Test to check a mpv whose process has exited
+        """
+        mpv_player, (mocked_player, _, _), _ = self.get_instance()
+        mocked_player.mpv_process.process.poll.return_value = 1
+        mocked_player.mpv_process.process.returncode = 1
+
+        # call the method
+        with patch.object(mpv_player, "respawn_player") as mocked_respawn_player:
+            with self.assertLogs("dakara_player.media_player.mpv", "DEBUG") as logger:
+                mpv_player.check_player()
+
+        # assert the call
+        mocked_respawn_player.assert_called_with()
+
+        # assert the logs
+        self.assertListEqual(
+            logger.output,
+            ["ERROR:dakara_player.media_player.mpv:mpv has exited with code 1"],
+        )
+
+    @patch("dakara_player.media_player.mpv.call_within")
+    def test_check_player_not_answering(self, mocked_call_within):
+        """Test to check a mpv not answering to the heartbeat
+        """
+        mpv_player, (mocked_player, _, _), _ = self.get_instance()
+        mocked_player.mpv_process.process.poll.return_value = None
+        mocked_call_within.side_effect = TimeoutError()
+
+        # call the method
+        with patch.object(mpv_player, "respawn_player") as mocked_respawn_player:
+            with self.assertLogs("dakara_player.media_player.mpv", "DEBUG") as logger:
+                mpv_player.check_player()
+
+        # assert the call
+        mocked_respawn_player.assert_called_with()
+
+        # assert the logs
+        self.assertListEqual(
+            logger.output,
+            ["ERROR:dakara_player.media_player.mpv:mpv has not answered within 2 s"],
+        )
+
+    @patch.object(MediaPlayerMpv, "play")
+    def test_respawn_player(self, mocked_play):
+        """Test to respawn mpv while playing a song
+        """
+        mpv_player, (mocked_player, _, _), _ = self.get_instance()
+        self.set_playlist_entry(mpv_player, "song")
+        mpv_player.heartbeat_position = 12.5
+
+        # call the method
+        with patch("dakara_player.media_player.mpv.mpv.MPV") as mocked_mpv_class:
+            with self.assertLogs("dakara_player.media_player.mpv", "DEBUG") as logger:
+                mpv_player.respawn_player()
+
+        # assert the calls
+        mocked_player.terminate.assert_called_with(join=False)
+        self.assertIs(mpv_player.player, mocked_mpv_class.return_value)
+        mpv_player.player.bind_event.assert_any_call(
+            "end-file", mpv_player.handle_end_file
+        )
+        mocked_play.assert_called_with("song", 12.5)
+
+        # assert the metrics
+        self.assertEqual(mpv_player.metrics.get_counter("respawns"), 1)
+        self.assertEqual(mpv_player.metrics.get_duration("respawn")["count"], 1)
+
+        # assert the logs
+        self.assertRegex(
+            logger.output[-1],
+            r"INFO:dakara_player.media_player.mpv:Respawned mpv in \d+\.\d{2} s",
+        )
+
+    @patch.object(MediaPlayerMpv, "play")
+    def test_respawn_player_paused(self, mocked_play):
+        """Test to respawn mpv while a song is paused
+        """
+        mpv_player, _, _ = self.get_instance()
+        self.set_playlist_entry(mpv_player, "song")
+        mpv_player.enter_pause()
+        mpv_player.heartbeat_position = 12.5
+
+        # call the method
+        with patch("dakara_player.media_player.mpv.mpv.MPV"):
+            mpv_player.respawn_player()
+
+        # assert the calls
+        mocked_play.assert_called_with("song", 12.5)
+        self.assertTrue(mpv_player.player.pause)
+        self.assertEqual(mpv_player.state, "paused")
+        self.assertEqual(mpv_player.state_paused, "song")
+
+    @patch.object(MediaPlayerMpv, "play")
+    def test_respawn_player_failed(self, mocked_play):
+        """Test to respawn mpv when it cannot start
+        """
+        mpv_player, _, _ = self.get_instance()
+        mpv_player.set_state("idle")
+
+        # call the method
+        with patch("dakara_player.media_player.mpv.mpv.MPV") as mocked_mpv_class:
+            mocked_mpv_class.side_effect = FileNotFoundError("mpv")
+            with self.assertRaisesRegex(MpvRespawnError, "Unable to respawn mpv: mpv"):
+                mpv_player.respawn_player()
+
+        # assert the call
+        mocked_play.assert_not_called()
+
+    @patch("dakara_player.media_player.base.check_file_integrity")
+    @patch.object(MediaPlayerMpv, "play")
+    @patch.object(MediaPlayerMpv, "generate_text")
+    def test_set_playlist_entry(
+        self, mocked_generate_text, mocked_play, mocked_check_file_integrity
+    ):
+        """Test to set a playlist entry
+        """
+        mpv_player, (_, mocked_background_loader, _), _ = self.get_instance()
+        mocked_background_loader.backgrounds = {
+            "transition": Path(gettempdir()) / "transition.png"
+        }
+
+        # run the preparation stages synchronously
+        mpv_player.preparation_executor = MagicMock()
+        mpv_player.preparation_executor.submit.side_effect = lambda f, *a: f(*a)
+
+        with TempDir() as temp:
+            (temp / "song.mkv").touch()
+            (temp / "song.ass").touch()
+            playlist_entry = PlaylistEntry.from_dict(
+                {"id": 42, "song": {"title": "Song title", "file_path": "song.mkv"}},
+                temp,
+            )
+
+            # call the method
+            mpv_player.set_playlist_entry(playlist_entry)
+
+        # assert the result
+        self.assertIs(mpv_player.playlist_entry, playlist_entry)
+        self.assertTrue(mpv_player.preparation.is_ready())
+        self.assertEqual(
+            mpv_player.playlist_entry_data["transition"].path,
+            Path(gettempdir()) / "transition.png",
+        )
+        self.assertEqual(mpv_player.playlist_entry_data["song"].path, temp / "song.mkv")
+        self.assertEqual(
+            mpv_player.playlist_entry_data["song"].path_subtitle, temp / "song.ass"
+        )
+        self.assertIsNone(mpv_player.playlist_entry_data["song"].path_audio)
+
+        # assert the call
+        mocked_generate_text.assert_called_with(
+            "transition",
+            fade_in=False,
+            playlist_entry=playlist_entry,
+            preparation=mpv_player.preparation,
+        )
+        mocked_play.assert_called_with("transition")
+        mocked_check_file_integrity.assert_called_with(temp / "song.mkv")
+
+    def test_reload_idle_text(self):
+        """Test to reload the idle screen text
+        """
+        mpv_player, (mocked_player, _, _), _ = self.get_instance()
+
+        # call the method
+        mpv_player.reload_idle_text()
+
+        # assert the call
+        mocked_player.command.assert_called_with("sub-reload")
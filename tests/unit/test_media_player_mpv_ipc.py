@@ -0,0 +1,186 @@
+import json
+import socket
+from threading import Thread
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from dakara_player.media_player.mpv_ipc import (
+    MpvIpcClient,
+    MpvIpcError,
+    PropertyStream,
+)
+
+
+class MpvIpcClientTestCase(TestCase):
+    """Test the pipelined IPC client of mpv
+    """
+
+    def setUp(self):
+        # create a connected client, mpv being the other end of the pair
+        self.client = MpvIpcClient("socket", timeout=1)
+        self.client.socket, self.mpv = socket.socketpair()
+        self.mpv_file = self.mpv.makefile("rb")
+        self.client.thread = Thread(target=self.client.receive)
+        self.client.thread.start()
+
+    def tearDown(self):
+        self.client.close()
+        self.mpv_file.close()
+        self.mpv.close()
+
+    def read_requests(self, count):
+        """Read requests sent by the client
+
+        Args:
+            count (int): Number of requests to read.
+
+        Returns:
+            list of dict: Requests.
+        """
+        return [json.loads(self.mpv_file.readline().decode()) for _ in range(count)]
+
+    def reply(self, *messages):
+        """Send messages to the client at once
+
+        Args:
+            messages (list of dict): Messages to send.
+        """
+        self.mpv.sendall(
+            b"".join(json.dumps(message).encode() + b"\n" for message in messages)
+        )
+
+    def reply_observe(self):
+        """Answer to a request to observe the idle-active property
+        """
+        request = self.read_requests(1)[0]
+        self.assertListEqual(
+            request["command"][::2], ["observe_property", "idle-active"]
+        )
+        self.reply({"request_id": request["request_id"], "error": "success"})
+
+    def test_batch(self):
+        """Test to send a batch of requests answered out of order
+        """
+        futures = self.client.send(
+            [["set_property", "pause", True], ["get_property", "path"]]
+        )
+
+        # assert the requests have been sent before any reply
+        requests = self.read_requests(2)
+        self.assertListEqual(
+            [request["command"] for request in requests],
+            [["set_property", "pause", True], ["get_property", "path"]],
+        )
+
+        # reply in reverse order, with an event in between
+        self.reply(
+            {"request_id": requests[1]["request_id"], "error": "success", "data": "f"},
+            {"event": "pause"},
+            {"request_id": requests[0]["request_id"], "error": "success"},
+        )
+
+        # assert the replies
+        self.assertListEqual(self.client.wait(futures), [None, "f"])
+
+    def test_batch_error(self):
+        """Test a batch of requests with a failed one
+        """
+        futures = self.client.send([["get_property", "foo"], ["get_property", "bar"]])
+        requests = self.read_requests(2)
+        self.reply(
+            {"request_id": requests[0]["request_id"], "error": "invalid parameter"},
+            {"request_id": requests[1]["request_id"], "error": "property unavailable"},
+        )
+
+        with self.assertRaisesRegex(MpvIpcError, "mpv request failed: invalid param"):
+            self.client.wait(futures)
+
+        # assert all the requests have been answered
+        self.assertDictEqual(self.client.pending, {})
+
+    def test_batch_timeout(self):
+        """Test a request not answered in time
+        """
+        self.client.timeout = 0.05
+
+        with self.assertRaisesRegex(MpvIpcError, "mpv has not answered within"):
+            self.client.command("get_property", "path")
+
+    def test_connection_lost(self):
+        """Test pending requests fail when the connection is lost
+        """
+        futures = self.client.send([["get_property", "path"]])
+        self.mpv.shutdown(socket.SHUT_RDWR)
+
+        with self.assertRaisesRegex(MpvIpcError, "mpv connection lost"):
+            self.client.wait(futures)
+
+        with self.assertRaisesRegex(MpvIpcError, "Connection to mpv is closed"):
+            self.client.send([["get_property", "path"]])
+
+    def test_invalid_message(self):
+        """Test malformed messages are ignored
+        """
+        futures = self.client.send([["get_property", "path"]])
+        request = self.read_requests(1)[0]
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.mpv_ipc", "WARNING") as logger:
+            self.mpv.sendall(b"{invalid\n[1]\n")
+            self.reply(
+                {"request_id": request["request_id"], "error": "success", "data": "f"}
+            )
+
+            # assert the reply
+            self.assertListEqual(self.client.wait(futures), ["f"])
+
+        # assert the effect on logs
+        self.assertEqual(len(logger.output), 2)
+        self.assertIn("Invalid message from mpv", logger.output[0])
+
+    def test_receive_error(self):
+        """Test pending requests fail when the reception stops on an error
+        """
+        futures = self.client.send([["get_property", "path"]])
+        self.read_requests(1)
+
+        # stop the reception on an error
+        self.client.handle_message = MagicMock(side_effect=RuntimeError("error"))
+        with patch("threading.excepthook") as mocked_excepthook:
+            self.reply({"event": "pause"})
+            self.client.thread.join(1)
+
+        mocked_excepthook.assert_called_once()
+
+        with self.assertRaisesRegex(MpvIpcError, "mpv connection lost"):
+            self.client.wait(futures)
+
+    def test_observe(self):
+        """Test to observe a property
+        """
+        thread = Thread(target=self.reply_observe)
+        thread.start()
+        stream = self.client.observe("idle-active")
+        thread.join()
+
+        self.reply(
+            {"event": "property-change", "id": 99, "name": "foo", "data": 1},
+            {"event": "property-change", "id": stream.observer_id, "data": False},
+            {"event": "property-change", "id": stream.observer_id, "data": True},
+        )
+
+        # assert the values
+        self.assertFalse(stream.get(1))
+        self.assertTrue(stream.get(1))
+
+        # assert the stream ends with the connection
+        self.mpv.shutdown(socket.SHUT_RDWR)
+        self.assertListEqual(list(stream), [])
+
+    def test_stream_get_timeout(self):
+        """Test to wait for a value of a property that does not change
+        """
+        stream = PropertyStream(self.client, 1, "pause")
+
+        with self.assertRaisesRegex(MpvIpcError, "Property pause has not changed"):
+            stream.get(0.01)
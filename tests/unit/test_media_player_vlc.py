@@ -1,13 +1,15 @@
+import logging
 import re
 from tempfile import gettempdir
 from contextlib import ExitStack
 from queue import Queue
 from threading import Event
-from time import sleep
+from time import monotonic, sleep
 from unittest import TestCase
-from unittest.mock import MagicMock, patch, call
+from unittest.mock import ANY, MagicMock, call, patch
 
 import vlc
+from dakara_base.resources_manager import get_file
 from packaging.version import parse
 from path import Path
 
@@ -16,12 +18,23 @@ from dakara_player.media_player.vlc import (
     VlcTooOldError,
 )
 from dakara_player.media_player.base import (
+    RESUME_WAIT_TIMEOUT,
+    TRANSITION_GATE_INTERVAL,
     KaraFolderNotFound,
     InvalidStateError,
     VersionNotFoundError,
 )
+from dakara_player.frame_stats import FrameStats
+from dakara_player.integrity import FileIntegrityError
+from dakara_player.io_executor import IOTimeoutError
+from dakara_player.media_info import MediaInfo, TrackInfo
+from dakara_player.playlist_entry import PlaylistEntry
 from dakara_player.mrl import mrl_to_path, path_to_mrl
-from dakara_player.text_generator import TextGenerator
+from dakara_player.text_generator import (
+    TemplateRenderError,
+    TemplateRenderTimeoutError,
+    TextGenerator,
+)
 
 
 @patch("dakara_player.media_player.base.PATH_BACKGROUNDS", "bg")
@@ -39,12 +52,15 @@ class MediaPlayerVlcTestCase(TestCase):
         self.song_file_path = Path("file")
 
         # create playlist entry
-        self.playlist_entry = {
-            "id": self.id,
-            "song": {"title": "Song title", "file_path": self.song_file_path},
-            "owner": "me",
-            "use_instrumental": False,
-        }
+        self.playlist_entry = PlaylistEntry.from_dict(
+            {
+                "id": self.id,
+                "song": {"title": "Song title", "file_path": self.song_file_path},
+                "owner": "me",
+                "use_instrumental": False,
+            },
+            Path(gettempdir()),
+        )
 
     def get_instance(
         self,
@@ -129,12 +145,12 @@ class MediaPlayerVlcTestCase(TestCase):
                 ),
             )
 
-    def set_playlist_entry(self, vlc_player, started=True):
+    def set_playlist_entry(self, vlc_player, state="song"):
         """Set a playlist entry and make the player play it
 
         Args:
             vlc_player (MediaPlayerVlc): Instance of the VLC player.
-            started (bool): If True, make the player play the song.
+            state (str): State to put the player in, if not None.
         """
         vlc_player.playlist_entry = self.playlist_entry
 
@@ -143,17 +159,14 @@ class MediaPlayerVlcTestCase(TestCase):
 
         # create mocked song
         media_song = MagicMock()
-        media_song.get_mrl.return_value = path_to_mrl(
-            vlc_player.kara_folder_path / self.playlist_entry["song"]["file_path"]
-        )
+        media_song.get_mrl.return_value = path_to_mrl(self.playlist_entry.file_path)
         vlc_player.playlist_entry_data["song"].media = media_song
 
-        # set media has started
-        if started:
+        # set media state
+        if state is not None:
             player = vlc_player.instance.media_player_new.return_value
             player.get_media.return_value = vlc_player.playlist_entry_data["song"].media
-            vlc_player.playlist_entry_data["transition"].started = True
-            vlc_player.playlist_entry_data["song"].started = True
+            vlc_player.set_state(state)
 
     def test_set_callback(self):
         """Test the assignation of a callback
@@ -304,6 +317,22 @@ class MediaPlayerVlcTestCase(TestCase):
         ):
             vlc_player.check_kara_folder_path()
 
+    def test_check_kara_folder_path_timeout(self):
+        """Test to check if the kara folder cannot be reached
+        """
+        # create instance
+        vlc_player, _, _ = self.get_instance()
+        vlc_player.io_executor = MagicMock()
+        vlc_player.io_executor.exists.side_effect = IOTimeoutError("timeout")
+
+        # call the method
+        with self.assertRaisesRegex(
+            KaraFolderNotFound,
+            'Karaoke folder "{}" cannot be reached'.format(re.escape(gettempdir())),
+        ):
+            vlc_player.check_kara_folder_path()
+
+    @patch.object(MediaPlayerVlc, "start_watchdog")
     @patch.object(MediaPlayerVlc, "check_kara_folder_path")
     @patch.object(MediaPlayerVlc, "check_version")
     @patch.object(MediaPlayerVlc, "set_vlc_default_callbacks")
@@ -314,6 +343,7 @@ class MediaPlayerVlcTestCase(TestCase):
         mocked_set_vlc_default_callback,
         mocked_check_version,
         mocked_check_kara_folder_path,
+        mocked_start_watchdog,
     ):
         """Test to load the instance
         """
@@ -337,13 +367,50 @@ class MediaPlayerVlcTestCase(TestCase):
         mocked_background_loader.load.assert_called_with()
         mocked_check_version.assert_called_with()
         mocked_set_vlc_default_callback.assert_called_with()
+        vlc_player.instance.log_set.assert_called_with(
+            vlc_player.vlc_log_callback, None
+        )
         vlc_player.player.set_fullscreen.assert_called_with(False)
+        mocked_start_watchdog.assert_called_with()
+        self.assertIsNotNone(vlc_player.log_pipeline.thread)
+        vlc_player.log_pipeline.stop()
 
         # assert logs
         self.assertListEqual(
             logger.output, ["INFO:dakara_player.media_player.vlc:VLC 3.0.0 NoName"]
         )
 
+    @patch("dakara_player.media_player.vlc.format_vlc_log")
+    @patch("dakara_player.media_player.vlc.get_vlc_log_module")
+    def test_handle_vlc_log(self, mocked_get_vlc_log_module, mocked_format_vlc_log):
+        """Test to submit a libvlc log message to the pipeline
+        """
+        vlc_player, _, _ = self.get_instance(
+            {
+                "kara_folder": gettempdir(),
+                "backend_logs": {"levels": {"avcodec": "error"}},
+            }
+        )
+        mocked_get_vlc_log_module.side_effect = ["main", "avcodec"]
+        mocked_format_vlc_log.return_value = "message"
+
+        # call the method
+        with patch.object(logging.getLogger("vlc"), "level", logging.INFO):
+            vlc_player.handle_vlc_log(None, 0, "context 0", b"fmt", 42)
+            vlc_player.handle_vlc_log(None, 3, "context 1", b"fmt", 42)
+            vlc_player.handle_vlc_log(None, 3, "context 2", b"fmt", 42)
+
+        # assert only the message of the main module has been submitted
+        mocked_get_vlc_log_module.assert_has_calls(
+            [call("context 1"), call("context 2")]
+        )
+        mocked_format_vlc_log.assert_called_once_with(b"fmt", 42)
+        self.assertEqual(
+            vlc_player.log_pipeline.queue.get_nowait(),
+            (logging.WARNING, "main", "message"),
+        )
+        self.assertTrue(vlc_player.log_pipeline.queue.empty())
+
     @patch.object(Path, "exists")
     def test_set_playlist_entry_error_file(self, mocked_exists):
         """Test to set a playlist entry that does not exist
@@ -358,6 +425,10 @@ class MediaPlayerVlcTestCase(TestCase):
         vlc_player.set_callback("could_not_play", MagicMock())
         vlc_player.set_callback("error", MagicMock())
 
+        # run the preparation stages synchronously
+        vlc_player.preparation_executor = MagicMock()
+        vlc_player.preparation_executor.submit.side_effect = lambda f, *a: f(*a)
+
         # pre assertions
         self.assertIsNone(vlc_player.playlist_entry)
 
@@ -385,6 +456,132 @@ class MediaPlayerVlcTestCase(TestCase):
             ],
         )
 
+    def test_set_playlist_entry_error_file_timeout(self):
+        """Test to set a playlist entry whose file cannot be reached
+        """
+        # create instance
+        vlc_player, _, _ = self.get_instance()
+        vlc_player.io_executor = MagicMock()
+        vlc_player.io_executor.exists.side_effect = IOTimeoutError("timeout")
+
+        # mock the callbacks
+        vlc_player.set_callback("could_not_play", MagicMock())
+        vlc_player.set_callback("error", MagicMock())
+
+        # run the preparation stages synchronously
+        vlc_player.preparation_executor = MagicMock()
+        vlc_player.preparation_executor.submit.side_effect = lambda f, *a: f(*a)
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.base", "DEBUG") as logger:
+            vlc_player.set_playlist_entry(self.playlist_entry)
+
+        # post assertions
+        self.assertIsNone(vlc_player.playlist_entry)
+        self.assertEqual(vlc_player.metrics.get_counter("filesystem_timeouts"), 1)
+
+        # assert the callbacks
+        vlc_player.callbacks["could_not_play"].assert_called_with(self.id)
+        vlc_player.callbacks["error"].assert_called_with(self.id, "File not reachable")
+
+        # assert the effects on logs
+        self.assertIn(
+            "ERROR:dakara_player.media_player.base:File not reachable '{}'".format(
+                Path(gettempdir()) / self.song_file_path
+            ),
+            logger.output,
+        )
+
+    @patch.object(MediaPlayerVlc, "play")
+    @patch("dakara_player.media_player.base.check_file_integrity")
+    def test_check_playlist_entry_integrity_invalid(
+        self, mocked_check_file_integrity, mocked_play
+    ):
+        """Test a broken file is rejected while the transition is played
+        """
+        # create instance
+        vlc_player, _, _ = self.get_instance()
+        self.set_playlist_entry(vlc_player, state="transition")
+        preparation = MagicMock()
+        vlc_player.preparation = preparation
+
+        # setup mocks
+        mocked_check_file_integrity.side_effect = FileIntegrityError("No cluster")
+
+        # mock the callbacks
+        vlc_player.set_callback("could_not_play", MagicMock())
+        vlc_player.set_callback("error", MagicMock())
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.base", "DEBUG") as logger:
+            vlc_player.check_playlist_entry_integrity(preparation, self.playlist_entry)
+
+        # assert the effects
+        preparation.cancel.assert_called_with()
+        self.assertIsNone(vlc_player.playlist_entry)
+        mocked_play.assert_called_with("idle")
+        self.assertEqual(vlc_player.metrics.get_counter("integrity_failures"), 1)
+
+        # assert the callbacks
+        vlc_player.callbacks["could_not_play"].assert_called_with(self.id)
+        vlc_player.callbacks["error"].assert_called_with(self.id, "Invalid file")
+
+        # assert the logs
+        self.assertIn(
+            "ERROR:dakara_player.media_player.base:"
+            "Invalid file '{}': No cluster".format(
+                Path(gettempdir()) / self.song_file_path
+            ),
+            logger.output,
+        )
+
+    @patch.object(MediaPlayerVlc, "play")
+    def test_check_playlist_entry_file_rejected(self, mocked_play):
+        """Test a file rejected by the library check is not played
+        """
+        # create instance
+        vlc_player, _, _ = self.get_instance()
+        self.set_playlist_entry(vlc_player, state="transition")
+        preparation = MagicMock()
+        vlc_player.preparation = preparation
+
+        # setup mocks
+        vlc_player.io_executor = MagicMock()
+        vlc_player.io_executor.exists.return_value = True
+        vlc_player.io_executor.call.return_value = "Unable to decode at 0s"
+        vlc_player.reject_list.songs = {str(self.playlist_entry.file_path): {}}
+
+        # mock the callbacks
+        vlc_player.set_callback("could_not_play", MagicMock())
+        vlc_player.set_callback("error", MagicMock())
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.base", "DEBUG") as logger:
+            vlc_player.check_playlist_entry_file(preparation, self.playlist_entry)
+
+        # assert the effects
+        vlc_player.io_executor.call.assert_called_with(
+            vlc_player.reject_list.get_reason, self.playlist_entry.file_path
+        )
+        preparation.cancel.assert_called_with()
+        self.assertIsNone(vlc_player.playlist_entry)
+
+        # assert the callbacks
+        vlc_player.callbacks["could_not_play"].assert_called_with(self.id)
+        vlc_player.callbacks["error"].assert_called_with(
+            self.id, "File rejected by library check"
+        )
+
+        # assert the logs
+        self.assertIn(
+            "ERROR:dakara_player.media_player.base:"
+            "File rejected by library check '{}': Unable to decode at 0s".format(
+                Path(gettempdir()) / self.song_file_path
+            ),
+            logger.output,
+        )
+
+    @patch("dakara_player.media_player.base.check_file_integrity")
     @patch.object(MediaPlayerVlc, "manage_instrumental")
     @patch.object(MediaPlayerVlc, "play")
     @patch.object(MediaPlayerVlc, "generate_text")
@@ -395,6 +592,7 @@ class MediaPlayerVlcTestCase(TestCase):
         mocked_generate_text,
         mocked_play,
         mocked_manage_instrumental,
+        mocked_check_file_integrity,
     ):
         """Test to set a playlist entry
         """
@@ -413,15 +611,19 @@ class MediaPlayerVlcTestCase(TestCase):
         vlc_player.set_callback("could_not_play", MagicMock())
         vlc_player.set_callback("error", MagicMock())
 
+        # run the preparation stages synchronously
+        vlc_player.preparation_executor = MagicMock()
+        vlc_player.preparation_executor.submit.side_effect = lambda f, *a: f(*a)
+
         # pre assertions
         self.assertIsNone(vlc_player.playlist_entry)
 
         # call the method
         vlc_player.set_playlist_entry(self.playlist_entry)
-        self.assertFalse(self.playlist_entry["use_instrumental"])
+        self.assertFalse(self.playlist_entry.use_instrumental)
 
         # post assertions
-        self.assertDictEqual(vlc_player.playlist_entry, self.playlist_entry)
+        self.assertIs(vlc_player.playlist_entry, self.playlist_entry)
         data_transition = vlc_player.playlist_entry_data["transition"]
         self.assertEqual(
             mrl_to_path(data_transition.media.get_mrl()),
@@ -434,7 +636,11 @@ class MediaPlayerVlcTestCase(TestCase):
 
         # assert mocks
         mocked_exists.assert_called_with()
-        mocked_generate_text.assert_called_with("transition")
+        mocked_generate_text.assert_called_with(
+            "transition",
+            playlist_entry=self.playlist_entry,
+            preparation=vlc_player.preparation,
+        )
         mocked_play.assert_called_with("transition")
         mocked_manage_instrumental.assert_not_called()
 
@@ -459,7 +665,9 @@ class MediaPlayerVlcTestCase(TestCase):
         self.assertIsNotNone(vlc_player.kara_folder_path)
 
         # set playlist entry to request instrumental
-        self.playlist_entry["use_instrumental"] = True
+        self.playlist_entry = PlaylistEntry.from_dict(
+            {**self.playlist_entry.data, "use_instrumental": True}, Path(gettempdir())
+        )
 
         # mocks
         mocked_get_instrumental_file.return_value = audio_path
@@ -469,7 +677,9 @@ class MediaPlayerVlcTestCase(TestCase):
 
         # call the method
         with self.assertLogs("dakara_player.media_player.vlc", "DEBUG") as logger:
-            vlc_player.manage_instrumental(self.playlist_entry, video_path)
+            vlc_player.manage_instrumental(
+                self.playlist_entry, video_path, vlc_player.playlist_entry_data
+            )
 
         # post assertions
         self.assertEqual(vlc_player.playlist_entry_data["song"].audio_track_id, 2)
@@ -480,11 +690,14 @@ class MediaPlayerVlcTestCase(TestCase):
             [
                 "INFO:dakara_player.media_player.vlc:Requesting to play instrumental "
                 "file '{}' for '{}'".format(audio_path, video_path),
+                "DEBUG:dakara_player.media_player.vlc:Requesting to play audio "
+                "track 2",
             ],
         )
 
         # assert the call
         mocked_get_audio_tracks_id.assert_not_called()
+        mocked_media_song.add_options.assert_called_with("audio-track-id=2")
 
     @patch.object(MediaPlayerVlc, "get_number_tracks")
     @patch.object(MediaPlayerVlc, "get_instrumental_file")
@@ -503,7 +716,9 @@ class MediaPlayerVlcTestCase(TestCase):
         self.assertIsNotNone(vlc_player.kara_folder_path)
 
         # set playlist entry to request instrumental
-        self.playlist_entry["use_instrumental"] = True
+        self.playlist_entry = PlaylistEntry.from_dict(
+            {**self.playlist_entry.data, "use_instrumental": True}, Path(gettempdir())
+        )
 
         # mocks
         mocked_get_instrumental_file.return_value = audio_path
@@ -516,7 +731,9 @@ class MediaPlayerVlcTestCase(TestCase):
 
         # call the method
         with self.assertLogs("dakara_player.media_player.vlc", "DEBUG") as logger:
-            vlc_player.manage_instrumental(self.playlist_entry, video_path)
+            vlc_player.manage_instrumental(
+                self.playlist_entry, video_path, vlc_player.playlist_entry_data
+            )
 
         # post assertions
         self.assertIsNone(vlc_player.playlist_entry_data["song"].audio_track_id)
@@ -552,7 +769,9 @@ class MediaPlayerVlcTestCase(TestCase):
         self.assertIsNotNone(vlc_player.kara_folder_path)
 
         # set playlist entry to request instrumental
-        self.playlist_entry["use_instrumental"] = True
+        self.playlist_entry = PlaylistEntry.from_dict(
+            {**self.playlist_entry.data, "use_instrumental": True}, Path(gettempdir())
+        )
 
         # mocks
         mocked_get_instrumental_file.return_value = None
@@ -562,7 +781,9 @@ class MediaPlayerVlcTestCase(TestCase):
 
         # call the method
         with self.assertLogs("dakara_player.media_player.vlc", "DEBUG") as logger:
-            vlc_player.manage_instrumental(self.playlist_entry, video_path)
+            vlc_player.manage_instrumental(
+                self.playlist_entry, video_path, vlc_player.playlist_entry_data
+            )
 
         # post assertions
         self.assertEqual(vlc_player.playlist_entry_data["song"].audio_track_id, 99)
@@ -573,11 +794,14 @@ class MediaPlayerVlcTestCase(TestCase):
             [
                 "INFO:dakara_player.media_player.vlc:Requesting to play instrumental "
                 "track of '{}'".format(video_path),
+                "DEBUG:dakara_player.media_player.vlc:Requesting to play audio "
+                "track 99",
             ],
         )
 
         # assert the call
         mocked_get_number_tracks.assert_not_called()
+        mocked_media_song.add_options.assert_called_with("audio-track-id=99")
 
     @patch.object(MediaPlayerVlc, "get_audio_tracks_id")
     @patch.object(MediaPlayerVlc, "get_instrumental_file")
@@ -594,7 +818,9 @@ class MediaPlayerVlcTestCase(TestCase):
         self.assertIsNone(vlc_player.playlist_entry_data["song"].audio_track_id)
 
         # set playlist entry to request instrumental
-        self.playlist_entry["use_instrumental"] = True
+        self.playlist_entry = PlaylistEntry.from_dict(
+            {**self.playlist_entry.data, "use_instrumental": True}, Path(gettempdir())
+        )
 
         # mocks
         mocked_get_instrumental_file.return_value = None
@@ -606,7 +832,9 @@ class MediaPlayerVlcTestCase(TestCase):
 
         # call the method
         with self.assertLogs("dakara_player.media_player.vlc", "DEBUG") as logger:
-            vlc_player.manage_instrumental(self.playlist_entry, video_path)
+            vlc_player.manage_instrumental(
+                self.playlist_entry, video_path, vlc_player.playlist_entry_data
+            )
 
         # post assertions
         self.assertIsNone(vlc_player.playlist_entry_data["song"].audio_track_id)
@@ -620,6 +848,106 @@ class MediaPlayerVlcTestCase(TestCase):
             ],
         )
 
+    @patch.object(MediaPlayerVlc, "get_audio_tracks_id")
+    @patch.object(MediaPlayerVlc, "get_media_info")
+    @patch.object(MediaPlayerVlc, "get_instrumental_file")
+    def test_manage_instrumental_track_media_info(
+        self,
+        mocked_get_instrumental_file,
+        mocked_get_media_info,
+        mocked_get_audio_tracks_id,
+    ):
+        """Test to add instrumental track read from the file headers
+        """
+        # create instance
+        vlc_player, (mocked_instance, _, _), _ = self.get_instance()
+        video_path = Path(gettempdir()) / "video"
+
+        # mocks
+        mocked_get_instrumental_file.return_value = None
+        mocked_get_media_info.return_value = MediaInfo(
+            "matroska",
+            [TrackInfo(1, "video"), TrackInfo(2, "audio"), TrackInfo(3, "audio")],
+        )
+        mocked_media_song = mocked_instance.media_new_path.return_value
+        vlc_player.playlist_entry_data["song"].media = mocked_media_song
+
+        # call the method
+        vlc_player.manage_instrumental(
+            self.playlist_entry, video_path, vlc_player.playlist_entry_data
+        )
+
+        # assert the call
+        mocked_media_song.add_options.assert_called_with("audio-track=1")
+        mocked_get_audio_tracks_id.assert_not_called()
+
+    @patch.object(MediaPlayerVlc, "get_number_tracks")
+    @patch.object(MediaPlayerVlc, "get_media_info")
+    @patch.object(MediaPlayerVlc, "get_instrumental_file")
+    def test_manage_instrumental_file_media_info(
+        self,
+        mocked_get_instrumental_file,
+        mocked_get_media_info,
+        mocked_get_number_tracks,
+    ):
+        """Test to add instrumental file to a file with known tracks
+        """
+        # create instance
+        vlc_player, (mocked_instance, _, _), _ = self.get_instance()
+        video_path = Path(gettempdir()) / "video"
+
+        # mocks
+        mocked_get_instrumental_file.return_value = Path(gettempdir()) / "audio"
+        mocked_get_media_info.return_value = MediaInfo(
+            "matroska", [TrackInfo(1, "video"), TrackInfo(2, "audio")]
+        )
+        mocked_media_song = mocked_instance.media_new_path.return_value
+        vlc_player.playlist_entry_data["song"].media = mocked_media_song
+
+        # call the method
+        vlc_player.manage_instrumental(
+            self.playlist_entry, video_path, vlc_player.playlist_entry_data
+        )
+
+        # assert the call
+        self.assertEqual(vlc_player.playlist_entry_data["song"].audio_track_id, 2)
+        mocked_get_number_tracks.assert_not_called()
+
+    def test_get_media_info(self):
+        """Test to get the tracks of a song file
+        """
+        vlc_player, _, _ = self.get_instance()
+
+        # call the method
+        media_info = vlc_player.get_media_info(get_file("tests.resources", "song.mkv"))
+
+        # assert the result
+        self.assertEqual(media_info.container, "matroska")
+        self.assertEqual(media_info.get_instrumental_index(), 1)
+
+    @patch("dakara_player.media_player.base.read_media_info")
+    def test_get_media_info_invalid(self, mocked_read_media_info):
+        """Test to get the tracks of a broken song file
+        """
+        vlc_player, _, _ = self.get_instance()
+        mocked_read_media_info.side_effect = FileIntegrityError("No segment found")
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.base", "DEBUG") as logger:
+            media_info = vlc_player.get_media_info(Path("video.mkv"))
+
+        # assert the result
+        self.assertIsNone(media_info)
+
+        # assert effect on logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "DEBUG:dakara_player.media_player.base:Unable to read tracks of "
+                "'video.mkv': No segment found"
+            ],
+        )
+
     @patch.object(MediaPlayerVlc, "is_playing_this")
     def test_set_pause_idle(self, mocked_is_playing_this):
         """Test to set pause when the player is idle
@@ -639,19 +967,15 @@ class MediaPlayerVlcTestCase(TestCase):
         mocked_is_playing_this.assert_called_with("idle")
 
     @patch.object(MediaPlayerVlc, "create_thread")
-    @patch.object(MediaPlayerVlc, "is_playing_this")
-    def test_handle_end_reached_transition(
-        self, mocked_is_playing_this, mocked_create_thread
-    ):
+    def test_handle_end_reached_transition(self, mocked_create_thread):
         """Test song end callback after a transition screen
         """
         # create instance
         vlc_player, _, _ = self.get_instance()
-        self.set_playlist_entry(vlc_player)
-        vlc_player.playlist_entry_data["song"].started = False
+        self.set_playlist_entry(vlc_player, "transition")
+        vlc_player.generation = 3
 
         # mock the call
-        mocked_is_playing_this.return_value = True
         vlc_player.set_callback("finished", MagicMock())
 
         # call the method
@@ -671,14 +995,12 @@ class MediaPlayerVlcTestCase(TestCase):
 
         # assert the call
         vlc_player.callbacks["finished"].assert_not_called()
-        mocked_create_thread.assert_called_with(target=vlc_player.play, args=("song",))
-        mocked_is_playing_this.assert_called_with("transition")
+        mocked_create_thread.assert_called_with(
+            target=vlc_player.play_if_current, args=("song", 3)
+        )
 
     @patch.object(MediaPlayerVlc, "create_thread")
-    @patch.object(MediaPlayerVlc, "is_playing_this")
-    def test_handle_end_reached_song(
-        self, mocked_is_playing_this, mocked_create_thread
-    ):
+    def test_handle_end_reached_song(self, mocked_create_thread):
         """Test song end callback after a song
         """
         # create instance
@@ -687,7 +1009,6 @@ class MediaPlayerVlcTestCase(TestCase):
 
         # mock the call
         vlc_player.set_callback("finished", MagicMock())
-        mocked_is_playing_this.side_effect = [False, True]
 
         # call the method
         with self.assertLogs("dakara_player.media_player.vlc", "DEBUG"):
@@ -699,22 +1020,18 @@ class MediaPlayerVlcTestCase(TestCase):
         # assert the call
         vlc_player.callbacks["finished"].assert_called_with(42)
         mocked_create_thread.assert_not_called()
-        mocked_is_playing_this.assert_has_calls([call("transition"), call("song")])
 
     @patch.object(MediaPlayerVlc, "create_thread")
-    @patch.object(MediaPlayerVlc, "is_playing_this")
-    def test_handle_end_reached_idle(
-        self, mocked_is_playing_this, mocked_create_thread
-    ):
+    def test_handle_end_reached_idle(self, mocked_create_thread):
         """Test song end callback after an idle screen
         """
         # create instance
         vlc_player, _, _ = self.get_instance()
-        self.set_playlist_entry(vlc_player)
+        vlc_player.set_state("idle")
+        vlc_player.generation = 3
 
         # mock the call
         vlc_player.set_callback("finished", MagicMock())
-        mocked_is_playing_this.side_effect = [False, False, True]
 
         # call the method
         with self.assertLogs("dakara_player.media_player.vlc", "DEBUG"):
@@ -722,25 +1039,50 @@ class MediaPlayerVlcTestCase(TestCase):
 
         # assert the call
         vlc_player.callbacks["finished"].assert_not_called()
-        mocked_create_thread.assert_called_with(target=vlc_player.play, args=("idle",))
-        mocked_is_playing_this.assert_has_calls(
-            [call("transition"), call("song"), call("idle")]
+        mocked_create_thread.assert_called_with(
+            target=vlc_player.play_if_current, args=("idle", 3)
         )
 
     @patch.object(MediaPlayerVlc, "create_thread")
-    @patch.object(MediaPlayerVlc, "is_playing_this")
-    def test_handle_end_reached_invalid(
-        self, mocked_is_playing_this, mocked_create_thread
-    ):
+    def test_handle_end_reached_stale(self, mocked_create_thread):
+        """Test song end callback while a new media is loading
+        """
+        # create instance
+        vlc_player, _, _ = self.get_instance()
+        self.set_playlist_entry(vlc_player, "transition_loading")
+
+        # mock the call
+        vlc_player.set_callback("finished", MagicMock())
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.vlc", "DEBUG") as logger:
+            vlc_player.handle_end_reached("event")
+
+        # assert effect on logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "DEBUG:dakara_player.media_player.vlc:End reached callback called",
+                "DEBUG:dakara_player.media_player.vlc:Discarding stale end reached "
+                "event in state transition_loading",
+            ],
+        )
+
+        # assert the call
+        self.assertFalse(vlc_player.stop.is_set())
+        vlc_player.callbacks["finished"].assert_not_called()
+        mocked_create_thread.assert_not_called()
+
+    @patch.object(MediaPlayerVlc, "create_thread")
+    def test_handle_end_reached_invalid(self, mocked_create_thread):
         """Test song end callback on invalid state
         """
         # create instance
         vlc_player, _, _ = self.get_instance()
-        self.set_playlist_entry(vlc_player)
+        self.set_playlist_entry(vlc_player, None)
 
         # mock the call
         vlc_player.set_callback("finished", MagicMock())
-        mocked_is_playing_this.return_value = False
 
         self.assertFalse(vlc_player.stop.is_set())
 
@@ -790,17 +1132,16 @@ class MediaPlayerVlcTestCase(TestCase):
         mocked_skip.assert_called_with()
 
     @patch.object(MediaPlayerVlc, "get_timing")
-    @patch.object(MediaPlayerVlc, "is_playing_this")
-    def test_handle_playing_unpause(self, mocked_is_playing_this, mocked_get_timing):
+    def test_handle_playing_unpause(self, mocked_get_timing):
         """Test playing callback when unpausing
         """
         # create instance
         vlc_player, _, _ = self.get_instance()
-        self.set_playlist_entry(vlc_player)
+        self.set_playlist_entry(vlc_player, "transition")
+        vlc_player.enter_pause()
 
         # mock the call
         vlc_player.set_callback("resumed", MagicMock())
-        mocked_is_playing_this.return_value = True
         mocked_get_timing.return_value = 25
 
         # call the method
@@ -816,25 +1157,22 @@ class MediaPlayerVlcTestCase(TestCase):
             ],
         )
 
+        # post assert
+        self.assertEqual(vlc_player.state, "transition")
+
         # assert the call
         vlc_player.callbacks["resumed"].assert_called_with(42, 25)
-        mocked_is_playing_this.assert_called_with("transition")
 
-    @patch.object(MediaPlayerVlc, "is_playing_this")
-    def test_handle_playing_transition_starts(self, mocked_is_playing_this):
+    @patch.object(MediaPlayerVlc, "create_timer")
+    def test_handle_playing_transition_starts(self, mocked_create_timer):
         """Test playing callback when transition starts
         """
         # create instance
         vlc_player, _, _ = self.get_instance()
-        self.set_playlist_entry(vlc_player, started=False)
+        self.set_playlist_entry(vlc_player, "transition_loading")
 
         # mock the call
         vlc_player.set_callback("started_transition", MagicMock())
-        mocked_is_playing_this.side_effect = [False, False, True]
-
-        # pre assert
-        self.assertFalse(vlc_player.playlist_entry_data["transition"].started)
-        self.assertFalse(vlc_player.playlist_entry_data["song"].started)
 
         # call the method
         with self.assertLogs("dakara_player.media_player.vlc", "DEBUG") as logger:
@@ -851,30 +1189,25 @@ class MediaPlayerVlcTestCase(TestCase):
         )
 
         # post assert
-        self.assertTrue(vlc_player.playlist_entry_data["transition"].started)
-        self.assertFalse(vlc_player.playlist_entry_data["song"].started)
+        self.assertEqual(vlc_player.state, "transition")
 
         # assert the call
         vlc_player.callbacks["started_transition"].assert_called_with(42)
-        mocked_is_playing_this.assert_has_calls(
-            [call("transition"), call("song"), call("transition")]
+        mocked_create_timer.assert_called_with(
+            9.5, vlc_player.check_song_ready, args=(0,)
         )
+        mocked_create_timer.return_value.start.assert_called_with()
+        self.assertEqual(vlc_player.metrics.get_counter("transitions"), 1)
 
-    @patch.object(MediaPlayerVlc, "is_playing_this")
-    def test_handle_playing_song(self, mocked_is_playing_this):
+    def test_handle_playing_song(self):
         """Test playing callback when song starts
         """
         # create instance
         vlc_player, _, _ = self.get_instance()
-        self.set_playlist_entry(vlc_player)
-        vlc_player.playlist_entry_data["song"].started = False
+        self.set_playlist_entry(vlc_player, "song_loading")
 
         # mock the call
         vlc_player.set_callback("started_song", MagicMock())
-        mocked_is_playing_this.side_effect = [False, False, False, True]
-
-        # pre assert
-        self.assertFalse(vlc_player.playlist_entry_data["song"].started)
 
         # call the method
         with self.assertLogs("dakara_player.media_player.vlc", "DEBUG") as logger:
@@ -891,27 +1224,22 @@ class MediaPlayerVlcTestCase(TestCase):
         )
 
         # post assert
-        self.assertTrue(vlc_player.playlist_entry_data["song"].started)
+        self.assertEqual(vlc_player.state, "song")
 
         # assert the call
         vlc_player.callbacks["started_song"].assert_called_with(42)
-        mocked_is_playing_this.assert_has_calls(
-            [call("transition"), call("song"), call("transition"), call("song")]
-        )
 
-    @patch.object(MediaPlayerVlc, "is_playing_this")
-    def test_handle_playing_media_starts_track_id(self, mocked_is_playing_this):
-        """Test playing callback when media starts with requested track ID
+    def test_handle_playing_media_starts_track_id(self):
+        """Test playing callback does not switch the requested track ID
         """
         # create instance
         vlc_player, (mocked_instance, _, _), _ = self.get_instance()
         mocked_player = mocked_instance.media_player_new.return_value
-        self.set_playlist_entry(vlc_player)
+        self.set_playlist_entry(vlc_player, "song_loading")
         vlc_player.playlist_entry_data["song"].audio_track_id = 99
 
         # mock the call
         vlc_player.set_callback("started_song", MagicMock())
-        mocked_is_playing_this.side_effect = [False, False, False, True]
 
         # call the method
         with self.assertLogs("dakara_player.media_player.vlc", "DEBUG") as logger:
@@ -922,8 +1250,6 @@ class MediaPlayerVlcTestCase(TestCase):
             logger.output,
             [
                 "DEBUG:dakara_player.media_player.vlc:Playing callback called",
-                "DEBUG:dakara_player.media_player.vlc:Requesting to play audio "
-                "track 99",
                 "INFO:dakara_player.media_player.vlc:Now playing 'Song title' "
                 "('{}')".format(Path(gettempdir()) / self.song_file_path),
             ],
@@ -931,20 +1257,14 @@ class MediaPlayerVlcTestCase(TestCase):
 
         # assert the call
         vlc_player.callbacks["started_song"].assert_called_with(42)
-        mocked_player.audio_set_track.assert_called_with(99)
-        mocked_is_playing_this.assert_has_calls(
-            [call("transition"), call("song"), call("transition"), call("song")]
-        )
+        mocked_player.audio_set_track.assert_not_called()
 
-    @patch.object(MediaPlayerVlc, "is_playing_this")
-    def test_handle_playing_idle_starts(self, mocked_is_playing_this):
+    def test_handle_playing_idle_starts(self):
         """Test playing callback when idle screen starts
         """
         # create instance
         vlc_player, _, _ = self.get_instance()
-
-        # mock the call
-        mocked_is_playing_this.side_effect = [False, False, False, False, True]
+        vlc_player.set_state("idle")
 
         # call the method
         with self.assertLogs("dakara_player.media_player.vlc", "DEBUG") as logger:
@@ -959,37 +1279,52 @@ class MediaPlayerVlcTestCase(TestCase):
             ],
         )
 
-        # assert the call
-        mocked_is_playing_this.assert_has_calls(
-            [
-                call("transition"),
-                call("song"),
-                call("transition"),
-                call("song"),
-                call("idle"),
-            ]
-        )
-
-    @patch.object(MediaPlayerVlc, "is_playing_this")
-    def test_handle_playing_invalid(self, mocked_is_playing_this):
-        """Test playing callback on invalid state
+    def test_handle_playing_stale(self):
+        """Test playing callback received twice for the same media
         """
         # create instance
         vlc_player, _, _ = self.get_instance()
+        self.set_playlist_entry(vlc_player)
 
-        # setup mock
-        mocked_is_playing_this.return_value = False
-
-        self.assertFalse(vlc_player.stop.is_set())
+        # mock the call
+        vlc_player.set_callback("started_song", MagicMock())
+        vlc_player.set_callback("resumed", MagicMock())
 
         # call the method
-        with self.assertLogs("dakara_player.media_player.vlc", "DEBUG"):
+        with self.assertLogs("dakara_player.media_player.vlc", "DEBUG") as logger:
             vlc_player.handle_playing("event")
 
-        self.assertTrue(vlc_player.stop.is_set())
-        exception_class, _, _ = vlc_player.errors.get()
-        self.assertIs(InvalidStateError, exception_class)
-
+        # assert effect on logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "DEBUG:dakara_player.media_player.vlc:Playing callback called",
+                "DEBUG:dakara_player.media_player.vlc:Discarding stale playing "
+                "event in state song",
+            ],
+        )
+
+        # assert the call
+        self.assertFalse(vlc_player.stop.is_set())
+        vlc_player.callbacks["started_song"].assert_not_called()
+        vlc_player.callbacks["resumed"].assert_not_called()
+
+    def test_handle_playing_invalid(self):
+        """Test playing callback on invalid state
+        """
+        # create instance
+        vlc_player, _, _ = self.get_instance()
+
+        self.assertFalse(vlc_player.stop.is_set())
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.vlc", "DEBUG"):
+            vlc_player.handle_playing("event")
+
+        self.assertTrue(vlc_player.stop.is_set())
+        exception_class, _, _ = vlc_player.errors.get()
+        self.assertIs(InvalidStateError, exception_class)
+
     @patch.object(MediaPlayerVlc, "get_timing")
     def test_handle_paused(self, mocked_get_timing):
         """Test paused callback
@@ -1015,14 +1350,38 @@ class MediaPlayerVlcTestCase(TestCase):
             ],
         )
 
+        # post assert
+        self.assertEqual(vlc_player.state, "paused")
+        self.assertTrue(vlc_player.is_playing_this("song"))
+
         # assert the call
         vlc_player.callbacks["paused"].assert_called_with(42, 25)
 
+    def test_handle_paused_idle(self):
+        """Test paused callback when the idle screen is playing
+        """
+        # create instance
+        vlc_player, _, _ = self.get_instance()
+        vlc_player.set_state("idle")
+
+        # mock the call
+        vlc_player.set_callback("paused", MagicMock())
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.vlc", "DEBUG"):
+            vlc_player.handle_paused("event")
+
+        # post assert
+        self.assertEqual(vlc_player.state, "idle")
+
+        # assert the call
+        vlc_player.callbacks["paused"].assert_not_called()
+
     def test_default_backgrounds(self):
         """Test to instanciate with default backgrounds
         """
         # create object
-        _, _, (_, mocked_background_loader_class, _) = self.get_instance()
+        vlc_player, _, (_, mocked_background_loader_class, _) = self.get_instance()
 
         # assert the instanciation of the background loader
         mocked_background_loader_class.assert_called_with(
@@ -1033,13 +1392,14 @@ class MediaPlayerVlcTestCase(TestCase):
                 "transition": "transition.png",
                 "idle": "idle.png",
             },
+            io_executor=vlc_player.io_executor,
         )
 
     def test_custom_backgrounds(self):
         """Test to instanciate with an existing backgrounds directory
         """
         # create object
-        _, _, (_, mocked_background_loader_class, _) = self.get_instance(
+        vlc_player, _, (_, mocked_background_loader_class, _) = self.get_instance(
             {
                 "backgrounds": {
                     "directory": Path("custom") / "bg",
@@ -1061,6 +1421,7 @@ class MediaPlayerVlcTestCase(TestCase):
                 "transition": "transition.png",
                 "idle": "idle.png",
             },
+            io_executor=vlc_player.io_executor,
         )
 
     def test_default_durations(self):
@@ -1114,6 +1475,86 @@ class MediaPlayerVlcTestCase(TestCase):
         mocked_create_idle_text.assert_not_called()
         mocked_create_transition_text.assert_not_called()
 
+    def test_generate_text_timeout(self):
+        """Test to generate a text screen whose template is too long to render
+
+        The error should be reported and the text generated again.
+        """
+        vlc_player, (_, _, mocked_text_generator), _ = self.get_instance()
+        vlc_player.text_paths["transition"] = Path(gettempdir()) / "transition.ass"
+        vlc_player.set_callback("error", MagicMock())
+        self.set_playlist_entry(vlc_player)
+        mocked_text_generator.create_transition_text.side_effect = [
+            TemplateRenderTimeoutError("too long"),
+            "text",
+        ]
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.base", "DEBUG") as logger:
+            path = vlc_player.generate_text(
+                "transition", playlist_entry=self.playlist_entry
+            )
+
+        # assert the result
+        self.assertEqual(path, vlc_player.text_paths["transition"])
+        self.assertEqual(vlc_player.texts["transition"], "text")
+        self.assertListEqual(
+            logger.output, ["ERROR:dakara_player.media_player.base:too long"]
+        )
+        vlc_player.callbacks["error"].assert_called_with(self.id, "too long")
+
+    def test_generate_text_rejected(self):
+        """Test to generate a text screen whose template is rejected
+
+        The error should be reported and the text generated again.
+        """
+        vlc_player, (_, _, mocked_text_generator), _ = self.get_instance()
+        vlc_player.text_paths["transition"] = Path(gettempdir()) / "transition.ass"
+        vlc_player.set_callback("error", MagicMock())
+        self.set_playlist_entry(vlc_player)
+        mocked_text_generator.create_transition_text.side_effect = [
+            TemplateRenderError("rejected"),
+            "text",
+        ]
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.base", "DEBUG") as logger:
+            path = vlc_player.generate_text(
+                "transition", playlist_entry=self.playlist_entry
+            )
+
+        # assert the result
+        self.assertEqual(path, vlc_player.text_paths["transition"])
+        self.assertEqual(vlc_player.texts["transition"], "text")
+        self.assertListEqual(
+            logger.output, ["ERROR:dakara_player.media_player.base:rejected"]
+        )
+        vlc_player.callbacks["error"].assert_called_with(self.id, "rejected")
+
+    def test_generate_text_cancelled(self):
+        """Test to generate a text screen for a cancelled preparation
+
+        The text screen should not be written.
+        """
+        vlc_player, (_, _, mocked_text_generator), _ = self.get_instance()
+        vlc_player.text_paths["transition"] = MagicMock()
+        preparation = MagicMock()
+        preparation.is_cancelled.return_value = True
+        mocked_text_generator.create_transition_text.return_value = "text"
+
+        # call the method
+        path = vlc_player.generate_text(
+            "transition", playlist_entry=self.playlist_entry, preparation=preparation
+        )
+
+        # assert the result
+        self.assertIsNone(path)
+        self.assertNotIn("transition", vlc_player.texts)
+        vlc_player.text_paths["transition"].write_text.assert_not_called()
+        mocked_text_generator.create_transition_text.assert_called_with(
+            self.playlist_entry
+        )
+
     def test_play_invalid(self):
         """Test to play invalid action
         """
@@ -1123,3 +1564,760 @@ class MediaPlayerVlcTestCase(TestCase):
             vlc_player.play("none")
 
         vlc_player.player.play.assert_not_called()
+
+    @patch.object(MediaPlayerVlc, "create_thread")
+    def test_skip(self, mocked_create_thread):
+        """Test to skip a song
+        """
+        vlc_player, _, _ = self.get_instance()
+        vlc_player.set_callback("finished", MagicMock())
+        self.set_playlist_entry(vlc_player)
+        vlc_player.generation = 3
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.vlc", "DEBUG"):
+            vlc_player.skip()
+
+        # assert the call
+        mocked_create_thread.assert_called_with(
+            target=vlc_player.play_if_current, args=("idle", 3)
+        )
+        mocked_create_thread.return_value.start.assert_called_with()
+        vlc_player.callbacks["finished"].assert_called_with(42)
+        self.assertIsNone(vlc_player.playlist_entry)
+        self.assertIsNotNone(vlc_player.skip_time)
+
+    def test_play_idle_already_idle(self):
+        """Test to play the idle screen when it is already playing
+        """
+        vlc_player, (mocked_instance, _, _), _ = self.get_instance()
+        mocked_player = mocked_instance.media_player_new.return_value
+        mocked_player.get_state.return_value = vlc.State.Playing
+        vlc_player.set_state("idle")
+
+        # call the method
+        vlc_player.play("idle")
+
+        # assert the call
+        mocked_player.set_media.assert_not_called()
+
+    def test_handle_playing_idle_after_skip(self):
+        """Test playing callback for a idle screen after a skip
+        """
+        # create instance
+        vlc_player, _, _ = self.get_instance()
+        vlc_player.set_state("idle")
+        vlc_player.start_skip()
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.vlc", "DEBUG"):
+            vlc_player.handle_playing("event")
+
+        # assert the skip duration has been recorded
+        self.assertIsNone(vlc_player.skip_time)
+        self.assertEqual(vlc_player.metrics.get_duration("skip")["count"], 1)
+
+    def test_check_song_ready(self):
+        """Test to check the song is ready before the transition ends
+        """
+        vlc_player, (mocked_instance, _, _), _ = self.get_instance()
+        mocked_player = mocked_instance.media_player_new.return_value
+        self.set_playlist_entry(vlc_player, "transition")
+        vlc_player.preparation = MagicMock()
+        vlc_player.preparation.wait.return_value = True
+
+        # call the method
+        vlc_player.check_song_ready(0)
+
+        # assert the call
+        vlc_player.preparation.wait.assert_called_once_with(timeout=0)
+        mocked_player.set_pause.assert_not_called()
+        self.assertEqual(vlc_player.metrics.get_counter("transition_extensions"), 0)
+
+    @patch.object(MediaPlayerVlc, "create_timer")
+    def test_check_song_ready_extend(self, mocked_create_timer):
+        """Test to extend the transition while the song is not ready
+        """
+        vlc_player, (mocked_instance, _, _), _ = self.get_instance()
+        mocked_player = mocked_instance.media_player_new.return_value
+        self.set_playlist_entry(vlc_player, "transition")
+        vlc_player.preparation = MagicMock()
+        vlc_player.preparation.wait.return_value = False
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.base", "DEBUG") as logger:
+            vlc_player.check_song_ready(0)
+
+        # assert effect on logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "INFO:dakara_player.media_player.base:Song is not ready, extending "
+                "transition screen"
+            ],
+        )
+
+        # assert the call
+        vlc_player.preparation.wait.assert_called_once_with(timeout=0)
+        mocked_player.set_pause.assert_called_once_with(True)
+        mocked_create_timer.assert_called_once_with(
+            TRANSITION_GATE_INTERVAL,
+            vlc_player.check_song_ready_extended,
+            args=(0, ANY),
+        )
+        mocked_create_timer.return_value.start.assert_called_once_with()
+        self.assertTrue(vlc_player.transition_held)
+
+        # the pause event is not reported
+        vlc_player.set_callback("paused", MagicMock())
+        with self.assertLogs("dakara_player.media_player.vlc", "DEBUG"):
+            vlc_player.handle_paused("event")
+
+        vlc_player.callbacks["paused"].assert_not_called()
+        self.assertEqual(vlc_player.state, "transition")
+
+    def test_check_song_ready_extended(self):
+        """Test to release the extended transition when the song is ready
+        """
+        vlc_player, (mocked_instance, _, _), _ = self.get_instance()
+        mocked_player = mocked_instance.media_player_new.return_value
+        self.set_playlist_entry(vlc_player, "transition")
+        vlc_player.preparation = MagicMock()
+        vlc_player.preparation.wait.return_value = True
+        vlc_player.transition_held = True
+
+        # call the method
+        vlc_player.check_song_ready_extended(0, monotonic())
+
+        # assert the call
+        vlc_player.preparation.wait.assert_called_once_with(timeout=0)
+        mocked_player.set_pause.assert_called_once_with(False)
+        self.assertFalse(vlc_player.transition_held)
+        self.assertEqual(vlc_player.metrics.get_counter("transition_extensions"), 1)
+        self.assertEqual(
+            vlc_player.metrics.get_duration("transition_extension")["count"], 1
+        )
+
+    @patch.object(MediaPlayerVlc, "create_timer")
+    def test_check_song_ready_extended_not_ready(self, mocked_create_timer):
+        """Test to check again later when the song is still not ready
+        """
+        vlc_player, (mocked_instance, _, _), _ = self.get_instance()
+        mocked_player = mocked_instance.media_player_new.return_value
+        self.set_playlist_entry(vlc_player, "transition")
+        vlc_player.preparation = MagicMock()
+        vlc_player.preparation.wait.return_value = False
+        vlc_player.transition_held = True
+        start = monotonic()
+
+        # call the method
+        vlc_player.check_song_ready_extended(0, start)
+
+        # assert the call
+        vlc_player.preparation.wait.assert_called_once_with(timeout=0)
+        mocked_player.set_pause.assert_not_called()
+        mocked_create_timer.assert_called_once_with(
+            TRANSITION_GATE_INTERVAL,
+            vlc_player.check_song_ready_extended,
+            args=(0, start),
+        )
+        self.assertTrue(vlc_player.transition_held)
+        self.assertEqual(vlc_player.metrics.get_counter("transition_extensions"), 0)
+
+    @patch.object(MediaPlayerVlc, "play")
+    @patch.object(MediaPlayerVlc, "create_timer")
+    def test_check_song_ready_extended_too_long(self, mocked_create_timer, mocked_play):
+        """Test to give up the extended transition when the song is never ready
+
+        The playlist entry should be rejected and the idle screen played.
+        """
+        vlc_player, (mocked_instance, _, _), _ = self.get_instance()
+        mocked_player = mocked_instance.media_player_new.return_value
+        self.set_playlist_entry(vlc_player, "transition")
+        vlc_player.set_callback("error", MagicMock())
+        vlc_player.set_callback("could_not_play", MagicMock())
+        preparation = vlc_player.preparation = MagicMock()
+        preparation.wait.return_value = False
+        vlc_player.transition_held = True
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.base", "DEBUG") as logger:
+            vlc_player.check_song_ready_extended(0, monotonic() - 10)
+
+        # assert effect on logs
+        self.assertEqual(len(logger.output), 2)
+        self.assertRegex(
+            logger.output[0],
+            r"WARNING:dakara_player.media_player.base:Song still not ready after "
+            r"extending transition screen for \d+\.\d s",
+        )
+        self.assertEqual(
+            logger.output[1],
+            "ERROR:dakara_player.media_player.base:Song not ready to be played "
+            "'{}'".format(Path(gettempdir()) / self.song_file_path),
+        )
+
+        # assert the call
+        mocked_create_timer.assert_not_called()
+        mocked_player.set_pause.assert_not_called()
+        self.assertFalse(vlc_player.transition_held)
+        preparation.cancel.assert_called_with()
+        vlc_player.callbacks["error"].assert_called_with(
+            self.id, "Song not ready to be played"
+        )
+        vlc_player.callbacks["could_not_play"].assert_called_with(self.id)
+        self.assertIsNone(vlc_player.playlist_entry)
+        mocked_play.assert_called_with("idle")
+
+    @patch.object(MediaPlayerVlc, "create_timer")
+    def test_check_song_ready_extended_stale(self, mocked_create_timer):
+        """Test to stop extending a transition that has been replaced
+        """
+        vlc_player, (mocked_instance, _, _), _ = self.get_instance()
+        mocked_player = mocked_instance.media_player_new.return_value
+        self.set_playlist_entry(vlc_player, "transition")
+        vlc_player.preparation = MagicMock()
+        vlc_player.preparation.wait.return_value = False
+        vlc_player.transition_held = True
+        vlc_player.generation = 2
+
+        # call the method
+        vlc_player.check_song_ready_extended(1, monotonic())
+
+        # assert the call
+        mocked_create_timer.assert_not_called()
+        mocked_player.set_pause.assert_not_called()
+        self.assertFalse(vlc_player.transition_held)
+
+    def test_check_song_ready_stale(self):
+        """Test to check the song is ready after the transition was replaced
+        """
+        vlc_player, (mocked_instance, _, _), _ = self.get_instance()
+        mocked_player = mocked_instance.media_player_new.return_value
+        self.set_playlist_entry(vlc_player, "transition")
+        vlc_player.preparation = MagicMock()
+        vlc_player.generation = 2
+
+        # call the method
+        vlc_player.check_song_ready(1)
+
+        # assert the call
+        vlc_player.preparation.wait.assert_not_called()
+        mocked_player.set_pause.assert_not_called()
+
+    def test_play_state(self):
+        """Test that playing a media sets the loading state
+        """
+        vlc_player, _, _ = self.get_instance()
+        self.set_playlist_entry(vlc_player, None)
+
+        # call the method
+        vlc_player.play("transition")
+
+        # assert the state
+        self.assertEqual(vlc_player.state, "transition_loading")
+        self.assertEqual(vlc_player.generation, 1)
+        self.assertTrue(vlc_player.is_playing_this("transition"))
+        self.assertFalse(vlc_player.is_playing_this("song"))
+        self.assertTrue(vlc_player.states["transition_loading"].is_active())
+
+        # call the method again
+        vlc_player.play("song")
+
+        # assert the state
+        self.assertEqual(vlc_player.state, "song_loading")
+        self.assertEqual(vlc_player.generation, 2)
+        self.assertTrue(vlc_player.states["transition_loading"].has_finished())
+
+    @patch.object(MediaPlayerVlc, "play")
+    def test_play_if_current(self, mocked_play):
+        """Test to play a media if nothing else has been requested
+        """
+        vlc_player, _, _ = self.get_instance()
+        vlc_player.generation = 3
+
+        # call the method
+        vlc_player.play_if_current("song", 3)
+
+        # assert the call
+        mocked_play.assert_called_with("song")
+
+    @patch.object(MediaPlayerVlc, "play")
+    def test_play_if_current_stale(self, mocked_play):
+        """Test to not play a media if something else has been requested
+        """
+        vlc_player, _, _ = self.get_instance()
+        vlc_player.generation = 4
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.base", "DEBUG") as logger:
+            vlc_player.play_if_current("song", 3)
+
+        # assert effect on logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "DEBUG:dakara_player.media_player.base:Discarding stale request to "
+                "play song"
+            ],
+        )
+
+        # assert the call
+        mocked_play.assert_not_called()
+
+    @patch.object(MediaPlayerVlc, "push_idle_text")
+    def test_update_idle_screen(self, mocked_push_idle_text):
+        """Test to update the idle screen
+        """
+        vlc_player, _, _ = self.get_instance()
+
+        # call the method
+        vlc_player.update_idle_screen(queue_length=3)
+
+        # assert the call
+        self.assertDictEqual(vlc_player.idle_info, {"queue_length": 3})
+        mocked_push_idle_text.assert_called_with()
+        self.assertIsNone(vlc_player.idle_update_timer)
+
+    @patch.object(MediaPlayerVlc, "create_timer")
+    @patch.object(MediaPlayerVlc, "push_idle_text")
+    def test_update_idle_screen_rate_limited(
+        self, mocked_push_idle_text, mocked_create_timer
+    ):
+        """Test to update the idle screen too often
+
+        The update should be delayed, then merged with the next one.
+        """
+        vlc_player, _, _ = self.get_instance()
+        vlc_player.idle_update_interval = 10
+        vlc_player.idle_update_last = monotonic()
+
+        # call the method twice
+        vlc_player.update_idle_screen(queue_length=3)
+        vlc_player.update_idle_screen(next_singer="me")
+
+        # assert the call
+        self.assertDictEqual(
+            vlc_player.idle_info, {"queue_length": 3, "next_singer": "me"}
+        )
+        mocked_push_idle_text.assert_not_called()
+        mocked_create_timer.assert_called_once_with(ANY, mocked_push_idle_text)
+        mocked_create_timer.return_value.start.assert_called_once_with()
+
+    @patch.object(MediaPlayerVlc, "reload_idle_text")
+    @patch.object(MediaPlayerVlc, "generate_text")
+    @patch.object(MediaPlayerVlc, "is_playing_this")
+    def test_push_idle_text(
+        self, mocked_is_playing_this, mocked_generate_text, mocked_reload_idle_text
+    ):
+        """Test to push a changed idle screen text
+        """
+        vlc_player, _, _ = self.get_instance()
+        mocked_is_playing_this.return_value = True
+        vlc_player.texts["idle"] = "old text"
+        mocked_generate_text.side_effect = lambda what: vlc_player.texts.update(
+            {what: "new text"}
+        )
+
+        # call the method
+        vlc_player.push_idle_text()
+
+        # assert the call
+        mocked_generate_text.assert_called_with("idle")
+        mocked_reload_idle_text.assert_called_with()
+
+    @patch.object(MediaPlayerVlc, "reload_idle_text")
+    @patch.object(MediaPlayerVlc, "generate_text")
+    @patch.object(MediaPlayerVlc, "is_playing_this")
+    def test_push_idle_text_unchanged(
+        self, mocked_is_playing_this, mocked_generate_text, mocked_reload_idle_text
+    ):
+        """Test to push an unchanged idle screen text
+        """
+        vlc_player, _, _ = self.get_instance()
+        mocked_is_playing_this.return_value = True
+        vlc_player.texts["idle"] = "text"
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.base", "DEBUG") as logger:
+            vlc_player.push_idle_text()
+
+        # assert the call
+        mocked_reload_idle_text.assert_not_called()
+        self.assertListEqual(
+            logger.output,
+            ["DEBUG:dakara_player.media_player.base:Idle screen text unchanged"],
+        )
+
+    @patch.object(MediaPlayerVlc, "reload_idle_text")
+    @patch.object(MediaPlayerVlc, "generate_text")
+    @patch.object(MediaPlayerVlc, "is_playing_this")
+    def test_push_idle_text_not_idle(
+        self, mocked_is_playing_this, mocked_generate_text, mocked_reload_idle_text
+    ):
+        """Test to push the idle screen text when not idle
+        """
+        vlc_player, _, _ = self.get_instance()
+        mocked_is_playing_this.return_value = False
+
+        # call the method
+        vlc_player.push_idle_text()
+
+        # assert the call
+        mocked_generate_text.assert_not_called()
+        mocked_reload_idle_text.assert_not_called()
+
+    @patch.object(MediaPlayerVlc, "get_position")
+    def test_reload_idle_text(self, mocked_get_position):
+        """Test to reload the idle screen text
+        """
+        vlc_player, (mocked_instance, _, _), _ = self.get_instance()
+        vlc_player.text_paths["idle"] = Path(gettempdir()) / "idle.ass"
+        vlc_player.load_state("idle")
+        mocked_get_position.return_value = 12.5
+        mocked_media = mocked_instance.media_new_path.return_value
+
+        # call the method
+        vlc_player.reload_idle_text()
+
+        # assert the call
+        mocked_media.add_options.assert_called_with(
+            *vlc_player.media_parameters,
+            "image-duration={}".format(vlc_player.durations["idle"]),
+            "sub-file={}".format(vlc_player.text_paths["idle"]),
+            "no-sub-autodetect-file",
+        )
+        mocked_media.add_option.assert_called_with("start-time=12.500")
+        vlc_player.player.set_media.assert_called_with(mocked_media)
+        vlc_player.player.add_slave.assert_not_called()
+        self.assertTrue(vlc_player.is_playing_this("idle"))
+        self.assertTrue(vlc_player.state_reloaded)
+
+    @patch.object(MediaPlayerVlc, "update_idle_screen")
+    def test_update_idle_clock(self, mocked_update_idle_screen):
+        """Test to update the clock of the idle screen only when it changes
+        """
+        vlc_player, _, _ = self.get_instance()
+
+        # call the method
+        with patch("dakara_player.media_player.base.strftime") as mocked_strftime:
+            mocked_strftime.return_value = "20:42"
+            vlc_player.update_idle_clock()
+            vlc_player.idle_info["time"] = "20:42"
+            vlc_player.update_idle_clock()
+
+        # assert the call
+        mocked_update_idle_screen.assert_called_once_with(time="20:42")
+
+    @patch.object(MediaPlayerVlc, "update_idle_clock")
+    def test_run_watchdog_no_idle_clock(self, mocked_update_idle_clock):
+        """Test the watchdog does not refresh the idle clock with VLC
+        """
+        vlc_player, _, _ = self.get_instance()
+        vlc_player.set_state("idle")
+        vlc_player.stop = MagicMock()
+        vlc_player.stop.wait.side_effect = [False, True]
+
+        # call the method
+        vlc_player.run_watchdog()
+
+        # assert the call
+        mocked_update_idle_clock.assert_not_called()
+
+    def test_play_reload(self):
+        """Test to reload a song at a given position
+        """
+        vlc_player, (mocked_instance, _, _), _ = self.get_instance()
+        mocked_player = mocked_instance.media_player_new.return_value
+        self.set_playlist_entry(vlc_player, "song")
+        vlc_player.preparation = None
+        media = vlc_player.playlist_entry_data["song"].media
+
+        # call the method
+        vlc_player.play("song", 12.5)
+
+        # assert the call
+        media.duplicate.assert_called_with()
+        media.duplicate.return_value.add_option.assert_called_with("start-time=12.500")
+        mocked_player.set_media.assert_called_with(media.duplicate.return_value)
+        self.assertEqual(vlc_player.state, "song_loading")
+        self.assertTrue(vlc_player.state_reloaded)
+
+    def test_handle_playing_song_reloaded(self):
+        """Test playing callback when a song reloaded after a stall starts
+        """
+        vlc_player, _, _ = self.get_instance()
+        self.set_playlist_entry(vlc_player, None)
+        vlc_player.load_state("song", reloaded=True)
+        vlc_player.set_callback("started_song", MagicMock())
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.vlc", "DEBUG"):
+            vlc_player.handle_playing("event")
+
+        # assert the start is not notified again
+        self.assertEqual(vlc_player.state, "song")
+        vlc_player.callbacks["started_song"].assert_not_called()
+
+    @patch("dakara_player.media_player.base.monotonic")
+    @patch.object(MediaPlayerVlc, "get_position")
+    def test_check_stall_progress(self, mocked_get_position, mocked_monotonic):
+        """Test the watchdog when the song progresses
+        """
+        vlc_player, _, _ = self.get_instance()
+        self.set_playlist_entry(vlc_player, "song")
+        vlc_player.play = MagicMock()
+        mocked_get_position.side_effect = [1.0, 6.0, 12.0]
+        mocked_monotonic.side_effect = [0, 5, 11]
+
+        # call the method
+        for _ in range(3):
+            vlc_player.check_stall()
+
+        # assert the effect
+        vlc_player.play.assert_not_called()
+        self.assertEqual(vlc_player.watchdog_position, 12.0)
+        self.assertEqual(vlc_player.metrics.get_counter("stalls"), 0)
+
+    @patch("dakara_player.media_player.base.monotonic")
+    @patch.object(MediaPlayerVlc, "get_position")
+    def test_check_stall_untracked(self, mocked_get_position, mocked_monotonic):
+        """Test the watchdog does not track a still idle screen
+        """
+        vlc_player, _, _ = self.get_instance()
+        vlc_player.set_state("idle")
+        vlc_player.play = MagicMock()
+
+        # call the method
+        vlc_player.check_stall()
+
+        # assert the effect
+        mocked_get_position.assert_not_called()
+        vlc_player.play.assert_not_called()
+
+    @patch("dakara_player.media_player.base.monotonic")
+    @patch.object(MediaPlayerVlc, "get_position")
+    def test_check_stall_reload(self, mocked_get_position, mocked_monotonic):
+        """Test the watchdog reloads a stalled song and records the recovery
+        """
+        vlc_player, _, _ = self.get_instance()
+        self.set_playlist_entry(vlc_player, "song")
+        vlc_player.play = MagicMock(
+            side_effect=lambda what, position: vlc_player.load_state(what, True)
+        )
+        mocked_get_position.side_effect = [12.0, 12.0, 12.0, 13.0]
+        mocked_monotonic.side_effect = [0, 11, 11, 11, 12, 14]
+
+        # call the method until the song is stalled
+        vlc_player.check_stall()
+        with self.assertLogs("dakara_player.media_player.base", "DEBUG") as logger:
+            vlc_player.check_stall()
+
+        # assert the effect
+        vlc_player.play.assert_called_with("song", 12.0)
+        self.assertEqual(vlc_player.metrics.get_counter("stalls"), 1)
+        self.assertEqual(vlc_player.metrics.get_counter("stall_reloads"), 1)
+        self.assertListEqual(
+            logger.output,
+            [
+                "WARNING:dakara_player.media_player.base:Playback of song stalled "
+                "for 11.0 s",
+                "INFO:dakara_player.media_player.base:Reloading song at 12.0 s",
+                "DEBUG:dakara_player.media_player.base:Player state is now "
+                "song_loading",
+            ],
+        )
+
+        # call the method until the reloaded song progresses
+        vlc_player.check_stall()
+        with self.assertLogs("dakara_player.metrics", "DEBUG"):
+            vlc_player.check_stall()
+
+        # assert the recovery
+        self.assertIsNone(vlc_player.stall_detected)
+        self.assertEqual(vlc_player.metrics.get_duration("stall_recovery")["last"], 3)
+
+    @patch("dakara_player.media_player.base.monotonic")
+    @patch.object(MediaPlayerVlc, "get_position")
+    def test_check_stall_skip(self, mocked_get_position, mocked_monotonic):
+        """Test the watchdog skips a song still stalled after a reload
+        """
+        vlc_player, _, _ = self.get_instance()
+        self.set_playlist_entry(vlc_player, "song")
+        vlc_player.set_callback("error", MagicMock())
+        vlc_player.skip = MagicMock()
+        vlc_player.stall_detected = 0
+        vlc_player.stall_reloads = 1
+        vlc_player.stall_generation = vlc_player.generation
+        mocked_get_position.return_value = 12.0
+        mocked_monotonic.side_effect = [0, 11, 11, 12]
+
+        # call the method until the song is stalled
+        vlc_player.check_stall()
+        with self.assertLogs("dakara_player.media_player.base", "DEBUG") as logger:
+            vlc_player.check_stall()
+
+        # assert the effect
+        vlc_player.skip.assert_called_with()
+        vlc_player.callbacks["error"].assert_called_with(42, "Playback stalled")
+        self.assertEqual(vlc_player.metrics.get_counter("stall_skips"), 1)
+        self.assertEqual(vlc_player.metrics.get_duration("stall_recovery")["last"], 12)
+        self.assertIn(
+            "ERROR:dakara_player.media_player.base:"
+            "Unable to recover playback of song",
+            logger.output,
+        )
+
+    @patch.object(MediaPlayerVlc, "get_position")
+    def test_save_checkpoint(self, mocked_get_position):
+        """Test to save the checkpoint while a song is played
+        """
+        vlc_player, _, _ = self.get_instance()
+        self.set_playlist_entry(vlc_player, "song")
+        vlc_player.checkpoint = MagicMock()
+        mocked_get_position.return_value = 12.5
+
+        # call the method
+        vlc_player.save_checkpoint()
+
+        # assert the call
+        vlc_player.checkpoint.save.assert_called_with(self.playlist_entry, 12.5)
+
+    def test_save_checkpoint_transition(self):
+        """Test to clear the checkpoint while a transition is played
+        """
+        vlc_player, _, _ = self.get_instance()
+        self.set_playlist_entry(vlc_player, "transition")
+        vlc_player.checkpoint = MagicMock()
+
+        # call the method
+        vlc_player.save_checkpoint()
+
+        # assert the call
+        vlc_player.checkpoint.clear.assert_called_with()
+        vlc_player.checkpoint.save.assert_not_called()
+
+    @patch.object(MediaPlayerVlc, "get_frame_stats")
+    def test_sample_frame_stats_degradation(self, mocked_get_frame_stats):
+        """Test to sample the frames of a song dropping too many frames
+        """
+        vlc_player, _, _ = self.get_instance(
+            {
+                "kara_folder": gettempdir(),
+                "frame_stats": {
+                    "interval": 0.001,
+                    "degradation": {"enabled": True, "samples": 1},
+                },
+            }
+        )
+        self.set_playlist_entry(vlc_player, "song")
+        mocked_get_frame_stats.side_effect = [(0, 0, None), (50, 50, None)]
+
+        # call the method
+        vlc_player.sample_frame_stats()
+        sleep(0.01)
+        with self.assertLogs("dakara_player.media_player.base", "DEBUG") as logger:
+            vlc_player.sample_frame_stats()
+
+        # assert the effect
+        self.assertEqual(vlc_player.frame_stats.dropped, 50)
+        self.assertEqual(vlc_player.frame_stats.degradations, 1)
+        self.assertIn("avcodec-skiploopfilter=4", vlc_player.media_parameters)
+        self.assertEqual(vlc_player.metrics.get_counter("degradations"), 1)
+
+        # assert the logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "WARNING:dakara_player.media_player.base:Dropping 50% of frames, "
+                "degrading settings: avcodec-skiploopfilter=4"
+            ],
+        )
+
+    @patch("dakara_player.media_player.base.append_frame_stats")
+    def test_sample_frame_stats_finish(self, mocked_append_frame_stats):
+        """Test to finish the frame statistics of a song when idle
+        """
+        vlc_player, _, _ = self.get_instance(
+            {"kara_folder": gettempdir(), "frame_stats": {"path": "stats.jsonl"}}
+        )
+        self.set_playlist_entry(vlc_player, "idle")
+        frame_stats = FrameStats(self.playlist_entry)
+        frame_stats.dropped = 1
+        frame_stats.displayed = 99
+        vlc_player.frame_stats = frame_stats
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.base", "DEBUG") as logger:
+            vlc_player.sample_frame_stats()
+
+        # assert the effect
+        self.assertIsNone(vlc_player.frame_stats)
+        mocked_append_frame_stats.assert_called_with(Path("stats.jsonl"), frame_stats)
+        self.assertEqual(vlc_player.metrics.get_counter("dropped_frames"), 1)
+
+        # assert the logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "INFO:dakara_player.media_player.base:Frames of 'Song title': "
+                "1 dropped, 99 displayed (1.0%, max 0.0%)"
+            ],
+        )
+
+    @patch("dakara_player.media_player.vlc.vlc.MediaStats")
+    def test_get_frame_stats(self, mocked_media_stats_class):
+        """Test to get the frame counters of VLC
+        """
+        vlc_player, _, _ = self.get_instance()
+        self.set_playlist_entry(vlc_player, "song")
+        stats = mocked_media_stats_class.return_value
+        stats.lost_pictures = 2
+        stats.displayed_pictures = 240
+
+        # call the method
+        counters = vlc_player.get_frame_stats()
+
+        # assert the result
+        self.assertEqual(counters, (2, 240, None))
+        vlc_player.playlist_entry_data["song"].media.get_stats.assert_called_with(stats)
+
+    @patch.object(MediaPlayerVlc, "play")
+    @patch.object(MediaPlayerVlc, "set_playlist_entry")
+    def test_resume_checkpoint(self, mocked_set_playlist_entry, mocked_play):
+        """Test to resume the song of the checkpoint
+        """
+        vlc_player, _, _ = self.get_instance()
+        vlc_player.checkpoint = MagicMock()
+        vlc_player.checkpoint.load.return_value = (self.playlist_entry, 12.5)
+        preparation = vlc_player.preparation = MagicMock()
+        mocked_play.side_effect = lambda what, position: vlc_player.load_state(
+            what, True
+        )
+
+        # call the method
+        with self.assertLogs("dakara_player.media_player.base", "DEBUG") as logger:
+            resumed = vlc_player.resume_checkpoint()
+
+        # assert the result
+        self.assertTrue(resumed)
+        mocked_set_playlist_entry.assert_called_with(
+            self.playlist_entry, autoplay=False
+        )
+        vlc_player.checkpoint.load.assert_called_with(vlc_player.kara_folder_path)
+        preparation.wait.assert_called_with(timeout=RESUME_WAIT_TIMEOUT)
+        mocked_play.assert_called_with("song", 12.5)
+        self.assertIn(
+            "INFO:dakara_player.media_player.base:Resuming 'Song title' at 12.5 s",
+            logger.output,
+        )
+
+    def test_resume_checkpoint_none(self):
+        """Test to resume when there is no checkpoint
+        """
+        vlc_player, _, _ = self.get_instance()
+        vlc_player.checkpoint = MagicMock()
+        vlc_player.checkpoint.load.return_value = None
+
+        # call the method
+        self.assertFalse(vlc_player.resume_checkpoint())
@@ -0,0 +1,89 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from dakara_player.metrics import Metrics
+
+
+class MetricsTestCase(TestCase):
+    """Test the Metrics class
+    """
+
+    def test_increment(self):
+        """Test to increment a counter
+        """
+        metrics = Metrics()
+
+        self.assertEqual(metrics.get_counter("stalls"), 0)
+
+        # call the method
+        metrics.increment("stalls")
+        metrics.increment("stalls", 2)
+
+        # assert the result
+        self.assertEqual(metrics.get_counter("stalls"), 3)
+
+    def test_record_duration(self):
+        """Test to record durations
+        """
+        metrics = Metrics()
+
+        self.assertIsNone(metrics.get_duration("skip"))
+
+        # call the method
+        with self.assertLogs("dakara_player.metrics", "DEBUG") as logger:
+            metrics.record_duration("skip", 1)
+            metrics.record_duration("skip", 3)
+
+        # assert effect on logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "DEBUG:dakara_player.metrics:Measured skip: 1.000 s",
+                "DEBUG:dakara_player.metrics:Measured skip: 3.000 s",
+            ],
+        )
+
+        # assert the result
+        self.assertDictEqual(
+            metrics.get_duration("skip"),
+            {"count": 2, "total": 4, "mean": 2, "min": 1, "max": 3, "last": 3},
+        )
+
+    @patch("dakara_player.metrics.monotonic")
+    def test_measure(self, mocked_monotonic):
+        """Test to measure a block of code
+        """
+        metrics = Metrics()
+        mocked_monotonic.side_effect = [10, 12.5]
+
+        # call the method
+        with self.assertRaises(ValueError):
+            with metrics.measure("stage"):
+                raise ValueError("error")
+
+        # assert the result
+        self.assertEqual(metrics.get_duration("stage")["last"], 2.5)
+
+    def test_log_summary(self):
+        """Test to log all measurements
+        """
+        metrics = Metrics()
+        metrics.increment("stalls")
+        metrics.record_duration("skip", 0.5)
+
+        # call the method
+        with self.assertLogs("dakara_player.metrics", "INFO") as logger:
+            metrics.log_summary()
+
+        # assert effect on logs
+        self.assertListEqual(
+            logger.output,
+            [
+                "INFO:dakara_player.metrics:stalls: 1",
+                "INFO:dakara_player.metrics:skip: 1 times, mean 0.500 s, "
+                "max 0.500 s",
+            ],
+        )
+
+        # assert the summary
+        self.assertDictEqual(metrics.get_summary()["counters"], {"stalls": 1})
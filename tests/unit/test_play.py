@@ -8,6 +8,7 @@ from path import Path
 
 from dakara_player import DakaraPlayer
 from dakara_player.commands import play
+from dakara_player.decoder_probe import DecoderProbeError, ProbeResult
 
 
 class GetParserTestCase(TestCase):
@@ -40,6 +41,40 @@ class GetParserTestCase(TestCase):
         # check the function
         self.assertIs(args.function, play.create_config)
 
+    def test_show_settings_function(self):
+        """Test the parser calls show_settings when prompted
+        """
+        # call the function
+        parser = play.get_parser()
+        args = parser.parse_args(["show-settings"])
+
+        # check the function
+        self.assertIs(args.function, play.show_settings)
+
+    def test_probe_decoders_function(self):
+        """Test the parser calls probe_decoders_command when prompted
+        """
+        # call the function
+        parser = play.get_parser()
+        args = parser.parse_args(["probe-decoders", "video.mkv"])
+
+        # check the function
+        self.assertIs(args.function, play.probe_decoders_command)
+        self.assertEqual(args.file, "video.mkv")
+        self.assertFalse(args.dry_run)
+
+    def test_check_library_function(self):
+        """Test the parser calls check_library_command when prompted
+        """
+        # call the function
+        parser = play.get_parser()
+        args = parser.parse_args(["check-library", "--jobs", "2"])
+
+        # check the function
+        self.assertIs(args.function, play.check_library_command)
+        self.assertEqual(args.jobs, 2)
+        self.assertIsNone(args.report)
+
 
 class PlayTestCase(TestCase):
     """Test the play action
@@ -192,6 +227,208 @@ class CreateConfigTestCase(TestCase):
         )
 
 
+class ShowSettingsTestCase(TestCase):
+    """Test the show settings action
+    """
+
+    @patch("dakara_player.commands.play.load_config")
+    @patch("dakara_player.commands.play.get_config_file")
+    @patch("dakara_player.commands.play.create_logger")
+    def test_show_settings(
+        self, mocked_create_logger, mocked_get_config_file, mocked_load_config
+    ):
+        """Test to show the settings of a profile
+        """
+        # create the mocks
+        mocked_load_config.return_value = {
+            "player": {"profile": "sbc", "mpv": {"cache": "yes"}}
+        }
+
+        # call the function
+        with self.assertLogs("dakara_player.commands.play") as logger:
+            play.show_settings(Namespace(debug=False))
+
+        # assert the logs
+        self.assertIn("INFO:dakara_player.commands.play:profile: sbc", logger.output)
+        self.assertIn("INFO:dakara_player.commands.play:  cache: yes", logger.output)
+
+        # assert the call
+        mocked_load_config.assert_called_with(
+            mocked_get_config_file.return_value, False, mandatory_keys=["player"]
+        )
+
+
+class ProbeDecodersTestCase(TestCase):
+    """Test the probe decoders action
+    """
+
+    def setUp(self):
+        # create results
+        self.result_software = ProbeResult("no")
+        self.result_software.frames = 100
+        self.result_software.elapsed = 1
+        self.result_hardware = ProbeResult("vaapi")
+        self.result_hardware.error = "fell back to software decoding"
+
+    @patch("dakara_player.commands.play.write_setting")
+    @patch("dakara_player.commands.play.probe_decoders")
+    @patch("dakara_player.commands.play.get_sample_path")
+    @patch("dakara_player.commands.play.load_config")
+    @patch("dakara_player.commands.play.get_config_file")
+    @patch("dakara_player.commands.play.create_logger")
+    def test_probe_decoders(
+        self,
+        mocked_create_logger,
+        mocked_get_config_file,
+        mocked_load_config,
+        mocked_get_sample_path,
+        mocked_probe_decoders,
+        mocked_write_setting,
+    ):
+        """Test to probe the decoders and write the best one
+        """
+        # create the mocks
+        mocked_load_config.return_value = {"player": {"player_name": "mpv"}}
+        mocked_probe_decoders.return_value = [
+            self.result_software,
+            self.result_hardware,
+        ]
+
+        # call the function
+        with self.assertLogs("dakara_player.commands.play") as logger:
+            play.probe_decoders_command(
+                Namespace(debug=False, file=None, dry_run=False)
+            )
+
+        # assert the logs
+        self.assertIn(
+            "INFO:dakara_player.commands.play:vaapi: not working "
+            "(fell back to software decoding)",
+            logger.output,
+        )
+        self.assertIn(
+            "INFO:dakara_player.commands.play:Best decoder setting: no", logger.output
+        )
+
+        # assert the calls
+        mocked_get_sample_path.assert_called_with(None)
+        mocked_probe_decoders.assert_called_with(
+            "mpv", mocked_get_sample_path.return_value
+        )
+        mocked_write_setting.assert_called_with(
+            mocked_get_config_file.return_value, "mpv", "no"
+        )
+
+    @patch("dakara_player.commands.play.write_setting")
+    @patch("dakara_player.commands.play.probe_decoders")
+    @patch("dakara_player.commands.play.get_sample_path")
+    @patch("dakara_player.commands.play.load_config")
+    @patch("dakara_player.commands.play.get_config_file")
+    @patch("dakara_player.commands.play.create_logger")
+    def test_probe_decoders_none_working(
+        self,
+        mocked_create_logger,
+        mocked_get_config_file,
+        mocked_load_config,
+        mocked_get_sample_path,
+        mocked_probe_decoders,
+        mocked_write_setting,
+    ):
+        """Test to probe the decoders when none works
+        """
+        # create the mocks
+        mocked_load_config.return_value = {"player": {}}
+        mocked_probe_decoders.return_value = [self.result_hardware]
+
+        # call the function
+        with self.assertLogs("dakara_player.commands.play"):
+            with self.assertRaisesRegex(
+                DecoderProbeError, "No decoder setting could decode the sample"
+            ):
+                play.probe_decoders_command(
+                    Namespace(debug=False, file="video.mkv", dry_run=False)
+                )
+
+        # assert the calls
+        mocked_probe_decoders.assert_called_with(
+            "vlc", mocked_get_sample_path.return_value
+        )
+        mocked_write_setting.assert_not_called()
+
+
+class CheckLibraryTestCase(TestCase):
+    """Test the check library action
+    """
+
+    @patch("dakara_player.commands.play.write_json")
+    @patch("dakara_player.commands.play.check_library")
+    @patch("dakara_player.commands.play.load_config")
+    @patch("dakara_player.commands.play.get_config_file")
+    @patch("dakara_player.commands.play.create_logger")
+    def test_check_library(
+        self,
+        mocked_create_logger,
+        mocked_get_config_file,
+        mocked_load_config,
+        mocked_check_library,
+        mocked_write_json,
+    ):
+        """Test to check the library and write the report and the reject list
+        """
+        # create the mocks
+        mocked_load_config.return_value = {
+            "player": {
+                "player_name": "mpv",
+                "kara_folder": "/karaoke",
+                "library_check": {"reject_list": "/config/rejects.json"},
+            }
+        }
+        mocked_check_library.return_value = {
+            "songs": [
+                {"path": "/karaoke/song1.mkv", "size": 1, "mtime": 2, "errors": []},
+                {
+                    "path": "/karaoke/song2.mkv",
+                    "size": 3,
+                    "mtime": 4,
+                    "errors": ["Invalid file: No cluster"],
+                },
+            ]
+        }
+
+        # call the function
+        with self.assertLogs("dakara_player.commands.play") as logger:
+            play.check_library_command(
+                Namespace(debug=False, jobs=2, report="/config/report.json")
+            )
+
+        # assert the logs
+        self.assertIn(
+            "WARNING:dakara_player.commands.play:Rejected '/karaoke/song2.mkv': "
+            "Invalid file: No cluster",
+            logger.output,
+        )
+        self.assertIn(
+            "INFO:dakara_player.commands.play:2 songs checked, 1 rejected",
+            logger.output,
+        )
+
+        # assert the calls
+        mocked_check_library.assert_called_with(Path("/karaoke"), "mpv", 2)
+        mocked_write_json.assert_any_call(
+            Path("/config/report.json"), mocked_check_library.return_value
+        )
+        mocked_write_json.assert_any_call(
+            Path("/config/rejects.json"),
+            {
+                "/karaoke/song2.mkv": {
+                    "size": 3,
+                    "mtime": 4,
+                    "errors": ["Invalid file: No cluster"],
+                }
+            },
+        )
+
+
 @patch("dakara_player.commands.play.exit")
 @patch.object(ArgumentParser, "parse_args")
 class MainTestCase(TestCase):
@@ -0,0 +1,136 @@
+import pickle
+from unittest import TestCase
+
+from path import Path
+
+from dakara_player.playlist_entry import InvalidPlaylistEntryError, PlaylistEntry
+
+
+class PlaylistEntryTestCase(TestCase):
+    """Test the playlist entry class
+    """
+
+    def setUp(self):
+        # create playlist entry data
+        self.data = {
+            "id": 42,
+            "song": {"title": "Song title", "file_path": "directory/song.mkv"},
+            "owner": {"username": "me"},
+            "use_instrumental": True,
+            "tags": [{"name": "OP"}],
+        }
+
+        # create kara folder
+        self.kara_folder_path = Path("kara")
+
+    def test_from_dict(self):
+        """Test to parse a playlist entry
+        """
+        playlist_entry = PlaylistEntry.from_dict(self.data, self.kara_folder_path)
+
+        self.assertEqual(playlist_entry.id, 42)
+        self.assertEqual(playlist_entry.title, "Song title")
+        self.assertEqual(
+            playlist_entry.file_path, Path("kara") / "directory" / "song.mkv"
+        )
+        self.assertTrue(playlist_entry.use_instrumental)
+        self.assertEqual(playlist_entry.data["owner"], {"username": "me"})
+
+    def test_from_dict_default_instrumental(self):
+        """Test to parse a playlist entry without instrumental flag
+        """
+        del self.data["use_instrumental"]
+        playlist_entry = PlaylistEntry.from_dict(self.data, self.kara_folder_path)
+
+        self.assertFalse(playlist_entry.use_instrumental)
+
+    def test_from_dict_invalid(self):
+        """Test to parse invalid playlist entries
+        """
+        with self.assertRaisesRegex(InvalidPlaylistEntryError, "must be a dict"):
+            PlaylistEntry.from_dict(None, self.kara_folder_path)
+
+        with self.assertRaisesRegex(InvalidPlaylistEntryError, "no valid ID"):
+            PlaylistEntry.from_dict({"id": "42"}, self.kara_folder_path)
+
+        with self.assertRaisesRegex(InvalidPlaylistEntryError, "42 has no song"):
+            PlaylistEntry.from_dict({"id": 42}, self.kara_folder_path)
+
+        with self.assertRaisesRegex(InvalidPlaylistEntryError, "42 has no file"):
+            PlaylistEntry.from_dict(
+                {"id": 42, "song": {"title": "Song title"}}, self.kara_folder_path
+            )
+
+        with self.assertRaisesRegex(InvalidPlaylistEntryError, "42 has no title"):
+            PlaylistEntry.from_dict(
+                {"id": 42, "song": {"file_path": "song.mkv"}}, self.kara_folder_path
+            )
+
+    def test_immutable(self):
+        """Test a playlist entry cannot be modified
+        """
+        playlist_entry = PlaylistEntry.from_dict(self.data, self.kara_folder_path)
+
+        with self.assertRaisesRegex(AttributeError, "immutable"):
+            playlist_entry.id = 43
+
+        with self.assertRaisesRegex(AttributeError, "immutable"):
+            del playlist_entry.title
+
+        with self.assertRaises(TypeError):
+            playlist_entry.data["id"] = 43
+
+        with self.assertRaises(AttributeError):
+            playlist_entry.__dict__
+
+        with self.assertRaises(TypeError):
+            playlist_entry.data["song"]["title"] = "Other title"
+
+        with self.assertRaises(TypeError):
+            playlist_entry.data["tags"][0]["name"] = "ED"
+
+    def test_to_dict(self):
+        """Test to get a mutable copy of the raw data
+        """
+        playlist_entry = PlaylistEntry.from_dict(self.data, self.kara_folder_path)
+
+        data = playlist_entry.to_dict()
+
+        self.assertDictEqual(data, self.data)
+        self.assertIsInstance(data["song"], dict)
+        self.assertIsInstance(data["tags"], list)
+
+        # assert the data of the playlist entry are not modified
+        data["song"]["title"] = "Other title"
+        self.assertEqual(playlist_entry.data["song"]["title"], "Song title")
+
+    def test_get_context(self):
+        """Test to get the template context
+        """
+        playlist_entry = PlaylistEntry.from_dict(self.data, self.kara_folder_path)
+
+        context = playlist_entry.get_context(fade_in=True)
+
+        self.assertDictEqual(context, {**self.data, "fade_in": True})
+
+        # assert the context is a new object each time
+        context["fade_in"] = False
+        self.assertNotIn("fade_in", playlist_entry.get_context())
+
+    def test_pickle(self):
+        """Test to pickle and unpickle a playlist entry
+        """
+        playlist_entry = PlaylistEntry.from_dict(self.data, self.kara_folder_path)
+
+        playlist_entry_copy = pickle.loads(pickle.dumps(playlist_entry))
+
+        self.assertEqual(playlist_entry_copy.id, playlist_entry.id)
+        self.assertEqual(playlist_entry_copy.file_path, playlist_entry.file_path)
+        self.assertEqual(playlist_entry_copy.data, playlist_entry.data)
+
+    def test_repr(self):
+        """Test the representation of a playlist entry
+        """
+        playlist_entry = PlaylistEntry.from_dict(self.data, self.kara_folder_path)
+
+        self.assertEqual(repr(playlist_entry), "<PlaylistEntry 42 'Song title'>")
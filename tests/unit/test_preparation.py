@@ -0,0 +1,140 @@
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from threading import Event
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from dakara_player.metrics import Metrics
+from dakara_player.preparation import Preparation
+
+
+class PreparationTestCase(TestCase):
+    """Test the Preparation class
+    """
+
+    def setUp(self):
+        # create stop event and errors queue
+        self.stop = Event()
+        self.errors = Queue()
+
+        # create an executor running stages synchronously
+        self.executor = MagicMock()
+        self.executor.submit.side_effect = lambda function, *args: function(*args)
+
+    def test_order(self):
+        """Test that stages run after the stages they require, critical first
+        """
+        preparation = Preparation(self.stop, self.errors, self.executor)
+        order = []
+
+        preparation.add_stage("song", lambda: order.append("song"))
+        preparation.add_stage("transition", lambda: order.append("transition"))
+        preparation.add_stage("file", lambda: order.append("file"), critical=True)
+        preparation.add_stage(
+            "autoplay",
+            lambda: order.append("autoplay"),
+            requires=["file", "transition"],
+            critical=True,
+        )
+
+        # call the method
+        preparation.start()
+
+        # assert the result
+        self.assertListEqual(order, ["file", "song", "transition", "autoplay"])
+        self.assertTrue(preparation.is_ready())
+        self.assertTrue(preparation.wait())
+
+    def test_add_stage_unknown_requirement(self):
+        """Test to add a stage requiring an unknown stage
+        """
+        preparation = Preparation(self.stop, self.errors, self.executor)
+
+        with self.assertRaisesRegex(ValueError, "Unknown required stage: file"):
+            preparation.add_stage("song", lambda: None, requires=["file"])
+
+    def test_cancel(self):
+        """Test to cancel the pipeline from a stage
+        """
+        preparation = Preparation(self.stop, self.errors, self.executor)
+        song = MagicMock()
+
+        preparation.add_stage("file", lambda: preparation.cancel())
+        preparation.add_stage("song", song, requires=["file"])
+
+        # call the method
+        with self.assertLogs("dakara_player.preparation", "DEBUG") as logger:
+            preparation.start()
+
+        # assert effect on logs
+        self.assertListEqual(
+            logger.output, ["DEBUG:dakara_player.preparation:Preparation cancelled"]
+        )
+
+        # assert the result
+        song.assert_not_called()
+        self.assertTrue(preparation.is_cancelled())
+        self.assertFalse(preparation.is_ready("file"))
+        self.assertFalse(preparation.wait("song"))
+
+    def test_error(self):
+        """Test a stage raising an error
+        """
+        preparation = Preparation(self.stop, self.errors, self.executor)
+        song = MagicMock()
+
+        preparation.add_stage("file", MagicMock(side_effect=OSError("error")))
+        preparation.add_stage("song", song, requires=["file"])
+
+        # call the method
+        with self.assertLogs("dakara_player.preparation", "DEBUG"):
+            preparation.start()
+
+        # assert the result
+        song.assert_not_called()
+        self.assertTrue(self.stop.is_set())
+        exception_class, _, _ = self.errors.get()
+        self.assertIs(exception_class, OSError)
+        self.assertFalse(preparation.wait())
+
+    def test_metrics(self):
+        """Test that the duration of stages is recorded
+        """
+        metrics = Metrics()
+        preparation = Preparation(self.stop, self.errors, self.executor, metrics)
+
+        preparation.add_stage("file", lambda: None)
+        preparation.add_stage("song", lambda: None, requires=["file"])
+
+        # call the method
+        with self.assertLogs("dakara_player.metrics", "DEBUG"):
+            preparation.start()
+
+        # assert the result
+        self.assertEqual(metrics.get_duration("preparation.file")["count"], 1)
+        self.assertEqual(metrics.get_duration("preparation.song")["count"], 1)
+        self.assertEqual(metrics.get_duration("preparation")["count"], 1)
+
+    def test_wait_timeout(self):
+        """Test to wait for a stage that takes too long
+        """
+        unlock = Event()
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            preparation = Preparation(self.stop, self.errors, executor)
+            preparation.add_stage("transition", lambda: None, critical=True)
+            preparation.add_stage("song", unlock.wait)
+
+            # call the method
+            preparation.start()
+
+            # assert the result
+            self.assertTrue(preparation.wait("transition", timeout=1))
+            self.assertFalse(preparation.wait(timeout=0.01))
+            self.assertFalse(preparation.is_ready())
+
+            # let the stage finish
+            unlock.set()
+            self.assertTrue(preparation.wait(timeout=1))
+
+        self.assertFalse(self.stop.is_set())
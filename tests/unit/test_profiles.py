@@ -0,0 +1,111 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from dakara_base.config import ConfigInvalidError
+
+from dakara_player import profiles
+
+
+class DetectProfileTestCase(TestCase):
+    """Test the detection of the profile
+    """
+
+    @patch("dakara_player.profiles.get_memory", return_value=8 * 1024 ** 3)
+    @patch("dakara_player.profiles.os.cpu_count", return_value=8)
+    def test_desktop(self, mocked_cpu_count, mocked_get_memory):
+        """Test to detect a desktop computer
+        """
+        self.assertEqual(profiles.detect_profile(), "desktop")
+
+    @patch("dakara_player.profiles.get_memory", return_value=8 * 1024 ** 3)
+    @patch("dakara_player.profiles.os.cpu_count", return_value=4)
+    def test_desktop_quad_core(self, mocked_cpu_count, mocked_get_memory):
+        """Test to detect a quad-core desktop computer
+        """
+        self.assertEqual(profiles.detect_profile(), "desktop")
+
+    @patch("dakara_player.profiles.get_memory", return_value=1024 ** 3)
+    @patch("dakara_player.profiles.os.cpu_count", return_value=8)
+    def test_desktop_low_memory(self, mocked_cpu_count, mocked_get_memory):
+        """Test to detect a computer with many cores and little memory
+        """
+        self.assertEqual(profiles.detect_profile(), "desktop")
+
+    @patch("dakara_player.profiles.get_memory", return_value=None)
+    @patch("dakara_player.profiles.os.cpu_count", return_value=4)
+    def test_desktop_unknown_memory(self, mocked_cpu_count, mocked_get_memory):
+        """Test to detect a computer which memory is unknown
+        """
+        self.assertEqual(profiles.detect_profile(), "desktop")
+
+    @patch("dakara_player.profiles.get_memory", return_value=1024 ** 3)
+    @patch("dakara_player.profiles.os.cpu_count", return_value=4)
+    def test_sbc(self, mocked_cpu_count, mocked_get_memory):
+        """Test to detect a single-board computer by its CPU count and memory
+        """
+        self.assertEqual(profiles.detect_profile(), "sbc")
+
+    def test_get_memory(self):
+        """Test to get the memory of the computer
+        """
+        self.assertGreater(profiles.get_memory(), 0)
+
+
+class ApplyProfileTestCase(TestCase):
+    """Test the application of a profile
+    """
+
+    def test_no_profile(self):
+        """Test the configuration is unchanged without profile
+        """
+        config = {"mpv": {"deband": True}}
+
+        self.assertIs(profiles.apply_profile(config), config)
+
+    def test_profile(self):
+        """Test explicit settings take precedence over the profile
+        """
+        config = {
+            "profile": "nas",
+            "mpv": {"cache-secs": 10},
+            "vlc": {"media_parameters": ["file-caching=2000"]},
+        }
+
+        # call the function
+        effective = profiles.apply_profile(config)
+
+        # assert the result
+        self.assertEqual(effective["mpv"]["cache-secs"], 10)
+        self.assertEqual(effective["mpv"]["demuxer-max-bytes"], "256MiB")
+        self.assertEqual(effective["vlc"]["media_parameters"][0], "file-caching=5000")
+        self.assertEqual(effective["vlc"]["media_parameters"][-1], "file-caching=2000")
+
+        # assert the configuration is not modified
+        self.assertDictEqual(config["mpv"], {"cache-secs": 10})
+
+    @patch("dakara_player.profiles.detect_profile", return_value="sbc")
+    def test_auto(self, mocked_detect_profile):
+        """Test to select the profile automatically
+        """
+        effective = profiles.apply_profile({"profile": "auto"})
+
+        self.assertEqual(effective["profile"], "sbc")
+        self.assertEqual(effective["mpv"]["vd-lavc-threads"], 2)
+
+    def test_unknown(self):
+        """Test to apply an unknown profile
+        """
+        with self.assertRaisesRegex(ConfigInvalidError, "Unknown profile 'fast'"):
+            profiles.apply_profile({"profile": "fast"})
+
+    def test_get_effective_settings(self):
+        """Test to describe the effective settings
+        """
+        lines = profiles.get_effective_settings(
+            {"profile": "sbc", "vlc": {"instance_parameters": ["--no-xlib"]}}
+        )
+
+        self.assertEqual(lines[0], "profile: sbc")
+        self.assertIn("  instance parameter: --no-xlib", lines)
+        self.assertIn("  media parameter: file-caching=300", lines)
+        self.assertIn("  demuxer-max-bytes: 32MiB", lines)
@@ -0,0 +1,89 @@
+import json
+import os
+from unittest import TestCase
+from unittest.mock import patch
+
+from path import Path, TempDir
+
+from dakara_player.reject_list import RejectList, get_reject_list_path
+
+
+class RejectListTestCase(TestCase):
+    """Test the songs rejected by the library check
+    """
+
+    def setUp(self):
+        # create a song and a reject list
+        self.tempdir = TempDir()
+        self.song_path = self.tempdir / "song.mkv"
+        self.song_path.write_bytes(b"song")
+        stat = os.stat(self.song_path)
+        self.path = self.tempdir / "rejects.json"
+        self.path.write_text(
+            json.dumps(
+                {
+                    str(self.song_path): {
+                        "size": stat.st_size,
+                        "mtime": stat.st_mtime,
+                        "errors": ["Invalid file", "Unable to decode"],
+                    }
+                }
+            )
+        )
+
+    def tearDown(self):
+        self.tempdir.rmtree()
+
+    def test_get_reason(self):
+        """Test to get the reason why a song is rejected
+        """
+        reject_list = RejectList(self.path)
+        reject_list.load()
+
+        self.assertEqual(len(reject_list), 1)
+        self.assertEqual(
+            reject_list.get_reason(self.song_path), "Invalid file; Unable to decode"
+        )
+        self.assertIsNone(reject_list.get_reason(self.tempdir / "other.mkv"))
+
+    def test_get_reason_changed(self):
+        """Test a song changed since the library check is not rejected
+        """
+        reject_list = RejectList(self.path)
+        reject_list.load()
+        self.song_path.write_bytes(b"fixed song")
+
+        self.assertIsNone(reject_list.get_reason(self.song_path))
+
+    def test_load_missing(self):
+        """Test to load a reject list that does not exist
+        """
+        reject_list = RejectList(self.tempdir / "nothing.json")
+        reject_list.load()
+
+        self.assertFalse(reject_list)
+
+    def test_load_invalid(self):
+        """Test to load an invalid reject list
+        """
+        self.path.write_text("{")
+        reject_list = RejectList(self.path)
+
+        with self.assertLogs("dakara_player.reject_list", "WARNING"):
+            reject_list.load()
+
+        self.assertFalse(reject_list)
+
+    @patch("dakara_player.reject_list.get_config_directory")
+    def test_get_reject_list_path(self, mocked_get_config_directory):
+        """Test to get the path of the reject list from the config
+        """
+        mocked_get_config_directory.return_value = Path("/config")
+
+        self.assertEqual(
+            get_reject_list_path({}), Path("/config") / "library_rejects.json"
+        )
+        self.assertEqual(
+            get_reject_list_path({"library_check": {"reject_list": "/rejects.json"}}),
+            Path("/rejects.json"),
+        )
@@ -7,6 +7,7 @@ from dakara_base.resources_manager import get_file
 from dakara_player.resources_manager import (
     get_all_fonts,
     get_background,
+    get_sample,
     get_template,
 )
 
@@ -42,6 +43,20 @@ class GetTemplateTestCase(TestCase):
         self.assertEqual(result, MODULE_PATH / "resources" / "templates" / "idle.ass")
 
 
+class GetSampleTestCase(TestCase):
+    """Test the `get_sample` function
+    """
+
+    def test_real(self):
+        """Test to access the real sample
+        """
+        # call the function
+        result = get_sample()
+
+        # assert the result
+        self.assertEqual(result, MODULE_PATH / "resources" / "sample.mkv")
+
+
 class GetAllFontsTestCase(TestCase):
     """Test the `get_all_fonts` function
     """
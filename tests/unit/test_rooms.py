@@ -0,0 +1,136 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from dakara_base.config import ConfigInvalidError
+from path import Path
+
+from dakara_player.rooms import SharedResources, get_rooms_config, merge_config
+
+
+CONFIG = {
+    "player": {"kara_folder": "/some/path", "fullscreen": True, "mpv": {"fs": True}},
+    "server": {"address": "www.example.com", "login": "login", "password": "pass"},
+    "loglevel": "info",
+}
+
+
+class MergeConfigTestCase(TestCase):
+    """Test the merge of configurations
+    """
+
+    def test_merge(self):
+        """Test to merge nested configurations
+        """
+        config = {"a": {"b": 1, "c": 2}, "d": 3}
+
+        # call the function
+        merged = merge_config(config, {"a": {"c": 4}, "d": {"e": 5}})
+
+        # assert the result
+        self.assertDictEqual(merged, {"a": {"b": 1, "c": 4}, "d": {"e": 5}})
+        self.assertDictEqual(config, {"a": {"b": 1, "c": 2}, "d": 3})
+
+
+@patch("dakara_player.rooms.gettempdir", return_value="/tmp")
+@patch("dakara_player.rooms.get_config_directory", return_value=Path("/config"))
+class GetRoomsConfigTestCase(TestCase):
+    """Test the configuration of the rooms
+    """
+
+    def test_get(self, mocked_get_config_directory, mocked_gettempdir):
+        """Test to get the configuration of two rooms
+        """
+        config = dict(
+            CONFIG,
+            rooms=[
+                {
+                    "name": "room1",
+                    "player": {"mpv": {"fs-screen": 1}},
+                    "server": {"login": "room1"},
+                },
+                {
+                    "name": "room2",
+                    "player": {"checkpoint": {"path": "/path/to/checkpoint.json"}},
+                },
+            ],
+        )
+
+        # call the function
+        rooms_config = get_rooms_config(config)
+
+        # assert the result
+        (name1, config1), (name2, config2) = rooms_config
+        self.assertEqual(name1, "room1")
+        self.assertDictEqual(config1["player"]["mpv"], {"fs": True, "fs-screen": 1})
+        self.assertEqual(config1["server"]["login"], "room1")
+        self.assertEqual(config1["server"]["password"], "pass")
+        self.assertEqual(config1["loglevel"], "info")
+        self.assertNotIn("rooms", config1)
+        self.assertEqual(
+            config1["player"]["checkpoint"]["path"],
+            Path("/config") / "player_checkpoint_room1.json",
+        )
+        self.assertEqual(
+            config1["player"]["persistent_mpv"]["ipc_socket"],
+            Path("/tmp") / "dakara_player_mpv_room1.sock",
+        )
+
+        self.assertEqual(name2, "room2")
+        self.assertEqual(config2["server"]["login"], "login")
+        self.assertEqual(
+            config2["player"]["checkpoint"]["path"], "/path/to/checkpoint.json"
+        )
+
+    def test_get_no_name(self, mocked_get_config_directory, mocked_gettempdir):
+        """Test to get the configuration of a room without name
+        """
+        config = dict(CONFIG, rooms=[{"server": {"login": "room1"}}])
+
+        # call the function
+        with self.assertRaisesRegex(ConfigInvalidError, "A room has no name"):
+            get_rooms_config(config)
+
+    def test_get_duplicate(self, mocked_get_config_directory, mocked_gettempdir):
+        """Test to get the configuration of two rooms with the same name
+        """
+        config = dict(CONFIG, rooms=[{"name": "room1"}, {"name": "room1"}])
+
+        # call the function
+        with self.assertRaisesRegex(
+            ConfigInvalidError, "Room 'room1' is declared twice"
+        ):
+            get_rooms_config(config)
+
+
+class SharedResourcesTestCase(TestCase):
+    """Test the resources shared by the rooms
+    """
+
+    def test_get_io_executor(self):
+        """Test executors are shared between identical configurations
+        """
+        resources = SharedResources(MagicMock())
+
+        # call the method
+        io_executor1 = resources.get_io_executor({"timeout": 2})
+        io_executor2 = resources.get_io_executor({"timeout": 2})
+        io_executor3 = resources.get_io_executor({"timeout": 5})
+
+        # assert the result
+        self.assertIs(io_executor1, io_executor2)
+        self.assertIsNot(io_executor1, io_executor3)
+        self.assertEqual(io_executor3.timeout, 5)
+
+    def test_get_text_generator(self):
+        """Test text generators are shared between identical configurations
+        """
+        resources = SharedResources(MagicMock())
+
+        # call the method
+        text_generator1 = resources.get_text_generator({})
+        text_generator2 = resources.get_text_generator(None)
+        text_generator3 = resources.get_text_generator({"render_timeout": 2})
+
+        # assert the result
+        self.assertIs(text_generator1, text_generator2)
+        self.assertIsNot(text_generator1, text_generator3)
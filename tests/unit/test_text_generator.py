@@ -1,15 +1,20 @@
+from tempfile import TemporaryDirectory
 from unittest import TestCase
-from unittest.mock import mock_open, patch
+from unittest.mock import MagicMock, mock_open, patch
 
 from dakara_base.resources_manager import get_file
 from path import Path
 
 from dakara_player.text_generator import (
+    BudgetedSandboxedEnvironment,
     IDLE_TEMPLATE_NAME,
+    TemplateRenderError,
+    TemplateRenderTimeoutError,
     TextGenerator,
     TRANSITION_TEMPLATE_NAME,
 )
 
+from dakara_player.playlist_entry import PlaylistEntry
 from dakara_player.resources_manager import get_template
 
 
@@ -32,6 +37,22 @@ class TextGeneratorTestCase(TestCase):
         mocked_load_icon_map.assert_called_once_with()
         mocked_load_templates.assert_called_once_with()
 
+    @patch.object(TextGenerator, "load_templates")
+    @patch.object(TextGenerator, "load_icon_map")
+    def test_load_loaded(self, mocked_load_icon_map, mocked_load_templates):
+        """Test the load method does nothing if already loaded
+        """
+        # create ojbect
+        text_generator = TextGenerator({})
+        text_generator.environment = MagicMock()
+
+        # call the method
+        text_generator.load()
+
+        # assert the call
+        mocked_load_icon_map.assert_not_called()
+        mocked_load_templates.assert_not_called()
+
     @patch.object(Path, "open", new_callable=mock_open)
     @patch("dakara_player.text_generator.ICON_MAP_FILE", "icon_map_file")
     @patch("dakara_player.text_generator.get_file", autospec=True)
@@ -235,6 +256,75 @@ class TextGeneratorTestCase(TestCase):
         self.assertEqual(text_generator.convert_link_type_name("IS"), "Image song")
 
 
+class BudgetedSandboxedEnvironmentTestCase(TestCase):
+    """Test the budgeted sandboxed environment
+    """
+
+    def test_render(self):
+        """Test to render a template within the budget
+        """
+        environment = BudgetedSandboxedEnvironment()
+        template = environment.from_string(
+            "{% for i in range(3) %}{{ i * 2 }}{% endfor %}"
+        )
+
+        with environment.budget(10):
+            self.assertEqual(template.render(), "024")
+
+    def test_render_timeout(self):
+        """Test to render a template exceeding the budget
+        """
+        environment = BudgetedSandboxedEnvironment()
+        template = environment.from_string(
+            "{% for i in range(100000) %}{% for j in range(100000) %}"
+            "{% endfor %}{% endfor %}"
+        )
+
+        with self.assertRaisesRegex(
+            TemplateRenderTimeoutError, "Template rendering took too long"
+        ):
+            with environment.budget(0.01):
+                template.render()
+
+    def test_render_timeout_loop(self):
+        """Test to render a template looping over data exceeding the budget
+        """
+        environment = BudgetedSandboxedEnvironment()
+        template = environment.from_string(
+            "{% for i in items %}{% for j in items %}{% endfor %}{% endfor %}"
+        )
+
+        with self.assertRaisesRegex(
+            TemplateRenderTimeoutError, "Template rendering took too long"
+        ):
+            with environment.budget(0.01):
+                template.render(items=[None] * 100000)
+
+    def test_render_result_too_large(self):
+        """Test to render a template creating a too large result
+        """
+        environment = BudgetedSandboxedEnvironment()
+
+        for source in ['{{ "x" * 10 ** 8 }}', "{{ 10 ** 1000000 }}"]:
+            with self.subTest(source=source):
+                template = environment.from_string(source)
+
+                with self.assertRaisesRegex(
+                    TemplateRenderTimeoutError, "Template operation result too large"
+                ):
+                    with environment.budget(10):
+                        template.render()
+
+    def test_render_no_budget(self):
+        """Test to render a template without budget
+        """
+        environment = BudgetedSandboxedEnvironment()
+        template = environment.from_string("{{ range(3) | list | length }}")
+
+        with environment.budget(None):
+            self.assertEqual(template.render(), "3")
+
+
 class TextGeneratorIntegrationTestCase(TestCase):
     """Test the text generator class in real conditions
     """
@@ -244,31 +334,35 @@ class TextGeneratorIntegrationTestCase(TestCase):
         self.idle_info = {"notes": ["VLC 0.0.0", "Dakara player 0.0.0"]}
 
         # create playlist entry
-        self.playlist_entry = {
-            "song": {
-                "title": "Song title",
-                "artists": [{"name": "Artist name"}],
-                "works": [
-                    {
-                        "work": {
-                            "title": "Work title",
-                            "subtitle": "Subtitle of the work",
-                            "work_type": {
-                                "name": "Work type name",
-                                "icon_name": "music",
+        self.playlist_entry = PlaylistEntry.from_dict(
+            {
+                "id": 42,
+                "song": {
+                    "title": "Song title",
+                    "artists": [{"name": "Artist name"}],
+                    "works": [
+                        {
+                            "work": {
+                                "title": "Work title",
+                                "subtitle": "Subtitle of the work",
+                                "work_type": {
+                                    "name": "Work type name",
+                                    "icon_name": "music",
+                                },
                             },
-                        },
-                        "link_type": "OP",
-                        "link_type_number": 1,
-                        "episodes": "1, 2, 3",
-                    }
-                ],
-                "file_path": "path/of/the/file",
+                            "link_type": "OP",
+                            "link_type_number": 1,
+                            "episodes": "1, 2, 3",
+                        }
+                    ],
+                    "file_path": "path/of/the/file",
+                },
+                "owner": {"username": "User"},
+                "use_instrumental": True,
+                "date_created": "1970-01-01T00:00:00.00",
             },
-            "owner": {"username": "User"},
-            "use_instrumental": True,
-            "date_created": "1970-01-01T00:00:00.00",
-        }
+            Path("kara"),
+        )
 
         # create idle text content
         self.idle_text_path = get_file("tests.resources", "idle.ass")
@@ -299,3 +393,102 @@ class TextGeneratorIntegrationTestCase(TestCase):
         # check file content
         transition_text_content = self.transition_text_path.text(encoding="utf8")
         self.assertEqual(transition_text_content, result)
+
+    def test_create_idle_text_render_duration(self):
+        """Test the duration of the rendering is recorded
+        """
+        # call method
+        self.text_generator.create_idle_text(self.idle_info)
+
+        # assert the duration
+        self.assertIn(IDLE_TEMPLATE_NAME, self.text_generator.render_durations)
+
+    def test_create_transition_text_timeout(self):
+        """Test the generation of a transition text too long to render
+
+        The template should be replaced by the default one.
+        """
+        with TemporaryDirectory() as temp:
+            directory = Path(temp)
+            (directory / "slow.ass").write_text(
+                "{% for i in range(100000) %}{% for j in range(100000) %}"
+                "{% endfor %}{% endfor %}"
+            )
+
+            text_generator = TextGenerator(
+                {
+                    "directory": directory,
+                    "transition_template_name": "slow.ass",
+                    "render_timeout": 0.01,
+                }
+            )
+            text_generator.load()
+
+            # call method
+            with self.assertRaisesRegex(
+                TemplateRenderTimeoutError,
+                r"Rendering transition template 'slow.ass' exceeded 0.01 s",
+            ), self.assertLogs("dakara_player.text_generator", "DEBUG"):
+                text_generator.create_transition_text(self.playlist_entry)
+
+        # assert the template has been replaced
+        self.assertEqual(
+            text_generator.transition_template.filename,
+            get_template(TRANSITION_TEMPLATE_NAME),
+        )
+        self.assertIn("slow.ass", text_generator.render_durations)
+
+        # assert the default template is now used
+        result = text_generator.create_transition_text(self.playlist_entry)
+        transition_text_content = self.transition_text_path.text(encoding="utf8")
+        self.assertEqual(transition_text_content, result)
+
+    def check_create_transition_text_rejected(self, source, message):
+        """Check the generation of a transition text rejected by the sandbox
+
+        The template should be replaced by the default one.
+
+        Args:
+            source (str): Content of the template.
+            message (str): Expected message of the sandbox error.
+        """
+        with TemporaryDirectory() as temp:
+            directory = Path(temp)
+            (directory / "rejected.ass").write_text(source)
+
+            text_generator = TextGenerator(
+                {"directory": directory, "transition_template_name": "rejected.ass"}
+            )
+            text_generator.load()
+
+            # call method
+            with self.assertRaisesRegex(
+                TemplateRenderError,
+                r"Rendering transition template 'rejected.ass' failed: " + message,
+            ), self.assertLogs("dakara_player.text_generator", "DEBUG"):
+                text_generator.create_transition_text(self.playlist_entry)
+
+        # assert the template has been replaced
+        self.assertEqual(
+            text_generator.transition_template.filename,
+            get_template(TRANSITION_TEMPLATE_NAME),
+        )
+
+        # assert the default template is now used
+        result = text_generator.create_transition_text(self.playlist_entry)
+        transition_text_content = self.transition_text_path.text(encoding="utf8")
+        self.assertEqual(transition_text_content, result)
+
+    def test_create_transition_text_range_too_big(self):
+        """Test the generation of a transition text with a too big range
+        """
+        self.check_create_transition_text_rejected(
+            "{{ range(10 ** 6) | list | length }}", "Range too big"
+        )
+
+    def test_create_transition_text_unsafe(self):
+        """Test the generation of a transition text accessing unsafe attributes
+        """
+        self.check_create_transition_text_rejected(
+            '{{ "".__class__.__mro__ }}', "access to attribute '__class__'"
+        )
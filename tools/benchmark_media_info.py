@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Measure the throughput of the container header reader over a directory
+
+Tracks of each Matroska, WebM and MP4 file of the directory are read from the
+headers of the container. If VLC is available, the duration of parsing the
+same files with VLC is measured for comparison.
+"""
+from argparse import ArgumentParser
+from time import monotonic
+
+from path import Path
+
+from dakara_player.integrity import FileIntegrityError
+from dakara_player.media_info import read_media_info
+
+try:
+    import vlc
+
+except ImportError:
+    vlc = None
+
+EXTENSIONS = {".mkv", ".webm", ".mp4", ".m4v"}
+
+
+def benchmark_media_info(file_paths):
+    """Read the tracks of the files with the header reader
+
+    Args:
+        file_paths (list of path.Path): Files to read.
+
+    Returns:
+        tuple: Duration in seconds and number of files that could not be read.
+    """
+    errors = 0
+    start = monotonic()
+    for file_path in file_paths:
+        try:
+            read_media_info(file_path)
+
+        except (FileIntegrityError, OSError, ValueError):
+            errors += 1
+
+    return monotonic() - start, errors
+
+
+def benchmark_vlc(file_paths):
+    """Read the tracks of the files by parsing them with VLC
+
+    Args:
+        file_paths (list of path.Path): Files to read.
+
+    Returns:
+        tuple: Duration in seconds and number of files without audio track.
+        None if VLC is not available.
+    """
+    if vlc is None:
+        return None
+
+    # python-vlc raises NameError when libvlc cannot be loaded
+    try:
+        instance = vlc.Instance()
+
+    except NameError:
+        return None
+
+    if instance is None:
+        return None
+
+    errors = 0
+    start = monotonic()
+    for file_path in file_paths:
+        media = instance.media_new_path(file_path)
+        media.parse()
+        if not any(track.type == vlc.TrackType.audio for track in media.tracks_get()):
+            errors += 1
+
+        media.release()
+
+    duration = monotonic() - start
+    instance.release()
+
+    return duration, errors
+
+
+def main():
+    parser = ArgumentParser(description="Measure the throughput of the header reader")
+    parser.add_argument("directory", help="directory containing media files")
+    args = parser.parse_args()
+
+    file_paths = [
+        file_path
+        for file_path in Path(args.directory).walkfiles()
+        if file_path.ext.lower() in EXTENSIONS
+    ]
+    if not file_paths:
+        print("No media file found")
+        return
+
+    results = {"header reader": benchmark_media_info(file_paths)}
+    vlc_result = benchmark_vlc(file_paths)
+    if vlc_result is not None:
+        results["VLC parse"] = vlc_result
+
+    print("{} files".format(len(file_paths)))
+    print("{:<20}{:>12}{:>12}{:>12}".format("", "total (s)", "files/s", "errors"))
+    for name, (duration, errors) in results.items():
+        print(
+            "{:<20}{:>12.3f}{:>12.1f}{:>12}".format(
+                name, duration, len(file_paths) / duration, errors
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
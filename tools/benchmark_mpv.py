@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Compare the latencies of mpv through IPC and through libmpv
+
+Both backends play the idle background with null video and audio outputs.
+The duration to read a property and the delay between the request to play a
+file and the reception of its start event are measured.
+"""
+from argparse import ArgumentParser
+from queue import Queue
+from statistics import mean, median
+from tempfile import TemporaryDirectory
+from threading import Event
+from time import monotonic
+
+from path import Path
+
+from dakara_player.media_player.base import IDLE_BG_NAME
+from dakara_player.media_player.libmpv import MediaPlayerLibmpv
+from dakara_player.media_player.mpv import MediaPlayerMpv
+from dakara_player.resources_manager import get_background
+
+EVENT_TIMEOUT = 10
+
+
+def benchmark(media_player_class, count):
+    """Measure the latencies of a mpv backend
+
+    Args:
+        media_player_class (type): Class of the media player.
+        count (int): Number of measures.
+
+    Returns:
+        dict: Measurements in milliseconds.
+    """
+    with TemporaryDirectory() as tempdir:
+        media_player = media_player_class(
+            Event(),
+            Queue(),
+            {"mpv": {"vo": "null", "ao": "null"}, "durations": {"respawn_budget": 0}},
+            Path(tempdir),
+            warn_long_exit=False,
+        )
+
+        with media_player:
+            player = media_player.player
+            started = Event()
+
+            def handle_start_file(event):
+                started.set()
+
+            if isinstance(media_player, MediaPlayerLibmpv):
+                player.event_callback("start-file")(handle_start_file)
+
+            else:
+                player.bind_event("start-file", handle_start_file)
+
+            # event latency
+            path = get_background(IDLE_BG_NAME)
+            player.image_display_duration = "inf"
+            events = []
+            for _ in range(count):
+                started.clear()
+                start = monotonic()
+                player.play(path)
+                if not started.wait(EVENT_TIMEOUT):
+                    raise RuntimeError("mpv has not started the file")
+
+                events.append(monotonic() - start)
+
+            # property access
+            properties = []
+            for _ in range(count * 10):
+                start = monotonic()
+                player.time_pos
+                properties.append(monotonic() - start)
+
+    return {
+        "property (mean)": mean(properties) * 1000,
+        "property (median)": median(properties) * 1000,
+        "event (mean)": mean(events) * 1000,
+        "event (median)": median(events) * 1000,
+    }
+
+
+def main():
+    parser = ArgumentParser(description="Compare the latencies of mpv backends")
+    parser.add_argument("--count", type=int, default=50, help="number of measures")
+    args = parser.parse_args()
+
+    results = {}
+    for media_player_class in (MediaPlayerMpv, MediaPlayerLibmpv):
+        if not media_player_class.is_available():
+            print("{} is not available".format(media_player_class.player_name))
+            continue
+
+        results[media_player_class.player_name] = benchmark(
+            media_player_class, args.count
+        )
+
+    if not results:
+        return
+
+    print(("{:<20}" + "{:>12}" * len(results)).format("ms", *results))
+    for name in next(iter(results.values())):
+        print(
+            ("{:<20}" + "{:>12.3f}" * len(results)).format(
+                name, *(result[name] for result in results.values())
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
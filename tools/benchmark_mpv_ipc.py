@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Compare the duration of a screen change of mpv with and without pipelining
+
+mpv plays the idle background with null video and audio outputs. The screen
+change is sent either request by request, or as one pipelined batch.
+"""
+from argparse import ArgumentParser
+from queue import Queue
+from statistics import mean, median
+from tempfile import TemporaryDirectory
+from threading import Event
+from time import monotonic
+
+from path import Path
+
+from dakara_player.media_player.base import IDLE_BG_NAME
+from dakara_player.media_player.mpv import MediaPlayerMpv
+from dakara_player.resources_manager import get_background
+
+
+def benchmark(count):
+    """Measure the duration of screen changes
+
+    Args:
+        count (int): Number of measures.
+
+    Returns:
+        dict: Measurements in milliseconds, by mode.
+    """
+    properties = {
+        "image_display_duration": "inf",
+        "sub_files": [],
+        "audio_files": [],
+        "audio": "auto",
+        "pause": False,
+        "start": "none",
+    }
+    path = get_background(IDLE_BG_NAME)
+
+    with TemporaryDirectory() as tempdir:
+        media_player = MediaPlayerMpv(
+            Event(),
+            Queue(),
+            {"mpv": {"vo": "null", "ao": "null"}, "durations": {"respawn_budget": 0}},
+            Path(tempdir),
+            warn_long_exit=False,
+        )
+
+        with media_player:
+            media_player.setup_player()
+            ipc_client = media_player.ipc_client
+            if ipc_client is None:
+                raise RuntimeError("Pipelined IPC client is not available")
+
+            results = {}
+            for mode, client in (("sequential", None), ("pipelined", ipc_client)):
+                media_player.ipc_client = client
+                durations = []
+                for _ in range(count):
+                    start = monotonic()
+                    media_player.load_media(properties, path)
+                    durations.append(monotonic() - start)
+
+                results[mode] = durations
+
+            media_player.ipc_client = ipc_client
+
+    return {
+        mode: {"mean": mean(durations) * 1000, "median": median(durations) * 1000}
+        for mode, durations in results.items()
+    }
+
+
+def main():
+    parser = ArgumentParser(description="Compare the duration of mpv screen changes")
+    parser.add_argument("--count", type=int, default=100, help="number of measures")
+    args = parser.parse_args()
+
+    if not MediaPlayerMpv.is_available():
+        print("mpv is not available")
+        return
+
+    results = benchmark(args.count)
+
+    print("{:<20}{:>12}{:>12}".format("ms", *results))
+    for name in ("mean", "median"):
+        print(
+            "{:<20}{:>12.3f}{:>12.3f}".format(
+                name, *(result[name] for result in results.values())
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
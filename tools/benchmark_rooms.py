@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Compare the memory used by rooms run in one process or in separate processes
+
+The media player backend is replaced by a fake one, so only the memory used
+by the program itself is measured. Linux only.
+"""
+import subprocess
+import sys
+from argparse import ArgumentParser
+from contextlib import ExitStack
+from queue import Queue
+from tempfile import TemporaryDirectory
+from threading import Event
+
+from path import Path
+
+from dakara_player.dakara_server import DakaraServerHTTPConnection
+from dakara_player.media_player.base import MediaPlayer
+from dakara_player.rooms import SharedResources, get_rooms_config
+
+
+class FakeMediaPlayer(MediaPlayer):
+    """Media player with a backend doing nothing
+    """
+
+    player_name = "fake"
+
+    @staticmethod
+    def is_available():
+        return True
+
+    def load_player(self):
+        pass
+
+    def get_position(self):
+        return 0
+
+    def get_timing(self):
+        return 0
+
+    def get_version(self):
+        return "0"
+
+    def is_playing(self):
+        return False
+
+    def is_paused(self):
+        return False
+
+    def play(self, what, position=None):
+        pass
+
+    def pause(self, paused):
+        pass
+
+    def pause_player(self, paused):
+        pass
+
+    def skip(self):
+        pass
+
+    def reload_idle_text(self):
+        pass
+
+    def stop_player(self):
+        pass
+
+    def prepare_playlist_entry_player(self, preparation, playlist_entry, file_path):
+        pass
+
+    def clear_playlist_entry_player(self):
+        pass
+
+
+def get_rss():
+    """Get the resident memory of the current process
+
+    Returns:
+        int: Resident memory in kB.
+    """
+    with open("/proc/self/status") as file:
+        for line in file:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+
+    raise RuntimeError("Unable to read the memory of the process")
+
+
+def run_rooms(count, kara_folder):
+    """Create rooms in the current process and print its memory
+
+    Args:
+        count (int): Number of rooms.
+        kara_folder (str): Path of the karaoke folder.
+    """
+    config = {
+        "player": {"kara_folder": kara_folder, "durations": {"stall_threshold": 0}},
+        "server": {"address": "127.0.0.1:8000", "login": "login", "password": "pass"},
+        "rooms": [{"name": "room{}".format(index)} for index in range(count)],
+    }
+
+    with ExitStack() as stack:
+        resources = SharedResources(None)
+        for _, room_config in get_rooms_config(config):
+            room_config["player"]["checkpoint"] = {"interval": 0}
+            tempdir = Path(stack.enter_context(TemporaryDirectory()))
+            media_player = stack.enter_context(
+                FakeMediaPlayer(
+                    Event(),
+                    Queue(),
+                    room_config["player"],
+                    tempdir,
+                    resources=resources,
+                )
+            )
+            media_player.load()
+            DakaraServerHTTPConnection(
+                room_config["server"], endpoint_prefix="api/", mute_raise=True,
+            )
+
+        print(get_rss())
+
+
+def measure(count, kara_folder):
+    """Measure the memory of rooms run in a new process
+
+    Args:
+        count (int): Number of rooms.
+        kara_folder (str): Path of the karaoke folder.
+
+    Returns:
+        int: Resident memory of the process in kB.
+    """
+    output = subprocess.check_output(
+        [sys.executable, __file__, "--child", str(count), "--kara-folder", kara_folder]
+    )
+
+    return int(output.decode().split()[-1])
+
+
+def main():
+    parser = ArgumentParser(
+        description="Compare the memory used by rooms in one or several processes"
+    )
+    parser.add_argument("--rooms", type=int, default=6, help="number of rooms")
+    parser.add_argument("--child", type=int, help="run rooms in this process")
+    parser.add_argument("--kara-folder", default=".", help="karaoke folder")
+    args = parser.parse_args()
+
+    if args.child is not None:
+        run_rooms(args.child, args.kara_folder)
+        return
+
+    single = measure(1, args.kara_folder)
+    separate = single * args.rooms
+    shared = measure(args.rooms, args.kara_folder)
+
+    print("{:<24}{:>12}{:>12}".format("", "total (kB)", "room (kB)"))
+    print("{:<24}{:>12}{:>12}".format("separate processes", separate, single))
+    print(
+        "{:<24}{:>12}{:>12.0f}".format(
+            "one process", shared, (shared - single) / max(args.rooms - 1, 1)
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()